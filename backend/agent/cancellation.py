@@ -0,0 +1,135 @@
+"""Per-turn cancellation scope shared by the websocket loop and tools.
+
+The websocket handler creates one ``CancelScope`` per turn and binds it to a
+context variable before the agent runs. Tools executing in worker threads pick
+it up via ``current_scope()`` to register subprocesses and HTTP clients, so a
+``cancel`` control message can kill them instead of waiting for timeouts.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+_current_scope: contextvars.ContextVar["CancelScope | None"] = contextvars.ContextVar(
+    "myclaw_cancel_scope", default=None
+)
+
+
+class TurnCancelled(Exception):
+    """Raised by ``run_agent`` when the turn was cancelled; carries partial output."""
+
+    def __init__(self, round_messages: list | None = None):
+        super().__init__("turn cancelled")
+        self.round_messages = round_messages or []
+
+
+def is_running(proc: Any) -> bool:
+    """True while a ``subprocess.Popen`` or ``asyncio.subprocess.Process`` has not exited."""
+    if isinstance(proc, subprocess.Popen):
+        return proc.poll() is None
+    return proc.returncode is None
+
+
+def kill_process_group(proc: Any) -> None:
+    """Terminate a subprocess (sync or asyncio) together with every child in its process group."""
+    if not is_running(proc):
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+    except Exception as e:
+        logger.warning("Failed to kill process group %s: %s", proc.pid, e)
+
+
+class CancelScope:
+    """Tracks resources owned by one agent turn and tears them down on cancel."""
+
+    def __init__(self, session_id: str | None = None):
+        # Lets tools that keep per-conversation state (the Python kernel) find their session.
+        self.session_id = session_id
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._processes: set[Any] = set()
+        self._clients: set[Any] = set()
+        self.killed_processes = 0
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def register_process(self, proc: Any) -> None:
+        with self._lock:
+            self._processes.add(proc)
+        if self.cancelled:
+            kill_process_group(proc)
+
+    def unregister_process(self, proc: Any) -> None:
+        with self._lock:
+            self._processes.discard(proc)
+
+    def register_client(self, client: Any) -> None:
+        """Register a sync httpx client to be closed on cancel."""
+        with self._lock:
+            self._clients.add(client)
+
+    def unregister_client(self, client: Any) -> None:
+        with self._lock:
+            self._clients.discard(client)
+
+    def cancel(self) -> None:
+        """Kill registered process groups and close registered HTTP clients."""
+        self._cancelled.set()
+        with self._lock:
+            processes = list(self._processes)
+            clients = list(self._clients)
+            self._processes.clear()
+            self._clients.clear()
+        for proc in processes:
+            if is_running(proc):
+                kill_process_group(proc)
+                self.killed_processes += 1
+        for client in clients:
+            try:
+                if not client.is_closed:
+                    client.close()
+            except Exception as e:
+                logger.debug("Failed to close HTTP client on cancel: %s", e)
+
+
+def current_scope() -> CancelScope | None:
+    return _current_scope.get()
+
+
+def bind_scope(scope: CancelScope | None) -> contextvars.Token:
+    return _current_scope.set(scope)
+
+
+def reset_scope(token: contextvars.Token) -> None:
+    _current_scope.reset(token)
+
+
+@contextmanager
+def scoped_client(client: Any) -> Iterator[Any]:
+    """Use a sync httpx client that the current turn's scope can abort on cancel."""
+    scope = current_scope()
+    if scope is not None:
+        scope.register_client(client)
+    try:
+        with client:
+            yield client
+    finally:
+        if scope is not None:
+            scope.unregister_client(client)
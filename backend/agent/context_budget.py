@@ -25,7 +25,7 @@ def load_context_policy() -> ContextPolicy:
     )
 
 
-def _estimate_text_tokens(text: str) -> int:
+def estimate_text_tokens(text: str) -> int:
     if not text:
         return 0
     # Heuristic: 1 token ~= 4 chars for mixed zh/en payloads.
@@ -58,7 +58,7 @@ def estimate_messages_tokens(messages: list[Any], model_name: str | None = None)
     total = 0
     for msg in messages:
         text = _extract_message_text(msg)
-        total += _estimate_text_tokens(text) + 10  # per-message overhead
+        total += estimate_text_tokens(text) + 10  # per-message overhead
     return total + 50  # request envelope overhead
 
 
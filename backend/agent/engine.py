@@ -9,10 +9,19 @@ from pathlib import Path
 from typing import Any, Callable
 
 from langchain.agents import create_agent
+from langchain_core.messages import SystemMessage, ToolMessage
 
+from agent.cancellation import CancelScope, TurnCancelled, bind_scope, reset_scope
+from agent.tool_stream import ToolOutputStream, bind_stream, reset_stream
 from agent.llm import get_llm
+from agent.metrics import metrics
+from agent.message_record import to_langchain_messages
+from agent.context_budget import estimate_text_tokens
 from agent.skill_loader import get_skill_loader
+from agent.skill_router import SkillSelection, select_skills, used_skills
 from agent.tool_registry import get_all_tools
+from agent.tool_router import ToolExposureMiddleware, select_tools
+from tools.skill_tools import skill_tool_name
 
 logger = logging.getLogger(__name__)
 
@@ -43,51 +52,134 @@ DEFAULT_CONTEXT_LIMIT = 131072
 
 
 def _extract_token_usage(ai_msg) -> dict[str, int] | None:
-    """Extract token usage from a LangChain AIMessage if available."""
+    """Extract token usage from a LangChain AIMessage if available.
+    ``cached_tokens`` is the part of the prompt served from the provider's prefix cache."""
     usage = getattr(ai_msg, "usage_metadata", None)
     if usage and isinstance(usage, dict):
+        details = usage.get("input_token_details") or {}
         return {
             "prompt_tokens": usage.get("input_tokens", 0),
             "completion_tokens": usage.get("output_tokens", 0),
             "total_tokens": usage.get("total_tokens", 0),
+            "cached_tokens": details.get("cache_read", 0) or 0,
         }
     resp_meta = getattr(ai_msg, "response_metadata", None)
     if resp_meta and isinstance(resp_meta, dict):
         tu = resp_meta.get("token_usage") or resp_meta.get("usage") or {}
         if tu:
+            details = tu.get("prompt_tokens_details") or {}
             return {
                 "prompt_tokens": tu.get("prompt_tokens", 0),
                 "completion_tokens": tu.get("completion_tokens", 0),
                 "total_tokens": tu.get("total_tokens", tu.get("prompt_tokens", 0) + tu.get("completion_tokens", 0)),
+                "cached_tokens": details.get("cached_tokens", 0) or 0,
             }
     return None
 
 
+def prompt_cache_control_enabled() -> bool:
+    return os.getenv("PROMPT_CACHE_CONTROL", "false").lower() in ("1", "true", "yes")
+
+
+_prompt_cache: tuple[tuple[int, int] | None, str] | None = None
+
+
 def load_system_prompt() -> str:
+    """prompts/system.md, re-read only when the file changes."""
+    global _prompt_cache
     path = PROMPTS_DIR / "system.md"
-    if path.exists():
-        content = path.read_text(encoding="utf-8").strip()
-        if content:
-            logger.info("Loaded system prompt from %s", path)
-            return content
-    logger.warning("System prompt file not found or empty, using default")
-    return DEFAULT_SYSTEM_PROMPT
+    try:
+        st = path.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    if _prompt_cache is not None and _prompt_cache[0] == stamp:
+        return _prompt_cache[1]
+    content = path.read_text(encoding="utf-8").strip() if stamp is not None else ""
+    if content:
+        logger.info("Loaded system prompt from %s", path)
+    else:
+        logger.warning("System prompt file not found or empty, using default")
+        content = DEFAULT_SYSTEM_PROMPT
+    _prompt_cache = (stamp, content)
+    return content
+
+
+def _skill_line(skill) -> str:
+    scripts_note = f' scripts="{", ".join(skill.scripts)}"' if skill.scripts else ""
+    if skill.commands:
+        names = ", ".join(skill_tool_name(skill.name, c.name) for c in skill.commands)
+        scripts_note += f' tools="{names}"'
+    return f'<skill name="{skill.name}"{scripts_note}>{skill.description}</skill>'
+
+
+def _skills_block(skills: list, omitted: list) -> str:
+    lines = ["", "", "<available_skills>", *(_skill_line(s) for s in skills)]
+    if omitted:
+        # Routed out for this message; names only, docs still readable via read_skill_doc.
+        lines.append(f"<other_skills>{', '.join(s.name for s in omitted)}</other_skills>")
+    lines.append("</available_skills>")
+    return "\n".join(lines)
+
+
+def _route_skills(query: str | None = None, history: list | None = None) -> SkillSelection:
+    """Skills to list for the user's message (``SKILL_ROUTING_ENABLED``); all without a message."""
+    skills = get_skill_loader().loaded_skills
+    if query is None:
+        return SkillSelection(skills)
+    return select_skills(skills, query, used_skills(history, skills))
+
+
+def _prompt_parts(selection: SkillSelection) -> tuple[str, str]:
+    """(stable, volatile) system prompt; per-day content goes in the volatile tail.
+
+    With ``PROMPT_CACHE_CONTROL`` the stable part lists the full skill catalog
+    and the skills routed for this message are only named in the tail, so the
+    cached prefix is byte-identical across messages. Without it, routing
+    shrinks the catalog itself: the stable part then only repeats while the
+    skill selection does. Records tokens saved by routing."""
+    stable = load_system_prompt()
+    volatile = ""
+    skills = get_skill_loader().loaded_skills
+    if skills:
+        if prompt_cache_control_enabled():
+            stable += _skills_block(skills, [])
+            if selection.omitted:
+                volatile += f"\n\n<relevant_skills>{', '.join(s.name for s in selection.listed)}</relevant_skills>"
+        else:
+            block = _skills_block(selection.listed, selection.omitted)
+            if selection.omitted:
+                saved = estimate_text_tokens(_skills_block(skills, [])) - estimate_text_tokens(block)
+                metrics.observe("skill_prompt_tokens_saved", saved)
+                logger.info(
+                    "Skill routing listed %s, omitted %d, saved ~%d prompt tokens per step",
+                    [s.name for s in selection.listed], len(selection.omitted), saved,
+                )
+            stable += block
+    today = datetime.now().strftime("%Y-%m-%d %A")
+    return stable, f"{volatile}\n\n当前日期：{today}"
 
 
-def _build_system_prompt() -> str:
-    base = load_system_prompt()
-    today = datetime.now().strftime("%Y-%m-%d %A")
-    base = f"当前日期：{today}\n\n{base}"
-    loader = get_skill_loader()
-    skills = loader.loaded_skills
-    if skills:
-        lines = ["", "", "<available_skills>"]
-        for s in skills:
-            scripts_note = f' scripts="{", ".join(s.scripts)}"' if s.scripts else ""
-            lines.append(f'<skill name="{s.name}"{scripts_note}>{s.description}</skill>')
-        lines.append("</available_skills>")
-        base += "\n".join(lines)
-    return base
+def _build_system_prompt(
+    query: str | None = None,
+    history: list | None = None,
+    selection: SkillSelection | None = None,
+) -> str:
+    """System prompt with the skill catalog, routed for ``query`` when given."""
+    stable, volatile = _prompt_parts(selection or _route_skills(query, history))
+    return stable + volatile
+
+
+def _system_message(selection: SkillSelection) -> SystemMessage:
+    """System message; with ``PROMPT_CACHE_CONTROL`` the stable part is marked
+    as a cache breakpoint (Anthropic / DashScope explicit caching)."""
+    stable, volatile = _prompt_parts(selection)
+    if not prompt_cache_control_enabled():
+        return SystemMessage(content=stable + volatile)
+    return SystemMessage(content=[
+        {"type": "text", "text": stable, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": volatile},
+    ])
 
 
 def _make_event(event_type: str, data: dict[str, Any], step: int = 0) -> dict:
@@ -122,15 +214,37 @@ def _serialize_message(msg) -> dict:
     return d
 
 
-def build_agent():
+def _close_pending_tool_calls(round_messages: list) -> list:
+    """Answer tool calls left open by a cancelled turn so history stays valid for the next LLM call."""
+    answered = {getattr(m, "tool_call_id", None) for m in round_messages if getattr(m, "type", "") == "tool"}
+    closed = list(round_messages)
+    for msg in round_messages:
+        for tc in getattr(msg, "tool_calls", None) or []:
+            if tc.get("id") and tc["id"] not in answered:
+                closed.append(ToolMessage(
+                    content="错误：工具调用已被用户取消",
+                    name=tc.get("name", ""),
+                    tool_call_id=tc["id"],
+                ))
+    return closed
+
+
+def build_agent(user_input: str | None = None, history: list | None = None):
     llm = get_llm()
     tools = get_all_tools()
     max_steps = int(os.getenv("AGENT_MAX_STEPS", "40"))
-    system_prompt = _build_system_prompt()
+    selection = _route_skills(user_input, history)
+    system_prompt = _system_message(selection)
+    # With explicit caching the full (sorted) tool list is part of the cached
+    # prefix; narrowing it per message or per request_tools call would miss it.
+    exposed = None
+    if user_input is not None and not prompt_cache_control_enabled():
+        exposed = select_tools(tools, user_input, selection.listed)
     agent = create_agent(
         model=llm,
         tools=tools,
         system_prompt=system_prompt,
+        middleware=[ToolExposureMiddleware(exposed)],
         name="myclaw_agent",
     )
     return agent, max_steps
@@ -147,109 +261,135 @@ async def run_agent(
     on_event: Callable,
     history: list | None = None,
     turn_num: int = 1,
+    scope: CancelScope | None = None,
 ) -> list:
-    agent, max_steps = build_agent()
+    """Run one agent turn. Raises TurnCancelled (with partial messages) when cancelled."""
+    agent, max_steps = build_agent(user_input, history)
 
     messages = []
     if history:
-        messages.extend(history)
+        messages.extend(to_langchain_messages(history))
     messages.append({"role": "user", "content": user_input})
 
     inputs = {"messages": messages}
-    config = {"recursion_limit": max_steps * 4 + 10}
+    output_stream = ToolOutputStream(on_event)
+    config = {"recursion_limit": max_steps * 4 + 10, "callbacks": [output_stream.handler]}
 
     round_messages: list = []
     step = 0
 
-    async for event in agent.astream(inputs, config=config, stream_mode="updates"):
-        for node_name, node_output in event.items():
-            if node_name == "model":
-                step += 1
-                node_start = time.perf_counter()
-                msgs = node_output.get("messages", [])
-                if not msgs:
-                    continue
-                ai_msg = msgs[-1]
-                round_messages.append(ai_msg)
-
-                all_msgs = [_serialize_message(m) for m in messages] + [_serialize_message(m) for m in round_messages[:-1]]
-                await on_event(_make_event("node_enter", {
-                    "node_type": "llm",
-                    "node_id": f"llm_t{turn_num}_{step}",
-                    "step": step,
-                    "messages_snapshot": all_msgs,
-                }, step=step))
-
-                tool_calls = getattr(ai_msg, "tool_calls", None)
-                has_tool_calls = bool(tool_calls)
-
-                if tool_calls:
-                    for tc in tool_calls:
-                        await on_event(_make_event(
-                            "tool_call",
-                            {
-                                "tool_call_id": tc.get("id", ""),
-                                "name": tc.get("name", ""),
-                                "arguments": tc.get("args", {}),
-                            },
-                            step=step,
-                        ))
-                else:
-                    content = getattr(ai_msg, "content", "")
-                    if content:
-                        await _stream_text(content, step, on_event)
-                        await on_event(_make_event(
-                            "final_answer",
-                            {"content": content},
-                            step=step,
-                        ))
-
-                duration_ms = round((time.perf_counter() - node_start) * 1000, 1)
-                token_usage = _extract_token_usage(ai_msg)
-                await on_event(_make_event("node_exit", {
-                    "node_type": "llm",
-                    "node_id": f"llm_t{turn_num}_{step}",
-                    "step": step,
-                    "has_tool_calls": has_tool_calls,
-                    "duration_ms": duration_ms,
-                    **({"token_usage": token_usage} if token_usage else {}),
-                }, step=step))
-
-            elif node_name == "tools":
-                tool_msgs = node_output.get("messages", [])
-                for tm in tool_msgs:
-                    round_messages.append(tm)
-                    content = getattr(tm, "content", "")
-                    name = getattr(tm, "name", "")
-                    tool_call_id = getattr(tm, "tool_call_id", "")
-                    status = "error" if content.startswith("错误") else "success"
-
-                    tool_start = time.perf_counter()
+    scope_token = bind_scope(scope)
+    stream_token = bind_stream(output_stream)
+    pump = asyncio.create_task(output_stream.run())
+    try:
+        async for event in agent.astream(inputs, config=config, stream_mode="updates"):
+            for node_name, node_output in event.items():
+                if node_name == "model":
+                    step += 1
+                    output_stream.step = step
+                    node_start = time.perf_counter()
+                    msgs = node_output.get("messages", [])
+                    if not msgs:
+                        continue
+                    ai_msg = msgs[-1]
+                    round_messages.append(ai_msg)
+
+                    all_msgs = [_serialize_message(m) for m in messages] + [_serialize_message(m) for m in round_messages[:-1]]
                     await on_event(_make_event("node_enter", {
-                        "node_type": "tool",
-                        "node_id": f"tool_{name}_t{turn_num}_{step}",
+                        "node_type": "llm",
+                        "node_id": f"llm_t{turn_num}_{step}",
                         "step": step,
-                        "tool_name": name,
+                        "messages_snapshot": all_msgs,
                     }, step=step))
 
-                    await on_event(_make_event(
-                        "tool_result",
-                        {
-                            "tool_call_id": tool_call_id,
-                            "name": name,
-                            "status": status,
-                            "content": content,
-                        },
-                        step=step,
-                    ))
-
-                    tool_duration = round((time.perf_counter() - tool_start) * 1000, 1)
+                    tool_calls = getattr(ai_msg, "tool_calls", None)
+                    has_tool_calls = bool(tool_calls)
+
+                    if tool_calls:
+                        for tc in tool_calls:
+                            await on_event(_make_event(
+                                "tool_call",
+                                {
+                                    "tool_call_id": tc.get("id", ""),
+                                    "name": tc.get("name", ""),
+                                    "arguments": tc.get("args", {}),
+                                },
+                                step=step,
+                            ))
+                    else:
+                        content = getattr(ai_msg, "content", "")
+                        if content:
+                            await _stream_text(content, step, on_event)
+                            await on_event(_make_event(
+                                "final_answer",
+                                {"content": content},
+                                step=step,
+                            ))
+
+                    duration_ms = round((time.perf_counter() - node_start) * 1000, 1)
+                    token_usage = _extract_token_usage(ai_msg)
+                    if token_usage:
+                        metrics.inc("llm_prompt_tokens_total", token_usage["prompt_tokens"])
+                        metrics.inc("llm_cached_tokens_total", token_usage["cached_tokens"])
                     await on_event(_make_event("node_exit", {
-                        "node_type": "tool",
-                        "node_id": f"tool_{name}_t{turn_num}_{step}",
+                        "node_type": "llm",
+                        "node_id": f"llm_t{turn_num}_{step}",
                         "step": step,
-                        "status": status,
-                        "duration_ms": tool_duration,
+                        "has_tool_calls": has_tool_calls,
+                        "duration_ms": duration_ms,
+                        **({"token_usage": token_usage} if token_usage else {}),
                     }, step=step))
 
+                elif node_name == "tools":
+                    # Live output must reach the client before the tool results.
+                    await output_stream.flush()
+                    tool_msgs = node_output.get("messages", [])
+                    for tm in tool_msgs:
+                        round_messages.append(tm)
+                        content = getattr(tm, "content", "")
+                        name = getattr(tm, "name", "")
+                        tool_call_id = getattr(tm, "tool_call_id", "")
+                        status = "error" if content.startswith("错误") else "success"
+                        artifact = getattr(tm, "artifact", None)
+                        usage = artifact.get("usage") if isinstance(artifact, dict) else None
+                        if usage:
+                            for key in ("peak_rss_mb", "cpu_seconds", "wall_seconds"):
+                                if key in usage:
+                                    metrics.observe(f"tool_exec_{key}", usage[key], tool=name)
+
+                        tool_start = time.perf_counter()
+                        await on_event(_make_event("node_enter", {
+                            "node_type": "tool",
+                            "node_id": f"tool_{name}_t{turn_num}_{step}",
+                            "step": step,
+                            "tool_name": name,
+                        }, step=step))
+
+                        await on_event(_make_event(
+                            "tool_result",
+                            {
+                                "tool_call_id": tool_call_id,
+                                "name": name,
+                                "status": status,
+                                "content": content,
+                                **({"usage": usage} if usage else {}),
+                            },
+                            step=step,
+                        ))
+
+                        tool_duration = round((time.perf_counter() - tool_start) * 1000, 1)
+                        await on_event(_make_event("node_exit", {
+                            "node_type": "tool",
+                            "node_id": f"tool_{name}_t{turn_num}_{step}",
+                            "step": step,
+                            "status": status,
+                            "duration_ms": tool_duration,
+                        }, step=step))
+    except asyncio.CancelledError:
+        raise TurnCancelled(_close_pending_tool_calls(round_messages)) from None
+    finally:
+        pump.cancel()
+        reset_stream(stream_token)
+        reset_scope(scope_token)
+
     return round_messages
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any
 
 from agent.context_budget import estimate_messages_tokens
+from agent.message_record import MessageRecord
 
 
 def _message_role(msg: Any) -> str:
@@ -52,6 +53,8 @@ def _truncate_old_tool_messages(messages: list[Any], max_tool_result_chars: int)
             cloned = dict(msg)
             cloned["content"] = short_content
             updated.append(cloned)
+        elif isinstance(msg, MessageRecord):
+            updated.append(msg.replace(content=short_content))
         else:
             try:
                 cloned = msg.model_copy(deep=True)
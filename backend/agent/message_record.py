@@ -0,0 +1,175 @@
+"""Compact in-memory representation of session history messages.
+
+Session history used to hold a mix of plain dicts and full pydantic LangChain
+messages, whose ``response_metadata``/``usage_metadata``/ids are never read
+again. ``MessageRecord`` keeps only what later turns need (role, content,
+tool calls, tool name/id) in a ``__slots__`` object. Role and tool names are
+interned, and large contents go through a weak pool so identical payloads
+(e.g. the same file read twice, or a rehydrated snapshot) are stored once.
+
+Records are converted back to LangChain messages only at the model boundary
+(``to_langchain_messages``). They expose ``type``/``content``/``tool_calls``/
+``name``/``tool_call_id`` attributes, so code that reads messages via
+``getattr`` (pruner, compactor, token estimation, transcript saving) accepts
+them unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import weakref
+from typing import Any, Iterable
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+LARGE_CONTENT_THRESHOLD = 2048
+
+# LangChain message types / dict roles -> record role.
+_ROLE_ALIASES = {
+    "human": "user",
+    "user": "user",
+    "ai": "ai",
+    "assistant": "ai",
+    "tool": "tool",
+    "system": "system",
+}
+
+
+class _PooledText(str):
+    """str subclass so pooled contents can be weakly referenced."""
+
+
+_pool_lock = threading.Lock()
+_content_pool: "weakref.WeakValueDictionary[bytes, _PooledText]" = weakref.WeakValueDictionary()
+
+
+def _share_content(content: str) -> str:
+    if len(content) < LARGE_CONTENT_THRESHOLD:
+        return content
+    if isinstance(content, _PooledText):
+        return content
+    digest = hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _pool_lock:
+        pooled = _content_pool.get(digest)
+        if pooled is None:
+            pooled = _PooledText(content)
+            _content_pool[digest] = pooled
+    return pooled
+
+
+def _intern(value: str | None) -> str | None:
+    return sys.intern(value) if value else value
+
+
+class MessageRecord:
+    __slots__ = ("role", "content", "name", "tool_call_id", "tool_calls")
+
+    def __init__(
+        self,
+        role: str,
+        content: Any = "",
+        name: str | None = None,
+        tool_call_id: str | None = None,
+        tool_calls: Iterable[dict] | None = None,
+    ):
+        self.role = sys.intern(_ROLE_ALIASES.get(role, role))
+        # Multimodal (list) contents are kept as-is; text goes through the pool.
+        self.content = _share_content(content) if isinstance(content, str) else content
+        self.name = _intern(name)
+        self.tool_call_id = tool_call_id or None
+        self.tool_calls = tuple(
+            {"id": tc.get("id", ""), "name": _intern(tc.get("name", "")), "args": tc.get("args", {})}
+            for tc in (tool_calls or ())
+        )
+
+    @property
+    def type(self) -> str:
+        return self.role
+
+    def replace(self, content: Any) -> "MessageRecord":
+        """Return a copy with new content (other fields shared, not deep-copied)."""
+        clone = MessageRecord.__new__(MessageRecord)
+        clone.role = self.role
+        clone.content = _share_content(content) if isinstance(content, str) else content
+        clone.name = self.name
+        clone.tool_call_id = self.tool_call_id
+        clone.tool_calls = self.tool_calls
+        return clone
+
+    def to_dict(self) -> dict[str, Any]:
+        d: dict[str, Any] = {"role": self.role, "content": self.content}
+        if self.name:
+            d["name"] = self.name
+        if self.tool_call_id:
+            d["tool_call_id"] = self.tool_call_id
+        if self.tool_calls:
+            d["tool_calls"] = [dict(tc) for tc in self.tool_calls]
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict[str, Any]) -> "MessageRecord":
+        return cls(
+            role=str(d.get("role", "") or ""),
+            content=d.get("content", ""),
+            name=d.get("name"),
+            tool_call_id=d.get("tool_call_id"),
+            tool_calls=d.get("tool_calls"),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MessageRecord):
+            return NotImplemented
+        return (
+            self.role == other.role
+            and self.content == other.content
+            and self.name == other.name
+            and self.tool_call_id == other.tool_call_id
+            and self.tool_calls == other.tool_calls
+        )
+
+    __hash__ = None  # mutable-content value object
+
+    def __repr__(self) -> str:
+        preview = str(self.content)[:40]
+        return f"MessageRecord(role={self.role!r}, content={preview!r}, tool_calls={len(self.tool_calls)})"
+
+
+def to_record(msg: Any) -> MessageRecord:
+    """Convert a plain dict or LangChain message into a MessageRecord (records pass through)."""
+    if isinstance(msg, MessageRecord):
+        return msg
+    if isinstance(msg, dict):
+        return MessageRecord.from_dict(msg)
+    return MessageRecord(
+        role=str(getattr(msg, "type", "") or ""),
+        content=getattr(msg, "content", ""),
+        name=getattr(msg, "name", None),
+        tool_call_id=getattr(msg, "tool_call_id", None),
+        tool_calls=getattr(msg, "tool_calls", None),
+    )
+
+
+def to_records(messages: Iterable[Any]) -> list[MessageRecord]:
+    return [to_record(m) for m in messages]
+
+
+def to_langchain(msg: Any) -> BaseMessage | dict:
+    """Convert a record to the LangChain message the model layer expects."""
+    if not isinstance(msg, MessageRecord):
+        return msg
+    content = msg.content
+    if msg.role == "user":
+        return HumanMessage(content=content)
+    if msg.role == "ai":
+        return AIMessage(content=content, tool_calls=[dict(tc) for tc in msg.tool_calls])
+    if msg.role == "tool":
+        return ToolMessage(content=content, name=msg.name, tool_call_id=msg.tool_call_id or "")
+    if msg.role == "system":
+        return SystemMessage(content=content)
+    return msg.to_dict()
+
+
+def to_langchain_messages(messages: Iterable[Any]) -> list:
+    return [to_langchain(m) for m in messages]
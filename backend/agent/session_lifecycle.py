@@ -0,0 +1,298 @@
+"""Idle detection and memory reclamation for open chat sessions.
+
+Between turns a session's history is owned by the ``SessionLifecycleManager``
+rather than by the websocket handler. A periodic sweep spills the history of
+idle sessions (no user activity for ``SESSION_IDLE_SECONDS``, or no heartbeat
+for ``SESSION_HEARTBEAT_TIMEOUT``) to a gzip snapshot on disk, and evicts the
+least recently used sessions whenever resident history exceeds
+``SESSION_MEMORY_LIMIT_MB``. ``checkout`` rehydrates transparently, so the
+next message on an evicted session behaves exactly as before.
+
+Snapshots are written and read outside the manager lock (the event loop
+takes it for heartbeats and registration): the entry is marked evicting or
+loading under the lock, the file I/O runs unlocked, and the result is
+swapped in under the lock. A checkout that lands during a spill marks the
+session busy, and the spill is then discarded.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from agent.metrics import metrics
+from agent.session_store import deserialize_history, serialize_history
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / "memory" / "snapshots"
+
+
+def estimate_history_bytes(history: list) -> int:
+    """Approximate resident size of a history list, dominated by message contents."""
+    total = 0
+    for msg in history:
+        if isinstance(msg, dict):
+            content = msg.get("content", "")
+            tool_calls = msg.get("tool_calls")
+        else:
+            content = getattr(msg, "content", "")
+            tool_calls = getattr(msg, "tool_calls", None)
+        total += sys.getsizeof(content) + 512  # per-message object overhead
+        if tool_calls:
+            total += sum(sys.getsizeof(str(tc.get("args", ""))) for tc in tool_calls)
+    return total
+
+
+@dataclass
+class _Entry:
+    history: list | None
+    size_bytes: int
+    last_active: float
+    last_heartbeat: float
+    busy: bool = False
+    snapshot: Path | None = None
+    evicting: bool = False
+    # Set while a checkout reads the snapshot back; other checkouts wait on it.
+    loading: threading.Event | None = None
+
+
+class SessionLifecycleManager:
+    def __init__(
+        self,
+        snapshot_dir: Path | None = None,
+        idle_seconds: float | None = None,
+        heartbeat_timeout: float | None = None,
+        memory_limit_bytes: int | None = None,
+    ):
+        self.snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+        self.idle_seconds = idle_seconds if idle_seconds is not None else float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+        self.heartbeat_timeout = (
+            heartbeat_timeout if heartbeat_timeout is not None else float(os.getenv("SESSION_HEARTBEAT_TIMEOUT", "120"))
+        )
+        self.memory_limit_bytes = (
+            memory_limit_bytes
+            if memory_limit_bytes is not None
+            else int(float(os.getenv("SESSION_MEMORY_LIMIT_MB", "512")) * 1024 * 1024)
+        )
+        self._lock = threading.RLock()
+        # Ordered least- to most-recently active.
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+
+    # --- registration / activity ---
+
+    def register(self, session_id: str, history: list) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._entries[session_id] = _Entry(
+                history=history,
+                size_bytes=estimate_history_bytes(history),
+                last_active=now,
+                last_heartbeat=now,
+            )
+            self._entries.move_to_end(session_id)
+        self._publish_gauges()
+
+    def unregister(self, session_id: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+        # A checkout still reading the snapshot removes it when done.
+        if entry is not None and entry.snapshot is not None and entry.loading is None:
+            entry.snapshot.unlink(missing_ok=True)
+        self._publish_gauges()
+
+    def heartbeat(self, session_id: str) -> None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_heartbeat = time.monotonic()
+
+    def checkout(self, session_id: str) -> list:
+        """Mark the session busy and return its history, rehydrating it if evicted."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                raise KeyError(session_id)
+            entry.busy = True
+            now = time.monotonic()
+            entry.last_active = entry.last_heartbeat = now
+            self._entries.move_to_end(session_id)
+            history, loading, path = entry.history, entry.loading, entry.snapshot
+            if history is None and loading is None:
+                entry.loading = threading.Event()
+        if history is None:
+            history = self._wait_loaded(entry, loading) if loading is not None else self._load(session_id, entry, path)
+        self._publish_gauges()
+        return history
+
+    def _load(self, session_id: str, entry: _Entry, path: Path) -> list:
+        try:
+            history = self._read_snapshot(path)
+            size = estimate_history_bytes(history)
+        except BaseException:
+            with self._lock:
+                entry.busy = False
+                entry.loading, event = None, entry.loading
+            event.set()
+            raise
+        with self._lock:
+            entry.history = history
+            entry.size_bytes = size
+            entry.snapshot = None
+            entry.loading, event = None, entry.loading
+        event.set()
+        path.unlink(missing_ok=True)
+        metrics.inc("session_rehydrations_total")
+        logger.info("Rehydrated session %s (%d messages)", session_id, len(history))
+        return history
+
+    def _wait_loaded(self, entry: _Entry, loading: threading.Event) -> list:
+        loading.wait()
+        with self._lock:
+            if entry.history is None:
+                raise RuntimeError("会话历史恢复失败")
+            return entry.history
+
+    def checkin(self, session_id: str, history: list) -> None:
+        """Hand the (possibly replaced) history back after a turn.
+        Callers should follow up with ``enforce_memory_limit`` off the event loop."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            entry.history = history
+            entry.size_bytes = estimate_history_bytes(history)
+            entry.busy = False
+            entry.last_active = time.monotonic()
+            self._entries.move_to_end(session_id)
+        self._publish_gauges()
+
+    # --- eviction ---
+
+    def _snapshot_path(self, session_id: str) -> Path:
+        return self.snapshot_dir / f"{session_id}.json.gz"
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> list:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return deserialize_history(json.load(f))
+
+    def evict(self, session_id: str) -> bool:
+        """Spill a non-busy session's history to disk. Returns True if evicted."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.busy or entry.evicting or entry.history is None:
+                return False
+            entry.evicting = True
+            history = entry.history
+        path = self._snapshot_path(session_id)
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+                json.dump(serialize_history(history), f, ensure_ascii=False)
+        except BaseException:
+            with self._lock:
+                entry.evicting = False
+            path.unlink(missing_ok=True)
+            raise
+        with self._lock:
+            entry.evicting = False
+            # A checkout (or unregister) during the write wins; drop the spill.
+            spilled = self._entries.get(session_id) is entry and not entry.busy and entry.history is history
+            if spilled:
+                freed = entry.size_bytes
+                entry.history = None
+                entry.size_bytes = 0
+                entry.snapshot = path
+        if not spilled:
+            path.unlink(missing_ok=True)
+            metrics.inc("session_evictions_aborted_total")
+            return False
+        metrics.inc("session_evictions_total")
+        metrics.inc("session_evicted_bytes_total", freed)
+        logger.info("Evicted session %s history to %s (~%d bytes freed)", session_id, path.name, freed)
+        self._publish_gauges()
+        return True
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size_bytes for e in self._entries.values())
+
+    def enforce_memory_limit(self) -> list[str]:
+        """Evict least recently active sessions until under the memory ceiling."""
+        evicted: list[str] = []
+        if self.memory_limit_bytes <= 0:
+            return evicted
+        with self._lock:
+            candidates = [
+                sid for sid, e in self._entries.items() if not e.busy and not e.evicting and e.history is not None
+            ]
+        for sid in candidates:
+            if self.resident_bytes() <= self.memory_limit_bytes:
+                break
+            if self.evict(sid):
+                evicted.append(sid)
+        return evicted
+
+    def sweep(self) -> list[str]:
+        """Evict idle sessions, then enforce the memory ceiling."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                sid
+                for sid, e in self._entries.items()
+                if not e.busy
+                and not e.evicting
+                and e.history is not None
+                and (now - e.last_active > self.idle_seconds or now - e.last_heartbeat > self.heartbeat_timeout)
+            ]
+        evicted = [sid for sid in idle if self.evict(sid)]
+        evicted.extend(self.enforce_memory_limit())
+        return evicted
+
+    async def run(self, interval: float | None = None) -> None:
+        interval = interval or float(os.getenv("SESSION_SWEEP_INTERVAL", "30"))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.sweep)
+            except Exception as e:
+                logger.warning("Session sweep failed: %s", e)
+
+    # --- reporting ---
+
+    def _publish_gauges(self) -> None:
+        stats = self.stats()
+        metrics.set_gauge("sessions_resident", stats["resident"])
+        metrics.set_gauge("sessions_evicted", stats["evicted"])
+        metrics.set_gauge("session_memory_bytes", stats["resident_bytes"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = sum(1 for e in self._entries.values() if e.history is not None)
+            return {
+                "sessions": len(self._entries),
+                "resident": resident,
+                "evicted": len(self._entries) - resident,
+                "resident_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "memory_limit_bytes": self.memory_limit_bytes,
+            }
+
+
+_manager: SessionLifecycleManager | None = None
+
+
+def get_session_lifecycle() -> SessionLifecycleManager:
+    global _manager
+    if _manager is None:
+        _manager = SessionLifecycleManager()
+    return _manager
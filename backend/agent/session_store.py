@@ -0,0 +1,373 @@
+"""Session state storage and cross-worker notifications.
+
+Chat sessions (history, turn counter, creation time) live behind a
+``SessionStore`` so several uvicorn workers can serve the same session: a
+client that reconnects with ``?session_id=...&resume_token=...`` to a different
+worker picks up where it left off. The token is issued by the server when the
+session is created and must match for a resume. Each store also carries a small pub/sub channel used to
+fan out skill reloads and MCP toggles to every worker.
+
+Backends (``SESSION_STORE``):
+- ``memory`` (default): process-local, single worker only. States are kept
+  gzip-compressed, expire after ``SESSION_TTL_SECONDS`` and are dropped least
+  recently used first beyond ``SESSION_STORE_MEMORY_MB``, so the store does
+  not hold on to histories the lifecycle manager spilled to disk.
+- ``sqlite``: a shared SQLite file (``SESSION_STORE_PATH``); notifications are
+  polled from a table, so all workers must share the filesystem.
+- ``redis``: any Redis-compatible server (``SESSION_STORE_REDIS_URL``);
+  requires the optional ``redis`` package.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+
+from agent.message_record import MessageRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = Path(__file__).resolve().parent.parent / "memory" / "sessions.db"
+NOTIFY_CHANNEL = "myclaw:events"
+
+# Handler receives (event_name, payload).
+NotificationHandler = Callable[[str, dict], None]
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    created_at: str
+    turn_num: int = 0
+    history: list = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+    # Server-issued secret a client must present to resume the session.
+    resume_token: str = ""
+
+
+def serialize_history(history: list) -> list[dict]:
+    """Encode a mixed list of records, plain dicts and LangChain messages as JSON-safe dicts."""
+    encoded: list[dict] = []
+    for msg in history:
+        if isinstance(msg, MessageRecord):
+            encoded.append({"kind": "record", "message": msg.to_dict()})
+        elif isinstance(msg, BaseMessage):
+            encoded.append({"kind": "lc", "message": messages_to_dict([msg])[0]})
+        else:
+            encoded.append({"kind": "dict", "message": msg})
+    return encoded
+
+
+def deserialize_history(encoded: list[dict]) -> list:
+    history: list = []
+    for item in encoded:
+        if item.get("kind") == "record":
+            history.append(MessageRecord.from_dict(item["message"]))
+        elif item.get("kind") == "lc":
+            history.extend(messages_from_dict([item["message"]]))
+        else:
+            history.append(item.get("message", {}))
+    return history
+
+
+def _state_to_json(state: SessionState) -> str:
+    return json.dumps({
+        "session_id": state.session_id,
+        "created_at": state.created_at,
+        "turn_num": state.turn_num,
+        "history": serialize_history(state.history),
+        "updated_at": state.updated_at,
+        "resume_token": state.resume_token,
+    }, ensure_ascii=False)
+
+
+def _state_from_json(raw: str | bytes) -> SessionState:
+    data = json.loads(raw)
+    return SessionState(
+        session_id=data["session_id"],
+        created_at=data.get("created_at", ""),
+        turn_num=int(data.get("turn_num", 0)),
+        history=deserialize_history(data.get("history", [])),
+        updated_at=float(data.get("updated_at", 0.0)),
+        resume_token=data.get("resume_token", ""),
+    )
+
+
+class SessionStore:
+    """Base class: persistence of ``SessionState`` plus a broadcast channel."""
+
+    backend = "base"
+
+    def __init__(self):
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._handlers: list[NotificationHandler] = []
+
+    def load(self, session_id: str) -> SessionState | None:
+        raise NotImplementedError
+
+    def save(self, state: SessionState) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, handler: NotificationHandler) -> None:
+        self._handlers.append(handler)
+
+    def publish(self, event: str, payload: dict | None = None) -> None:
+        """Broadcast to the other workers. The publishing worker is not notified."""
+        raise NotImplementedError
+
+    def start(self) -> None:
+        """Start background listeners, if the backend needs any."""
+
+    def stop(self) -> None:
+        """Stop background listeners."""
+
+    def _dispatch(self, origin: str, event: str, payload: dict) -> None:
+        if origin == self.worker_id:
+            return
+        for handler in list(self._handlers):
+            try:
+                handler(event, payload)
+            except Exception as e:
+                logger.warning("Session store handler for '%s' failed: %s", event, e)
+
+
+class MemorySessionStore(SessionStore):
+    backend = "memory"
+
+    def __init__(self, max_bytes: int | None = None, ttl_seconds: float | None = None):
+        super().__init__()
+        self.max_bytes = (
+            max_bytes if max_bytes is not None else int(float(os.getenv("SESSION_STORE_MEMORY_MB", "64")) * 1024 * 1024)
+        )
+        self._ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+        self._lock = threading.Lock()
+        # session_id -> (gzip'd state JSON, expiry on the monotonic clock); least recently used first.
+        self._sessions: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+
+    def _drop(self, session_id: str) -> None:
+        """Caller holds ``self._lock``."""
+        raw, _ = self._sessions.pop(session_id)
+        self._bytes -= len(raw)
+
+    def _expire(self, now: float) -> None:
+        """Caller holds ``self._lock``."""
+        for session_id in [sid for sid, (_, expires) in self._sessions.items() if expires <= now]:
+            self._drop(session_id)
+
+    def load(self, session_id: str) -> SessionState | None:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions.move_to_end(session_id)
+        return _state_from_json(gzip.decompress(entry[0])) if entry else None
+
+    def save(self, state: SessionState) -> None:
+        state.updated_at = time.time()
+        raw = gzip.compress(_state_to_json(state).encode("utf-8"), compresslevel=6)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if state.session_id in self._sessions:
+                self._drop(state.session_id)
+            self._sessions[state.session_id] = (raw, now + self._ttl if self._ttl > 0 else float("inf"))
+            self._bytes += len(raw)
+            while self._bytes > self.max_bytes and len(self._sessions) > 1:
+                self._drop(next(iter(self._sessions)))
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._sessions:
+                self._drop(session_id)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def publish(self, event: str, payload: dict | None = None) -> None:
+        # Single process: there is nobody else to notify.
+        return None
+
+
+class SQLiteSessionStore(SessionStore):
+    backend = "sqlite"
+
+    def __init__(self, path: Path | str | None = None, poll_interval: float = 1.0):
+        super().__init__()
+        self.path = Path(path or os.getenv("SESSION_STORE_PATH", "") or DEFAULT_SQLITE_PATH)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS notifications ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, origin TEXT, event TEXT, payload TEXT, created_at REAL)"
+            )
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM notifications").fetchone()
+        self._last_seen = row[0]
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self, session_id: str) -> SessionState | None:
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return _state_from_json(row[0]) if row else None
+
+    def save(self, state: SessionState) -> None:
+        state.updated_at = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (state.session_id, _state_to_json(state), state.updated_at),
+            )
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def publish(self, event: str, payload: dict | None = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO notifications (origin, event, payload, created_at) VALUES (?, ?, ?, ?)",
+                (self.worker_id, event, json.dumps(payload or {}, ensure_ascii=False), time.time()),
+            )
+
+    def poll(self) -> int:
+        """Deliver notifications published since the last poll. Returns how many were seen."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, origin, event, payload FROM notifications WHERE id > ? ORDER BY id",
+                (self._last_seen,),
+            ).fetchall()
+            # Keep the table small; workers only ever need recent rows.
+            conn.execute("DELETE FROM notifications WHERE created_at < ?", (time.time() - 3600,))
+        for row_id, origin, event, payload in rows:
+            self._last_seen = row_id
+            self._dispatch(origin, event, json.loads(payload or "{}"))
+        return len(rows)
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning("Session store notification poll failed: %s", e)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll_loop, name="session-store-poll", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class RedisSessionStore(SessionStore):
+    """Redis-compatible backend. ``client`` may be any object with the redis-py
+    get/set/delete/publish/pubsub surface (tests pass a local stand-in)."""
+
+    backend = "redis"
+
+    def __init__(self, url: str | None = None, client: Any = None, ttl_seconds: int | None = None):
+        super().__init__()
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("SESSION_STORE=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url or os.getenv("SESSION_STORE_REDIS_URL", "redis://127.0.0.1:6379/0"))
+        self._client = client
+        self._ttl = ttl_seconds if ttl_seconds is not None else int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+        self._pubsub = None
+        self._thread: threading.Thread | None = None
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"myclaw:session:{session_id}"
+
+    def load(self, session_id: str) -> SessionState | None:
+        raw = self._client.get(self._key(session_id))
+        return _state_from_json(raw) if raw else None
+
+    def save(self, state: SessionState) -> None:
+        state.updated_at = time.time()
+        self._client.set(self._key(state.session_id), _state_to_json(state), ex=self._ttl or None)
+
+    def delete(self, session_id: str) -> None:
+        self._client.delete(self._key(session_id))
+
+    def publish(self, event: str, payload: dict | None = None) -> None:
+        message = json.dumps({"origin": self.worker_id, "event": event, "payload": payload or {}}, ensure_ascii=False)
+        self._client.publish(NOTIFY_CHANNEL, message)
+
+    def handle_message(self, message: dict) -> None:
+        if message.get("type") != "message":
+            return
+        data = json.loads(message["data"])
+        self._dispatch(data.get("origin", ""), data.get("event", ""), data.get("payload", {}))
+
+    def _listen(self) -> None:
+        try:
+            for message in self._pubsub.listen():
+                self.handle_message(message)
+        except Exception as e:
+            logger.warning("Session store pub/sub listener stopped: %s", e)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(NOTIFY_CHANNEL)
+            self._thread = threading.Thread(target=self._listen, name="session-store-pubsub", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._pubsub is not None:
+            try:
+                self._pubsub.close()
+            except Exception:
+                pass
+
+
+def create_session_store(backend: str | None = None) -> SessionStore:
+    backend = (backend or os.getenv("SESSION_STORE", "memory")).lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "redis":
+        return RedisSessionStore()
+    if backend != "memory":
+        logger.warning("Unknown SESSION_STORE '%s', falling back to memory", backend)
+    return MemorySessionStore()
+
+
+_store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        _store = create_session_store()
+    return _store
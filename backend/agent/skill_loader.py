@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import ast
 import logging
+import os
 import re
+import threading
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 import yaml
 
+from agent.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 SKILLS_DIR = Path(__file__).resolve().parent.parent / "skills"
@@ -25,6 +30,67 @@ def _parse_frontmatter(text: str) -> tuple[dict[str, Any], str]:
     return fm, body
 
 
+def script_tools_enabled() -> bool:
+    return os.getenv("SKILL_SCRIPT_TOOLS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class SkillParam:
+    name: str
+    annotation: str | None = None  # "str" | "int" | "float" | "bool" when declared
+    default: Any = None
+    required: bool = True
+
+
+@dataclass
+class SkillCommand:
+    """A function exported through a script's ``COMMANDS`` dict."""
+
+    name: str
+    script: Path
+    params: list[SkillParam] = field(default_factory=list)
+    doc: str = ""
+
+
+def _parse_params(func: ast.FunctionDef) -> list[SkillParam]:
+    args = func.args
+    positional = args.posonlyargs + args.args
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    pairs = list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults))
+    params = []
+    for arg, default in pairs:
+        annotation = arg.annotation.id if isinstance(arg.annotation, ast.Name) else None
+        param = SkillParam(arg.arg, annotation)
+        if default is not None:
+            try:
+                param.default, param.required = ast.literal_eval(default), False
+            except ValueError:
+                # A non-literal default: leave it to the function.
+                param.required = False
+        params.append(param)
+    return params
+
+
+def parse_script_commands(script: Path) -> list[SkillCommand]:
+    """Read ``COMMANDS = {"name": func, ...}`` from a script without importing it."""
+    tree = ast.parse(script.read_text(encoding="utf-8"), filename=str(script))
+    functions = {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+    commands = []
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict)):
+            continue
+        if not any(isinstance(t, ast.Name) and t.id == "COMMANDS" for t in node.targets):
+            continue
+        for key, value in zip(node.value.keys, node.value.values):
+            if not (isinstance(key, ast.Constant) and isinstance(key.value, str) and isinstance(value, ast.Name)):
+                continue
+            func = functions.get(value.id)
+            if func is None:
+                continue
+            commands.append(SkillCommand(key.value, script, _parse_params(func), ast.get_docstring(func) or ""))
+    return commands
+
+
 @dataclass
 class SkillMeta:
     name: str
@@ -34,12 +100,83 @@ class SkillMeta:
     metadata: dict[str, str] = field(default_factory=dict)
     scripts: list[str] = field(default_factory=list)
     doc_content: str | None = None
+    commands: list[SkillCommand] = field(default_factory=list)
+
+
+def watch_interval() -> float:
+    """Seconds between skill directory scans; 0 disables the watcher."""
+    return float(os.getenv("SKILL_WATCH_INTERVAL_SECONDS", "2"))
+
+
+def _stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _signature(skill_path: Path) -> tuple:
+    """What a skill's catalog entry depends on: SKILL.md and scripts/*.py."""
+    files = [skill_path / "SKILL.md", *sorted((skill_path / "scripts").glob("*.py"))]
+    return (script_tools_enabled(), *((f.name, _stamp(f)) for f in files))
+
+
+def _parse_skill(skill_path: Path) -> SkillMeta:
+    raw = (skill_path / "SKILL.md").read_text(encoding="utf-8")
+    fm, _body = _parse_frontmatter(raw)
+    name = fm.get("name", skill_path.name)
+    description = fm.get("description", "")
+    metadata = fm.get("metadata", {}) or {}
+    if isinstance(metadata, dict):
+        metadata = {str(k): str(v) for k, v in metadata.items()}
+    else:
+        metadata = {}
+
+    scripts_dir = skill_path / "scripts"
+    script_files = []
+    commands: list[SkillCommand] = []
+    if scripts_dir.exists():
+        script_files = [f.name for f in sorted(scripts_dir.glob("*.py"))]
+        if script_tools_enabled():
+            for script in sorted(scripts_dir.glob("*.py")):
+                try:
+                    commands.extend(parse_script_commands(script))
+                except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                    logger.warning("Failed to read commands from %s: %s", script, e)
+
+    return SkillMeta(
+        name=name,
+        description=description,
+        path=skill_path,
+        status="discovered",
+        metadata=metadata,
+        scripts=script_files,
+        commands=commands,
+    )
 
 
 class SkillLoader:
+    """Skill catalog with incremental rediscovery.
+
+    ``discover()`` re-parses only skills whose ``SKILL.md`` or scripts changed
+    (by mtime and size), builds the new catalog aside and swaps it in with a
+    single assignment, so readers never see a half-built catalog. Unchanged
+    skills keep their ``SkillMeta`` objects. Docs and references are cached
+    per file and re-read when the file changes. A watcher thread polls every
+    ``SKILL_WATCH_INTERVAL_SECONDS``, so edits apply without a manual reload.
+    """
+
     def __init__(self, skills_dir: Path | None = None):
         self.skills_dir = skills_dir or SKILLS_DIR
         self.catalog: dict[str, SkillMeta] = {}
+        self._lock = threading.Lock()
+        # Skill dir -> (signature, meta) from the last scan.
+        self._entries: dict[Path, tuple[tuple, SkillMeta]] = {}
+        # File -> (stamp, content) for docs (parsed body) and references.
+        self._files: dict[Path, tuple[tuple[int, int], str]] = {}
+        self._watcher: threading.Thread | None = None
+        self._stop = threading.Event()
 
     @property
     def loaded_skills(self) -> list[SkillMeta]:
@@ -48,63 +185,74 @@ class SkillLoader:
     def discover(self) -> list[SkillMeta]:
         """Scan skill dirs, parse ONLY frontmatter (name + description).
         Also record which script files exist for reference."""
-        self.catalog.clear()
+        self.refresh()
+        return list(self.catalog.values())
 
-        if not self.skills_dir.exists():
-            logger.info("Skills directory not found: %s", self.skills_dir)
-            return []
+    def refresh(self) -> bool:
+        """Rescan and swap in a new catalog. Returns True if anything changed."""
+        with self._lock:
+            if not self.skills_dir.exists():
+                logger.info("Skills directory not found: %s", self.skills_dir)
+                changed = bool(self.catalog)
+                self.catalog, self._entries = {}, {}
+                return changed
 
-        for skill_path in sorted(self.skills_dir.iterdir()):
-            if not skill_path.is_dir():
-                continue
-            skill_md = skill_path / "SKILL.md"
-            if not skill_md.exists():
-                continue
-            try:
-                raw = skill_md.read_text(encoding="utf-8")
-                fm, _body = _parse_frontmatter(raw)
-                name = fm.get("name", skill_path.name)
-                description = fm.get("description", "")
-                metadata = fm.get("metadata", {}) or {}
-                if isinstance(metadata, dict):
-                    metadata = {str(k): str(v) for k, v in metadata.items()}
+            entries: dict[Path, tuple[tuple, SkillMeta]] = {}
+            catalog: dict[str, SkillMeta] = {}
+            reparsed = 0
+            for skill_path in sorted(self.skills_dir.iterdir()):
+                if not skill_path.is_dir() or not (skill_path / "SKILL.md").exists():
+                    continue
+                signature = _signature(skill_path)
+                previous = self._entries.get(skill_path)
+                if previous is not None and previous[0] == signature:
+                    meta = previous[1]
                 else:
-                    metadata = {}
-
-                scripts_dir = skill_path / "scripts"
-                script_files = []
-                if scripts_dir.exists():
-                    script_files = [f.name for f in sorted(scripts_dir.glob("*.py"))]
-
-                self.catalog[name] = SkillMeta(
-                    name=name,
-                    description=description,
-                    path=skill_path,
-                    status="discovered",
-                    metadata=metadata,
-                    scripts=script_files,
+                    try:
+                        meta = _parse_skill(skill_path)
+                    except Exception as e:
+                        logger.warning("Failed to discover skill '%s': %s", skill_path.name, e)
+                        continue
+                    reparsed += 1
+                entries[skill_path] = (signature, meta)
+                catalog[meta.name] = meta
+
+            changed = reparsed > 0 or catalog.keys() != self.catalog.keys()
+            self._entries = entries
+            self.catalog = catalog
+            if changed:
+                live = {meta.path for meta in catalog.values()}
+                self._files = {f: v for f, v in self._files.items() if any(f.is_relative_to(p) for p in live)}
+                metrics.inc("skill_reparsed_total", reparsed)
+                logger.info(
+                    "Discovered %d skill(s) (%d re-parsed): %s",
+                    len(catalog),
+                    reparsed,
+                    list(catalog.keys()),
                 )
-            except Exception as e:
-                logger.warning("Failed to discover skill '%s': %s", skill_path.name, e)
+            return changed
 
-        logger.info(
-            "Discovered %d skill(s): %s",
-            len(self.catalog),
-            list(self.catalog.keys()),
-        )
-        return list(self.catalog.values())
+    def _read_cached(self, path: Path, parse: Callable[[str], str] | None = None) -> str | None:
+        stamp = _stamp(path)
+        if stamp is None:
+            return None
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        content = path.read_text(encoding="utf-8")
+        if parse is not None:
+            content = parse(content)
+        self._files[path] = (stamp, content)
+        return content
 
     def get_skill_doc(self, name: str) -> str | None:
         """Load SKILL.md body on demand (progressive disclosure Level 2)."""
         skill = self.catalog.get(name)
         if skill is None:
             return None
-        if skill.doc_content is None:
-            skill_md = skill.path / "SKILL.md"
-            if skill_md.exists():
-                raw = skill_md.read_text(encoding="utf-8")
-                _fm, body = _parse_frontmatter(raw)
-                skill.doc_content = body.strip()
+        body = self._read_cached(skill.path / "SKILL.md", lambda raw: _parse_frontmatter(raw)[1].strip())
+        if body is not None:
+            skill.doc_content = body
         return skill.doc_content
 
     def get_skill_reference(self, name: str, ref_path: str) -> str | None:
@@ -117,7 +265,29 @@ class SkillLoader:
             return None
         if not file_path.resolve().is_relative_to(skill.path.resolve()):
             return None
-        return file_path.read_text(encoding="utf-8")
+        return self._read_cached(file_path)
+
+    # --- watcher ---
+
+    def _watch_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Skill watcher scan failed: %s", e)
+
+    def start_watching(self) -> bool:
+        interval = watch_interval()
+        if interval <= 0 or self._watcher is not None:
+            return False
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, args=(interval,), name="skill-watcher", daemon=True)
+        self._watcher.start()
+        return True
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        self._watcher = None
 
 
 _loader = SkillLoader()
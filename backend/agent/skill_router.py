@@ -0,0 +1,138 @@
+"""Query-relevant skill selection for the system prompt (opt-in, ``SKILL_ROUTING_ENABLED``).
+
+Listing every skill's description in ``<available_skills>`` costs the same
+tokens on every LLM step however many skills exist. With routing on, a BM25
+index over each skill's name, description and ``metadata`` (tags) picks the
+``SKILL_ROUTING_TOP_K`` skills that best match the user's message; skills the
+conversation already used are always kept. The rest are listed by name only,
+so the model can still ask for them with ``read_skill_doc``.
+
+Text is tokenized as lowercase ASCII words plus CJK character bigrams, which
+is enough to match the mixed Chinese/English skill descriptions without a
+segmenter. The index is rebuilt only when the catalog changes.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterable
+
+from agent.skill_loader import SkillMeta
+from tools.skill_tools import skill_tool_name
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD_RE = re.compile(r"[a-z0-9]+|[一-鿿]+")
+_SKILL_TOOLS = ("read_skill_doc", "read_skill_reference")
+
+
+def skill_routing_enabled() -> bool:
+    return os.getenv("SKILL_ROUTING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def routing_top_k() -> int:
+    return max(1, int(os.getenv("SKILL_ROUTING_TOP_K", "3")))
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for run in _WORD_RE.findall(text.lower()):
+        if run.isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _skill_text(skill: SkillMeta) -> str:
+    return " ".join([skill.name, skill.name, skill.description, *skill.metadata.values()])
+
+
+class SkillIndex:
+    """BM25 over skill name (weighted twice), description and metadata."""
+
+    def __init__(self, skills: list[SkillMeta]):
+        self.skills = skills
+        self._docs = [Counter(tokenize(_skill_text(s))) for s in skills]
+        lengths = [sum(d.values()) for d in self._docs]
+        self._lengths = lengths
+        self._avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+        df: Counter[str] = Counter()
+        for doc in self._docs:
+            df.update(doc.keys())
+        n = len(skills)
+        self._idf = {t: math.log(1 + (n - c + 0.5) / (c + 0.5)) for t, c in df.items()}
+
+    def scores(self, query: str) -> list[float]:
+        terms = set(tokenize(query))
+        scores = []
+        for doc, length in zip(self._docs, self._lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_length) if self._avg_length else BM25_K1
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def top(self, query: str, k: int) -> list[SkillMeta]:
+        ranked = sorted(zip(self.scores(query), range(len(self.skills))), key=lambda p: (-p[0], p[1]))
+        return [self.skills[i] for score, i in ranked[:k] if score > 0]
+
+
+_index_lock = threading.Lock()
+_index: tuple[tuple, SkillIndex | None] = ((), None)
+
+
+def get_skill_index(skills: list[SkillMeta]) -> SkillIndex:
+    """Index for this catalog; unchanged skills keep their objects, so the key is stable."""
+    global _index
+    key = tuple(id(s) for s in skills)
+    with _index_lock:
+        if _index[0] != key or _index[1] is None:
+            _index = (key, SkillIndex(skills))
+        return _index[1]
+
+
+def _field(msg: Any, name: str) -> Any:
+    return msg.get(name) if isinstance(msg, dict) else getattr(msg, name, None)
+
+
+def used_skills(history: Iterable[Any] | None, skills: list[SkillMeta]) -> set[str]:
+    """Skills whose docs, references or script tools appear in the conversation's tool calls."""
+    by_tool = {skill_tool_name(s.name, c.name): s.name for s in skills for c in s.commands}
+    used: set[str] = set()
+    for msg in history or ():
+        for tc in _field(msg, "tool_calls") or ():
+            name = tc.get("name", "")
+            if name in _SKILL_TOOLS:
+                used.add(str((tc.get("args") or {}).get("skill_name", "")))
+            elif name in by_tool:
+                used.add(by_tool[name])
+    return used
+
+
+@dataclass
+class SkillSelection:
+    listed: list[SkillMeta]
+    omitted: list[SkillMeta] = field(default_factory=list)
+
+
+def select_skills(skills: list[SkillMeta], query: str, used: set[str] | None = None) -> SkillSelection:
+    """Top-k skills for the query plus the used ones, in catalog order."""
+    if not skill_routing_enabled() or len(skills) <= routing_top_k():
+        return SkillSelection(list(skills))
+    chosen = {s.name for s in get_skill_index(skills).top(query, routing_top_k())} | (used or set())
+    return SkillSelection(
+        [s for s in skills if s.name in chosen],
+        [s for s in skills if s.name not in chosen],
+    )
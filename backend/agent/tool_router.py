@@ -0,0 +1,158 @@
+"""Per-turn tool exposure (opt-in, ``TOOL_ROUTING_ENABLED``).
+
+Every model call re-sends the schema of every bound tool. With routing on,
+each turn exposes the core tools plus the groups the turn looks like it
+needs: intent keywords in the user's message and in the descriptions of the
+skills routed into the prompt, script tools of those skills, and any tool
+already called or requested in the conversation. ``request_tools`` is the
+escape hatch: the model names a tool or group and it is exposed from the
+next model call on. Exposed tools are sent sorted by name, so the same set
+always produces the same request prefix. With ``PROMPT_CACHE_CONTROL`` every
+tool is exposed instead, so the cached prefix does not change per message.
+
+All tools stay registered with the agent, so a call to a hidden tool still
+runs; only the schemas sent to the model shrink. The schema tokens of every
+call are recorded (``tool_schema_tokens``) whether routing is on or not.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Any, Iterable
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from agent.context_budget import estimate_text_tokens
+from agent.metrics import metrics
+from agent.skill_loader import SkillMeta
+
+REQUEST_TOOL = "request_tools"
+
+# Always exposed. Tools in no group (e.g. added later) are exposed too.
+CORE_TOOLS = frozenset({
+    "read_file", "write_file", "python_executor", "shell_executor",
+    "read_skill_doc", "read_skill_reference", REQUEST_TOOL,
+})
+
+# Builtin groups by tool name; MCP and skill tools carry ``metadata["tool_group"]``.
+TOOL_GROUPS: dict[str, tuple[str, ...]] = {
+    "web": ("web_search", "web_fetch"),
+    "kernel": ("python_kernel", "python_kernel_reset"),
+    "jobs": ("job_start", "job_status", "job_collect", "job_cancel"),
+}
+
+GROUP_INTENTS: dict[str, re.Pattern] = {
+    "web": re.compile(r"搜索|搜一下|查一下|网上|联网|新闻|最新|调研|研究|链接|网址|https?://|search|google|url|web", re.I),
+    "browser": re.compile(r"浏览器|网页|页面|登录|点击|填写|表单|标签页|截图|chrome|browser|tab", re.I),
+    "kernel": re.compile(r"数据|分析|统计|变量|dataframe|notebook|kernel|csv|excel|xlsx|pandas", re.I),
+    "jobs": re.compile(r"后台|长时间|耗时|训练|批量|下载|background|job", re.I),
+}
+
+_GROUP_OF = {name: group for group, names in TOOL_GROUPS.items() for name in names}
+
+
+def tool_routing_enabled() -> bool:
+    return os.getenv("TOOL_ROUTING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _name(tool: Any) -> str:
+    return tool.get("name", "") if isinstance(tool, dict) else tool.name
+
+
+def tool_group(tool: Any) -> str | None:
+    metadata = getattr(tool, "metadata", None) or {}
+    return metadata.get("tool_group") or _GROUP_OF.get(_name(tool))
+
+
+def _field(msg: Any, name: str) -> Any:
+    return msg.get(name) if isinstance(msg, dict) else getattr(msg, name, None)
+
+
+def _tool_calls(messages: Iterable[Any]) -> Iterable[dict]:
+    for msg in messages:
+        yield from _field(msg, "tool_calls") or ()
+
+
+def resolve_tool_request(requested: str, tools: list) -> tuple[set[str], list[str]]:
+    """Map a comma separated list of tool or group names to tool names; also return unknown entries."""
+    names, unknown = set(), []
+    for item in (part.strip() for part in re.split(r"[,，\s]+", requested)):
+        if not item:
+            continue
+        matched = {_name(t) for t in tools if _name(t) == item or tool_group(t) == item}
+        if item == "all":
+            matched = {_name(t) for t in tools}
+        if matched:
+            names |= matched
+        else:
+            unknown.append(item)
+    return names, unknown
+
+
+def select_tools(tools: list, query: str, skills: list[SkillMeta]) -> set[str] | None:
+    """Tool names to expose for a turn, or None to expose everything."""
+    if not tool_routing_enabled():
+        return None
+    text = " ".join([query, *(s.description for s in skills)])
+    groups = {group for group, pattern in GROUP_INTENTS.items() if pattern.search(text)}
+    skill_names = {s.name for s in skills}
+    selected = set()
+    for tool in tools:
+        group = tool_group(tool)
+        metadata = getattr(tool, "metadata", None) or {}
+        if group is None or _name(tool) in CORE_TOOLS or group in groups or metadata.get("skill") in skill_names:
+            selected.add(_name(tool))
+    return selected
+
+
+_schema_lock = threading.Lock()
+_schema_tokens: dict[tuple[str, str], int] = {}
+
+
+def schema_tokens(tool: Any) -> int:
+    if isinstance(tool, dict):
+        return estimate_text_tokens(json.dumps(tool, ensure_ascii=False))
+    key = (tool.name, tool.description)
+    with _schema_lock:
+        cached = _schema_tokens.get(key)
+    if cached is None:
+        cached = estimate_text_tokens(json.dumps(convert_to_openai_tool(tool), ensure_ascii=False))
+        with _schema_lock:
+            _schema_tokens[key] = cached
+    return cached
+
+
+class ToolExposureMiddleware(AgentMiddleware):
+    """Filters the tools sent with each model call and records their schema tokens."""
+
+    def __init__(self, selected: set[str] | None):
+        super().__init__()
+        self.selected = selected
+
+    def _exposed(self, request):
+        tools = request.tools
+        exposed = tools
+        if self.selected is not None:
+            names = set(self.selected)
+            for tc in _tool_calls(request.messages):
+                names.add(tc.get("name", ""))
+                if tc.get("name") == REQUEST_TOOL:
+                    names |= resolve_tool_request(str((tc.get("args") or {}).get("tools", "")), tools)[0]
+            exposed = [t for t in tools if isinstance(t, dict) or _name(t) in names]
+        tokens = sum(schema_tokens(t) for t in exposed)
+        metrics.observe("tool_schema_tokens", tokens)
+        metrics.set_gauge("tools_exposed", len(exposed))
+        if len(exposed) < len(tools):
+            metrics.observe("tool_schema_tokens_saved", sum(schema_tokens(t) for t in tools) - tokens)
+        # Sorted by name: the same tool set always serializes to the same bytes (prefix caching).
+        return request.override(tools=sorted(exposed, key=_name))
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._exposed(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._exposed(request))
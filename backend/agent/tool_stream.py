@@ -0,0 +1,147 @@
+"""Live tool output: forwards subprocess stdout/stderr to the client while a tool runs.
+
+``run_agent`` binds a ``ToolOutputStream`` for the turn. Tools execute in
+worker threads; the subprocess helpers look up ``current_output_callback()``
+in the tool's thread and call it from their pipe readers. Chunks are queued
+and a pump task on the event loop coalesces them into ``tool_output_chunk``
+events every ``TOOL_STREAM_FLUSH_MS``.
+
+Chunks are attributed to their tool call through a callback handler that maps
+LangChain tool run ids to tool call ids; inside the tool, the run id is the
+``parent_run_id`` of the child callback manager in the runnable config.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables.config import var_child_runnable_config
+
+logger = logging.getLogger(__name__)
+
+# (stream name, text) -> None; stream is "stdout" or "stderr".
+OutputCallback = Callable[[str, str], None]
+
+_current_stream: contextvars.ContextVar["ToolOutputStream | None"] = contextvars.ContextVar(
+    "tool_output_stream", default=None
+)
+
+
+class _ToolCallTracker(BaseCallbackHandler):
+    """Remembers which tool call each running tool belongs to."""
+
+    run_inline = True
+
+    def __init__(self, stream: "ToolOutputStream"):
+        self._stream = stream
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._stream._register_run(run_id, kwargs.get("tool_call_id") or "", (serialized or {}).get("name", ""))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._stream._unregister_run(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._stream._unregister_run(run_id)
+
+
+class ToolOutputStream:
+    def __init__(
+        self,
+        on_event: Callable,
+        flush_interval: float | None = None,
+        max_chars_per_call: int | None = None,
+    ):
+        self._on_event = on_event
+        self.flush_interval = flush_interval or int(os.getenv("TOOL_STREAM_FLUSH_MS", "100")) / 1000
+        self.max_chars_per_call = max_chars_per_call or int(os.getenv("TOOL_STREAM_MAX_CHARS", "200000"))
+        self.step = 0
+        self.handler = _ToolCallTracker(self)
+        self._lock = threading.Lock()
+        self._runs: dict[UUID, tuple[str, str]] = {}
+        self._pending: list[tuple[str, str, str, str]] = []
+        self._sent: dict[str, int] = {}
+
+    def _register_run(self, run_id: UUID, tool_call_id: str, name: str) -> None:
+        with self._lock:
+            self._runs[run_id] = (tool_call_id, name)
+
+    def _unregister_run(self, run_id: UUID) -> None:
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def callback_for_current_tool(self) -> OutputCallback | None:
+        config = var_child_runnable_config.get() or {}
+        run_id = getattr(config.get("callbacks"), "parent_run_id", None)
+        with self._lock:
+            call = self._runs.get(run_id) if run_id else None
+        if call is None:
+            return None
+        tool_call_id, name = call
+        return lambda stream, text: self.push(tool_call_id, name, stream, text)
+
+    def push(self, tool_call_id: str, name: str, stream: str, text: str) -> None:
+        """Queue a chunk; safe to call from any thread."""
+        if not text:
+            return
+        with self._lock:
+            sent = self._sent.get(tool_call_id, 0)
+            if sent >= self.max_chars_per_call:
+                return
+            text = text[: self.max_chars_per_call - sent]
+            self._sent[tool_call_id] = sent + len(text)
+            if self._sent[tool_call_id] >= self.max_chars_per_call:
+                text += f"\n[实时输出已超过 {self.max_chars_per_call} 字符，后续内容不再推送]\n"
+            self._pending.append((tool_call_id, name, stream, text))
+
+    async def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+        merged: list[list[str]] = []
+        for item in pending:
+            if merged and merged[-1][:3] == list(item[:3]):
+                merged[-1][3] += item[3]
+            else:
+                merged.append(list(item))
+        for tool_call_id, name, stream, text in merged:
+            await self._on_event({
+                "type": "tool_output_chunk",
+                "step": self.step,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "data": {"tool_call_id": tool_call_id, "name": name, "stream": stream, "text": text},
+            })
+
+    async def run(self) -> None:
+        """Pump queued chunks to the client until cancelled."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.debug("Failed to send tool output chunk: %s", e)
+
+
+def current_stream() -> ToolOutputStream | None:
+    return _current_stream.get()
+
+
+def bind_stream(stream: ToolOutputStream | None) -> contextvars.Token:
+    return _current_stream.set(stream)
+
+
+def reset_stream(token: contextvars.Token) -> None:
+    _current_stream.reset(token)
+
+
+def current_output_callback() -> OutputCallback | None:
+    """Callback for the tool running in this thread, or None when not streaming."""
+    stream = current_stream()
+    return stream.callback_for_current_tool() if stream is not None else None
@@ -0,0 +1,214 @@
+"""Admission control and weighted fair queuing for agent turns.
+
+Every turn must be admitted before ``run_agent`` starts. At most
+``AGENT_MAX_CONCURRENT_TURNS`` turns run at once and at most
+``AGENT_MAX_TURNS_PER_USER`` per user. Waiting turns are ordered by a virtual
+finish tag (self-clocked fair queuing): each user's next turn is stamped
+``max(virtual_time, last_tag[user]) + 1 / weight``, so a user firing a burst
+of turns cannot starve others, and heavier-weighted users get more slots.
+A user's tag is forgotten once they have nothing running or queued.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable
+
+from agent.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Called with (queue_position, initial). initial=True on the first notification.
+QueueCallback = Callable[[int, bool], Awaitable[None]]
+
+
+def _parse_weights(raw: str) -> dict[str, float]:
+    """Parse ``AGENT_USER_WEIGHTS`` like ``alice=2,bob=0.5``."""
+    weights: dict[str, float] = {}
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        user, value = part.split("=", 1)
+        try:
+            weights[user.strip()] = max(0.01, float(value))
+        except ValueError:
+            logger.warning("Ignoring invalid weight for user '%s': %s", user, value)
+    return weights
+
+
+@dataclass
+class _Waiter:
+    user_id: str
+    tag: float
+    seq: int
+    future: asyncio.Future
+    enqueued_at: float
+    on_queued: QueueCallback | None = None
+    last_position: int = -1
+    tasks: set = field(default_factory=set)
+
+
+class TurnScheduler:
+    def __init__(
+        self,
+        max_concurrent: int | None = None,
+        max_per_user: int | None = None,
+        weights: dict[str, float] | None = None,
+    ):
+        self.max_concurrent = max_concurrent or max(1, int(os.getenv("AGENT_MAX_CONCURRENT_TURNS", "8")))
+        self.max_per_user = max_per_user or max(1, int(os.getenv("AGENT_MAX_TURNS_PER_USER", "2")))
+        self.weights = weights if weights is not None else _parse_weights(os.getenv("AGENT_USER_WEIGHTS", ""))
+        self._running_total = 0
+        self._running_by_user: dict[str, int] = defaultdict(int)
+        self._last_tag: dict[str, float] = {}
+        self._virtual_time = 0.0
+        self._waiters: list[_Waiter] = []
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def running(self) -> int:
+        return self._running_total
+
+    def _can_run(self, user_id: str) -> bool:
+        return (
+            self._running_total < self.max_concurrent
+            and self._running_by_user[user_id] < self.max_per_user
+        )
+
+    def _grant(self, user_id: str) -> None:
+        self._running_total += 1
+        self._running_by_user[user_id] += 1
+
+    def _next_tag(self, user_id: str) -> float:
+        weight = self.weights.get(user_id, 1.0)
+        start = max(self._virtual_time, self._last_tag.get(user_id, 0.0))
+        tag = start + 1.0 / weight
+        self._last_tag[user_id] = tag
+        return tag
+
+    def _forget_if_idle(self, user_id: str) -> None:
+        if user_id in self._running_by_user or any(w.user_id == user_id for w in self._waiters):
+            return
+        self._last_tag.pop(user_id, None)
+
+    def _ordered_waiters(self) -> list[_Waiter]:
+        return sorted(self._waiters, key=lambda w: (w.tag, w.seq))
+
+    def _publish_gauges(self) -> None:
+        metrics.set_gauge("turn_queue_depth", len(self._waiters))
+        metrics.set_gauge("turn_running", self._running_total)
+
+    def _notify_positions(self) -> None:
+        for position, waiter in enumerate(self._ordered_waiters(), start=1):
+            if waiter.on_queued is None or waiter.last_position == position:
+                continue
+            initial = waiter.last_position < 0
+            waiter.last_position = position
+            task = asyncio.ensure_future(waiter.on_queued(position, initial))
+            waiter.tasks.add(task)
+            task.add_done_callback(waiter.tasks.discard)
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            eligible = [w for w in self._ordered_waiters() if self._can_run(w.user_id)]
+            if not eligible:
+                break
+            waiter = eligible[0]
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                self._forget_if_idle(waiter.user_id)
+                continue
+            self._virtual_time = max(self._virtual_time, waiter.tag)
+            self._grant(waiter.user_id)
+            waiter.future.set_result(None)
+        self._notify_positions()
+        self._publish_gauges()
+
+    async def acquire(self, user_id: str, on_queued: QueueCallback | None = None) -> float:
+        """Wait until the turn may run. Returns seconds spent queued."""
+        if not self._waiters and self._can_run(user_id):
+            self._grant(user_id)
+            self._next_tag(user_id)
+            metrics.observe("turn_queue_wait_seconds", 0.0)
+            self._publish_gauges()
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(
+            user_id=user_id,
+            tag=self._next_tag(user_id),
+            seq=next(self._seq),
+            future=loop.create_future(),
+            enqueued_at=time.monotonic(),
+            on_queued=on_queued,
+        )
+        self._waiters.append(waiter)
+        # Waiters ahead may be blocked only by their per-user cap; admit if we can.
+        self._dispatch()
+        if not waiter.future.done():
+            metrics.inc("turn_queued_total")
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._forget_if_idle(user_id)
+                self._notify_positions()
+                self._publish_gauges()
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we were cancelled: hand the slot back.
+                self.release(user_id)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        metrics.observe("turn_queue_wait_seconds", waited)
+        logger.info("Turn admitted for user=%s after %.2fs in queue", user_id, waited)
+        return waited
+
+    def release(self, user_id: str) -> None:
+        self._running_total = max(0, self._running_total - 1)
+        self._running_by_user[user_id] = max(0, self._running_by_user[user_id] - 1)
+        if not self._running_by_user[user_id]:
+            del self._running_by_user[user_id]
+        self._forget_if_idle(user_id)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, on_queued: QueueCallback | None = None) -> AsyncIterator[float]:
+        waited = await self.acquire(user_id, on_queued)
+        try:
+            yield waited
+        finally:
+            self.release(user_id)
+
+    def status(self) -> dict:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "running": self._running_total,
+            "queue_depth": len(self._waiters),
+            "running_by_user": dict(self._running_by_user),
+            "tracked_users": len(self._last_tag),
+        }
+
+
+_scheduler: TurnScheduler | None = None
+
+
+def get_turn_scheduler() -> TurnScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = TurnScheduler()
+    return _scheduler
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import os
 import re
+import secrets
 import traceback
 import uuid
 from datetime import datetime, timezone
@@ -15,12 +17,27 @@ from pydantic import BaseModel
 from config.mcp_config import list_mcps, set_mcp_enabled
 from agent.engine import run_agent, PROMPTS_DIR, _build_system_prompt, MODEL_CONTEXT_LIMITS, DEFAULT_CONTEXT_LIMIT
 from agent.auto_compactor import compact_history
+from agent.cancellation import CancelScope, TurnCancelled
 from agent.context_budget import load_context_policy, compute_thresholds, estimate_messages_tokens
 from agent.init_jobs import init_collector
 from agent.overflow_recovery import is_context_overflow
 from agent.history_pruner import prune_history
 from agent.skill_loader import get_skill_loader
-from tools import get_all_tools
+from agent.message_record import MessageRecord, to_records
+from agent.metrics import metrics
+from agent.session_lifecycle import get_session_lifecycle
+from agent.session_store import SessionState, get_session_store
+from agent.turn_scheduler import get_turn_scheduler
+from tools import get_all_tools, mcp_chrome_catalog
+from mcp_client.chrome_client import get_chrome_health
+from mcp_client.http_client import mcp_http_status
+from mcp_client.registry import get_mcp_registry
+from mcp_client.snapshot_diff import get_snapshot_store
+from tools.background_jobs import get_job_manager
+from tools.execution_lanes import lanes_status
+from tools.python_kernel import get_kernel_manager
+from tools.result_cache import get_result_cache
+from tools.shell_session import get_shell_session_manager
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +45,13 @@ router = APIRouter()
 
 MEMORY_DIR = Path(__file__).resolve().parent.parent / "memory" / "conversations"
 
+_SESSION_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Sockets currently serving a session in this worker, with an event set once
+# the socket's cleanup is done. A reconnect takes the session over.
+_live_sessions: dict[str, tuple[WebSocket, asyncio.Event]] = {}
+SESSION_TAKEOVER_TIMEOUT = 10.0
+
 
 def _govern_history_before_run(
     history: list,
@@ -91,6 +115,14 @@ def _govern_history_before_run(
     return governed_history, events, policy
 
 
+def _extend_history(base_history: list, user_content: str, round_messages: list) -> list:
+    """Return base history plus this turn, as compact MessageRecords."""
+    history = to_records(base_history)
+    history.append(MessageRecord("user", user_content))
+    history.extend(to_records(round_messages))
+    return history
+
+
 def _save_turn(session_id: str, turn_num: int, user_content: str,
                round_messages: list, created_at: str):
     """Append a conversation turn to the session markdown file."""
@@ -172,6 +204,7 @@ async def list_skills():
                 "status": s.status,
                 "metadata": s.metadata,
                 "scripts": s.scripts,
+                "commands": [c.name for c in s.commands],
             }
             for s in loader.loaded_skills
         ]
@@ -264,35 +297,59 @@ async def update_mcp_enabled(mcp_id: str, body: MCPEnabledUpdate):
     if mcp_id not in mcps:
         raise HTTPException(status_code=404, detail=f"MCP '{mcp_id}' not found")
     set_mcp_enabled(mcp_id, body.enabled)
+    if mcp_id == "mcp-chrome":
+        mcp_chrome_catalog().invalidate()
+    else:
+        get_mcp_registry().invalidate(mcp_id)
+    get_session_store().publish("mcp_toggled", {"id": mcp_id, "enabled": body.enabled})
     return {"id": mcp_id, "enabled": body.enabled}
 
 
 @router.get("/api/mcp/chrome/status")
 async def mcp_chrome_status():
-    """Diagnostic: check MCP Chrome bridge reachability and tool loading."""
+    """Diagnostic: cached MCP Chrome bridge health and tool catalog (no network round-trip)."""
     from config.mcp_config import is_mcp_enabled
-    from mcp_client.chrome_client import _check_bridge_reachable, _get_config
+    from mcp_client.chrome_client import _get_config, get_chrome_health
 
     url, _ = _get_config()
     enabled = is_mcp_enabled("mcp-chrome")
-    reachable, msg = _check_bridge_reachable(url)
-    tools_loaded = False
-    tool_count = 0
-    if enabled and reachable:
-        try:
-            from mcp_client import get_mcp_chrome_tools
-            tools = get_mcp_chrome_tools()
-            tools_loaded = True
-            tool_count = len(tools)
-        except Exception as e:
-            msg = str(e)
+    health = get_chrome_health(url)
+    if enabled and health.reachable is None:
+        # Never probed yet (prober disabled or not started): check once.
+        await asyncio.to_thread(health.check)
+    state = health.status()
+    catalog = mcp_chrome_catalog().status()
+    msg = state["message"]
+    if state["reachable"] and catalog["error"]:
+        msg = catalog["error"]
     return {
         "enabled": enabled,
         "url": url,
-        "http_reachable": reachable,
+        "http_reachable": bool(state["reachable"]),
         "http_message": msg,
-        "tools_loaded": tools_loaded,
-        "tool_count": tool_count,
+        "tools_loaded": catalog["age_seconds"] is not None,
+        "tool_count": catalog["tools"],
+        "circuit": state["circuit"]["state"],
+        "checked_seconds_ago": state["checked_seconds_ago"],
+    }
+
+
+@router.get("/api/metrics")
+async def get_metrics():
+    return {
+        "scheduler": get_turn_scheduler().status(),
+        "sessions": get_session_lifecycle().stats(),
+        "python_kernels": get_kernel_manager().status(),
+        "tool_lanes": lanes_status(),
+        "python_cache": get_result_cache().status(),
+        "background_jobs": get_job_manager().status(),
+        "shell_sessions": get_shell_session_manager().status(),
+        "mcp_tools": {"mcp-chrome": mcp_chrome_catalog().status()},
+        "mcp_servers": get_mcp_registry().status(),
+        "mcp_health": {"mcp-chrome": get_chrome_health().status()},
+        "mcp_http": mcp_http_status(),
+        "mcp_snapshots": get_snapshot_store().status(),
+        **metrics.snapshot(),
     }
 
 
@@ -300,6 +357,7 @@ async def mcp_chrome_status():
 async def reload_skills():
     loader = get_skill_loader()
     loader.discover()
+    get_session_store().publish("skills_reloaded")
     return {
         "message": f"重新发现完成，共 {len(loader.loaded_skills)} 个 Skill",
         "skills": [s.name for s in loader.loaded_skills],
@@ -308,13 +366,82 @@ async def reload_skills():
 
 # --- WebSocket ---
 
+def _parse_client_message(raw: str) -> tuple[str, str]:
+    """Return (message_type, content) for a raw client frame. Plain text counts as user input."""
+    try:
+        msg = json.loads(raw)
+        return msg.get("type", "user_input"), msg.get("data", {}).get("content", "")
+    except (json.JSONDecodeError, AttributeError):
+        return "user_input", raw.strip()
+
+
+def _new_session() -> SessionState:
+    return SessionState(
+        session_id=uuid.uuid4().hex[:12],
+        created_at=datetime.now(timezone.utc).isoformat(),
+        resume_token=secrets.token_urlsafe(24),
+    )
+
+
+async def _take_over_session(session_id: str) -> None:
+    """Close another socket of this worker serving the session and wait for its cleanup."""
+    live = _live_sessions.get(session_id)
+    if live is None:
+        return
+    old_socket, closed = live
+    logger.info("Session %s resumed by a new connection, closing the old one", session_id)
+    metrics.inc("session_takeovers_total")
+    try:
+        await old_socket.close(code=4000, reason="session resumed by another connection")
+    except Exception as e:
+        logger.debug("Closing superseded socket failed (session=%s): %s", session_id, e)
+    try:
+        await asyncio.wait_for(closed.wait(), timeout=SESSION_TAKEOVER_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("Superseded socket of session %s did not shut down in time", session_id)
+        if _live_sessions.get(session_id) is live:
+            del _live_sessions[session_id]
+
+
+async def _resume_session(store, requested_id: str, token: str) -> SessionState:
+    """The stored session if ``token`` matches its server-issued resume token, else a new session.
+
+    Unknown ids are never adopted, so a client cannot pick another user's id in advance."""
+    if not (_SESSION_ID_RE.match(requested_id) and token):
+        return _new_session()
+    state = await asyncio.to_thread(store.load, requested_id)
+    if state is None or not state.resume_token or not secrets.compare_digest(state.resume_token, token):
+        if state is not None:
+            logger.warning("Rejected resume of session %s: bad resume token", requested_id)
+            metrics.inc("session_resume_rejected_total")
+        return _new_session()
+    # Loop: another reconnect may have taken the session while we waited.
+    while requested_id in _live_sessions:
+        await _take_over_session(requested_id)
+        # The old socket may have persisted a turn while shutting down.
+        state = await asyncio.to_thread(store.load, requested_id) or state
+    return state
+
+
 @router.websocket("/ws/chat")
 async def chat_ws(websocket: WebSocket):
     await websocket.accept()
+    store = get_session_store()
+    state = await _resume_session(
+        store, websocket.query_params.get("session_id", ""), websocket.query_params.get("resume_token", "")
+    )
+    session_id = state.session_id
+    turn_num = state.turn_num
+    created_at = state.created_at
+    resume_token = state.resume_token
+    closed = asyncio.Event()
+    _live_sessions[session_id] = (websocket, closed)
+    # Between turns the lifecycle manager owns the history (and may spill it
+    # to disk when idle); a turn checks it out and hands it back.
+    lifecycle = get_session_lifecycle()
+    lifecycle.register(session_id, state.history)
     history: list = []
-    session_id = uuid.uuid4().hex[:12]
-    turn_num = 0
-    created_at = datetime.now(timezone.utc).isoformat()
+    del state
 
     loader = get_skill_loader()
     builtin_tools_info = [
@@ -338,116 +465,261 @@ async def chat_ws(websocket: WebSocket):
             "system_prompt": assembled_prompt,
             "model_name": model_name,
             "context_limit": context_limit,
+            "session_id": session_id,
+            "resume_token": resume_token,
+            "resumed_turns": turn_num,
         },
     })
 
-    try:
-        while True:
-            raw = await websocket.receive_text()
+    # The socket is read by a dedicated task so control messages (cancel)
+    # arrive while a turn is running; user inputs are queued for the turn loop.
+    inbox: asyncio.Queue[str | None] = asyncio.Queue()
+    active_turn: dict = {"task": None, "scope": None}
+    scheduler = get_turn_scheduler()
+    # The fairness key must not be client-chosen, or per-user caps are trivially bypassed.
+    user_id = websocket.client.host if websocket.client else session_id
+
+    def _cancel_active_turn() -> bool:
+        task, scope = active_turn["task"], active_turn["scope"]
+        if task is None or task.done():
+            return False
+        scope.cancel()
+        task.cancel()
+        return True
+
+    async def _receive_loop():
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                msg_type, content = _parse_client_message(raw)
+                lifecycle.heartbeat(session_id)
+                if msg_type == "ping":
+                    await websocket.send_json({
+                        "type": "pong",
+                        "step": 0,
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                        "data": {},
+                    })
+                    continue
+                if msg_type == "cancel":
+                    if _cancel_active_turn():
+                        logger.info("Turn cancel requested (session=%s, turn=%d)", session_id, turn_num)
+                    continue
+                if content:
+                    await inbox.put(content)
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.warning("WebSocket receive loop stopped: %s", e)
+        _cancel_active_turn()
+        await inbox.put(None)
+
+    async def _send_turn_cancelled(partial_messages: int, scope: CancelScope):
+        await websocket.send_json({
+            "type": "turn_cancelled",
+            "step": 0,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {
+                "turn": turn_num,
+                "partial_messages": partial_messages,
+                "killed_processes": scope.killed_processes,
+            },
+        })
+
+    async def _on_queued(position: int, initial: bool):
+        await websocket.send_json({
+            "type": "queued" if initial else "queue_position",
+            "step": 0,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"queue_position": position, "queue_depth": scheduler.queue_depth},
+        })
+
+    async def _run_turn(user_content: str, scope: CancelScope):
+        nonlocal history
+
+        await websocket.send_json({
+            "type": "graph_reset",
+            "step": 0,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {},
+        })
+
+        await websocket.send_json({
+            "type": "user_input",
+            "step": 0,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "data": {"content": user_content},
+        })
+
+        async with scheduler.admit(user_id, on_queued=_on_queued):
+            history = await asyncio.to_thread(lifecycle.checkout, session_id)
             try:
-                msg = json.loads(raw)
-                user_content = msg.get("data", {}).get("content", "")
-            except (json.JSONDecodeError, AttributeError):
-                user_content = raw.strip()
-
-            if not user_content:
-                continue
+                await _execute_turn(user_content, scope)
+                await _persist_session()
+            finally:
+                lifecycle.checkin(session_id, history)
+                history = []
+        await asyncio.to_thread(lifecycle.enforce_memory_limit)
+
+    async def _persist_session():
+        try:
+            await asyncio.to_thread(store.save, SessionState(session_id, created_at, turn_num, history, resume_token=resume_token))
+        except Exception as e:
+            logger.warning("Failed to persist session %s: %s", session_id, e)
 
-            turn_num += 1
+    async def _execute_turn(user_content: str, scope: CancelScope):
+        nonlocal history
 
-            await websocket.send_json({
-                "type": "graph_reset",
-                "step": 0,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "data": {},
-            })
+        async def on_event(event: dict):
+            await websocket.send_json(event)
 
-            await websocket.send_json({
-                "type": "user_input",
-                "step": 0,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "data": {"content": user_content},
-            })
+        governed_history = history
+        try:
+            governed_history, governance_events, _ = _govern_history_before_run(
+                history=history,
+                user_content=user_content,
+                model_name=model_name,
+                context_limit=context_limit,
+            )
+            if governance_events:
+                # Pruned/compacted history may no longer hold the snapshots diffs refer to.
+                get_snapshot_store().clear(session_id)
+            for evt in governance_events:
+                await websocket.send_json({
+                    "type": evt["type"],
+                    "step": 0,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "data": evt["data"],
+                })
 
-            async def on_event(event: dict):
-                await websocket.send_json(event)
+            round_messages = await run_agent(user_content, on_event, history=governed_history, turn_num=turn_num, scope=scope)
+            history = _extend_history(governed_history, user_content, round_messages)
 
             try:
-                governed_history, governance_events, _ = _govern_history_before_run(
-                    history=history,
-                    user_content=user_content,
+                _save_turn(session_id, turn_num, user_content, round_messages, created_at)
+            except Exception as e:
+                logger.warning("Failed to save conversation turn: %s", e)
+
+        except TurnCancelled as cancelled:
+            # Keep what the agent produced so far so the next turn can build on it,
+            # on top of the pruned/compacted history the agent actually ran with.
+            history = _extend_history(governed_history, user_content, cancelled.round_messages)
+            try:
+                _save_turn(session_id, turn_num, user_content, cancelled.round_messages, created_at)
+            except Exception as e:
+                logger.warning("Failed to save cancelled conversation turn: %s", e)
+            await _send_turn_cancelled(len(cancelled.round_messages), scope)
+
+        except Exception as run_err:
+            policy = load_context_policy()
+            if is_context_overflow(run_err) and policy.max_retry_on_overflow > 0:
+                retry_history, compact_stats = compact_history(
+                    history,
+                    preserve_recent_turns=policy.preserve_recent_turns,
                     model_name=model_name,
-                    context_limit=context_limit,
                 )
-                for evt in governance_events:
+                get_snapshot_store().clear(session_id)
+                await websocket.send_json({
+                    "type": "context_compacted",
+                    "step": 0,
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "data": {
+                        "before_tokens": compact_stats.get("before_tokens", 0),
+                        "after_tokens": compact_stats.get("after_tokens", 0),
+                        "summary_chars": compact_stats.get("summary_chars", 0),
+                        "compacted_turns": compact_stats.get("compacted_turns", 0),
+                    },
+                })
+                try:
+                    round_messages = await run_agent(user_content, on_event, history=retry_history, turn_num=turn_num, scope=scope)
+                    history = _extend_history(retry_history, user_content, round_messages)
                     await websocket.send_json({
-                        "type": evt["type"],
+                        "type": "overflow_recovered",
                         "step": 0,
                         "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "data": evt["data"],
+                        "data": {"retry_count": 1, "success": True, "reason": "context_overflow"},
                     })
-
-                round_messages = await run_agent(user_content, on_event, history=governed_history, turn_num=turn_num)
-                history = list(governed_history)
-                history.append({"role": "user", "content": user_content})
-                history.extend(round_messages)
-
-                try:
-                    _save_turn(session_id, turn_num, user_content, round_messages, created_at)
-                except Exception as e:
-                    logger.warning("Failed to save conversation turn: %s", e)
-
-            except Exception as run_err:
-                policy = load_context_policy()
-                if is_context_overflow(run_err) and policy.max_retry_on_overflow > 0:
-                    retry_history, compact_stats = compact_history(
-                        history,
-                        preserve_recent_turns=policy.preserve_recent_turns,
-                        model_name=model_name,
-                    )
+                    try:
+                        _save_turn(session_id, turn_num, user_content, round_messages, created_at)
+                    except Exception as e:
+                        logger.warning("Failed to save conversation turn after retry: %s", e)
+                    return
+                except TurnCancelled as cancelled:
+                    history = _extend_history(retry_history, user_content, cancelled.round_messages)
+                    try:
+                        _save_turn(session_id, turn_num, user_content, cancelled.round_messages, created_at)
+                    except Exception as e:
+                        logger.warning("Failed to save cancelled conversation turn: %s", e)
+                    await _send_turn_cancelled(len(cancelled.round_messages), scope)
+                    return
+                except Exception:
                     await websocket.send_json({
-                        "type": "context_compacted",
+                        "type": "overflow_recovered",
                         "step": 0,
                         "timestamp": datetime.now(timezone.utc).isoformat(),
-                        "data": {
-                            "before_tokens": compact_stats.get("before_tokens", 0),
-                            "after_tokens": compact_stats.get("after_tokens", 0),
-                            "summary_chars": compact_stats.get("summary_chars", 0),
-                            "compacted_turns": compact_stats.get("compacted_turns", 0),
-                        },
+                        "data": {"retry_count": 1, "success": False, "reason": "context_overflow"},
                     })
-                    try:
-                        round_messages = await run_agent(user_content, on_event, history=retry_history, turn_num=turn_num)
-                        history = list(retry_history)
-                        history.append({"role": "user", "content": user_content})
-                        history.extend(round_messages)
-                        await websocket.send_json({
-                            "type": "overflow_recovered",
-                            "step": 0,
-                            "timestamp": datetime.now(timezone.utc).isoformat(),
-                            "data": {"retry_count": 1, "success": True, "reason": "context_overflow"},
-                        })
-                        try:
-                            _save_turn(session_id, turn_num, user_content, round_messages, created_at)
-                        except Exception as e:
-                            logger.warning("Failed to save conversation turn after retry: %s", e)
-                        continue
-                    except Exception:
-                        await websocket.send_json({
-                            "type": "overflow_recovered",
-                            "step": 0,
-                            "timestamp": datetime.now(timezone.utc).isoformat(),
-                            "data": {"retry_count": 1, "success": False, "reason": "context_overflow"},
-                        })
-
-                tb = traceback.format_exc()
-                logger.error("Agent error: %s", tb)
-                await websocket.send_json({
-                    "type": "error",
-                    "step": -1,
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "data": {"message": "Agent 执行出错", "detail": tb[-500:]},
-                })
 
-    except WebSocketDisconnect:
+            tb = traceback.format_exc()
+            logger.error("Agent error: %s", tb)
+            await websocket.send_json({
+                "type": "error",
+                "step": -1,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "data": {"message": "Agent 执行出错", "detail": tb[-500:]},
+            })
+
+    # Background jobs outlive turns; their start/finish events go to whichever socket holds the session.
+    loop = asyncio.get_running_loop()
+
+    async def _send_job_update(event: dict):
+        try:
+            await websocket.send_json({
+                "type": event["type"],
+                "step": 0,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "data": event["data"],
+            })
+        except Exception as e:
+            logger.debug("Failed to send job update (session=%s): %s", session_id, e)
+
+    def _on_job_update(event: dict):
+        loop.call_soon_threadsafe(lambda: asyncio.ensure_future(_send_job_update(event)))
+
+    job_manager = get_job_manager()
+    job_manager.add_listener(session_id, _on_job_update)
+
+    receiver = asyncio.create_task(_receive_loop())
+    try:
+        while True:
+            user_content = await inbox.get()
+            if user_content is None:
+                break
+
+            turn_num += 1
+            scope = CancelScope(session_id=session_id)
+            task = asyncio.create_task(_run_turn(user_content, scope))
+            active_turn.update(task=task, scope=scope)
+            try:
+                await asyncio.wait({task})
+            finally:
+                active_turn.update(task=None, scope=None)
+
+            if task.cancelled():
+                # Cancelled before run_agent took over (e.g. during governance).
+                try:
+                    await _send_turn_cancelled(0, scope)
+                except Exception:
+                    pass
+            elif task.exception() is not None:
+                logger.info("Turn ended with connection error (session=%s): %s", session_id, task.exception())
+
+    finally:
+        receiver.cancel()
+        _cancel_active_turn()
+        job_manager.remove_listener(session_id, _on_job_update)
+        lifecycle.unregister(session_id)
+        if _live_sessions.get(session_id, (None,))[0] is websocket:
+            del _live_sessions[session_id]
+        closed.set()
         logger.info("WebSocket client disconnected (session=%s, turns=%d)", session_id, turn_num)
@@ -5,12 +5,15 @@ from __future__ import annotations
 import json
 import logging
 import os
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 CONFIG_DIR = Path(__file__).resolve().parent.parent / "config"
 MCP_CONFIG_FILE = CONFIG_DIR / "mcp.json"
+DEFAULT_SERVERS_FILE = CONFIG_DIR / "mcp_servers.json"
 
 # Known MCPs that can be enabled/disabled
 KNOWN_MCPs = [
@@ -23,6 +26,110 @@ KNOWN_MCPs = [
 ]
 
 
+@dataclass
+class MCPServerConfig:
+    """An extra MCP server from ``MCP_SERVERS_FILE`` (HTTP via ``url`` or stdio via ``command``)."""
+
+    id: str
+    name: str
+    description: str = ""
+    transport: str = "http"
+    url: str = ""
+    command: str = ""
+    args: list[str] = field(default_factory=list)
+    env: dict[str, str] = field(default_factory=dict)
+    enabled: bool = False
+    timeout: float = 60.0
+    discovery_timeout: float = 10.0
+    prefix: str = ""
+    tools: list[str] | None = None
+
+    @property
+    def tool_prefix(self) -> str:
+        """Namespace for this server's tool names (``<prefix>__<tool>``)."""
+        return re.sub(r"[^A-Za-z0-9_]", "_", self.prefix or self.id)
+
+
+def servers_file() -> Path:
+    path = Path(os.getenv("MCP_SERVERS_FILE", str(DEFAULT_SERVERS_FILE)))
+    return path if path.is_absolute() else CONFIG_DIR.parent / path
+
+
+_servers_cache: tuple[tuple, list[MCPServerConfig]] | None = None
+
+
+def _parse_server(server_id: str, raw: dict) -> MCPServerConfig:
+    transport = raw.get("transport") or ("stdio" if raw.get("command") else "http")
+    if transport not in ("http", "stdio"):
+        raise ValueError(f"unknown transport '{transport}'")
+    if transport == "http" and not raw.get("url"):
+        raise ValueError("http server needs 'url'")
+    if transport == "stdio" and not raw.get("command"):
+        raise ValueError("stdio server needs 'command'")
+    return MCPServerConfig(
+        id=server_id,
+        name=raw.get("name") or server_id,
+        description=raw.get("description", ""),
+        transport=transport,
+        url=raw.get("url", ""),
+        command=raw.get("command", ""),
+        args=[str(a) for a in raw.get("args", [])],
+        env={str(k): str(v) for k, v in (raw.get("env") or {}).items()},
+        enabled=bool(raw.get("enabled", False)),
+        timeout=float(raw.get("timeout", 60)),
+        discovery_timeout=float(raw.get("discovery_timeout", os.getenv("MCP_DISCOVERY_TIMEOUT_SECONDS", "10"))),
+        prefix=raw.get("prefix", ""),
+        tools=raw.get("tools"),
+    )
+
+
+def load_server_configs() -> list[MCPServerConfig]:
+    """Extra MCP servers, cached until the file changes. Invalid entries are skipped with a warning.
+
+    The file uses the common ``{"mcpServers": {"<id>": {...}}}`` layout.
+    """
+    global _servers_cache
+    path = servers_file()
+    try:
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return []
+    if _servers_cache is not None and _servers_cache[0] == key:
+        return list(_servers_cache[1])
+    servers = []
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning("Failed to load MCP servers from %s: %s", path, e)
+        data = {}
+    for server_id, raw in (data.get("mcpServers") or data.get("servers") or {}).items():
+        if server_id == "mcp-chrome" or not isinstance(raw, dict):
+            logger.warning("Skip MCP server '%s': reserved id or not an object", server_id)
+            continue
+        try:
+            servers.append(_parse_server(server_id, raw))
+        except (TypeError, ValueError) as e:
+            logger.warning("Skip MCP server '%s': %s", server_id, e)
+    _servers_cache = (key, servers)
+    return list(servers)
+
+
+def _known_mcps() -> list[dict]:
+    """Builtin MCPs plus the servers from ``MCP_SERVERS_FILE``."""
+    extra = [
+        {"id": s.id, "name": s.name, "description": s.description or f"MCP 服务（{s.transport}）", "default": s.enabled}
+        for s in load_server_configs()
+    ]
+    return KNOWN_MCPs + extra
+
+
+def _default_enabled(mcp: dict) -> bool:
+    if "env_key" in mcp:
+        return os.getenv(mcp["env_key"], "false").lower() in ("true", "1", "yes")
+    return bool(mcp.get("default", False))
+
+
 def _load_config() -> dict:
     """Load MCP config from file. Falls back to .env if file missing."""
     if MCP_CONFIG_FILE.exists():
@@ -49,11 +156,10 @@ def is_mcp_enabled(mcp_id: str) -> bool:
     if mcp_id in config and "enabled" in config[mcp_id]:
         return bool(config[mcp_id]["enabled"])
 
-    # Fallback to env
-    for mcp in KNOWN_MCPs:
+    # Fallback to env / servers file
+    for mcp in _known_mcps():
         if mcp["id"] == mcp_id:
-            env_val = os.getenv(mcp["env_key"], "false")
-            return env_val.lower() in ("true", "1", "yes")
+            return _default_enabled(mcp)
     return False
 
 
@@ -70,11 +176,11 @@ def list_mcps() -> list[dict]:
     """List all known MCPs with their current enabled state."""
     config = _load_config()
     result = []
-    for mcp in KNOWN_MCPs:
+    for mcp in _known_mcps():
         mcp_id = mcp["id"]
         enabled = config.get(mcp_id, {}).get("enabled")
         if enabled is None:
-            enabled = os.getenv(mcp["env_key"], "false").lower() in ("true", "1", "yes")
+            enabled = _default_enabled(mcp)
         result.append({
             "id": mcp_id,
             "name": mcp["name"],
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -47,6 +48,12 @@ async def lifespan(app: FastAPI):
         return f"{len(skills)} skill(s) discovered — {details}"
     init_collector.run_job("discover_skills", _discover)
 
+    def _watch_skills():
+        if not loader.start_watching():
+            return "disabled (SKILL_WATCH_INTERVAL_SECONDS=0)"
+        return f"polling every {os.getenv('SKILL_WATCH_INTERVAL_SECONDS', '2')}s"
+    init_collector.run_job("watch_skills", _watch_skills)
+
     def _register_tools():
         tools = get_all_tools()
         names = [t.name for t in tools]
@@ -58,9 +65,79 @@ async def lifespan(app: FastAPI):
         return get_mcp_chrome_init_status()
     init_collector.run_job("check_mcp_chrome", _check_mcp_chrome)
 
+    def _monitor_mcp_chrome():
+        from mcp_client.health import probe_interval
+        from tools import start_mcp_chrome_monitor
+        if not start_mcp_chrome_monitor():
+            return "disabled (MCP_HEALTH_INTERVAL_SECONDS=0)"
+        return f"probing every {probe_interval():g}s"
+    init_collector.run_job("monitor_mcp_chrome", _monitor_mcp_chrome)
+
+    def _discover_mcp_servers():
+        from tools import get_mcp_servers_init_status
+        return get_mcp_servers_init_status()
+    init_collector.run_job("discover_mcp_servers", _discover_mcp_servers)
+
+    def _start_session_store():
+        from agent.session_store import get_session_store
+        from config.mcp_config import is_mcp_enabled, set_mcp_enabled
+
+        store = get_session_store()
+
+        def _on_notification(event: str, payload: dict):
+            if event == "skills_reloaded":
+                loader.discover()
+            elif event == "mcp_toggled":
+                mcp_id, enabled = payload.get("id", ""), bool(payload.get("enabled"))
+                if mcp_id and is_mcp_enabled(mcp_id) != enabled:
+                    set_mcp_enabled(mcp_id, enabled)
+                if mcp_id == "mcp-chrome":
+                    from tools import mcp_chrome_catalog
+                    mcp_chrome_catalog().invalidate()
+                elif mcp_id:
+                    from mcp_client.registry import get_mcp_registry
+                    get_mcp_registry().invalidate(mcp_id)
+            logger.info("Applied cross-worker notification '%s' %s", event, payload)
+
+        store.subscribe(_on_notification)
+        store.start()
+        return f"backend={store.backend}, worker={store.worker_id}"
+    init_collector.run_job("session_store", _start_session_store)
+
+    def _warm_python_pool():
+        from tools.python_worker_pool import get_python_pool
+        pool = get_python_pool()
+        if not pool.enabled:
+            return "disabled (PYTHON_WORKER_POOL_SIZE=0)"
+        pool.warm()
+        return f"warming {pool.size} worker(s), preload={pool.preload_modules()}"
+    init_collector.run_job("warm_python_pool", _warm_python_pool)
+
+    from agent.session_lifecycle import get_session_lifecycle
+    sweeper = asyncio.create_task(get_session_lifecycle().run())
+
     logger.info("MyClaw V2 initialized — %d jobs completed", len(init_collector.jobs))
     yield
 
+    sweeper.cancel()
+    loader.stop_watching()
+    from agent.session_store import get_session_store
+    get_session_store().stop()
+    from tools.python_worker_pool import get_python_pool
+    get_python_pool().shutdown()
+    from tools.python_kernel import get_kernel_manager
+    get_kernel_manager().shutdown()
+    from tools.background_jobs import get_job_manager
+    get_job_manager().shutdown()
+    from tools.shell_session import get_shell_session_manager
+    get_shell_session_manager().shutdown()
+    from mcp_client.chrome_client import get_chrome_health
+    get_chrome_health().stop()
+    from mcp_client.http_client import aclose_mcp_http_clients
+    await aclose_mcp_http_clients()
+    from mcp_client.sdk_session import close_sdk_sessions
+    close_sdk_sessions()
+
 
 app = FastAPI(title="MyClaw", version="0.2.0", lifespan=lifespan)
 
@@ -0,0 +1,227 @@
+"""``chrome_run_actions``: run a short browser action script in one tool call.
+
+Deterministic flows (navigate → get_interactive_elements → click →
+get_web_content) otherwise cost one LLM step and one round trip per call.
+The script is validated up front against the bridge's tool schemas, then
+executed over the shared MCP session: steps run in order and consecutive
+read-only steps are pipelined (sent concurrently on the async path). The
+first failure stops the script. Only the final step's output is returned,
+with a one-line status per earlier step.
+
+The bridge speaks MCP 2024-11-05 without JSON-RPC batches, so pipelining on
+the pooled connection is used instead of a batch request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Any
+
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel, Field
+
+from agent.metrics import metrics
+
+ACTION_TOOL_NAME = "chrome_run_actions"
+WAIT = "wait"
+MAX_WAIT_SECONDS = 10.0
+
+SCRIPTABLE_TOOLS = {
+    "get_windows_and_tabs",
+    "chrome_navigate",
+    "chrome_switch_tab",
+    "chrome_get_web_content",
+    "chrome_get_interactive_elements",
+    "chrome_click_element",
+    "chrome_fill_or_select",
+    "chrome_keyboard",
+}
+
+# Steps that only read the page; consecutive ones can be sent together.
+READ_ONLY_TOOLS = {"get_windows_and_tabs", "chrome_get_web_content", "chrome_get_interactive_elements"}
+
+_JSON_TYPES: dict[str, tuple[type, ...]] = {
+    "string": (str,),
+    "integer": (int,),
+    "number": (int, float),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+}
+
+
+def action_scripts_enabled() -> bool:
+    return os.getenv("MCP_CHROME_ACTION_SCRIPT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def max_steps() -> int:
+    return int(os.getenv("MCP_CHROME_ACTION_SCRIPT_MAX_STEPS", "10"))
+
+
+class ActionStep(BaseModel):
+    tool: str = Field(description="浏览器工具名，或 wait（等待 seconds 秒）")
+    args: dict[str, Any] = Field(default_factory=dict, description="该工具的参数")
+
+
+class ActionScriptArgs(BaseModel):
+    actions: list[ActionStep] = Field(description="按顺序执行的步骤")
+
+
+def _type_ok(value: Any, expected: str | None) -> bool:
+    types = _JSON_TYPES.get(expected or "")
+    if types is None:
+        return True
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def validate_script(actions: list[dict], schemas: dict[str, dict]) -> list[str]:
+    """Problems with the script (empty when it may run). ``schemas`` maps tool name to inputSchema."""
+    errors = []
+    if not actions:
+        errors.append("actions 不能为空")
+    if len(actions) > max_steps():
+        errors.append(f"步骤数 {len(actions)} 超过上限 {max_steps()}")
+    for i, step in enumerate(actions, 1):
+        tool, args = step.get("tool", ""), step.get("args") or {}
+        if tool == WAIT:
+            seconds = args.get("seconds")
+            if not _type_ok(seconds, "number") or not 0 < seconds <= MAX_WAIT_SECONDS:
+                errors.append(f"步骤 {i}：wait 需要 0 < seconds <= {MAX_WAIT_SECONDS:g}")
+            continue
+        if tool not in schemas:
+            errors.append(f"步骤 {i}：不支持的工具 {tool}，可用：{', '.join(sorted(schemas))}, {WAIT}")
+            continue
+        props = schemas[tool].get("properties") or {}
+        missing = [k for k in schemas[tool].get("required", []) if k not in args]
+        if missing:
+            errors.append(f"步骤 {i}：{tool} 缺少参数 {missing}")
+        for key, value in args.items():
+            if props and key not in props:
+                errors.append(f"步骤 {i}：{tool} 不接受参数 {key}")
+            elif key in props and not _type_ok(value, props[key].get("type")):
+                errors.append(f"步骤 {i}：{tool} 的参数 {key} 应为 {props[key].get('type')}")
+    return errors
+
+
+def _stages(actions: list[dict]) -> list[list[tuple[int, dict]]]:
+    """Group steps: each run of consecutive read-only steps forms one stage."""
+    stages: list[list[tuple[int, dict]]] = []
+    for i, step in enumerate(actions):
+        if stages and step["tool"] in READ_ONLY_TOOLS and all(s["tool"] in READ_ONLY_TOOLS for _, s in stages[-1]):
+            stages[-1].append((i, step))
+        else:
+            stages.append([(i, step)])
+    return stages
+
+
+def _first_line(text: str, limit: int = 80) -> str:
+    line = (text or "").strip().splitlines()[0] if (text or "").strip() else ""
+    return line[:limit] + ("…" if len(line) > limit else "")
+
+
+def _report(actions: list[dict], outputs: dict[int, str], failed: tuple[int, Exception] | None) -> str:
+    lines = []
+    for i, step in enumerate(actions):
+        if failed is not None and i == failed[0]:
+            lines.append(f"步骤 {i + 1} {step['tool']}：失败 — {failed[1]}")
+            break
+        if i not in outputs:
+            break
+        if i < len(actions) - 1:
+            lines.append(f"步骤 {i + 1} {step['tool']}：成功 {_first_line(outputs[i])}".rstrip())
+    if failed is not None:
+        lines.insert(0, f"错误：动作脚本在第 {failed[0] + 1} 步中止，后续步骤未执行。")
+        done = [i for i in outputs if i < failed[0]]
+        if done:
+            last = max(done)
+            lines.append(f"\n最后成功步骤（{last + 1} {actions[last]['tool']}）的输出：\n{outputs[last]}")
+    else:
+        lines.append(f"\n最终结果（步骤 {len(actions)} {actions[-1]['tool']}）：\n{outputs[len(actions) - 1]}")
+    return "\n".join(lines).strip()
+
+
+def _record(actions: list[dict], start: float, ok: bool) -> None:
+    metrics.inc("mcp_action_scripts_total", result="ok" if ok else "error")
+    metrics.observe("mcp_action_script_steps", len(actions))
+    metrics.observe("mcp_action_script_seconds", time.perf_counter() - start)
+
+
+def run_script(client: Any, actions: list[dict]) -> str:
+    """Run steps one after another on the client's shared session."""
+    start = time.perf_counter()
+    outputs: dict[int, str] = {}
+    for i, step in enumerate(actions):
+        try:
+            if step["tool"] == WAIT:
+                time.sleep(step["args"]["seconds"])
+                outputs[i] = ""
+            else:
+                outputs[i] = client.call_tool(step["tool"], step.get("args") or {})
+        except Exception as e:
+            _record(actions, start, False)
+            return _report(actions, outputs, (i, e))
+    _record(actions, start, True)
+    return _report(actions, outputs, None)
+
+
+async def arun_script(client: Any, actions: list[dict]) -> str:
+    """Like ``run_script``, but consecutive read-only steps are in flight together."""
+    start = time.perf_counter()
+    outputs: dict[int, str] = {}
+
+    async def _step(step: dict) -> str:
+        if step["tool"] == WAIT:
+            await asyncio.sleep(step["args"]["seconds"])
+            return ""
+        return await client.acall_tool(step["tool"], step.get("args") or {})
+
+    for stage in _stages(actions):
+        results = await asyncio.gather(*(_step(step) for _, step in stage), return_exceptions=True)
+        for (i, _), result in zip(stage, results):
+            if isinstance(result, BaseException):
+                _record(actions, start, False)
+                return _report(actions, outputs, (i, result))
+            outputs[i] = result
+    _record(actions, start, True)
+    return _report(actions, outputs, None)
+
+
+def make_action_script_tool(tools_def: list[dict], client: Any) -> StructuredTool:
+    """The composite tool for the scriptable subset of ``tools_def``."""
+    schemas = {t["name"]: t.get("inputSchema") or {} for t in tools_def if t.get("name") in SCRIPTABLE_TOOLS}
+
+    def _prepare(actions: list) -> tuple[list[dict], str | None]:
+        steps = [a.model_dump() if isinstance(a, BaseModel) else dict(a) for a in actions]
+        errors = validate_script(steps, schemas)
+        if errors:
+            return steps, "错误：动作脚本校验失败，未执行任何步骤。\n" + "\n".join(f"- {e}" for e in errors)
+        return steps, None
+
+    def _run(actions: list) -> str:
+        steps, error = _prepare(actions)
+        return error or run_script(client, steps)
+
+    async def _arun(actions: list) -> str:
+        steps, error = _prepare(actions)
+        return error or await arun_script(client, steps)
+
+    description = (
+        "在一次调用中按顺序执行一段确定的浏览器动作脚本（如 导航 → 获取可交互元素 → 点击 → 读取页面），"
+        "只返回最后一步的结果及前面各步的成功/失败摘要，用于减少多步操作的往返。"
+        "任一步失败即停止。仅在步骤与参数都已确定时使用；需要根据中间结果决定下一步时请逐个调用工具。"
+        f"可用步骤工具：{', '.join(sorted(schemas))}；另有 wait（args: {{\"seconds\": 1}}）。"
+        f"最多 {max_steps()} 步。示例：[{{\"tool\": \"chrome_navigate\", \"args\": {{\"url\": \"https://example.com\"}}}}, "
+        "{\"tool\": \"chrome_get_web_content\", \"args\": {}}]"
+    )
+    return StructuredTool(
+        name=ACTION_TOOL_NAME,
+        description=description,
+        args_schema=ActionScriptArgs,
+        func=_run,
+        coroutine=_arun,
+        metadata={"tool_group": "browser"},
+    )
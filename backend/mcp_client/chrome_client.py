@@ -2,16 +2,26 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import threading
 import time
 from pathlib import Path
 from typing import Any
 
+from mcp_client.health import CircuitOpenError, ServerHealth
+from mcp_client.sdk_session import call_tool_op, get_sdk_session, list_tools_op, parse_tool_result
+
+# Kept for existing imports of the SDK result parser from this module.
+_parse_tool_result = parse_tool_result
+
 logger = logging.getLogger(__name__)
 
 DEFAULT_URL = "http://127.0.0.1:12306/mcp"
 DEFAULT_TIMEOUT = 60.0
+CALL_ATTEMPTS = 2
+CALL_RETRY_DELAY = 1.0
 
 _BACKEND_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,21 +32,40 @@ def _get_config() -> tuple[str, float]:
     return url, timeout
 
 
+def _describe_connect_error(e: Exception) -> str:
+    err = str(e).lower()
+    if "refused" in err or "10061" in err or "connect" in err:
+        return "端口不可达，请确认扩展已点击 Connect 且端口 12306 未被占用"
+    return str(e)
+
+
 def _check_bridge_reachable(url: str, timeout: float = 5.0) -> tuple[bool, str]:
     """Quick HTTP check if bridge port is reachable. Returns (reachable, message)."""
     try:
-        import httpx
-        from urllib.parse import urlparse
-        parsed = urlparse(url)
-        base = f"{parsed.scheme}://{parsed.netloc}"
-        with httpx.Client(timeout=timeout) as client:
-            resp = client.get(f"{base}/ping")
-            return True, f"HTTP {resp.status_code}"
+        from mcp_client.http_client import get_mcp_http_client
+        status = get_mcp_http_client(url, _get_config()[1]).ping(timeout=timeout)
+        return True, f"HTTP {status}"
     except Exception as e:
-        err = str(e).lower()
-        if "refused" in err or "10061" in err or "connect" in err:
-            return False, "端口不可达，请确认扩展已点击 Connect 且端口 12306 未被占用"
-        return False, str(e)
+        return False, _describe_connect_error(e)
+
+
+_health_lock = threading.Lock()
+_healths: dict[str, ServerHealth] = {}
+
+
+def get_chrome_health(url: str | None = None) -> ServerHealth:
+    """Shared health state and circuit breaker for the bridge at ``url``."""
+    url = url or _get_config()[0]
+    with _health_lock:
+        health = _healths.get(url)
+        if health is None:
+            def _probe() -> str:
+                reachable, message = _check_bridge_reachable(url, timeout=min(5.0, _get_config()[1]))
+                if not reachable:
+                    raise ConnectionError(message)
+                return message
+            health = _healths[url] = ServerHealth("mcp-chrome", _probe)
+        return health
 
 
 def _use_legacy_sdk() -> bool:
@@ -44,72 +73,31 @@ def _use_legacy_sdk() -> bool:
     return os.getenv("MCP_CHROME_USE_SDK", "").lower() in ("true", "1", "yes")
 
 
-def _run_legacy_list_tools(url: str, timeout: float) -> list[dict]:
-    """Legacy: run list_tools via Python MCP SDK."""
-    import asyncio
-    from mcp import ClientSession
-    from mcp.client.streamable_http import streamable_http_client
-
-    async def _do():
-        async with streamable_http_client(url) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
-                await asyncio.wait_for(session.initialize(), timeout=timeout)
-                result = await asyncio.wait_for(session.list_tools(), timeout=timeout)
-                return [
-                    {"name": getattr(t, "name", ""), "description": getattr(t, "description", "") or "", "inputSchema": getattr(t, "inputSchema", {}) or {}}
-                    for t in (getattr(result, "tools", []) or [])
-                ]
+def _call_failed(name: str, err: Exception | None) -> RuntimeError:
+    hint = (
+        "可尝试设置 MCP_CHROME_USE_SDK=false 使用轻量 HTTP 客户端。" if _use_legacy_sdk()
+        else "若扩展已显示连接，请尝试断开后重新点击 Connect，或重启 Chrome。"
+    )
+    return RuntimeError(f"调用浏览器工具 {name} 失败: {err}。{hint}")
 
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
-    if loop is not None and loop.is_running():
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            future = pool.submit(asyncio.run, _do())
-            return future.result()
-    return asyncio.run(_do())
-
-
-def _run_legacy_call_tool(url: str, timeout: float, name: str, arguments: dict) -> str:
-    """Legacy: run call_tool via Python MCP SDK."""
-    import asyncio
-    from mcp import ClientSession
-    from mcp.client.streamable_http import streamable_http_client
-
-    async def _do():
-        async with streamable_http_client(url) as (read_stream, write_stream, _):
-            async with ClientSession(read_stream, write_stream) as session:
-                await asyncio.wait_for(session.initialize(), timeout=timeout)
-                result = await asyncio.wait_for(session.call_tool(name, arguments), timeout=timeout)
-                content = getattr(result, "content", None) or []
-                parts = []
-                for block in content:
-                    if hasattr(block, "type"):
-                        if block.type == "text" and hasattr(block, "text"):
-                            parts.append(block.text)
-                        elif block.type == "image":
-                            parts.append("[图片已省略]")
-                return "\n".join(parts) if parts else "(无返回内容)"
 
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        loop = None
-    if loop is not None and loop.is_running():
-        import concurrent.futures
-        with concurrent.futures.ThreadPoolExecutor() as pool:
-            future = pool.submit(asyncio.run, _do())
-            return future.result()
-    return asyncio.run(_do())
+def _list_failed(url: str, err: Exception) -> ConnectionError:
+    if isinstance(err, CircuitOpenError):
+        return ConnectionError(f"无法连接 mcp-chrome-bridge ({url})。{err}")
+    hint = (
+        "可尝试设置 MCP_CHROME_USE_SDK=false 使用轻量 HTTP 客户端。" if _use_legacy_sdk()
+        else "若扩展已显示连接，请尝试断开后重新点击 Connect，或重启 Chrome。"
+    )
+    return ConnectionError(f"无法连接 mcp-chrome-bridge ({url})。{_describe_connect_error(err)} — {hint}")
 
 
 class MCPChromeClient:
     """
-    Synchronous client for mcp-chrome-bridge.
+    Client for mcp-chrome-bridge with sync and async (``alist_tools`` /
+    ``acall_tool``) methods.
     Uses minimal HTTP (POST-only) by default to avoid SDK 500/TaskGroup issues.
-    Set MCP_CHROME_USE_SDK=true to fall back to Python MCP SDK.
+    Set MCP_CHROME_USE_SDK=true to fall back to Python MCP SDK; its session
+    is opened once and kept on a dedicated event loop.
     """
 
     def __init__(
@@ -120,69 +108,109 @@ class MCPChromeClient:
         self._url = url or _get_config()[0]
         self._timeout = timeout if timeout is not None else _get_config()[1]
         self._http_client = None
+        self._health = get_chrome_health(self._url)
 
     def _get_http_client(self):
         if self._http_client is None:
-            from mcp_client.http_client import MCPHttpClient
-            self._http_client = MCPHttpClient(self._url, self._timeout)
+            from mcp_client.http_client import get_mcp_http_client
+            self._http_client = get_mcp_http_client(self._url, self._timeout)
         return self._http_client
 
     def list_tools(self) -> list[dict[str, Any]]:
-        """List available tools from mcp-chrome."""
-        if not _use_legacy_sdk():
-            reachable, msg = _check_bridge_reachable(self._url, timeout=min(5.0, self._timeout))
-            if not reachable:
-                raise ConnectionError(f"无法连接 mcp-chrome-bridge ({self._url})。{msg}")
-
-            try:
-                return self._get_http_client().list_tools()
-            except Exception as e:
-                logger.warning("MCP Chrome list_tools failed: %s", e)
-                raise ConnectionError(
-                    f"无法连接 mcp-chrome-bridge ({self._url})。{e} — "
-                    "若扩展已显示连接，请尝试断开后重新点击 Connect，或重启 Chrome。"
-                ) from e
-
-        # Legacy SDK path
+        """List available tools from mcp-chrome. Fails fast while the circuit is open."""
+        ticket = 0
+        try:
+            ticket = self._health.guard()
+            if _use_legacy_sdk():
+                tools = get_sdk_session(self._url, self._timeout).run(list_tools_op)
+            else:
+                tools = self._get_http_client().list_tools()
+        except Exception as e:
+            if not isinstance(e, CircuitOpenError):
+                self._health.record(e)
+            logger.warning("MCP Chrome list_tools failed: %s", e)
+            raise _list_failed(self._url, e) from e
+        except BaseException:
+            self._health.release(ticket)
+            raise
+        self._health.record(None)
+        return tools
+
+    async def alist_tools(self) -> list[dict[str, Any]]:
+        ticket = 0
         try:
-            return _run_legacy_list_tools(self._url, self._timeout)
+            ticket = self._health.guard()
+            if _use_legacy_sdk():
+                tools = await get_sdk_session(self._url, self._timeout).arun(list_tools_op)
+            else:
+                tools = await self._get_http_client().alist_tools()
         except Exception as e:
-            logger.warning("MCP Chrome list_tools (SDK) failed: %s", e)
-            raise ConnectionError(
-                f"无法连接 mcp-chrome-bridge ({self._url})。{e} — "
-                "可尝试设置 MCP_CHROME_USE_SDK=false 使用轻量 HTTP 客户端。"
-            ) from e
+            if not isinstance(e, CircuitOpenError):
+                self._health.record(e)
+            logger.warning("MCP Chrome list_tools failed: %s", e)
+            raise _list_failed(self._url, e) from e
+        except BaseException:
+            # Cancelled: no outcome, so a half-open trial must not stay taken.
+            self._health.release(ticket)
+            raise
+        self._health.record(None)
+        return tools
 
     def call_tool(self, name: str, arguments: dict[str, Any] | None = None) -> str:
-        """Call an MCP tool by name. Retries once on connection failure."""
-        if not _use_legacy_sdk():
-            last_err = None
-            for attempt in range(2):
-                try:
-                    return self._get_http_client().call_tool(name, arguments or {})
-                except Exception as e:
-                    last_err = e
-                    if attempt == 0:
-                        logger.info("MCP Chrome call_tool %s attempt 1 failed, retrying: %s", name, e)
-                        time.sleep(1.0)
-                    else:
-                        logger.warning("MCP Chrome call_tool %s failed: %s", name, e)
-            raise RuntimeError(
-                f"调用浏览器工具 {name} 失败: {last_err}。"
-                "若扩展已显示连接，请尝试断开后重新点击 Connect，或重启 Chrome。"
-            ) from last_err
-
-        # Legacy SDK path
+        """Call an MCP tool by name. Retries once on failure; fails fast while the circuit is open."""
+        last_err = None
+        for attempt in range(CALL_ATTEMPTS):
+            try:
+                ticket = self._health.guard()
+            except CircuitOpenError as e:
+                last_err = e
+                break
+            try:
+                if _use_legacy_sdk():
+                    result = get_sdk_session(self._url, self._timeout).run(call_tool_op(name, arguments or {}))
+                else:
+                    result = self._get_http_client().call_tool(name, arguments or {})
+            except Exception as e:
+                last_err = e
+                self._health.record(e)
+                if attempt + 1 < CALL_ATTEMPTS:
+                    logger.info("MCP Chrome call_tool %s attempt %d failed, retrying: %s", name, attempt + 1, e)
+                    time.sleep(CALL_RETRY_DELAY * 2 ** attempt)
+                continue
+            except BaseException:
+                self._health.release(ticket)
+                raise
+            self._health.record(None)
+            return result
+        logger.warning("MCP Chrome call_tool %s failed: %s", name, last_err)
+        raise _call_failed(name, last_err) from last_err
+
+    async def acall_tool(self, name: str, arguments: dict[str, Any] | None = None) -> str:
+        """Async ``call_tool``: no thread is held while waiting or backing off."""
         last_err = None
-        for attempt in range(2):
+        for attempt in range(CALL_ATTEMPTS):
+            try:
+                ticket = self._health.guard()
+            except CircuitOpenError as e:
+                last_err = e
+                break
             try:
-                return _run_legacy_call_tool(self._url, self._timeout, name, arguments or {})
+                if _use_legacy_sdk():
+                    result = await get_sdk_session(self._url, self._timeout).arun(call_tool_op(name, arguments or {}))
+                else:
+                    result = await self._get_http_client().acall_tool(name, arguments or {})
             except Exception as e:
                 last_err = e
-                if attempt == 0:
-                    logger.info("MCP Chrome call_tool %s (SDK) attempt 1 failed, retrying: %s", name, e)
-                    time.sleep(1.0)
-        raise RuntimeError(
-            f"调用浏览器工具 {name} 失败: {last_err}。"
-            "可尝试设置 MCP_CHROME_USE_SDK=false 使用轻量 HTTP 客户端。"
-        ) from last_err
+                self._health.record(e)
+                if attempt + 1 < CALL_ATTEMPTS:
+                    logger.info("MCP Chrome call_tool %s attempt %d failed, retrying: %s", name, attempt + 1, e)
+                    await asyncio.sleep(CALL_RETRY_DELAY * 2 ** attempt)
+                continue
+            except BaseException:
+                # Cancelled mid-call: free a half-open trial slot for the next caller.
+                self._health.release(ticket)
+                raise
+            self._health.record(None)
+            return result
+        logger.warning("MCP Chrome call_tool %s failed: %s", name, last_err)
+        raise _call_failed(name, last_err) from last_err
@@ -0,0 +1,250 @@
+"""Cached health state and circuit breaker for MCP servers.
+
+A dead bridge used to cost every caller its own ping timeout and retry
+sleeps. ``ServerHealth`` keeps the last known reachability, refreshed by a
+background prober every ``MCP_HEALTH_INTERVAL_SECONDS``, and guards calls
+with a ``CircuitBreaker``:
+
+- closed: calls go through; ``MCP_BREAKER_FAILURE_THRESHOLD`` consecutive
+  connection failures open the circuit.
+- open: calls fail at once for ``MCP_BREAKER_RESET_SECONDS``.
+- half-open: one trial call (or probe) is let through; success closes the
+  circuit, failure opens it again. A trial that ends without an outcome
+  (cancelled) frees the slot for the next caller.
+
+Only transport failures count. An MCP error reply means the server is up.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+import httpx
+
+from agent.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_connection_error(err: BaseException) -> bool:
+    """True for failures that say the server is unreachable (not an MCP error reply)."""
+    if isinstance(err, httpx.HTTPStatusError):
+        return err.response.status_code >= 500
+    return isinstance(err, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError, OSError))
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a server whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int | None = None,
+        reset_seconds: float | None = None,
+    ):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold if failure_threshold is not None else int(os.getenv("MCP_BREAKER_FAILURE_THRESHOLD", "3")))
+        self.reset_seconds = reset_seconds if reset_seconds is not None else float(os.getenv("MCP_BREAKER_RESET_SECONDS", "30"))
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial = False
+        # Number of the current half-open trial, so only its caller can release it.
+        self._trial_ticket = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half-open state only one trial is admitted."""
+        return self.admit() is not None
+
+    def admit(self) -> int | None:
+        """Like ``allow``, returning ``None`` when rejected, else a ticket for
+        ``release_trial``: the trial's number, or 0 for a call that is not the trial."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return 0
+            if state == HALF_OPEN and not self._trial:
+                self._state, self._trial = HALF_OPEN, True
+                self._trial_ticket += 1
+                return self._trial_ticket
+        metrics.inc("mcp_breaker_rejected_total", server=self.name)
+        return None
+
+    def release_trial(self, ticket: int) -> None:
+        """The admitted call ended without a result (e.g. cancelled): free its trial slot."""
+        with self._lock:
+            if ticket and self._trial and ticket == self._trial_ticket:
+                self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            changed = self._state != CLOSED
+            self._state, self._failures, self._trial = CLOSED, 0, False
+        if changed:
+            logger.info("MCP circuit '%s' closed", self.name)
+            metrics.inc("mcp_breaker_transitions_total", server=self.name, state=CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            was_half_open = self._state == HALF_OPEN
+            self._trial = False
+            opened = was_half_open or (self._state == CLOSED and self._failures >= self.failure_threshold)
+            if opened or self._state == OPEN:
+                self._state, self._opened_at = OPEN, time.monotonic()
+        if opened:
+            logger.warning("MCP circuit '%s' opened after %d failure(s)", self.name, self._failures)
+            metrics.inc("mcp_breaker_transitions_total", server=self.name, state=OPEN)
+
+    def retry_in(self) -> float:
+        """Seconds until the open circuit admits a trial (0 when not open)."""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {"state": self._current_state(), "consecutive_failures": self._failures}
+
+
+def probe_interval() -> float:
+    """Seconds between background health probes (0 disables the prober)."""
+    return float(os.getenv("MCP_HEALTH_INTERVAL_SECONDS", "15"))
+
+
+class ServerHealth:
+    """Last known reachability of one MCP server plus its circuit breaker.
+
+    ``probe()`` must return a short message on success and raise when the
+    server is unreachable.
+    """
+
+    def __init__(self, name: str, probe: Callable[[], str], breaker: CircuitBreaker | None = None):
+        self.name = name
+        self._probe = probe
+        self.breaker = breaker or CircuitBreaker(name)
+        self._lock = threading.Lock()
+        self._reachable: bool | None = None
+        self._message = "尚未检测"
+        self._checked_at: float | None = None
+        self._listeners: list[Callable[[bool], None]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def reachable(self) -> bool | None:
+        """Cached reachability; ``None`` until the first probe or call."""
+        with self._lock:
+            return self._reachable
+
+    def subscribe(self, callback: Callable[[bool], None]) -> None:
+        """``callback(reachable)`` runs whenever reachability flips."""
+        self._listeners.append(callback)
+
+    def _set(self, reachable: bool, message: str) -> None:
+        with self._lock:
+            changed = self._reachable is not None and self._reachable != reachable
+            self._reachable, self._message, self._checked_at = reachable, message, time.monotonic()
+        metrics.set_gauge("mcp_server_up", 1 if reachable else 0, server=self.name)
+        if changed:
+            logger.info("MCP server '%s' is now %s: %s", self.name, "reachable" if reachable else "unreachable", message)
+            for callback in list(self._listeners):
+                try:
+                    callback(reachable)
+                except Exception as e:
+                    logger.debug("MCP health listener failed: %s", e)
+
+    def check(self) -> bool:
+        """Probe now and update the cached state and the breaker."""
+        try:
+            message = self._probe()
+        except Exception as e:
+            self.breaker.record_failure()
+            self._set(False, str(e))
+            metrics.inc("mcp_health_probes_total", server=self.name, result="down")
+            return False
+        self.breaker.record_success()
+        self._set(True, message)
+        metrics.inc("mcp_health_probes_total", server=self.name, result="up")
+        return True
+
+    def guard(self) -> int:
+        """Raise ``CircuitOpenError`` instead of letting a call hit a server known to be down.
+
+        Returns the breaker ticket; a call that ends without calling ``record``
+        must pass it to ``release``."""
+        ticket = self.breaker.admit()
+        if ticket is None:
+            with self._lock:
+                message = self._message
+            raise CircuitOpenError(f"{message}（熔断中，约 {self.breaker.retry_in():.0f} 秒后重试）")
+        return ticket
+
+    def release(self, ticket: int) -> None:
+        """A guarded call was cancelled before it had an outcome."""
+        self.breaker.release_trial(ticket)
+
+    def record(self, err: BaseException | None) -> None:
+        """Feed the outcome of a real call into the breaker and the cached state."""
+        if err is None:
+            self.breaker.record_success()
+            if not self.reachable:
+                self._set(True, "调用成功")
+        elif is_connection_error(err):
+            self.breaker.record_failure()
+            self._set(False, str(err))
+        else:
+            # The server answered, so it is up even though the call failed.
+            self.breaker.record_success()
+
+    def start(self, interval: float | None = None, enabled: Callable[[], bool] | None = None) -> bool:
+        """Start the background prober. ``enabled()`` is checked before each probe."""
+        interval = probe_interval() if interval is None else interval
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return False
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.is_set():
+                if enabled is None or enabled():
+                    self.check()
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=_loop, name=f"mcp-health-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            age = None if self._checked_at is None else round(time.monotonic() - self._checked_at, 1)
+            state = {"reachable": self._reachable, "message": self._message, "checked_seconds_ago": age}
+        return {**state, "circuit": self.breaker.status(), "prober_running": self._thread is not None and self._thread.is_alive()}
@@ -8,13 +8,19 @@ Bridge expects: POST /mcp with initialize -> response has Mcp-Session-Id header.
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
+import threading
+import time
 import uuid
-from typing import Any
+from urllib.parse import urlparse
 
 import httpx
 
+from agent.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 PROTOCOL_VERSION = "2024-11-05"  # Use stable version for compatibility
@@ -41,37 +47,34 @@ def _parse_response_body(resp: httpx.Response) -> dict:
         return {}
 
 
-def _post_json(url: str, body: dict, session_id: str | None, timeout: float) -> tuple[dict, str | None]:
-    """POST JSON-RPC request, return (response_body, new_session_id from headers)."""
+def _headers(session_id: str | None) -> dict[str, str]:
     headers = {
         "Accept": "application/json, text/event-stream",  # Per MCP streamable HTTP spec
         "Content-Type": "application/json",
     }
     if session_id:
         headers["Mcp-Session-Id"] = session_id
+    return headers
 
-    with httpx.Client(timeout=timeout) as client:
-        resp = client.post(url, json=body, headers=headers)
-        resp.raise_for_status()
-        # Headers are case-insensitive; bridge may send mcp-session-id or Mcp-Session-Id
-        sid = resp.headers.get("mcp-session-id") or resp.headers.get("Mcp-Session-Id")
-        data = _parse_response_body(resp)
-        return data, sid
-
-
-def mcp_initialize(url: str, timeout: float) -> str:
-    """Initialize MCP session, return session ID from response header."""
-    body = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": "initialize",
-        "params": {
-            "protocolVersion": PROTOCOL_VERSION,
-            "capabilities": {},
-            "clientInfo": {"name": "myclaw", "version": "0.2.0"},
-        },
-    }
-    data, session_id = _post_json(url, body, None, timeout)
+
+def _session_id_from(resp: httpx.Response) -> str | None:
+    # Headers are case-insensitive; bridge may send mcp-session-id or Mcp-Session-Id
+    return resp.headers.get("mcp-session-id") or resp.headers.get("Mcp-Session-Id")
+
+
+def _rpc(method: str, params: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": str(uuid.uuid4()), "method": method, "params": params}
+
+
+def _initialize_body() -> dict:
+    return _rpc("initialize", {
+        "protocolVersion": PROTOCOL_VERSION,
+        "capabilities": {},
+        "clientInfo": {"name": "myclaw", "version": "0.2.0"},
+    })
+
+
+def _initialize_result(data: dict, session_id: str | None) -> str:
     if "error" in data:
         raise RuntimeError(f"MCP initialize failed: {data['error']}")
     if "result" in data:
@@ -80,15 +83,7 @@ def mcp_initialize(url: str, timeout: float) -> str:
     raise RuntimeError(f"Unexpected MCP response: {data}")
 
 
-def mcp_list_tools(url: str, session_id: str, timeout: float) -> list[dict]:
-    """List tools from MCP server."""
-    body = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": "tools/list",
-        "params": {},
-    }
-    data, _ = _post_json(url, body, session_id, timeout)
+def _list_tools_result(data: dict) -> list[dict]:
     if "result" in data:
         tools = data["result"].get("tools", [])
         return [{"name": t.get("name", ""), "description": t.get("description", ""), "inputSchema": t.get("inputSchema", {})} for t in tools]
@@ -97,15 +92,7 @@ def mcp_list_tools(url: str, session_id: str, timeout: float) -> list[dict]:
     raise RuntimeError(f"Unexpected MCP response: {data}")
 
 
-def mcp_call_tool(url: str, session_id: str, name: str, arguments: dict, timeout: float) -> str:
-    """Call MCP tool, return text content."""
-    body = {
-        "jsonrpc": "2.0",
-        "id": str(uuid.uuid4()),
-        "method": "tools/call",
-        "params": {"name": name, "arguments": arguments or {}},
-    }
-    data, _ = _post_json(url, body, session_id, timeout)
+def _call_tool_result(data: dict) -> str:
     if "result" in data:
         content = data["result"].get("content", [])
         parts = []
@@ -125,43 +112,256 @@ def mcp_call_tool(url: str, session_id: str, name: str, arguments: dict, timeout
     raise RuntimeError(f"Unexpected MCP response: {data}")
 
 
+def _ping_url(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/ping"
+
+
 class MCPHttpClient:
     """
     Session-aware MCP HTTP client. Uses POST-only, no SSE.
     Re-initializes on 404 (session expired).
+
+    Requests go through one long-lived ``httpx.Client`` (and an
+    ``httpx.AsyncClient`` for the async methods) with keep-alive pooling, so
+    consecutive tool calls reuse the TCP connection. ``MCP_HTTP_MAX_CONNECTIONS``
+    and ``MCP_HTTP_KEEPALIVE_SECONDS`` size the pool. An AsyncClient is bound
+    to the loop that created it, so there is one per event loop; clients of
+    loops that have closed are dropped, and ``aclose``/``close`` close the rest
+    on their own loops. Use ``get_mcp_http_client`` to share one instance per
+    server.
     """
 
     def __init__(self, url: str, timeout: float):
         self._url = url
         self._timeout = timeout
         self._session_id: str | None = None
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self._aclients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._stats = {"requests": 0, "connections_opened": 0, "errors": 0}
+
+    # --- pooled transports ---
+
+    def _pool_kwargs(self) -> dict:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "10")),
+            max_keepalive_connections=int(os.getenv("MCP_HTTP_MAX_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("MCP_HTTP_KEEPALIVE_SECONDS", "60")),
+        )
+        return {"timeout": self._timeout, "limits": limits}
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._pool_kwargs())
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # A closed loop's sockets can no longer be closed through its client.
+            for stale in [other for other in self._aclients if other.is_closed()]:
+                del self._aclients[stale]
+                logger.debug("Dropped MCP AsyncClient of a closed event loop (%s)", self._url)
+            client = self._aclients.get(loop)
+            if client is None:
+                client = self._aclients[loop] = httpx.AsyncClient(**self._pool_kwargs())
+            return client
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self._count("connections_opened")
+            metrics.inc("mcp_http_connections_opened_total")
+
+    async def _atrace(self, event: str, info: dict) -> None:
+        self._trace(event, info)
+
+    def _record(self, method: str, start: float, ok: bool) -> None:
+        self._count("requests")
+        metrics.inc("mcp_http_requests_total", method=method)
+        metrics.observe("mcp_http_request_seconds", time.perf_counter() - start, method=method)
+        if not ok:
+            self._count("errors")
+            metrics.inc("mcp_http_errors_total", method=method)
+
+    def _post(self, body: dict, session_id: str | None) -> tuple[dict, str | None]:
+        """POST JSON-RPC request, return (response_body, new_session_id from headers)."""
+        start, ok = time.perf_counter(), False
+        try:
+            resp = self._sync_client().post(
+                self._url, json=body, headers=_headers(session_id), extensions={"trace": self._trace},
+            )
+            resp.raise_for_status()
+            ok = True
+            return _parse_response_body(resp), _session_id_from(resp)
+        finally:
+            self._record(body["method"], start, ok)
+
+    async def _apost(self, body: dict, session_id: str | None) -> tuple[dict, str | None]:
+        start, ok = time.perf_counter(), False
+        try:
+            resp = await self._async_client().post(
+                self._url, json=body, headers=_headers(session_id), extensions={"trace": self._atrace},
+            )
+            resp.raise_for_status()
+            ok = True
+            return _parse_response_body(resp), _session_id_from(resp)
+        finally:
+            self._record(body["method"], start, ok)
+
+    # --- MCP session ---
 
     def _ensure_session(self) -> str:
         if self._session_id:
             return self._session_id
-        self._session_id = mcp_initialize(self._url, self._timeout)
+        data, sid = self._post(_initialize_body(), None)
+        self._session_id = _initialize_result(data, sid)
         if not self._session_id:
             raise RuntimeError("MCP initialize did not return session ID")
         return self._session_id
 
-    def list_tools(self) -> list[dict]:
+    async def _aensure_session(self) -> str:
+        if self._session_id:
+            return self._session_id
+        data, sid = await self._apost(_initialize_body(), None)
+        self._session_id = _initialize_result(data, sid)
+        if not self._session_id:
+            raise RuntimeError("MCP initialize did not return session ID")
+        return self._session_id
+
+    def _request(self, body: dict) -> dict:
         try:
-            sid = self._ensure_session()
-            return mcp_list_tools(self._url, sid, self._timeout)
+            return self._post(body, self._ensure_session())[0]
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 self._session_id = None
-                sid = self._ensure_session()
-                return mcp_list_tools(self._url, sid, self._timeout)
+                return self._post(body, self._ensure_session())[0]
             raise
 
-    def call_tool(self, name: str, arguments: dict | None = None) -> str:
+    async def _arequest(self, body: dict) -> dict:
         try:
-            sid = self._ensure_session()
-            return mcp_call_tool(self._url, sid, name, arguments or {}, self._timeout)
+            return (await self._apost(body, await self._aensure_session()))[0]
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 self._session_id = None
-                sid = self._ensure_session()
-                return mcp_call_tool(self._url, sid, name, arguments or {}, self._timeout)
+                return (await self._apost(body, await self._aensure_session()))[0]
             raise
+
+    def list_tools(self) -> list[dict]:
+        return _list_tools_result(self._request(_rpc("tools/list", {})))
+
+    async def alist_tools(self) -> list[dict]:
+        return _list_tools_result(await self._arequest(_rpc("tools/list", {})))
+
+    def call_tool(self, name: str, arguments: dict | None = None) -> str:
+        return _call_tool_result(self._request(_rpc("tools/call", {"name": name, "arguments": arguments or {}})))
+
+    async def acall_tool(self, name: str, arguments: dict | None = None) -> str:
+        body = _rpc("tools/call", {"name": name, "arguments": arguments or {}})
+        return _call_tool_result(await self._arequest(body))
+
+    def ping(self, timeout: float = 5.0) -> int:
+        """GET /ping on the bridge over the pooled client; returns the HTTP status."""
+        start, ok = time.perf_counter(), False
+        try:
+            resp = self._sync_client().get(_ping_url(self._url), timeout=timeout, extensions={"trace": self._trace})
+            ok = True
+            return resp.status_code
+        finally:
+            # Pings share the pool, so they count towards requests (and reused_requests).
+            self._record("ping", start, ok)
+
+    # --- lifecycle ---
+
+    def _take_clients(self) -> tuple[httpx.Client | None, dict[asyncio.AbstractEventLoop, httpx.AsyncClient]]:
+        with self._lock:
+            client, self._client = self._client, None
+            aclients, self._aclients = self._aclients, {}
+        return client, aclients
+
+    @staticmethod
+    def _close_async(loop: asyncio.AbstractEventLoop, aclient: httpx.AsyncClient, timeout: float):
+        """Close ``aclient`` on its own loop; returns a concurrent future when another thread runs it."""
+        if loop.is_closed():
+            return None
+        if loop.is_running():
+            return asyncio.run_coroutine_threadsafe(aclient.aclose(), loop)
+        loop.run_until_complete(asyncio.wait_for(aclient.aclose(), timeout))
+        return None
+
+    def close(self) -> None:
+        """Close the sync client and every AsyncClient. Use ``aclose`` from a running loop."""
+        client, aclients = self._take_clients()
+        if client is not None:
+            client.close()
+        for loop, aclient in aclients.items():
+            try:
+                future = self._close_async(loop, aclient, self._timeout)
+                if future is not None:
+                    future.result(timeout=self._timeout)
+            except Exception as e:
+                logger.debug("Closing MCP AsyncClient failed (%s): %s", self._url, e)
+
+    async def aclose(self) -> None:
+        """Like ``close``, awaiting the current loop's client instead of blocking on it."""
+        current = asyncio.get_running_loop()
+        client, aclients = self._take_clients()
+        if client is not None:
+            client.close()
+        for loop, aclient in aclients.items():
+            try:
+                if loop is current:
+                    await aclient.aclose()
+                elif (future := self._close_async(loop, aclient, self._timeout)) is not None:
+                    await asyncio.wait_for(asyncio.wrap_future(future), self._timeout)
+            except Exception as e:
+                logger.debug("Closing MCP AsyncClient failed (%s): %s", self._url, e)
+
+    def status(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        opened = stats["connections_opened"]
+        stats["reused_requests"] = max(0, stats["requests"] - opened)
+        return stats
+
+
+_clients_lock = threading.Lock()
+_clients: dict[tuple[str, float], MCPHttpClient] = {}
+
+
+def get_mcp_http_client(url: str, timeout: float) -> MCPHttpClient:
+    """Shared pooled client (and MCP session) for a server URL."""
+    with _clients_lock:
+        client = _clients.get((url, timeout))
+        if client is None:
+            client = _clients[(url, timeout)] = MCPHttpClient(url, timeout)
+        return client
+
+
+def mcp_http_status() -> dict:
+    with _clients_lock:
+        clients = dict(_clients)
+    return {url: client.status() for (url, _timeout), client in clients.items()}
+
+
+def _take_all_clients() -> list[MCPHttpClient]:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    return clients
+
+
+def close_mcp_http_clients() -> None:
+    for client in _take_all_clients():
+        client.close()
+
+
+async def aclose_mcp_http_clients() -> None:
+    """``close_mcp_http_clients`` for callers on an event loop (app shutdown)."""
+    for client in _take_all_clients():
+        await client.aclose()
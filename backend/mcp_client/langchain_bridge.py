@@ -8,7 +8,9 @@ from typing import Any
 from langchain_core.tools import StructuredTool
 from pydantic import create_model
 
+from mcp_client.action_script import SCRIPTABLE_TOOLS, action_scripts_enabled, make_action_script_tool
 from mcp_client.chrome_client import MCPChromeClient
+from mcp_client.snapshot_diff import FULL_ARG, FULL_ARG_DESCRIPTION, SNAPSHOT_TOOLS, get_snapshot_store, snapshot_diff_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -62,26 +64,59 @@ def _create_args_model(name: str, schema: dict) -> type | None:
     return create_model(f"MCP_{safe_name}Args", **fields)
 
 
-def mcp_tool_to_langchain(mcp_tool: dict[str, Any], client: MCPChromeClient) -> StructuredTool:
-    """Convert an MCP tool definition to a LangChain StructuredTool."""
-    name = mcp_tool.get("name", "")
-    description = mcp_tool.get("description", "") or f"MCP Chrome tool: {name}"
+def mcp_tool_to_langchain(
+    mcp_tool: dict[str, Any],
+    client: Any,
+    name: str | None = None,
+    description: str | None = None,
+    metadata: dict[str, Any] | None = None,
+    snapshots: bool = False,
+) -> StructuredTool:
+    """Convert an MCP tool definition to a LangChain StructuredTool.
+
+    ``client`` provides ``call_tool``/``acall_tool``; ``name`` overrides the
+    exposed tool name (calls still use the server's own name). With
+    ``snapshots``, page snapshot tools get a ``full_snapshot`` flag and their
+    results go through the per-session snapshot diff.
+    """
+    mcp_name = mcp_tool.get("name", "")
+    description = description or mcp_tool.get("description", "") or f"MCP Chrome tool: {mcp_name}"
     schema = mcp_tool.get("inputSchema", {})
+    snapshots = snapshots and mcp_name in SNAPSHOT_TOOLS and snapshot_diff_enabled()
+    if snapshots:
+        props = {**schema.get("properties", {}), FULL_ARG: {"type": "boolean", "default": False}}
+        schema = {**schema, "properties": props}
+        description += FULL_ARG_DESCRIPTION
 
     args_model = None
     try:
-        args_model = _create_args_model(name, schema)
+        args_model = _create_args_model(name or mcp_name, schema)
     except Exception as e:
-        logger.warning("Failed to create args model for %s: %s, using generic", name, e)
+        logger.warning("Failed to create args model for %s: %s, using generic", mcp_name, e)
+
+    def _postprocess(kwargs: dict, full: bool, output: str) -> str:
+        from tools.python_kernel import current_session_id
+        return get_snapshot_store().process(current_session_id(), mcp_name, kwargs, output, full=full)
 
     def _invoke(**kwargs) -> str:
-        return client.call_tool(name, kwargs)
+        if not snapshots:
+            return client.call_tool(mcp_name, kwargs)
+        full = bool(kwargs.pop(FULL_ARG, False))
+        return _postprocess(kwargs, full, client.call_tool(mcp_name, kwargs))
+
+    async def _ainvoke(**kwargs) -> str:
+        if not snapshots:
+            return await client.acall_tool(mcp_name, kwargs)
+        full = bool(kwargs.pop(FULL_ARG, False))
+        return _postprocess(kwargs, full, await client.acall_tool(mcp_name, kwargs))
 
     return StructuredTool(
-        name=name,
+        name=name or mcp_name,
         description=description,
         args_schema=args_model,
         func=_invoke,
+        coroutine=_ainvoke,
+        metadata=metadata or {"tool_group": "browser"},
     )
 
 
@@ -91,7 +126,8 @@ def get_mcp_chrome_tools(
 ) -> list[StructuredTool]:
     """
     Fetch tools from mcp-chrome and convert to LangChain tools.
-    If tool_filter is provided, only include those tools.
+    If tool_filter is provided, only include those tools. The composite
+    ``chrome_run_actions`` tool is added unless MCP_CHROME_ACTION_SCRIPT_ENABLED=false.
     """
     client = client or MCPChromeClient()
     tool_filter = tool_filter or CORE_TOOL_NAMES
@@ -102,7 +138,9 @@ def get_mcp_chrome_tools(
         name = t.get("name", "")
         if name and (not tool_filter or name in tool_filter):
             try:
-                result.append(mcp_tool_to_langchain(t, client))
+                result.append(mcp_tool_to_langchain(t, client, snapshots=True))
             except Exception as e:
                 logger.warning("Skip tool %s: %s", name, e)
+    if action_scripts_enabled() and any(t.get("name") in SCRIPTABLE_TOOLS for t in tools_def):
+        result.append(make_action_script_tool(tools_def, client))
     return result
@@ -0,0 +1,245 @@
+"""Registry of extra MCP servers (HTTP and stdio) configured in ``MCP_SERVERS_FILE``.
+
+Every enabled server gets its own ``ToolCatalog``, so turns read cached
+tools and never wait on discovery. ``discover()`` refreshes all servers
+concurrently and waits at most each server's ``discovery_timeout``; a slow
+server keeps loading in the background and its tools show up once listed.
+Tools are exposed as ``<prefix>__<tool>`` (prefix defaults to the server id)
+so servers cannot shadow builtin tools or each other.
+
+HTTP servers use the pooled minimal client, stdio servers a persistent SDK
+session keyed on a hash of the launch config, so editing the command, args or
+env starts a new process; the replaced server's session is closed. Each
+server has its own circuit breaker. mcp-chrome keeps its
+dedicated client in ``mcp_client.chrome_client``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+
+from agent.metrics import metrics
+from config.mcp_config import MCPServerConfig, is_mcp_enabled, load_server_configs
+from mcp_client.health import CircuitOpenError, ServerHealth
+from mcp_client.sdk_session import (
+    call_tool_op,
+    close_sdk_session,
+    get_sdk_session,
+    list_tools_op,
+    stdio_transport,
+)
+from mcp_client.tool_catalog import ToolCatalog
+
+logger = logging.getLogger(__name__)
+
+MAX_TOOL_NAME = 64
+
+
+def namespaced_tool_name(prefix: str, tool: str) -> str:
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", f"{prefix}__{tool}")
+    return name[:MAX_TOOL_NAME]
+
+
+class MCPServer:
+    """One configured server: transport, breaker and cached tool catalog."""
+
+    def __init__(self, config: MCPServerConfig):
+        self.config = config
+        self.health = ServerHealth(config.id, lambda: f"{len(self._list())} tools")
+        self.catalog = ToolCatalog(config.id, self._discover)
+
+    @property
+    def id(self) -> str:
+        return self.config.id
+
+    @property
+    def session_key(self) -> str | None:
+        """Key of the stdio SDK session (None for HTTP servers)."""
+        c = self.config
+        if c.transport != "stdio":
+            return None
+        launch = json.dumps([c.command, c.args, c.env, c.timeout], sort_keys=True)
+        return f"stdio:{c.id}:{hashlib.sha256(launch.encode('utf-8')).hexdigest()[:16]}"
+
+    def _session(self):
+        c = self.config
+        return get_sdk_session(self.session_key, c.timeout, stdio_transport(c.command, c.args, c.env))
+
+    def _http(self):
+        from mcp_client.http_client import get_mcp_http_client
+        return get_mcp_http_client(self.config.url, self.config.timeout)
+
+    def _list(self) -> list[dict]:
+        if self.config.transport == "stdio":
+            return self._session().run(list_tools_op)
+        return self._http().list_tools()
+
+    def list_tools(self) -> list[dict]:
+        ticket = self.health.guard()
+        try:
+            tools = self._list()
+        except Exception as e:
+            self.health.record(e)
+            raise
+        except BaseException:
+            self.health.release(ticket)
+            raise
+        self.health.record(None)
+        return tools
+
+    def call_tool(self, name: str, arguments: dict[str, Any] | None = None) -> str:
+        ticket = 0
+        try:
+            ticket = self.health.guard()
+            if self.config.transport == "stdio":
+                result = self._session().run(call_tool_op(name, arguments or {}))
+            else:
+                result = self._http().call_tool(name, arguments or {})
+        except Exception as e:
+            raise self._call_failed(name, e) from e
+        except BaseException:
+            self.health.release(ticket)
+            raise
+        self.health.record(None)
+        return result
+
+    async def acall_tool(self, name: str, arguments: dict[str, Any] | None = None) -> str:
+        ticket = 0
+        try:
+            ticket = self.health.guard()
+            if self.config.transport == "stdio":
+                result = await self._session().arun(call_tool_op(name, arguments or {}))
+            else:
+                result = await self._http().acall_tool(name, arguments or {})
+        except Exception as e:
+            raise self._call_failed(name, e) from e
+        except BaseException:
+            self.health.release(ticket)
+            raise
+        self.health.record(None)
+        return result
+
+    def _call_failed(self, name: str, err: Exception) -> RuntimeError:
+        if not isinstance(err, CircuitOpenError):
+            self.health.record(err)
+        logger.warning("MCP server '%s' call_tool %s failed: %s", self.id, name, err)
+        return RuntimeError(f"调用 MCP 服务 {self.config.name} 的工具 {name} 失败: {err}")
+
+    def _discover(self) -> list:
+        from mcp_client.langchain_bridge import mcp_tool_to_langchain
+
+        allowed = set(self.config.tools) if self.config.tools else None
+        result = []
+        for t in self.list_tools():
+            name = t.get("name", "")
+            if not name or (allowed is not None and name not in allowed):
+                continue
+            try:
+                result.append(mcp_tool_to_langchain(
+                    t,
+                    self,
+                    name=namespaced_tool_name(self.config.tool_prefix, name),
+                    description=f"[{self.config.name}] {t.get('description') or name}",
+                    metadata={"tool_group": self.id, "mcp_server": self.id},
+                ))
+            except Exception as e:
+                logger.warning("Skip MCP tool %s/%s: %s", self.id, name, e)
+        logger.info("Loaded %d tools from MCP server '%s'", len(result), self.id)
+        return result
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "transport": self.config.transport,
+            "enabled": is_mcp_enabled(self.id),
+            "catalog": self.catalog.status(),
+            "health": self.health.status(),
+        }
+
+
+class MCPRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers: dict[str, MCPServer] = {}
+
+    def servers(self) -> list[MCPServer]:
+        """Configured servers; entries whose config changed get a fresh server (and cache)."""
+        configs = load_server_configs()
+        with self._lock:
+            servers = {}
+            for config in configs:
+                current = self._servers.get(config.id)
+                servers[config.id] = current if current is not None and current.config == config else MCPServer(config)
+            live = {s.session_key for s in servers.values()}
+            stale = {s.session_key for s in self._servers.values()} - live - {None}
+            self._servers = servers
+            result = list(servers.values())
+        if stale:
+            # Stopping a stdio process can take up to its timeout; don't make the caller wait.
+            threading.Thread(
+                target=lambda: [close_sdk_session(key) for key in stale], name="mcp-session-close", daemon=True
+            ).start()
+        return result
+
+    def get(self, server_id: str) -> MCPServer | None:
+        return next((s for s in self.servers() if s.id == server_id), None)
+
+    def enabled_servers(self) -> list[MCPServer]:
+        return [s for s in self.servers() if is_mcp_enabled(s.id)]
+
+    def tools(self) -> list:
+        """Cached tools of all enabled servers; never waits for a server."""
+        tools = []
+        for server in self.enabled_servers():
+            tools += server.catalog.get()
+        return tools
+
+    def discover(self) -> dict[str, str]:
+        """Refresh every enabled server concurrently; returns a summary per server id."""
+        servers = self.enabled_servers()
+        if not servers:
+            return {}
+        start = time.monotonic()
+        pool = ThreadPoolExecutor(max_workers=len(servers), thread_name_prefix="mcp-discover")
+        futures = {s.id: (s, pool.submit(s.catalog.refresh)) for s in servers}
+        pool.shutdown(wait=False)
+        summary = {}
+        for server_id, (server, future) in futures.items():
+            remaining = server.config.discovery_timeout - (time.monotonic() - start)
+            try:
+                summary[server_id] = f"{len(future.result(timeout=max(0.0, remaining)))} tools"
+            except FutureTimeoutError:
+                # Still running: the catalog fills in when it finishes.
+                metrics.inc("mcp_discovery_timeouts_total", server=server_id)
+                summary[server_id] = f"timeout after {server.config.discovery_timeout:g}s (still loading)"
+            except Exception as e:
+                summary[server_id] = f"error: {e}"
+        metrics.observe("mcp_discovery_seconds", time.monotonic() - start)
+        return summary
+
+    def invalidate(self, server_id: str) -> None:
+        server = self.get(server_id)
+        if server is not None:
+            server.catalog.invalidate()
+
+    def status(self) -> dict[str, Any]:
+        return {s.id: s.status() for s in self.servers()}
+
+
+_registry: MCPRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_mcp_registry() -> MCPRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MCPRegistry()
+        return _registry
@@ -0,0 +1,209 @@
+"""Persistent MCP SDK sessions (streamable HTTP or stdio), one event loop thread each."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncContextManager, Awaitable, Callable
+
+from agent.metrics import metrics
+from mcp_client.health import is_connection_error
+
+logger = logging.getLogger(__name__)
+
+
+def parse_tool_result(result: Any) -> str:
+    """Text of an SDK ``CallToolResult``; images are replaced by a placeholder."""
+    parts = []
+    for block in getattr(result, "content", None) or []:
+        if hasattr(block, "type"):
+            if block.type == "text" and hasattr(block, "text"):
+                parts.append(block.text)
+            elif block.type == "image":
+                parts.append("[图片已省略]")
+    return "\n".join(parts) if parts else "(无返回内容)"
+
+
+def parse_tools(result: Any) -> list[dict]:
+    return [
+        {"name": getattr(t, "name", ""), "description": getattr(t, "description", "") or "", "inputSchema": getattr(t, "inputSchema", {}) or {}}
+        for t in (getattr(result, "tools", []) or [])
+    ]
+
+
+def _is_transport_failure(err: BaseException) -> bool:
+    """True when the session's streams are unusable, not just one call."""
+    import anyio
+
+    if isinstance(err, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)):
+        return True
+    return is_connection_error(err)
+
+
+SessionOp = Callable[[Any], Awaitable[Any]]
+Transport = Callable[[], AsyncContextManager]
+
+
+def _http_transport(url: str) -> Transport:
+    def _open():
+        from mcp.client.streamable_http import streamable_http_client
+        return streamable_http_client(url)
+    return _open
+
+
+def stdio_transport(command: str, args: list[str], env: dict[str, str] | None = None) -> Transport:
+    """Transport that spawns ``command`` and speaks MCP over its stdin/stdout."""
+    def _open():
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        return stdio_client(StdioServerParameters(command=command, args=list(args), env=env or None))
+    return _open
+
+
+class SDKSession:
+    """One MCP SDK session kept open on a dedicated event loop thread.
+
+    The SDK's transport contexts must be entered and exited by the same task,
+    so a single serving task owns the session and runs each submitted
+    operation as its own task (calls can overlap). An operation that fails
+    with a transport error closes the session (the next one reconnects); an
+    MCP/tool error or a per-operation timeout fails only that operation.
+
+    ``transport()`` returns the SDK transport context (yielding the read and
+    write streams); by default it is streamable HTTP to ``url``.
+    """
+
+    def __init__(self, url: str, timeout: float, transport: Transport | None = None):
+        self._url = url
+        self._timeout = timeout
+        self._transport = transport or _http_transport(url)
+        self._loop = asyncio.new_event_loop()
+        self._queue: asyncio.Queue | None = None
+        self._serving: asyncio.Task | None = None
+        self._ready: asyncio.Future | None = None
+        threading.Thread(target=self._loop.run_forever, name="mcp-sdk-session", daemon=True).start()
+
+    async def _serve(self) -> None:
+        from mcp import ClientSession
+
+        queue, ready = self._queue, self._ready
+        pending: set[asyncio.Task] = set()
+        try:
+            async with self._transport() as (read_stream, write_stream, *_):
+                async with ClientSession(read_stream, write_stream) as session:
+                    await asyncio.wait_for(session.initialize(), timeout=self._timeout)
+                    metrics.inc("mcp_sdk_sessions_opened_total")
+                    ready.set_result(None)
+                    while (item := await queue.get()) is not None:
+                        task = asyncio.create_task(self._handle(session, queue, *item))
+                        pending.add(task)
+                        task.add_done_callback(pending.discard)
+                    for task in list(pending):
+                        task.cancel()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            logger.info("MCP SDK session closed: %s", e)
+        finally:
+            # Anything still queued fails; the next call reconnects.
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None and not item[1].done():
+                    item[1].set_exception(ConnectionError("MCP 会话已关闭"))
+
+    async def _handle(self, session: Any, queue: asyncio.Queue, op: SessionOp, future: asyncio.Future) -> None:
+        try:
+            result = await asyncio.wait_for(op(session), timeout=self._timeout)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(ConnectionError("MCP 会话已关闭"))
+            raise
+        except asyncio.TimeoutError:
+            # A slow tool says nothing about the connection; other calls keep the session.
+            metrics.inc("mcp_sdk_op_timeouts_total")
+            if not future.done():
+                future.set_exception(TimeoutError(f"MCP 调用超时（{self._timeout:g} 秒）"))
+            return
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            if _is_transport_failure(e):
+                logger.info("MCP SDK session transport failed, closing it: %s", e)
+                queue.put_nowait(None)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _run(self, op: SessionOp) -> Any:
+        if self._serving is None or self._serving.done():
+            self._queue, self._ready = asyncio.Queue(), self._loop.create_future()
+            self._serving = asyncio.create_task(self._serve())
+        await asyncio.wait_for(asyncio.shield(self._ready), timeout=self._timeout)
+        future = self._loop.create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+
+    def run(self, op: SessionOp) -> Any:
+        return asyncio.run_coroutine_threadsafe(self._run(op), self._loop).result()
+
+    async def arun(self, op: SessionOp) -> Any:
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._run(op), self._loop))
+
+    async def _stop(self) -> None:
+        if self._serving is not None and not self._serving.done():
+            self._queue.put_nowait(None)
+            await asyncio.wait({self._serving}, timeout=self._timeout)
+
+    def close(self) -> None:
+        try:
+            asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result(timeout=self._timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_sdk_lock = threading.Lock()
+_sdk_sessions: dict[str, SDKSession] = {}
+
+
+def get_sdk_session(key: str, timeout: float, transport: Transport | None = None) -> SDKSession:
+    """Shared session for ``key`` (the server URL, or an id for stdio servers)."""
+    with _sdk_lock:
+        session = _sdk_sessions.get(key)
+        if session is None:
+            session = _sdk_sessions[key] = SDKSession(key, timeout, transport)
+        return session
+
+
+def close_sdk_session(key: str) -> bool:
+    """Close and forget the session for ``key``; returns whether there was one."""
+    with _sdk_lock:
+        session = _sdk_sessions.pop(key, None)
+    if session is None:
+        return False
+    try:
+        session.close()
+    except Exception as e:
+        logger.debug("Closing MCP SDK session failed: %s", e)
+    return True
+
+
+def close_sdk_sessions() -> None:
+    with _sdk_lock:
+        sessions = list(_sdk_sessions.values())
+        _sdk_sessions.clear()
+    for session in sessions:
+        try:
+            session.close()
+        except Exception as e:
+            logger.debug("Closing MCP SDK session failed: %s", e)
+
+
+async def list_tools_op(session: Any) -> list[dict]:
+    return parse_tools(await session.list_tools())
+
+
+def call_tool_op(name: str, arguments: dict) -> SessionOp:
+    async def _op(session: Any) -> str:
+        return parse_tool_result(await session.call_tool(name, arguments))
+    return _op
@@ -0,0 +1,189 @@
+"""Diff repeated page snapshots instead of re-sending them.
+
+Browser flows call ``chrome_get_web_content`` and
+``chrome_get_interactive_elements`` again and again on pages that barely
+change, and every full copy stays in the history. ``SnapshotStore`` keeps
+the last result per conversation, tool, tab and arguments. A large result
+(``MCP_SNAPSHOT_DIFF_MIN_CHARS``) on the same URL is returned as the lines
+that were removed and added: one line per element, or per line of page text.
+If nothing changed, the tool returns a short notice.
+The full copy is returned when there is no earlier snapshot, the URL
+changed, the diff would not be much smaller, or the model passes
+``full_snapshot=true``.
+
+Only results the model actually sees become the baseline: the store is fed
+by the LangChain tools, not by the client (``chrome_run_actions`` steps
+bypass it).
+"""
+
+from __future__ import annotations
+
+import difflib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from agent.metrics import metrics
+
+SNAPSHOT_TOOLS = {"chrome_get_web_content", "chrome_get_interactive_elements"}
+FULL_ARG = "full_snapshot"
+FULL_ARG_DESCRIPTION = f"（结果较大且与本会话上次结果相比变化不多时只返回差异；传 {FULL_ARG}=true 获取完整内容）"
+# A diff is only worth it when it is clearly smaller than the full copy.
+MAX_DIFF_RATIO = 0.5
+
+
+def snapshot_diff_enabled() -> bool:
+    return os.getenv("MCP_SNAPSHOT_DIFF_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def min_chars() -> int:
+    return int(os.getenv("MCP_SNAPSHOT_DIFF_MIN_CHARS", "2000"))
+
+
+def _tab(args: dict[str, Any]) -> str:
+    return str(args.get("tabId", "active"))
+
+
+def _key(tool: str, args: dict[str, Any]) -> str:
+    rest = {k: v for k, v in args.items() if k != "tabId"}
+    return f"{tool}:{_tab(args)}:{json.dumps(rest, sort_keys=True, ensure_ascii=False, default=str)}"
+
+
+def _parse(output: str) -> Any:
+    try:
+        return json.loads(output)
+    except (TypeError, ValueError):
+        return None
+
+
+def _url(data: Any) -> str | None:
+    if isinstance(data, dict):
+        for key in ("url", "URL", "href"):
+            if isinstance(data.get(key), str):
+                return data[key]
+        for value in data.values():
+            if isinstance(value, dict) and (url := _url(value)):
+                return url
+    return None
+
+
+def _flatten(value: Any, path: str, lines: list[str]) -> None:
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(v, f"{path}.{k}" if path else str(k), lines)
+    elif isinstance(value, list):
+        # One line per element: added/removed elements show up as whole lines.
+        for item in value:
+            if isinstance(item, (dict, list)):
+                lines.append(f"{path}[] {json.dumps(item, sort_keys=True, ensure_ascii=False)}")
+            else:
+                lines.append(f"{path}[] {item}")
+    elif isinstance(value, str) and "\n" in value:
+        lines.extend(f"{path}: {line.strip()}" for line in value.splitlines() if line.strip())
+    else:
+        lines.append(f"{path}: {value}")
+
+
+def snapshot_lines(output: str, data: Any = None) -> list[str]:
+    """Comparable lines of a result: flattened JSON, or the non-empty text lines."""
+    data = _parse(output) if data is None else data
+    if isinstance(data, (dict, list)):
+        lines: list[str] = []
+        _flatten(data, "", lines)
+        return lines
+    return [line.strip() for line in output.splitlines() if line.strip()]
+
+
+def diff_lines(old: list[str], new: list[str]) -> tuple[list[str], list[str]]:
+    """(removed, added) lines between two snapshots, in page order."""
+    removed, added = [], []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op in ("replace", "delete"):
+            removed += old[i1:i2]
+        if op in ("replace", "insert"):
+            added += new[j1:j2]
+    return removed, added
+
+
+class SnapshotStore:
+    """Last snapshot per (session, tool, tab, arguments), bounded LRU."""
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("MCP_SNAPSHOT_CACHE_ENTRIES", "256"))
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[str | None, list[str]]] = OrderedDict()
+
+    def _remember(self, key: tuple[str, str], url: str | None, lines: list[str]) -> None:
+        with self._lock:
+            self._entries[key] = (url, lines)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def process(self, session_id: str, tool: str, args: dict[str, Any], output: str, full: bool = False) -> str:
+        """What the model gets for ``output``: the full copy, a diff, or an unchanged notice."""
+        if not snapshot_diff_enabled() or tool not in SNAPSHOT_TOOLS or not isinstance(output, str):
+            return output
+        key = (session_id, _key(tool, args))
+        data = _parse(output)
+        url, lines = _url(data), snapshot_lines(output, data)
+        with self._lock:
+            previous = self._entries.get(key)
+        self._remember(key, url, lines)
+        if full or previous is None or len(output) < min_chars() or previous[0] != url:
+            metrics.inc("mcp_snapshot_results_total", tool=tool, result="full")
+            return output
+
+        removed, added = diff_lines(previous[1], lines)
+        tab = _tab(args)
+        if not removed and not added:
+            text = (
+                f"[快照未变化] {tool}（标签页 {tab}）的结果与本会话上次调用相同（{len(output)} 字符），"
+                f"请参考上次的结果；如需完整内容，请带参数 {FULL_ARG}=true 重新调用。"
+            )
+            result = "unchanged"
+        else:
+            parts = [
+                f"[快照差异] {tool}（标签页 {tab}）相对本会话上次结果的变化："
+                f"移除 {len(removed)} 行，新增 {len(added)} 行（完整结果 {len(output)} 字符）。"
+                f"未列出的内容与上次相同；如需完整内容，请带参数 {FULL_ARG}=true 重新调用。"
+            ]
+            if removed:
+                parts.append("--- 移除\n" + "\n".join(f"- {line}" for line in removed))
+            if added:
+                parts.append("+++ 新增\n" + "\n".join(f"+ {line}" for line in added))
+            text = "\n".join(parts)
+            result = "diff"
+            if len(text) > len(output) * MAX_DIFF_RATIO:
+                metrics.inc("mcp_snapshot_results_total", tool=tool, result="full")
+                return output
+        metrics.inc("mcp_snapshot_results_total", tool=tool, result=result)
+        metrics.inc("mcp_snapshot_chars_saved_total", len(output) - len(text), tool=tool)
+        return text
+
+    def clear(self, session_id: str | None = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == session_id]:
+                    del self._entries[key]
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+
+_store: SnapshotStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store
@@ -0,0 +1,101 @@
+"""Cached MCP tool catalog, served stale-while-revalidate.
+
+Listing MCP tools means a reachability probe, ``initialize`` and ``tools/list``
+(with retries when the server is down). ``ToolCatalog.get()`` never does that
+inline: it returns the cached tools at once and, when they are older than
+``MCP_TOOLS_CACHE_TTL_SECONDS``, refreshes them on a background thread. A
+failed refresh keeps the last good tools and is retried after
+``MCP_TOOLS_RETRY_SECONDS``. ``refresh()`` is the blocking variant, used at
+startup to warm the cache.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable
+
+from agent.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCatalog:
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], list],
+        ttl: float | None = None,
+        retry_seconds: float | None = None,
+    ):
+        self.name = name
+        self._fetch = fetch
+        self.ttl = ttl if ttl is not None else float(os.getenv("MCP_TOOLS_CACHE_TTL_SECONDS", "300"))
+        self.retry_seconds = retry_seconds if retry_seconds is not None else float(os.getenv("MCP_TOOLS_RETRY_SECONDS", "30"))
+        self._lock = threading.Lock()
+        self._tools: list = []
+        self._loaded = False
+        self._fetched_at: float | None = None
+        self._expires_at = 0.0
+        self._error: str | None = None
+        self._refreshing = False
+
+    def get(self) -> list:
+        """Cached tools; kicks off a background refresh when they are due."""
+        with self._lock:
+            tools = list(self._tools)
+            due = time.monotonic() >= self._expires_at and not self._refreshing
+            if due:
+                self._refreshing = True
+        if due:
+            if self._loaded:
+                metrics.inc("mcp_catalog_stale_served_total", server=self.name)
+            threading.Thread(target=self._refresh_quietly, name=f"mcp-catalog-{self.name}", daemon=True).start()
+        return tools
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.info("MCP tool catalog '%s' refresh failed: %s", self.name, e)
+
+    def refresh(self) -> list:
+        """Fetch now. On failure the previous tools are kept and the error is re-raised."""
+        start = time.perf_counter()
+        try:
+            tools = self._fetch()
+        except Exception as e:
+            with self._lock:
+                self._error = str(e)
+                self._expires_at = time.monotonic() + self.retry_seconds
+                self._refreshing = False
+            metrics.inc("mcp_catalog_refresh_total", server=self.name, result="error")
+            raise
+        with self._lock:
+            self._tools = list(tools)
+            self._loaded = True
+            self._fetched_at = time.monotonic()
+            self._expires_at = self._fetched_at + self.ttl
+            self._error = None
+            self._refreshing = False
+        metrics.inc("mcp_catalog_refresh_total", server=self.name, result="ok")
+        metrics.observe("mcp_catalog_refresh_seconds", time.perf_counter() - start, server=self.name)
+        return list(tools)
+
+    def invalidate(self) -> None:
+        """Make the next ``get()`` revalidate (e.g. after the server was toggled)."""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            age = None if self._fetched_at is None else round(time.monotonic() - self._fetched_at, 1)
+            return {
+                "tools": len(self._tools),
+                "age_seconds": age,
+                "stale": time.monotonic() >= self._expires_at,
+                "refreshing": self._refreshing,
+                "error": self._error,
+            }
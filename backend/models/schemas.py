@@ -12,6 +12,8 @@ class EventType(str, Enum):
     LLM_TOKEN = "llm_token"
     TOOL_CALL = "tool_call"
     TOOL_RESULT = "tool_result"
+    TOOL_OUTPUT_CHUNK = "tool_output_chunk"
+    JOB_UPDATE = "job_update"
     FINAL_ANSWER = "final_answer"
     ERROR = "error"
     INIT_STATUS = "init_status"
@@ -21,6 +23,10 @@ class EventType(str, Enum):
     CONTEXT_PRUNED = "context_pruned"
     CONTEXT_COMPACTED = "context_compacted"
     OVERFLOW_RECOVERED = "overflow_recovered"
+    TURN_CANCELLED = "turn_cancelled"
+    QUEUED = "queued"
+    QUEUE_POSITION = "queue_position"
+    PONG = "pong"
 
 
 class UserInputData(BaseModel):
@@ -42,6 +48,24 @@ class ToolResultData(BaseModel):
     name: str
     status: str  # "success" | "error"
     content: str
+    # Resource usage of code-executing tools: peak_rss_mb / cpu_seconds / wall_seconds
+    usage: dict | None = None
+
+
+class JobUpdateData(BaseModel):
+    job_id: str
+    kind: str  # "python" | "shell"
+    status: str  # "running" | "succeeded" | "failed" | "timed_out" | "cancelled"
+    elapsed_seconds: float
+    progress: str | None = None
+    returncode: int | None = None
+
+
+class ToolOutputChunkData(BaseModel):
+    tool_call_id: str
+    name: str
+    stream: str  # "stdout" | "stderr"
+    text: str
 
 
 class FinalAnswerData(BaseModel):
@@ -0,0 +1,85 @@
+"""Benchmark per-session history memory: LangChain messages vs MessageRecord.
+
+Usage: python scripts/bench_session_memory.py [--sessions=20] [--turns=10]
+
+Builds the same synthetic history (user message, AI tool call, large tool
+output, final answer per turn) for N sessions in both representations and
+reports traced allocation and RSS growth per session. Two workloads are
+measured: "repeated", where a session re-reads the same file every turn (the
+content pool dedupes the tool output), and "unique", where every tool output
+differs (only the per-message object overhead is saved).
+"""
+from __future__ import annotations
+
+import gc
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+if str(BACKEND) not in sys.path:
+    sys.path.insert(0, str(BACKEND))
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from agent.message_record import to_records
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS).
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _langchain_history(session: int, turns: int, unique: bool) -> list:
+    history: list = []
+    for t in range(turns):
+        call_id = f"call_{session}_{t}"
+        history.append({"role": "user", "content": f"第 {t} 个问题：分析 sales.xlsx"})
+        history.append(AIMessage(
+            content="",
+            tool_calls=[{"id": call_id, "name": "python_executor", "args": {"code": "import pandas as pd\n" * 20}}],
+            response_metadata={"token_usage": {"prompt_tokens": 1200, "completion_tokens": 80}, "model_name": "qwen-plus"},
+            usage_metadata={"input_tokens": 1200, "output_tokens": 80, "total_tokens": 1280},
+            id=f"run-{session}-{t}",
+        ))
+        header = f"session {session} turn {t}\n" if unique else f"session {session}\n"
+        history.append(ToolMessage(content=header + "col_a,col_b\n" * 4000, name="python_executor", tool_call_id=call_id))
+        history.append(AIMessage(content="结论：" + "y" * 800, id=f"run-{session}-{t}-final"))
+    return history
+
+
+def _measure(build) -> tuple[int, int]:
+    gc.collect()
+    tracemalloc.start()
+    rss_before = _rss_bytes()
+    sessions = build()
+    gc.collect()
+    traced, _peak = tracemalloc.get_traced_memory()
+    rss_after = _rss_bytes()
+    tracemalloc.stop()
+    del sessions
+    return traced, rss_after - rss_before
+
+
+def main(sessions: int, turns: int) -> None:
+    print(f"sessions={sessions} turns/session={turns} messages/session={turns * 4}")
+    print(f"{'workload':<10}{'representation':<16}{'traced/session':>18}{'rss/session':>16}{'reduction':>11}")
+    for workload in ("repeated", "unique"):
+        unique = workload == "unique"
+        lc_traced, lc_rss = _measure(lambda: [_langchain_history(s, turns, unique) for s in range(sessions)])
+        rec_traced, rec_rss = _measure(lambda: [to_records(_langchain_history(s, turns, unique)) for s in range(sessions)])
+        reduction = f"{100 * (1 - rec_traced / lc_traced):.1f}%" if lc_traced else "-"
+        print(f"{workload:<10}{'langchain':<16}{lc_traced // sessions:>16,} B{lc_rss // sessions:>14,} B")
+        print(f"{workload:<10}{'MessageRecord':<16}{rec_traced // sessions:>16,} B{rec_rss // sessions:>14,} B{reduction:>11}")
+
+
+if __name__ == "__main__":
+    opts = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    main(int(opts.get("sessions", 20)), int(opts.get("turns", 10)))
@@ -10,6 +10,7 @@ from zoneinfo import ZoneInfo
 
 
 def get_current_time(timezone="Asia/Shanghai"):
+    """获取指定时区（IANA 标识符，如 Asia/Shanghai、UTC）的当前日期和时间。"""
     try:
         tz = ZoneInfo(timezone)
         now = datetime.now(tz)
@@ -19,6 +20,7 @@ def get_current_time(timezone="Asia/Shanghai"):
 
 
 def calculate_date_diff(date1, date2):
+    """计算两个日期（YYYY-MM-DD）之间相差的天数。"""
     try:
         d1 = datetime.strptime(date1, "%Y-%m-%d")
         d2 = datetime.strptime(date2, "%Y-%m-%d")
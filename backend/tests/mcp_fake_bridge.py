@@ -0,0 +1,83 @@
+"""A minimal in-process stand-in for mcp-chrome-bridge (streamable HTTP, POST-only)."""
+
+from __future__ import annotations
+
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOOLS = [
+    {"name": "chrome_navigate", "description": "Navigate", "inputSchema": {"properties": {"url": {"type": "string"}}, "required": ["url"]}},
+    {"name": "chrome_get_web_content", "description": "Content", "inputSchema": {"properties": {"tabId": {"type": "integer"}}}},
+]
+
+
+class FakeBridge:
+    """Serves ``/ping`` and ``/mcp``; tool calls are answered by ``handler(name, args) -> text``."""
+
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda name, args: f"{name} {json.dumps(args, sort_keys=True)}")
+        self.sessions: set[str] = set()
+        self.connections = 0
+        self.calls: list[tuple[str, dict]] = []
+        self.initializes = 0
+        bridge = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                bridge.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: dict | None, headers: dict | None = None):
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._send(200, {"status": "ok"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                method, rid = body.get("method"), body.get("id")
+                if method == "initialize":
+                    bridge.initializes += 1
+                    sid = uuid.uuid4().hex
+                    bridge.sessions.add(sid)
+                    return self._send(200, {"jsonrpc": "2.0", "id": rid, "result": {}}, {"Mcp-Session-Id": sid})
+                if self.headers.get("Mcp-Session-Id") not in bridge.sessions:
+                    return self._send(404, None)
+                if method == "tools/list":
+                    return self._send(200, {"jsonrpc": "2.0", "id": rid, "result": {"tools": TOOLS}})
+                if method == "tools/call":
+                    params = body.get("params", {})
+                    bridge.calls.append((params.get("name"), params.get("arguments", {})))
+                    try:
+                        text = bridge.handler(params.get("name"), params.get("arguments", {}))
+                    except Exception as e:
+                        return self._send(200, {"jsonrpc": "2.0", "id": rid, "error": {"message": str(e)}})
+                    result = {"content": [{"type": "text", "text": text}]}
+                    return self._send(200, {"jsonrpc": "2.0", "id": rid, "result": result})
+                self._send(200, {"jsonrpc": "2.0", "id": rid, "error": {"message": "unknown method"}})
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/mcp"
+        threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def expire_sessions(self) -> None:
+        self.sessions.clear()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,90 @@
+"""Unit tests for background jobs."""
+
+from __future__ import annotations
+
+import sys
+import time
+import unittest
+from unittest import mock
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from tools import background_jobs
+from tools.background_jobs import JobManager, job_collect, job_start, job_status
+
+
+def _wait_status(manager: JobManager, job_id: str, timeout: float = 20) -> str:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = manager.get("s1", job_id)
+        if job.status != "running" or time.monotonic() > deadline:
+            return job.status
+        time.sleep(0.05)
+
+
+class JobManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(timeout=30, max_running_per_session=2, retention_seconds=3600)
+        self.addCleanup(self.manager.shutdown)
+        self.events: list[dict] = []
+        self.manager.add_listener("s1", self.events.append)
+
+    def test_runs_in_background_and_reports_progress(self):
+        code = "import time\nprint('PROGRESS: 50%', flush=True)\ntime.sleep(0.5)\nprint('done')"
+        job = self.manager.start("s1", "python", code)
+        self.assertEqual(job.status, "running")
+        self.assertEqual(_wait_status(self.manager, job.id), "succeeded")
+        self.assertEqual(job.progress, "50%")
+        self.assertIn("done", job.result.stdout)
+        self.assertEqual([e["data"]["status"] for e in self.events], ["running", "succeeded"])
+        self.assertEqual(self.events[-1]["type"], "job_update")
+
+    def test_survives_turn_cancel_and_can_be_cancelled(self):
+        turn = CancelScope(session_id="s1")
+        token = bind_scope(turn)
+        try:
+            job = self.manager.start("s1", "shell", f"{sys.executable} -c \"import time; time.sleep(30)\"")
+        finally:
+            reset_scope(token)
+        turn.cancel()
+        time.sleep(0.3)
+        self.assertEqual(job.status, "running")
+        self.assertTrue(self.manager.cancel("s1", job.id))
+        self.assertEqual(_wait_status(self.manager, job.id), "cancelled")
+
+    def test_limits_running_jobs_per_session_and_isolates_sessions(self):
+        sleeper = "import time; time.sleep(30)"
+        self.manager.start("s1", "python", sleeper)
+        self.manager.start("s1", "python", sleeper)
+        with self.assertRaises(RuntimeError):
+            self.manager.start("s1", "python", sleeper)
+        other = self.manager.start("s2", "python", "print(1)")
+        self.assertIsNone(self.manager.get("s1", other.id))
+        with self.assertRaises(ValueError):
+            self.manager.start("s1", "ruby", "")
+
+
+class JobToolTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = JobManager(timeout=30)
+        self.addCleanup(self.manager.shutdown)
+        patcher = mock.patch.object(background_jobs, "get_job_manager", return_value=self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token = bind_scope(CancelScope(session_id="s1"))
+        self.addCleanup(reset_scope, self.token)
+
+    def test_start_status_collect(self):
+        started = job_start.invoke({"kind": "shell", "code": "echo hello; exit 2"})
+        job_id = started.split("任务 ID：")[1].split("。")[0]
+        result = job_collect.invoke({"job_id": job_id, "wait_seconds": 20})
+        self.assertIn("hello", result)
+        self.assertIn("[退出码: 2]", result)
+        self.assertIn("failed", job_status.invoke({}))
+        self.assertTrue(job_collect.invoke({"job_id": "nope"}).startswith("错误"))
+
+    def test_dangerous_shell_commands_are_rejected(self):
+        self.assertTrue(job_start.invoke({"kind": "shell", "code": "rm -rf /"}).startswith("错误"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Unit tests for turn cancellation of tool subprocesses."""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import unittest
+
+from langchain_core.messages import AIMessage
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from agent.engine import _close_pending_tool_calls
+from tools.process_runner import run_process
+
+
+class CancelScopeTests(unittest.TestCase):
+    def test_cancel_kills_running_process(self):
+        scope = CancelScope()
+        result_box = {}
+
+        def _run():
+            token = bind_scope(scope)
+            try:
+                result_box["result"] = run_process([sys.executable, "-c", "import time; time.sleep(30)"], timeout=60)
+            finally:
+                reset_scope(token)
+
+        worker = threading.Thread(target=_run)
+        start = time.monotonic()
+        worker.start()
+        time.sleep(0.5)
+        scope.cancel()
+        worker.join(timeout=10)
+
+        self.assertFalse(worker.is_alive())
+        self.assertLess(time.monotonic() - start, 10)
+        self.assertTrue(result_box["result"].cancelled)
+        self.assertEqual(scope.killed_processes, 1)
+
+    def test_timeout_kills_process(self):
+        result = run_process([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+        self.assertTrue(result.timed_out)
+
+    def test_close_pending_tool_calls_answers_open_calls(self):
+        ai = AIMessage(content="", tool_calls=[{"id": "call_1", "name": "python_executor", "args": {}}])
+        closed = _close_pending_tool_calls([ai])
+        self.assertEqual(len(closed), 2)
+        self.assertEqual(closed[-1].tool_call_id, "call_1")
+
+
+if __name__ == "__main__":
+    unittest.main()
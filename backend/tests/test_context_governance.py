@@ -5,6 +5,7 @@ import unittest
 from agent.auto_compactor import compact_history
 from agent.context_budget import compute_thresholds, estimate_messages_tokens
 from agent.history_pruner import prune_history
+from agent.message_record import MessageRecord, to_langchain_messages, to_records
 from agent.overflow_recovery import is_context_overflow
 
 
@@ -55,6 +56,27 @@ class ContextGovernanceTests(unittest.TestCase):
         tokens = estimate_messages_tokens(_build_history(turns=2))
         self.assertGreater(tokens, 0)
 
+    def test_prune_history_accepts_message_records(self):
+        history = to_records(_build_history(turns=8, tool_chars=3000))
+        pruned, stats = prune_history(
+            history,
+            target_tokens=100_000,
+            preserve_recent_turns=3,
+            max_tool_result_chars=500,
+        )
+        self.assertTrue(all(isinstance(m, MessageRecord) for m in pruned))
+        self.assertEqual(pruned, history)
+        pruned, stats = prune_history(history, target_tokens=1200, preserve_recent_turns=3, max_tool_result_chars=500)
+        self.assertGreater(stats["before_tokens"], stats["after_tokens"])
+        self.assertTrue(all(isinstance(m, MessageRecord) for m in pruned))
+
+    def test_message_records_share_large_content(self):
+        payload = "z" * 10_000
+        first, second = to_records([{"role": "tool", "content": payload}, {"role": "tool", "content": "z" * 10_000}])
+        self.assertIs(first.content, second.content)
+        lc = to_langchain_messages([MessageRecord("assistant", "hi"), MessageRecord("user", "q")])
+        self.assertEqual([m.type for m in lc], ["ai", "human"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+"""Unit tests for async subprocess execution and tool execution lanes."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import unittest
+
+from langchain_core.tools import tool
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from agent.metrics import metrics
+from tools.execution_lanes import ExecutionLane, with_lane
+from tools.process_runner import run_process_async
+from tools.shell_executor import shell_executor
+
+
+@tool
+def _which_thread() -> str:
+    """Return the name of the thread running the tool."""
+    return threading.current_thread().name
+
+
+class ExecutionLaneTests(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_concurrency_and_reports_queue(self):
+        lane = ExecutionLane("test", max_concurrent=2)
+        peak = 0
+
+        async def _job():
+            nonlocal peak
+            async with lane.slot():
+                peak = max(peak, lane.running)
+                await asyncio.sleep(0.05)
+
+        jobs = [asyncio.create_task(_job()) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(lane.running, 2)
+        self.assertEqual(lane.waiting, 3)
+        self.assertEqual(metrics.snapshot()["gauges"]["tool_lane_waiting{lane=test}"], 3)
+        await asyncio.gather(*jobs)
+        self.assertEqual(peak, 2)
+        self.assertEqual(lane.status(), {"max_concurrent": 2, "waiting": 0, "running": 0})
+
+    async def test_sync_tools_run_on_lane_threads(self):
+        laned = with_lane(_which_thread, "fast")
+        self.assertTrue((await laned.ainvoke({})).startswith("lane-fast"))
+        # The sync path is untouched.
+        self.assertEqual(laned.invoke({}), threading.current_thread().name)
+
+
+class AsyncProcessTests(unittest.IsolatedAsyncioTestCase):
+    async def test_captures_output_and_exit_code(self):
+        result = await run_process_async([sys.executable, "-c", "import sys; print('hi'); sys.exit(3)"], timeout=10)
+        self.assertEqual(result.stdout, "hi\n")
+        self.assertEqual(result.returncode, 3)
+
+    async def test_timeout_kills_process(self):
+        start = time.monotonic()
+        result = await run_process_async([sys.executable, "-c", "import time; time.sleep(30)"], timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertLess(time.monotonic() - start, 10)
+
+    async def test_scope_cancel_kills_process(self):
+        scope = CancelScope()
+        token = bind_scope(scope)
+        try:
+            task = asyncio.create_task(run_process_async([sys.executable, "-c", "import time; time.sleep(30)"], timeout=60))
+            await asyncio.sleep(0.3)
+            scope.cancel()
+            result = await asyncio.wait_for(task, timeout=10)
+        finally:
+            reset_scope(token)
+        self.assertTrue(result.cancelled)
+        self.assertEqual(scope.killed_processes, 1)
+
+    async def test_shell_executor_async_path(self):
+        out = await shell_executor.ainvoke({"command": "echo async-ok"})
+        self.assertIn("async-ok", out)
+        self.assertIn("[退出码: 0]", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
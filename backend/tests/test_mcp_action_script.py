@@ -0,0 +1,98 @@
+"""Unit tests for the chrome_run_actions composite tool."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+
+from mcp_client.action_script import _stages, make_action_script_tool, validate_script
+from mcp_client.chrome_client import MCPChromeClient
+from mcp_fake_bridge import TOOLS, FakeBridge
+
+SCHEMAS = {t["name"]: t["inputSchema"] for t in TOOLS}
+
+
+class ValidationTests(unittest.TestCase):
+    def test_valid_script(self):
+        script = [
+            {"tool": "chrome_navigate", "args": {"url": "https://example.com"}},
+            {"tool": "wait", "args": {"seconds": 0.5}},
+            {"tool": "chrome_get_web_content", "args": {"tabId": 1}},
+        ]
+        self.assertEqual(validate_script(script, SCHEMAS), [])
+
+    def test_reports_every_problem(self):
+        script = [
+            {"tool": "chrome_navigate", "args": {}},
+            {"tool": "chrome_get_web_content", "args": {"tabId": "1", "extra": True}},
+            {"tool": "chrome_screenshot", "args": {}},
+            {"tool": "wait", "args": {"seconds": 60}},
+        ]
+        errors = validate_script(script, SCHEMAS)
+        self.assertEqual(len(errors), 5)
+        self.assertIn("缺少参数 ['url']", errors[0])
+
+    def test_read_only_runs_are_grouped(self):
+        script = [{"tool": name} for name in (
+            "chrome_navigate", "chrome_get_web_content", "chrome_get_interactive_elements", "chrome_click_element",
+            "get_windows_and_tabs",
+        )]
+        self.assertEqual([[i for i, _ in stage] for stage in _stages(script)], [[0], [1, 2], [3], [4]])
+
+
+class RunActionsTests(unittest.TestCase):
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.addCleanup(self.bridge.close)
+        self.client = MCPChromeClient(url=self.bridge.url, timeout=5)
+        self.tool = make_action_script_tool(TOOLS, self.client)
+
+    def test_returns_only_final_output(self):
+        result = self.tool.invoke({"actions": [
+            {"tool": "chrome_navigate", "args": {"url": "https://example.com"}},
+            {"tool": "chrome_get_web_content", "args": {"tabId": 7}},
+        ]})
+        self.assertIn("步骤 1 chrome_navigate：成功", result)
+        self.assertIn('最终结果（步骤 2 chrome_get_web_content）：\nchrome_get_web_content {"tabId": 7}', result)
+        self.assertNotIn("https://example.com\"}", result.split("最终结果")[1])
+        self.assertEqual([c[0] for c in self.bridge.calls], ["chrome_navigate", "chrome_get_web_content"])
+        self.assertEqual(self.bridge.initializes, 1)
+
+    def test_invalid_script_runs_nothing(self):
+        result = self.tool.invoke({"actions": [{"tool": "chrome_navigate", "args": {}}]})
+        self.assertTrue(result.startswith("错误：动作脚本校验失败"))
+        self.assertEqual(self.bridge.calls, [])
+
+    def test_failure_stops_the_script(self):
+        def _handler(name, args):
+            if args.get("url") == "bad":
+                raise ValueError("navigation refused")
+            return f"{name} ok"
+
+        self.bridge.handler = _handler
+        result = self.tool.invoke({"actions": [
+            {"tool": "chrome_navigate", "args": {"url": "good"}},
+            {"tool": "chrome_navigate", "args": {"url": "bad"}},
+            {"tool": "chrome_get_web_content", "args": {}},
+        ]})
+        self.assertTrue(result.startswith("错误：动作脚本在第 2 步中止"))
+        self.assertIn("navigation refused", result)
+        self.assertIn("最后成功步骤（1 chrome_navigate）", result)
+        self.assertNotIn("chrome_get_web_content", [c[0] for c in self.bridge.calls])
+
+    def test_async_pipelines_consecutive_reads(self):
+        def _handler(name, args):
+            time.sleep(0.3)
+            return f"{name} {args.get('tabId')}"
+
+        self.bridge.handler = _handler
+        actions = [{"tool": "chrome_get_web_content", "args": {"tabId": i}} for i in range(3)]
+        start = time.perf_counter()
+        result = asyncio.run(self.tool.ainvoke({"actions": actions}))
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertTrue(result.endswith("chrome_get_web_content 2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
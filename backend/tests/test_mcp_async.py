@@ -0,0 +1,140 @@
+"""Unit tests for the async MCP Chrome client path."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from mcp_client import chrome_client
+from mcp_client.chrome_client import MCPChromeClient
+from mcp_client.sdk_session import SDKSession, call_tool_op, list_tools_op
+from mcp_client.langchain_bridge import mcp_tool_to_langchain
+from mcp_fake_bridge import TOOLS, FakeBridge
+
+
+class AsyncHttpPathTests(unittest.TestCase):
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.addCleanup(self.bridge.close)
+
+    def test_tool_ainvoke_uses_async_client(self):
+        client = MCPChromeClient(url=self.bridge.url, timeout=5)
+        tool = mcp_tool_to_langchain(TOOLS[0], client)
+        with mock.patch.object(client, "call_tool", side_effect=AssertionError("sync path used")):
+            result = asyncio.run(tool.ainvoke({"url": "https://example.com"}))
+        self.assertIn("chrome_navigate", result)
+        self.assertEqual(self.bridge.calls, [("chrome_navigate", {"url": "https://example.com"})])
+
+    def test_async_retry_backs_off_without_blocking(self):
+        client = MCPChromeClient(url="http://127.0.0.1:9/mcp", timeout=2)
+        sleeps = []
+
+        async def _sleep(delay):
+            sleeps.append(delay)
+
+        with mock.patch.object(chrome_client.asyncio, "sleep", _sleep):
+            with self.assertRaisesRegex(RuntimeError, "chrome_navigate"):
+                asyncio.run(client.acall_tool("chrome_navigate", {"url": "x"}))
+        self.assertEqual(sleeps, [chrome_client.CALL_RETRY_DELAY])
+
+
+class _FakeSession:
+    opened = 0
+
+    def __init__(self, read, write):
+        pass
+
+    async def __aenter__(self):
+        _FakeSession.opened += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def initialize(self):
+        pass
+
+    async def list_tools(self):
+        return SimpleNamespace(tools=[SimpleNamespace(name="chrome_navigate", description="d", inputSchema={})])
+
+    async def call_tool(self, name, arguments):
+        if arguments.get("fail"):
+            raise ConnectionError("dropped")
+        if arguments.get("error"):
+            raise ValueError("bad arguments")
+        await asyncio.sleep(arguments.get("sleep", 0.01))
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name}:{arguments.get('n')}")])
+
+
+@contextlib.asynccontextmanager
+async def _fake_transport(url):
+    yield (object(), object(), None)
+
+
+class SDKSessionTests(unittest.TestCase):
+    def setUp(self):
+        _FakeSession.opened = 0
+        patches = [
+            mock.patch("mcp.ClientSession", _FakeSession),
+            mock.patch("mcp.client.streamable_http.streamable_http_client", _fake_transport),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.session = SDKSession("http://fake/mcp", timeout=5)
+        self.addCleanup(self.session.close)
+
+    def test_session_is_opened_once(self):
+        tools = self.session.run(list_tools_op)
+        self.assertEqual(tools[0]["name"], "chrome_navigate")
+        self.assertEqual(self.session.run(call_tool_op("chrome_navigate", {"n": 1})), "chrome_navigate:1")
+
+        async def _concurrent():
+            ops = [self.session.arun(call_tool_op("t", {"n": i})) for i in range(3)]
+            return await asyncio.gather(*ops)
+
+        self.assertEqual(asyncio.run(_concurrent()), ["t:0", "t:1", "t:2"])
+        self.assertEqual(_FakeSession.opened, 1)
+
+    def test_failure_reconnects_on_next_call(self):
+        self.session.run(list_tools_op)
+        with self.assertRaises(ConnectionError):
+            self.session.run(call_tool_op("t", {"fail": True}))
+        self.assertEqual(self.session.run(call_tool_op("t", {"n": 2})), "t:2")
+        self.assertEqual(_FakeSession.opened, 2)
+
+    def test_tool_errors_and_timeouts_keep_the_session(self):
+        session = SDKSession("http://fake/mcp", timeout=0.5)
+        self.addCleanup(session.close)
+
+        async def _mixed():
+            ops = [
+                session.arun(call_tool_op("t", {"n": 1, "sleep": 0.2})),
+                session.arun(call_tool_op("t", {"error": True})),
+                session.arun(call_tool_op("t", {"sleep": 5})),
+            ]
+            return await asyncio.gather(*ops, return_exceptions=True)
+
+        ok, error, timeout = asyncio.run(_mixed())
+        self.assertEqual(ok, "t:1")
+        self.assertIsInstance(error, ValueError)
+        self.assertIsInstance(timeout, TimeoutError)
+        self.assertEqual(session.run(call_tool_op("t", {"n": 2})), "t:2")
+        self.assertEqual(_FakeSession.opened, 1)
+
+    def test_client_uses_sdk_session_when_configured(self):
+        with mock.patch.dict(os.environ, {"MCP_CHROME_USE_SDK": "true"}), \
+                mock.patch.object(chrome_client, "get_sdk_session", return_value=self.session):
+            client = MCPChromeClient(url="http://fake/mcp", timeout=5)
+            self.assertEqual(client.call_tool("t", {"n": 5}), "t:5")
+            self.assertEqual(asyncio.run(client.acall_tool("t", {"n": 6})), "t:6")
+            self.assertEqual(len(client.list_tools()), 1)
+        self.assertEqual(_FakeSession.opened, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
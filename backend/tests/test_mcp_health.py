@@ -0,0 +1,138 @@
+"""Unit tests for the MCP circuit breaker and cached health state."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+import unittest
+
+from mcp_client.chrome_client import MCPChromeClient
+from mcp_client.health import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, ServerHealth
+from mcp_fake_bridge import FakeBridge
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_threshold_and_half_opens_after_reset(self):
+        breaker = CircuitBreaker("t", failure_threshold=2, reset_seconds=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())  # only one trial at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker("t", failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_released_trial_admits_the_next_caller(self):
+        breaker = CircuitBreaker("t", failure_threshold=1, reset_seconds=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        first = breaker.admit()
+        self.assertTrue(first)
+        self.assertIsNone(breaker.admit())
+        breaker.release_trial(first)
+        second = breaker.admit()
+        self.assertTrue(second)
+        breaker.release_trial(first)  # a stale ticket does not free someone else's trial
+        self.assertIsNone(breaker.admit())
+        breaker.release_trial(0)
+        self.assertIsNone(breaker.admit())
+
+
+class ServerHealthTests(unittest.TestCase):
+    def test_probe_updates_state_and_notifies_on_flip(self):
+        up = {"value": False}
+
+        def _probe():
+            if not up["value"]:
+                raise ConnectionError("down")
+            return "ok"
+
+        health = ServerHealth("t", _probe, CircuitBreaker("t", failure_threshold=1, reset_seconds=60))
+        flips = []
+        health.subscribe(flips.append)
+        self.assertFalse(health.check())
+        self.assertEqual(health.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            health.guard()
+        up["value"] = True
+        self.assertTrue(health.check())
+        self.assertEqual(health.breaker.state, CLOSED)
+        self.assertEqual(flips, [True])
+        self.assertTrue(health.status()["reachable"])
+
+    def test_error_reply_does_not_count_as_outage(self):
+        health = ServerHealth("t", lambda: "ok", CircuitBreaker("t", failure_threshold=1, reset_seconds=60))
+        health.record(RuntimeError("MCP tools/call failed: bad args"))
+        self.assertEqual(health.breaker.state, CLOSED)
+        health.record(ConnectionError("refused"))
+        self.assertEqual(health.breaker.state, OPEN)
+        self.assertFalse(health.reachable)
+
+    def test_background_prober(self):
+        calls = []
+        health = ServerHealth("t", lambda: calls.append(1) or "ok")
+        self.assertTrue(health.start(interval=0.01))
+        self.addCleanup(health.stop)
+        deadline = time.monotonic() + 2
+        while len(calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(calls), 2)
+        self.assertTrue(health.reachable)
+
+
+class ClientBreakerTests(unittest.TestCase):
+    def test_open_circuit_fails_fast_without_network(self):
+        bridge = FakeBridge()
+        self.addCleanup(bridge.close)
+        client = MCPChromeClient(url=bridge.url, timeout=5)
+        self.assertEqual(len(client.list_tools()), 2)
+        self.assertEqual(client._health.breaker.state, CLOSED)
+        for _ in range(client._health.breaker.failure_threshold):
+            client._health.breaker.record_failure()
+        requests = client._get_http_client().status()["requests"]
+        start = time.perf_counter()
+        with self.assertRaisesRegex(RuntimeError, "熔断"):
+            client.call_tool("chrome_navigate", {"url": "x"})
+        with self.assertRaises(ConnectionError):
+            client.list_tools()
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(client._get_http_client().status()["requests"], requests)
+        self.assertEqual(bridge.calls, [])
+
+    def test_cancelled_trial_call_frees_the_slot(self):
+        bridge = FakeBridge(handler=lambda name, args: time.sleep(1) or "slow")
+        self.addCleanup(bridge.close)
+        client = MCPChromeClient(url=bridge.url, timeout=5)
+        breaker = client._health.breaker
+        breaker.reset_seconds = 0.05
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        time.sleep(0.06)
+
+        async def _cancel_trial():
+            task = asyncio.create_task(client.acall_tool("chrome_navigate", {"url": "x"}))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(_cancel_trial())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""Unit tests for the pooled MCP HTTP client."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import unittest
+
+from mcp_client.http_client import MCPHttpClient, get_mcp_http_client
+from mcp_fake_bridge import FakeBridge
+
+
+class MCPHttpClientTests(unittest.TestCase):
+    def setUp(self):
+        self.bridge = FakeBridge()
+        self.addCleanup(self.bridge.close)
+        self.client = MCPHttpClient(self.bridge.url, timeout=5)
+        self.addCleanup(self.client.close)
+
+    def test_calls_reuse_one_connection(self):
+        self.assertEqual([t["name"] for t in self.client.list_tools()][0], "chrome_navigate")
+        for i in range(5):
+            self.assertIn(f'"n": {i}', self.client.call_tool("chrome_navigate", {"n": i}))
+        self.assertEqual(self.client.ping(), 200)
+        status = self.client.status()
+        self.assertEqual(status["requests"], 8)  # initialize + list + 5 calls + ping
+        self.assertEqual(status["connections_opened"], 1)
+        self.assertEqual(status["reused_requests"], 7)
+        self.assertEqual(self.bridge.connections, 1)
+        self.assertEqual(self.bridge.initializes, 1)
+
+    def test_reinitializes_expired_session(self):
+        self.client.call_tool("chrome_navigate", {"url": "a"})
+        self.bridge.expire_sessions()
+        self.assertIn("chrome_navigate", self.client.call_tool("chrome_navigate", {"url": "b"}))
+        self.assertEqual(self.bridge.initializes, 2)
+
+    def test_async_calls_share_the_session(self):
+        async def _run():
+            self.client.call_tool("chrome_navigate", {"url": "sync"})
+            results = await asyncio.gather(*(self.client.acall_tool("chrome_navigate", {"n": i}) for i in range(3)))
+            tools = await self.client.alist_tools()
+            return results, tools
+
+        results, tools = asyncio.run(_run())
+        self.assertEqual(len(results), 3)
+        self.assertEqual(len(tools), 2)
+        self.assertEqual(self.bridge.initializes, 1)
+
+    def test_async_clients_are_per_loop_and_closed_on_their_loop(self):
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(loop.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(loop.call_soon_threadsafe, loop.stop)
+
+        asyncio.run_coroutine_threadsafe(self.client.acall_tool("chrome_navigate", {"n": 1}), loop).result(5)
+        background = self.client._aclients[loop]
+        for n in (2, 3):
+            asyncio.run(self.client.acall_tool("chrome_navigate", {"n": n}))
+        # The first asyncio.run loop closed and was dropped; the other two remain.
+        self.assertEqual(len(self.client._aclients), 2)
+        self.assertIs(self.client._aclients[loop], background)
+
+        self.client.close()
+        self.assertTrue(background.is_closed)
+        self.assertEqual(self.client._aclients, {})
+
+    def test_rpc_error_is_raised(self):
+        self.bridge.handler = lambda name, args: (_ for _ in ()).throw(ValueError("boom"))
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            self.client.call_tool("chrome_navigate", {})
+
+    def test_shared_client_per_server(self):
+        self.assertIs(get_mcp_http_client(self.bridge.url, 5), get_mcp_http_client(self.bridge.url, 5))
+
+
+if __name__ == "__main__":
+    unittest.main()
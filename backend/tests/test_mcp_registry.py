@@ -0,0 +1,139 @@
+"""Unit tests for the multi-server MCP registry."""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from config import mcp_config
+from mcp_client.registry import MCPRegistry, MCPServer, namespaced_tool_name
+from mcp_fake_bridge import FakeBridge
+
+
+class RegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.servers_path = self.dir / "mcp_servers.json"
+        patches = [
+            mock.patch.dict(os.environ, {"MCP_SERVERS_FILE": str(self.servers_path)}),
+            mock.patch.object(mcp_config, "MCP_CONFIG_FILE", self.dir / "mcp.json"),
+            mock.patch.object(mcp_config, "CONFIG_DIR", self.dir),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def write_servers(self, servers: dict) -> None:
+        self.servers_path.write_text(json.dumps({"mcpServers": servers}), encoding="utf-8")
+        # Distinct mtime for the config cache even on coarse filesystems.
+        os.utime(self.servers_path, ns=(time.time_ns(), time.time_ns()))
+
+
+class ServerConfigTests(RegistryTestCase):
+    def test_servers_are_listed_with_builtin_mcps(self):
+        self.write_servers({
+            "fs": {"command": "npx", "args": ["server-fs"], "enabled": True},
+            "api": {"url": "http://127.0.0.1:1/mcp", "name": "API"},
+            "broken": {"transport": "http"},
+            "mcp-chrome": {"url": "http://x"},
+        })
+        configs = {c.id: c for c in mcp_config.load_server_configs()}
+        self.assertEqual(set(configs), {"fs", "api"})
+        self.assertEqual(configs["fs"].transport, "stdio")
+        self.assertEqual(configs["api"].transport, "http")
+        ids = [m["id"] for m in mcp_config.list_mcps()]
+        self.assertEqual(ids, ["mcp-chrome", "fs", "api"])
+        self.assertTrue(mcp_config.is_mcp_enabled("fs"))
+        self.assertFalse(mcp_config.is_mcp_enabled("api"))
+        mcp_config.set_mcp_enabled("api", True)
+        self.assertTrue(mcp_config.is_mcp_enabled("api"))
+
+    def test_missing_file_means_no_servers(self):
+        self.assertEqual(mcp_config.load_server_configs(), [])
+
+    def test_tool_names_are_namespaced(self):
+        self.assertEqual(namespaced_tool_name("internal_api", "get.order"), "internal_api__get_order")
+        self.assertLessEqual(len(namespaced_tool_name("p" * 40, "t" * 40)), 64)
+
+
+class RegistryDiscoveryTests(RegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.bridge = FakeBridge()
+        self.addCleanup(self.bridge.close)
+
+    def test_discovery_is_concurrent_with_per_server_timeout(self):
+        self.write_servers({
+            "fast": {"url": self.bridge.url, "enabled": True},
+            "slow": {"url": self.bridge.url, "enabled": True, "prefix": "s", "discovery_timeout": 0.2},
+            "off": {"url": self.bridge.url},
+        })
+        registry = MCPRegistry()
+        real_list = MCPServer._list
+
+        def _list(server):
+            if server.id == "slow":
+                time.sleep(0.6)
+            return real_list(server)
+
+        with mock.patch.object(MCPServer, "_list", _list):
+            start = time.perf_counter()
+            summary = registry.discover()
+            self.assertLess(time.perf_counter() - start, 0.5)
+            self.assertEqual(summary["fast"], "2 tools")
+            self.assertIn("timeout", summary["slow"])
+            self.assertNotIn("off", summary)
+            self.assertEqual(
+                sorted(t.name for t in registry.tools()),
+                ["fast__chrome_get_web_content", "fast__chrome_navigate"],
+            )
+            deadline = time.monotonic() + 5
+            while len(registry.tools()) < 4 and time.monotonic() < deadline:
+                time.sleep(0.05)
+        self.assertIn("s__chrome_navigate", {t.name for t in registry.tools()})
+
+    def test_namespaced_tool_calls_the_original_name(self):
+        self.write_servers({"api": {"url": self.bridge.url, "enabled": True, "tools": ["chrome_navigate"]}})
+        registry = MCPRegistry()
+        registry.discover()
+        (tool,) = registry.tools()
+        self.assertEqual(tool.name, "api__chrome_navigate")
+        self.assertEqual(tool.metadata["tool_group"], "api")
+        self.assertIn("chrome_navigate", tool.invoke({"url": "https://example.com"}))
+        self.assertEqual(self.bridge.calls, [("chrome_navigate", {"url": "https://example.com"})])
+
+    def test_changed_config_replaces_only_that_server(self):
+        self.write_servers({"a": {"url": self.bridge.url}, "b": {"url": self.bridge.url}})
+        registry = MCPRegistry()
+        before = {s.id: s for s in registry.servers()}
+        self.write_servers({"a": {"url": self.bridge.url}, "b": {"url": self.bridge.url, "prefix": "bb"}})
+        after = {s.id: s for s in registry.servers()}
+        self.assertIs(before["a"], after["a"])
+        self.assertIsNot(before["b"], after["b"])
+
+    def test_stdio_env_change_closes_the_old_session(self):
+        self.write_servers({"fs": {"command": "npx", "args": ["server-fs"], "env": {"ROOT": "/a"}}})
+        registry = MCPRegistry()
+        with mock.patch("mcp_client.registry.close_sdk_session") as close:
+            (old,) = registry.servers()
+            self.write_servers({"fs": {"command": "npx", "args": ["server-fs"], "env": {"ROOT": "/a"}, "tools": ["read"]}})
+            (same,) = registry.servers()
+            self.assertEqual(same.session_key, old.session_key)
+            self.write_servers({"fs": {"command": "npx", "args": ["server-fs"], "env": {"ROOT": "/b"}}})
+            (new,) = registry.servers()
+            self.assertNotEqual(new.session_key, old.session_key)
+            deadline = time.monotonic() + 5
+            while not close.called and time.monotonic() < deadline:
+                time.sleep(0.01)
+        close.assert_called_once_with(old.session_key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Unit tests for page-snapshot diffing of repeated MCP Chrome reads."""
+
+from __future__ import annotations
+
+import json
+import os
+import unittest
+from unittest import mock
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from mcp_client.chrome_client import MCPChromeClient
+from mcp_client.langchain_bridge import mcp_tool_to_langchain
+from mcp_client.snapshot_diff import SnapshotStore, diff_lines, snapshot_lines
+from mcp_fake_bridge import TOOLS, FakeBridge
+
+
+def _elements(n: int, changed: dict[int, str] | None = None, url: str = "https://intra/list") -> str:
+    changed = changed or {}
+    elements = [{"selector": f"#row-{i}", "text": changed.get(i, f"订单 {i} 待处理")} for i in range(n)]
+    return json.dumps({"url": url, "elements": elements}, ensure_ascii=False)
+
+
+class SnapshotLinesTests(unittest.TestCase):
+    def test_json_elements_are_one_line_each(self):
+        lines = snapshot_lines(_elements(2))
+        self.assertEqual(lines[0], "url: https://intra/list")
+        self.assertEqual(len(lines), 3)
+
+    def test_diff_reports_removed_and_added(self):
+        removed, added = diff_lines(["a", "b", "c"], ["a", "c", "d"])
+        self.assertEqual((removed, added), (["b"], ["d"]))
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.dict(os.environ, {"MCP_SNAPSHOT_DIFF_MIN_CHARS": "500"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = SnapshotStore()
+        self.tool = "chrome_get_interactive_elements"
+
+    def test_first_read_is_full_then_unchanged_notice(self):
+        page = _elements(40)
+        self.assertEqual(self.store.process("s1", self.tool, {"tabId": 3}, page), page)
+        notice = self.store.process("s1", self.tool, {"tabId": 3}, page)
+        self.assertTrue(notice.startswith("[快照未变化]"))
+        self.assertIn("full_snapshot=true", notice)
+
+    def test_changed_elements_are_diffed(self):
+        self.store.process("s1", self.tool, {}, _elements(40))
+        diff = self.store.process("s1", self.tool, {}, _elements(40, {7: "订单 7 已完成"}))
+        self.assertTrue(diff.startswith("[快照差异]"))
+        self.assertIn("- elements[] ", diff)
+        self.assertIn("订单 7 已完成", diff)
+        self.assertNotIn("订单 8", diff)
+        self.assertLess(len(diff), len(_elements(40)) / 4)
+
+    def test_full_copy_when_diff_is_not_worth_it(self):
+        self.store.process("s1", self.tool, {}, _elements(40))
+        navigated = _elements(40, url="https://intra/detail")
+        self.assertEqual(self.store.process("s1", self.tool, {}, navigated), navigated)
+        rewritten = _elements(40, {i: f"新内容 {i}" for i in range(40)}, url="https://intra/detail")
+        self.assertEqual(self.store.process("s1", self.tool, {}, rewritten), rewritten)
+        self.assertEqual(self.store.process("s1", self.tool, {}, rewritten, full=True), rewritten)
+        small = _elements(2)
+        self.store.process("s1", self.tool, {"tabId": 9}, small)
+        self.assertEqual(self.store.process("s1", self.tool, {"tabId": 9}, small), small)
+
+    def test_sessions_and_tabs_are_separate(self):
+        page = _elements(40)
+        self.store.process("s1", self.tool, {"tabId": 1}, page)
+        self.assertEqual(self.store.process("s2", self.tool, {"tabId": 1}, page), page)
+        self.assertEqual(self.store.process("s1", self.tool, {"tabId": 2}, page), page)
+        self.store.clear("s1")
+        self.assertEqual(self.store.process("s1", self.tool, {"tabId": 1}, page), page)
+
+
+class SnapshotToolTests(unittest.TestCase):
+    def test_tool_strips_flag_and_diffs_per_session(self):
+        pages = iter([_elements(60), _elements(60, {3: "changed"}), _elements(60, {3: "changed"})])
+        bridge = FakeBridge(handler=lambda name, args: next(pages))
+        self.addCleanup(bridge.close)
+        tool = mcp_tool_to_langchain(TOOLS[1], MCPChromeClient(url=bridge.url, timeout=5), snapshots=True)
+        self.assertIn("full_snapshot", tool.args)
+
+        token = bind_scope(CancelScope(session_id="snapshot-test"))
+        self.addCleanup(reset_scope, token)
+        self.assertTrue(tool.invoke({"tabId": 5}).startswith("{"))
+        self.assertTrue(tool.invoke({"tabId": 5}).startswith("[快照差异]"))
+        self.assertIn('"changed"', tool.invoke({"tabId": 5, "full_snapshot": True}))
+        self.assertEqual([args for _, args in bridge.calls], [{"tabId": 5}] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""Unit tests for the cached MCP tool catalog."""
+
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from mcp_client.tool_catalog import ToolCatalog
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class _Fetcher:
+    def __init__(self):
+        self.calls = 0
+        self.result: list | Exception = ["a"]
+        self.gate: threading.Event | None = None
+
+    def __call__(self) -> list:
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return list(self.result)
+
+
+class ToolCatalogTests(unittest.TestCase):
+    def test_cold_get_returns_immediately_and_loads_in_background(self):
+        fetch = _Fetcher()
+        fetch.gate = threading.Event()
+        catalog = ToolCatalog("t", fetch, ttl=60, retry_seconds=60)
+        start = time.perf_counter()
+        self.assertEqual(catalog.get(), [])
+        self.assertLess(time.perf_counter() - start, 0.5)
+        fetch.gate.set()
+        self.assertTrue(_wait_for(lambda: catalog.get() == ["a"]))
+
+    def test_fresh_catalog_is_not_refetched(self):
+        fetch = _Fetcher()
+        catalog = ToolCatalog("t", fetch, ttl=60, retry_seconds=60)
+        catalog.refresh()
+        for _ in range(5):
+            self.assertEqual(catalog.get(), ["a"])
+        self.assertEqual(fetch.calls, 1)
+
+    def test_stale_is_served_while_revalidating(self):
+        fetch = _Fetcher()
+        catalog = ToolCatalog("t", fetch, ttl=0, retry_seconds=60)
+        catalog.refresh()
+        fetch.result, fetch.gate = ["b"], threading.Event()
+        self.assertEqual(catalog.get(), ["a"])
+        self.assertEqual(catalog.get(), ["a"])  # only one refresh in flight
+        fetch.gate.set()
+        self.assertTrue(_wait_for(lambda: catalog.status()["refreshing"] is False))
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(catalog.refresh(), ["b"])
+
+    def test_failed_refresh_keeps_last_good_tools(self):
+        fetch = _Fetcher()
+        catalog = ToolCatalog("t", fetch, ttl=60, retry_seconds=60)
+        catalog.refresh()
+        fetch.result = ConnectionError("down")
+        with self.assertRaises(ConnectionError):
+            catalog.refresh()
+        self.assertEqual(catalog.get(), ["a"])
+        self.assertEqual(catalog.status()["error"], "down")
+        self.assertEqual(fetch.calls, 2)  # not retried before retry_seconds
+
+    def test_invalidate_triggers_revalidation(self):
+        fetch = _Fetcher()
+        catalog = ToolCatalog("t", fetch, ttl=60, retry_seconds=60)
+        catalog.refresh()
+        fetch.result = ["c"]
+        catalog.invalidate()
+        catalog.get()
+        self.assertTrue(_wait_for(lambda: catalog.get() == ["c"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""Unit tests for the prefix-cache-friendly prompt layout and cached-token accounting."""
+
+from __future__ import annotations
+
+import os
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+
+from agent import engine
+from agent.tool_router import ToolExposureMiddleware
+from tools import BASE_TOOLS
+
+
+def _at(day: int):
+    clock = mock.Mock()
+    clock.now.return_value = datetime(2026, 1, day)
+    return mock.patch.object(engine, "datetime", clock)
+
+
+class PromptLayoutTests(unittest.TestCase):
+    def test_date_is_at_the_tail_and_the_rest_is_stable(self):
+        with _at(1):
+            first = engine._build_system_prompt()
+        with _at(2):
+            second = engine._build_system_prompt()
+        self.assertTrue(first.rstrip().endswith("2026-01-01 Thursday"))
+        tail = first.rindex("\n\n当前日期")
+        self.assertEqual(first[:tail], second[:second.rindex("\n\n当前日期")])
+
+    def test_cache_control_marks_the_stable_part(self):
+        selection = engine._route_skills()
+        with mock.patch.dict(os.environ, {"PROMPT_CACHE_CONTROL": "true"}):
+            message = engine._system_message(selection)
+        stable, volatile = message.content
+        self.assertEqual(stable["cache_control"], {"type": "ephemeral"})
+        self.assertNotIn("当前日期", stable["text"])
+        self.assertIn("当前日期", volatile["text"])
+        with mock.patch.dict(os.environ, {"PROMPT_CACHE_CONTROL": "false"}):
+            self.assertIsInstance(engine._system_message(selection).content, str)
+
+    def test_system_prompt_file_is_read_once(self):
+        engine.load_system_prompt()
+        with mock.patch("pathlib.Path.read_text", side_effect=AssertionError("re-read")):
+            engine.load_system_prompt()
+
+    def test_tools_are_sent_in_name_order(self):
+        request = mock.Mock(tools=list(reversed(BASE_TOOLS)), messages=[])
+        ToolExposureMiddleware(None)._exposed(request)
+        sent = request.override.call_args.kwargs["tools"]
+        self.assertEqual([t.name for t in sent], sorted(t.name for t in BASE_TOOLS))
+
+
+class CachedTokenTests(unittest.TestCase):
+    def test_usage_metadata_cache_read(self):
+        msg = AIMessage(content="", usage_metadata={
+            "input_tokens": 1200, "output_tokens": 10, "total_tokens": 1210,
+            "input_token_details": {"cache_read": 1024},
+        })
+        self.assertEqual(engine._extract_token_usage(msg)["cached_tokens"], 1024)
+
+    def test_openai_style_prompt_tokens_details(self):
+        msg = AIMessage(content="", response_metadata={"token_usage": {
+            "prompt_tokens": 900, "completion_tokens": 5, "total_tokens": 905,
+            "prompt_tokens_details": {"cached_tokens": 512},
+        }})
+        self.assertEqual(engine._extract_token_usage(msg)["cached_tokens"], 512)
+
+    def test_missing_cache_details(self):
+        msg = AIMessage(content="", usage_metadata={"input_tokens": 5, "output_tokens": 1, "total_tokens": 6})
+        self.assertEqual(engine._extract_token_usage(msg)["cached_tokens"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
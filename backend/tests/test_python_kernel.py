@@ -0,0 +1,90 @@
+"""Unit tests for stateful per-session Python kernels."""
+
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from tools.python_kernel import KernelManager, get_kernel_manager, python_kernel, python_kernel_reset
+
+
+class KernelManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = KernelManager(memory_mb=512, idle_seconds=3600, max_sessions=2)
+        self.addCleanup(self.manager.shutdown)
+
+    def test_globals_persist_per_session(self):
+        first, info = self.manager.run("s1", "import json\nrows = [1, 2, 3]", timeout=30)
+        self.assertEqual(first.returncode, 0)
+        self.assertTrue(info["started"])
+
+        second, info = self.manager.run("s1", "rows.append(4)\nprint(json.dumps(rows))", timeout=30)
+        self.assertFalse(info["started"])
+        self.assertEqual(second.stdout, "[1, 2, 3, 4]\n")
+
+        other, _ = self.manager.run("s2", "print('rows' in globals())", timeout=30)
+        self.assertEqual(other.stdout, "False\n")
+
+    def test_errors_keep_state_but_timeout_discards_it(self):
+        self.manager.run("s1", "x = 1", timeout=30)
+        failed, _ = self.manager.run("s1", "1 / 0", timeout=30)
+        self.assertIn("ZeroDivisionError", failed.stderr)
+        self.assertEqual(self.manager.run("s1", "print(x)", timeout=30)[0].stdout, "1\n")
+
+        timed_out, _ = self.manager.run("s1", "import time; time.sleep(30)", timeout=1)
+        self.assertTrue(timed_out.timed_out)
+        after, info = self.manager.run("s1", "print('x' in globals())", timeout=30)
+        self.assertTrue(info["started"])
+        self.assertEqual(after.stdout, "False\n")
+
+    def test_memory_limit_kills_kernel(self):
+        manager = KernelManager(memory_mb=64, idle_seconds=3600, max_sessions=1)
+        self.addCleanup(manager.shutdown)
+        result, info = manager.run("s1", "import time\nblob = bytearray(256 * 1024 * 1024)\ntime.sleep(5)", timeout=30)
+        self.assertTrue(info["memory_exceeded"])
+        self.assertNotIn("s1", manager.status()["kernels"])
+
+    def test_idle_reaping_and_capacity_eviction(self):
+        self.manager.run("s1", "a = 1", timeout=30)
+        self.manager.run("s2", "b = 1", timeout=30)
+        self.manager.run("s3", "c = 1", timeout=30)
+        self.assertEqual(set(self.manager.status()["kernels"]), {"s2", "s3"})
+
+        self.manager.idle_seconds = 0
+        self.assertEqual(self.manager.reap_idle(), 2)
+        self.assertEqual(self.manager.status()["kernels"], {})
+
+    def test_busy_session_keeps_its_lock_and_reset_waits(self):
+        self.manager.run("s1", "x = 1", timeout=30)
+        worker = threading.Thread(target=self.manager.run, args=("s1", "import time; time.sleep(1)"), kwargs={"timeout": 30})
+        worker.start()
+        time.sleep(0.3)
+        self.manager.idle_seconds = 0
+        self.assertEqual(self.manager.reap_idle(), 0)
+        self.assertIn("s1", self.manager._session_locks)
+
+        started = time.monotonic()
+        self.assertTrue(self.manager.reset("s1"))
+        self.assertGreater(time.monotonic() - started, 0.3)
+        worker.join()
+        self.assertEqual(self.manager._session_locks, {})
+
+
+class KernelToolTests(unittest.TestCase):
+    def setUp(self):
+        self.token = bind_scope(CancelScope(session_id="tool-session"))
+        self.addCleanup(reset_scope, self.token)
+        self.addCleanup(get_kernel_manager().reset, "tool-session")
+
+    def test_tools_use_the_scope_session(self):
+        out = python_kernel.invoke({"code": "total = 40"})
+        self.assertIn("新内核已启动", out)
+        self.assertEqual(python_kernel.invoke({"code": "print(total + 2)"}).strip(), "42")
+        self.assertIn("已重置", python_kernel_reset.invoke({}))
+        self.assertIn("没有运行中的内核", python_kernel_reset.invoke({}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Unit tests for the warm Python worker pool."""
+
+from __future__ import annotations
+
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from tools import python_worker_pool
+from tools.python_worker_pool import PythonWorkerPool
+
+
+def _wait_idle(pool: PythonWorkerPool, count: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while pool.status()["idle"] < count:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"pool did not warm up: {pool.status()}")
+        time.sleep(0.05)
+
+
+class PythonWorkerPoolTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(python_worker_pool, "IMPORT_STATS_FILE", Path(self._tmp.name) / "imports.json")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = PythonWorkerPool(size=1, max_runs=3, preload=["json"], learned_top=2)
+        self.addCleanup(self.pool.shutdown)
+        self.addCleanup(self._tmp.cleanup)
+        self.pool.warm()
+        _wait_idle(self.pool, 1)
+
+    def test_runs_in_fresh_namespace_with_captured_output(self):
+        first = self.pool.run("import sys\nx = 41\nprint(x + 1)\nprint('oops', file=sys.stderr)", timeout=10)
+        self.assertEqual(first.stdout, "42\n")
+        self.assertEqual(first.stderr, "oops\n")
+        self.assertEqual(first.returncode, 0)
+
+        second = self.pool.run("print('x' in globals(), __name__)", timeout=10)
+        self.assertEqual(second.stdout, "False __main__\n")
+
+    def test_exceptions_and_exit_codes_match_python_c(self):
+        failed = self.pool.run("raise ValueError('bad')", timeout=10)
+        self.assertEqual(failed.returncode, 1)
+        self.assertIn("ValueError: bad", failed.stderr)
+        self.assertNotIn("_python_worker", failed.stderr)
+
+        exited = self.pool.run("import sys; sys.exit(3)", timeout=10)
+        self.assertEqual(exited.returncode, 3)
+
+    def test_timeout_kills_worker_and_pool_recovers(self):
+        result = self.pool.run("import time; print('start', flush=True); time.sleep(30)", timeout=1)
+        self.assertTrue(result.timed_out)
+        self.assertEqual(result.stdout, "start\n")
+
+        _wait_idle(self.pool, 1)
+        self.assertEqual(self.pool.run("print('ok')", timeout=10).stdout, "ok\n")
+
+    def test_falls_back_to_cold_process_when_busy(self):
+        worker = self.pool._checkout()
+        try:
+            result = self.pool.run("print('cold')", timeout=10)
+        finally:
+            self.pool._checkin(worker)
+        self.assertEqual(result.stdout, "cold\n")
+
+    def test_recycles_after_max_runs_and_learns_imports(self):
+        pids = set()
+        for _ in range(4):
+            _wait_idle(self.pool, 1)
+            pids.add(self.pool.run("import os, json\nimport some_thirdparty_pkg\n", timeout=10).stderr and
+                     self.pool.run("import os; print(os.getpid())", timeout=10).stdout)
+        self.assertGreater(len(pids), 1)
+        modules = self.pool.preload_modules()
+        self.assertIn("some_thirdparty_pkg", modules)
+        self.assertEqual(modules.count("json"), 1)
+        self.assertNotIn("os", modules)
+
+    def test_process_state_does_not_leak_between_runs(self):
+        leak = (
+            "import json, os, sys, types\n"
+            "os.environ['MYCLAW_LEAK'] = '1'\n"
+            "sys.path.insert(0, '/tmp/myclaw-leak')\n"
+            "sys.modules['myclaw_leak_mod'] = types.ModuleType('myclaw_leak_mod')\n"
+            "json.dumps = lambda *a, **k: 'broken'\n"
+        )
+        self.assertEqual(self.pool.run(leak, timeout=10).returncode, 0)
+        check = (
+            "import os, sys\n"
+            "print('MYCLAW_LEAK' in os.environ, '/tmp/myclaw-leak' in sys.path, 'myclaw_leak_mod' in sys.modules)"
+        )
+        result = self.pool.run(check, timeout=10)
+        self.assertEqual(result.stdout, "False False False\n")
+        self.assertEqual(self.pool.status()["idle"], 1)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "needs /proc")
+    def test_protocol_error_kills_worker(self):
+        garbage = (
+            "import os\n"
+            "for fd in os.listdir('/proc/self/fd'):\n"
+            "    try:\n"
+            "        if os.readlink(f'/proc/self/fd/{fd}').startswith('pipe:'):\n"
+            "            os.write(int(fd), b'not json\\n')\n"
+            "    except OSError:\n"
+            "        pass\n"
+        )
+        pid = self.pool.run("import os; print(os.getpid())", timeout=10).stdout
+        result = self.pool.run(garbage, timeout=10)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("通信异常", result.stderr)
+        _wait_idle(self.pool, 1)
+        self.assertNotEqual(self.pool.run("import os; print(os.getpid())", timeout=10).stdout, pid)
+
+    def test_import_stats_are_flushed_at_shutdown(self):
+        self.pool.run("import some_thirdparty_pkg", timeout=10)
+        self.assertFalse(python_worker_pool.IMPORT_STATS_FILE.exists())
+        self.pool.shutdown()
+        self.assertIn("some_thirdparty_pkg", python_worker_pool.IMPORT_STATS_FILE.read_text(encoding="utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Unit tests for per-run resource limits and usage accounting."""
+
+from __future__ import annotations
+
+import os
+import sys
+import unittest
+
+from tools.process_runner import run_process
+from tools.python_worker_pool import _Worker
+from tools.resource_limits import ExecLimits, limit_message
+
+ALLOCATE = "x = bytearray(600 * 1024 * 1024); print(len(x))"
+BUSY = "while True: pass"
+
+
+@unittest.skipUnless(os.name == "posix", "rlimits are POSIX only")
+class LauncherTests(unittest.TestCase):
+    def test_reports_usage_and_exit_code(self):
+        result = run_process(
+            [sys.executable, "-c", "import sys; print('ok'); sys.exit(3)"], timeout=30, limits=ExecLimits()
+        )
+        self.assertEqual(result.stdout, "ok\n")
+        self.assertEqual(result.returncode, 3)
+        self.assertIsNone(result.limit_exceeded)
+        self.assertGreater(result.usage["peak_rss_mb"], 0)
+        self.assertIn("cpu_seconds", result.usage)
+        self.assertIn("wall_seconds", result.usage)
+
+    def test_memory_limit(self):
+        result = run_process([sys.executable, "-c", ALLOCATE], timeout=30, limits=ExecLimits(memory_mb=300))
+        self.assertNotEqual(result.returncode, 0)
+        self.assertEqual(result.limit_exceeded, "memory")
+        self.assertIn("300 MB", limit_message(result.limit_exceeded, ExecLimits(memory_mb=300)))
+
+    def test_cpu_limit(self):
+        result = run_process([sys.executable, "-c", BUSY], timeout=30, limits=ExecLimits(cpu_seconds=1))
+        self.assertFalse(result.timed_out)
+        self.assertEqual(result.limit_exceeded, "cpu")
+
+    def test_shell_exit_code_passes_through(self):
+        result = run_process("echo hi; exit 4", timeout=30, shell=True, limits=ExecLimits())
+        self.assertEqual(result.stdout, "hi\n")
+        self.assertEqual(result.returncode, 4)
+
+
+@unittest.skipUnless(os.name == "posix", "rlimits are POSIX only")
+class WorkerLimitTests(unittest.TestCase):
+    def setUp(self):
+        self.worker = _Worker([])
+        self.assertTrue(self.worker.wait_ready())
+
+    def tearDown(self):
+        self.worker.kill()
+
+    def test_limits_apply_per_snippet(self):
+        result = self.worker.run(BUSY, timeout=30, limits=ExecLimits(cpu_seconds=1))
+        self.assertEqual(result.limit_exceeded, "cpu")
+        self.assertTrue(self.worker.alive)
+
+        result = self.worker.run(ALLOCATE, timeout=30, limits=ExecLimits(memory_mb=300))
+        self.assertEqual(result.limit_exceeded, "memory")
+        self.assertIn("MemoryError", result.stderr)
+
+        # Limits are lifted again afterwards.
+        result = self.worker.run(ALLOCATE, timeout=30)
+        self.assertEqual(result.stdout.strip(), str(600 * 1024 * 1024))
+        self.assertIsNone(result.limit_exceeded)
+        self.assertGreaterEqual(result.usage["peak_rss_mb"], 600)
+        self.assertIn("wall_seconds", result.usage)
+
+
+if __name__ == "__main__":
+    unittest.main()
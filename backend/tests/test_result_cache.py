@@ -0,0 +1,144 @@
+"""Unit tests for the python_executor result cache."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from tools.process_runner import ProcessResult
+from tools.python_worker_pool import PythonWorkerPool
+from tools.result_cache import PythonResultCache, referenced_paths
+
+# ``tools`` re-exports the tool object under the module's name.
+python_executor_module = importlib.import_module("tools.python_executor")
+
+
+class ResultCacheTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        self._cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, self._cwd)
+        self.cache = PythonResultCache(self.root / "cache", max_mb=1, max_age_seconds=3600)
+        Path("data.csv").write_text("a,b\n1,2\n")
+        # Cold runs only: a shared warm worker keeps the cwd it was started in.
+        patcher = mock.patch.object(python_executor_module, "get_python_pool", return_value=PythonWorkerPool(size=0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hit_until_referenced_file_changes(self):
+        code = "print(open('data.csv').read())"
+        plan = self.cache.plan(code)
+        self.assertIsNone(self.cache.lookup(plan))
+        self.assertTrue(self.cache.store(plan, ProcessResult("a,b\n1,2\n", "", 0)))
+
+        hit = self.cache.lookup(self.cache.plan(code))
+        self.assertEqual(hit.stdout, "a,b\n1,2\n")
+
+        Path("data.csv").write_text("a,b\n1,2\n3,4\n")
+        self.assertIsNone(self.cache.lookup(self.cache.plan(code)))
+
+    def test_restores_artifacts(self):
+        code = "import os\nos.makedirs('out', exist_ok=True)\nopen('out/chart.png', 'wb').write(b'png')"
+        plan = self.cache.plan(code)
+        Path("out").mkdir()
+        Path("out/chart.png").write_bytes(b"png")
+        self.assertTrue(self.cache.store(plan, ProcessResult("", "", 0)))
+
+        Path("out/chart.png").unlink()
+        self.assertIsNotNone(self.cache.lookup(self.cache.plan(code)))
+        self.assertEqual(Path("out/chart.png").read_bytes(), b"png")
+
+    def test_skips_failed_and_volatile_runs(self):
+        plan = self.cache.plan("print(1)")
+        self.assertFalse(self.cache.store(plan, ProcessResult("", "boom", 1)))
+        self.assertFalse(self.cache.store(plan, ProcessResult("", "", None, timed_out=True)))
+        self.assertIsNone(self.cache.plan("import random\nprint(random.random())"))
+        self.assertIsNotNone(self.cache.plan("df.sample(3, random_state=1)"))
+
+    def test_evicts_by_size_and_age(self):
+        big = "x" * (600 * 1024)
+        first = self.cache.plan("print('first')")
+        self.cache.store(first, ProcessResult(big, "", 0))
+        second = self.cache.plan("print('second')")
+        self.cache.store(second, ProcessResult(big, "", 0))
+        self.assertIsNone(self.cache.lookup(self.cache.plan("print('first')")))
+        self.assertIsNotNone(self.cache.lookup(self.cache.plan("print('second')")))
+
+        self.cache.max_age_seconds = 0.01
+        time.sleep(0.05)
+        self.assertIsNone(self.cache.lookup(self.cache.plan("print('second')")))
+        self.assertEqual(self.cache.status()["entries"], 0)
+
+    def test_leaves_other_writers_entries_alone(self):
+        in_progress = self.root / "cache" / ".build-other"
+        in_progress.mkdir(parents=True)
+        (in_progress / "artifact-0").write_bytes(b"png")
+        unreadable = self.root / "cache" / ("f" * 32)
+        unreadable.mkdir()
+        plan = self.cache.plan("print(1)")
+        self.assertTrue(self.cache.store(plan, ProcessResult("1\n", "", 0)))
+        self.assertTrue(in_progress.is_dir())
+        self.assertTrue(unreadable.is_dir())
+        # Re-storing the same code swaps the entry without leaving build dirs behind.
+        self.assertTrue(self.cache.store(self.cache.plan("print(1)"), ProcessResult("1\n", "", 0)))
+        self.assertEqual(self.cache.lookup(self.cache.plan("print(1)")).stdout, "1\n")
+        self.assertEqual(len(list((self.root / "cache").glob(".build-*"))), 1)
+
+        stale = time.time() - 2 * 3600
+        os.utime(in_progress, (stale, stale))
+        os.utime(unreadable, (stale, stale))
+        self.cache.status()
+        self.assertFalse(in_progress.exists())
+        self.assertFalse(unreadable.exists())
+
+    def test_glob_literals_are_expanded(self):
+        Path("b.csv").write_text("x")
+        names = {p.name for p in referenced_paths("import glob\nfiles = glob.glob('*.csv')")}
+        self.assertTrue({"data.csv", "b.csv"} <= names)
+
+    def test_python_executor_uses_cache_and_bypass(self):
+        code = "print(open('data.csv').read().count('\\n'))"
+        with mock.patch.dict(os.environ, {"PYTHON_CACHE_ENABLED": "true"}), \
+                mock.patch.object(python_executor_module, "get_result_cache", return_value=self.cache):
+            first = python_executor_module.python_executor.invoke({"code": code})
+            second = python_executor_module.python_executor.invoke({"code": code})
+            bypassed = python_executor_module.python_executor.invoke({"code": code, "no_cache": True})
+        self.assertEqual(first.strip(), "2")
+        self.assertTrue(second.startswith(python_executor_module.CACHE_HIT_NOTE))
+        self.assertTrue(second.endswith("2\n"))
+        self.assertEqual(bypassed.strip(), "2")
+
+    def test_async_cache_work_runs_on_the_slow_lane(self):
+        code = "print(open('data.csv').read().count('\\n'))"
+        threads = []
+        lookup = self.cache.lookup
+
+        def _lookup(plan):
+            threads.append(threading.current_thread().name)
+            return lookup(plan)
+
+        async def _twice():
+            tool = python_executor_module.python_executor
+            return [await tool.ainvoke({"code": code}) for _ in range(2)]
+
+        with mock.patch.dict(os.environ, {"PYTHON_CACHE_ENABLED": "true"}), \
+                mock.patch.object(python_executor_module, "get_result_cache", return_value=self.cache), \
+                mock.patch.object(self.cache, "lookup", _lookup):
+            first, second = asyncio.run(_twice())
+        self.assertEqual(first.strip(), "2")
+        self.assertTrue(second.startswith(python_executor_module.CACHE_HIT_NOTE))
+        self.assertTrue(all(name.startswith("lane-slow") for name in threads), threads)
+
+
+if __name__ == "__main__":
+    unittest.main()
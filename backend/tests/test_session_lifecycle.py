@@ -0,0 +1,106 @@
+"""Unit tests for idle session eviction and rehydration."""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import ToolMessage
+
+from agent import session_lifecycle
+from agent.session_lifecycle import SessionLifecycleManager
+
+
+def _history(tool_chars: int = 50_000) -> list:
+    return [
+        {"role": "user", "content": "分析数据"},
+        ToolMessage(content="x" * tool_chars, name="python_executor", tool_call_id="call_1"),
+    ]
+
+
+class SessionLifecycleTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.snapshot_dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_idle_session_is_evicted_and_rehydrated(self):
+        manager = SessionLifecycleManager(self.snapshot_dir, idle_seconds=0.01, heartbeat_timeout=60, memory_limit_bytes=0)
+        manager.register("s1", _history())
+        time.sleep(0.02)
+
+        self.assertEqual(manager.sweep(), ["s1"])
+        self.assertEqual(manager.stats()["resident_bytes"], 0)
+        self.assertTrue((self.snapshot_dir / "s1.json.gz").exists())
+
+        history = manager.checkout("s1")
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[1].tool_call_id, "call_1")
+        self.assertFalse((self.snapshot_dir / "s1.json.gz").exists())
+
+    def test_busy_session_is_never_evicted(self):
+        manager = SessionLifecycleManager(self.snapshot_dir, idle_seconds=0, heartbeat_timeout=0, memory_limit_bytes=1)
+        manager.register("s1", _history())
+        manager.checkout("s1")
+        self.assertEqual(manager.sweep(), [])
+
+    def test_memory_ceiling_evicts_least_recently_used(self):
+        manager = SessionLifecycleManager(self.snapshot_dir, idle_seconds=3600, heartbeat_timeout=3600, memory_limit_bytes=150_000)
+        for sid in ("old", "mid", "new"):
+            manager.register(sid, _history())
+        manager.checkin("old", manager.checkout("old"))  # "old" becomes most recent
+
+        evicted = manager.enforce_memory_limit()
+        self.assertEqual(evicted, ["mid"])
+        self.assertLessEqual(manager.resident_bytes(), 150_000)
+
+    def test_checkout_during_spill_aborts_it_without_waiting(self):
+        manager = SessionLifecycleManager(self.snapshot_dir, idle_seconds=3600, heartbeat_timeout=3600, memory_limit_bytes=0)
+        original = _history()
+        manager.register("s1", original)
+        writing, release = threading.Event(), threading.Event()
+        serialize = session_lifecycle.serialize_history
+
+        def _slow_serialize(history):
+            writing.set()
+            release.wait(5)
+            return serialize(history)
+
+        result = {}
+        with mock.patch.object(session_lifecycle, "serialize_history", _slow_serialize):
+            spill = threading.Thread(target=lambda: result.setdefault("evicted", manager.evict("s1")))
+            spill.start()
+            self.assertTrue(writing.wait(5))
+            # The lock is free while the snapshot is written.
+            manager.heartbeat("s1")
+            self.assertIs(manager.checkout("s1"), original)
+            release.set()
+            spill.join()
+        self.assertFalse(result["evicted"])
+        self.assertEqual(manager.stats()["resident"], 1)
+        self.assertFalse((self.snapshot_dir / "s1.json.gz").exists())
+
+    def test_concurrent_checkouts_share_one_rehydration(self):
+        manager = SessionLifecycleManager(self.snapshot_dir, idle_seconds=3600, heartbeat_timeout=3600, memory_limit_bytes=0)
+        manager.register("s1", _history())
+        self.assertTrue(manager.evict("s1"))
+        with mock.patch.object(manager, "_read_snapshot", wraps=manager._read_snapshot) as read:
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(manager.checkout("s1"))) for _ in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual([len(h) for h in results], [2, 2, 2])
+        self.assertTrue(all(h is results[0] for h in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
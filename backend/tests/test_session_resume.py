@@ -0,0 +1,64 @@
+"""Unit tests for resuming a chat session over the websocket."""
+
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from agent.session_store import MemorySessionStore, SessionState
+from api import routes
+
+
+class _FakeSocket:
+    """A live socket whose handler cleans up shortly after being closed."""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.closed = asyncio.Event()
+        self.close_codes: list[int] = []
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        self.close_codes.append(code)
+        asyncio.get_running_loop().call_later(0.05, self._cleanup)
+
+    def _cleanup(self) -> None:
+        routes._live_sessions.pop(self.session_id, None)
+        self.closed.set()
+
+
+class ResumeSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.store = MemorySessionStore()
+        self.store.save(SessionState("known1", "2026-01-01T00:00:00+00:00", turn_num=3, resume_token="secret"))
+        self.addCleanup(routes._live_sessions.clear)
+
+    def _resume(self, session_id: str, token: str) -> SessionState:
+        return asyncio.run(routes._resume_session(self.store, session_id, token))
+
+    def test_resume_requires_the_issued_token(self):
+        state = self._resume("known1", "secret")
+        self.assertEqual((state.session_id, state.turn_num), ("known1", 3))
+        for token in ("", "wrong"):
+            state = self._resume("known1", token)
+            self.assertNotEqual(state.session_id, "known1")
+            self.assertEqual(state.turn_num, 0)
+
+    def test_unknown_ids_are_not_adopted(self):
+        state = self._resume("attacker-chosen", "whatever")
+        self.assertNotEqual(state.session_id, "attacker-chosen")
+        self.assertTrue(state.resume_token)
+        self.assertNotEqual(state.resume_token, self._resume("", "").resume_token)
+
+    def test_second_socket_takes_the_session_over(self):
+        async def _run():
+            old = _FakeSocket("known1")
+            routes._live_sessions["known1"] = (old, old.closed)
+            return old, await routes._resume_session(self.store, "known1", "secret")
+
+        old, state = asyncio.run(_run())
+        self.assertEqual(old.close_codes, [4000])
+        self.assertEqual(state.session_id, "known1")
+        self.assertNotIn("known1", routes._live_sessions)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Unit tests for session stores and cross-worker notifications."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import AIMessage, ToolMessage
+
+from agent.session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionState,
+    SQLiteSessionStore,
+)
+
+
+def _sample_state() -> SessionState:
+    return SessionState(
+        session_id="abc123",
+        created_at="2026-01-01T00:00:00+00:00",
+        turn_num=2,
+        resume_token="tok-abc",
+        history=[
+            {"role": "user", "content": "你好"},
+            AIMessage(content="", tool_calls=[{"id": "call_1", "name": "python_executor", "args": {"code": "print(1)"}}]),
+            ToolMessage(content="1", name="python_executor", tool_call_id="call_1"),
+        ],
+    )
+
+
+class _FakeRedis:
+    """Local stand-in for the subset of redis-py used by RedisSessionStore."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.published: list[tuple[str, str]] = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class SessionStoreTests(unittest.TestCase):
+    def _assert_roundtrip(self, store):
+        store.save(_sample_state())
+        loaded = store.load("abc123")
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.turn_num, 2)
+        self.assertEqual(loaded.resume_token, "tok-abc")
+        self.assertEqual(loaded.history[0], {"role": "user", "content": "你好"})
+        self.assertEqual(loaded.history[1].tool_calls[0]["id"], "call_1")
+        self.assertEqual(loaded.history[2].tool_call_id, "call_1")
+        store.delete("abc123")
+        self.assertIsNone(store.load("abc123"))
+
+    def test_memory_roundtrip(self):
+        self._assert_roundtrip(MemorySessionStore())
+
+    def test_memory_footprint_stays_bounded(self):
+        store = MemorySessionStore(max_bytes=64 * 1024, ttl_seconds=3600)
+        for i in range(500):
+            state = _sample_state()
+            state.session_id = f"s{i}"
+            state.history.append({"role": "user", "content": os.urandom(2048).hex()})
+            store.save(state)
+        status = store.status()
+        self.assertLessEqual(status["bytes"], 64 * 1024)
+        self.assertLess(status["sessions"], 500)
+        self.assertIsNone(store.load("s0"))
+        self.assertIsNotNone(store.load("s499"))
+
+    def test_memory_entries_expire(self):
+        store = MemorySessionStore(ttl_seconds=60)
+        with mock.patch("agent.session_store.time.monotonic", return_value=1000.0):
+            store.save(_sample_state())
+        with mock.patch("agent.session_store.time.monotonic", return_value=1061.0):
+            self.assertIsNone(store.load("abc123"))
+            self.assertEqual(store.status()["bytes"], 0)
+
+    def test_sqlite_roundtrip_and_notifications(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sessions.db"
+            worker_a = SQLiteSessionStore(path)
+            worker_b = SQLiteSessionStore(path)
+            self._assert_roundtrip(worker_a)
+
+            received_a, received_b = [], []
+            worker_a.subscribe(lambda event, payload: received_a.append(event))
+            worker_b.subscribe(lambda event, payload: received_b.append((event, payload)))
+            worker_a.publish("mcp_toggled", {"id": "mcp-chrome", "enabled": True})
+            worker_a.poll()
+            worker_b.poll()
+
+            self.assertEqual(received_a, [])
+            self.assertEqual(received_b, [("mcp_toggled", {"id": "mcp-chrome", "enabled": True})])
+
+    def test_redis_roundtrip_and_notifications(self):
+        client = _FakeRedis()
+        worker_a = RedisSessionStore(client=client)
+        worker_b = RedisSessionStore(client=client)
+        self._assert_roundtrip(worker_a)
+
+        received = []
+        worker_b.subscribe(lambda event, payload: received.append(event))
+        worker_a.publish("skills_reloaded")
+        for _channel, message in client.published:
+            worker_b.handle_message({"type": "message", "data": message})
+        self.assertEqual(received, ["skills_reloaded"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+"""Unit tests for the persistent per-conversation shell."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from tools.shell_executor import SESSION_RESTARTED_NOTE, shell_executor
+from tools.resource_limits import ExecLimits
+from tools.shell_session import ShellSessionManager
+
+
+@unittest.skipUnless(os.name == "posix", "pty shells are POSIX only")
+class ShellSessionTests(unittest.TestCase):
+    def setUp(self):
+        self.manager = ShellSessionManager(idle_seconds=3600, max_sessions=2)
+        self.addCleanup(self.manager.shutdown)
+
+    def test_state_persists_between_calls(self):
+        first, info = self.manager.run("s1", "cd /tmp && export GREETING=hi && echo ok; echo warn >&2", timeout=10)
+        self.assertEqual(first.stdout, "ok\nwarn\n")
+        self.assertEqual(first.returncode, 0)
+        self.assertFalse(info["restarted"])
+
+        second, _ = self.manager.run("s1", "pwd; echo $GREETING; cat; false", timeout=10)
+        # stdin is /dev/null, so `cat` cannot swallow the protocol.
+        self.assertEqual(second.stdout, "/tmp\nhi\n")
+        self.assertEqual(second.returncode, 1)
+
+        other, _ = self.manager.run("s2", "echo ${GREETING:-unset}", timeout=10)
+        self.assertEqual(other.stdout, "unset\n")
+
+    def test_multiline_commands(self):
+        result, _ = self.manager.run("s1", "cat <<EOF\na\nb\nEOF\nfor i in 1 2; do echo $i; done", timeout=10)
+        self.assertEqual(result.stdout, "a\nb\n1\n2\n")
+
+    def test_timeout_and_exit_reset_the_shell(self):
+        self.manager.run("s1", "cd /tmp", timeout=10)
+        start = time.monotonic()
+        result, _ = self.manager.run("s1", "sleep 30", timeout=0.5)
+        self.assertTrue(result.timed_out)
+        self.assertLess(time.monotonic() - start, 10)
+
+        result, info = self.manager.run("s1", "pwd", timeout=10)
+        self.assertTrue(info["restarted"])
+        self.assertNotEqual(result.stdout, "/tmp\n")
+
+        result, _ = self.manager.run("s1", "exit 3", timeout=10)
+        self.assertEqual(result.returncode, 3)
+        _, info = self.manager.run("s1", "true", timeout=10)
+        self.assertTrue(info["restarted"])
+
+    def test_cancel_kills_the_command(self):
+        scope = CancelScope(session_id="s1")
+        token = bind_scope(scope)
+        try:
+            timer = threading.Timer(0.3, scope.cancel)
+            timer.start()
+            result, _ = self.manager.run("s1", "sleep 30", timeout=30)
+        finally:
+            reset_scope(token)
+        self.assertTrue(result.cancelled)
+
+    def test_capacity_evicts_least_recently_used(self):
+        for sid in ("a", "b", "c"):
+            self.manager.run(sid, "true", timeout=10)
+        self.assertEqual(set(self.manager.status()["sessions"]), {"b", "c"})
+        _, info = self.manager.run("a", "true", timeout=10)
+        self.assertTrue(info["restarted"])
+        self.assertEqual(set(self.manager._session_locks), {"a", "c"})
+
+    def test_capacity_never_evicts_a_busy_shell(self):
+        self.manager.run("idle", "true", timeout=10)
+        results = {}
+
+        def _long(sid):
+            results[sid] = self.manager.run(sid, "sleep 1; echo done", timeout=10)[0]
+
+        workers = [threading.Thread(target=_long, args=(sid,)) for sid in ("b1", "b2")]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.5)
+        # Both slots are running a command: the idle shell was evicted, nothing else can be.
+        with self.assertRaisesRegex(RuntimeError, "上限"):
+            self.manager.run("third", "true", timeout=10)
+        for worker in workers:
+            worker.join()
+        self.assertEqual([results[sid].stdout for sid in ("b1", "b2")], ["done\n", "done\n"])
+        self.assertEqual(set(self.manager.status()["sessions"]), {"b1", "b2"})
+
+    def test_reap_keeps_locks_of_waiting_calls(self):
+        self.manager.run("s1", "true", timeout=10)
+        with self.manager._session("s1"):
+            self.manager.idle_seconds = 0
+            self.assertEqual(self.manager.reap_idle(), 0)
+            self.assertIn("s1", self.manager._session_locks)
+        self.assertEqual(self.manager.reap_idle(), 1)
+        self.assertEqual(self.manager._session_locks, {})
+
+    def test_session_commands_inherit_exec_limits(self):
+        limits = ExecLimits(memory_mb=300, cpu_seconds=1)
+        busy, _ = self.manager.run("s1", f"{sys.executable} -c 'while True: pass'", timeout=30, limits=limits)
+        self.assertFalse(busy.timed_out)
+        self.assertEqual(busy.limit_exceeded, "cpu")
+
+        alloc = f"{sys.executable} -c 'x = bytearray(600 * 1024 * 1024)'"
+        big, _ = self.manager.run("s1", alloc, timeout=30, limits=limits)
+        self.assertEqual(big.limit_exceeded, "memory")
+        after, _ = self.manager.run("s1", "echo alive", timeout=10)
+        self.assertEqual(after.stdout, "alive\n")
+
+    def test_shell_executor_uses_session_when_enabled(self):
+        token = bind_scope(CancelScope(session_id="tool-test"))
+        try:
+            with mock.patch.dict(os.environ, {"SHELL_SESSION_ENABLED": "true"}), \
+                    mock.patch("tools.shell_executor.get_shell_session_manager", return_value=self.manager):
+                shell_executor.invoke({"command": "export STEP=two"})
+                out = shell_executor.invoke({"command": "echo step-$STEP"})
+        finally:
+            reset_scope(token)
+        self.assertIn("step-two", out)
+        self.assertIn("[退出码: 0]", out)
+        self.assertNotIn(SESSION_RESTARTED_NOTE, out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""Unit tests for incremental skill discovery and per-file caches."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent.skill_loader import SkillLoader
+
+
+def _write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    # Move the mtime forward so back-to-back writes are always distinguishable.
+    stamp = time.time_ns() + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+def _skill_md(name: str, description: str, body: str = "# Doc") -> str:
+    return f"---\nname: {name}\ndescription: {description}\n---\n{body}\n"
+
+
+class SkillLoaderTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = Path(self._tmp.name)
+        _write(self.root / "alpha" / "SKILL.md", _skill_md("alpha", "First"))
+        _write(self.root / "beta" / "SKILL.md", _skill_md("beta", "Second"))
+        _write(self.root / "beta" / "references" / "notes.md", "v1")
+        self.loader = SkillLoader(self.root)
+        self.loader.discover()
+
+    def test_unchanged_skills_are_reused(self):
+        alpha, beta = self.loader.catalog["alpha"], self.loader.catalog["beta"]
+        self.assertFalse(self.loader.refresh())
+        self.assertIs(self.loader.catalog["alpha"], alpha)
+        self.assertIs(self.loader.catalog["beta"], beta)
+
+    def test_only_changed_skill_is_reparsed(self):
+        alpha, old_catalog = self.loader.catalog["alpha"], self.loader.catalog
+        _write(self.root / "beta" / "SKILL.md", _skill_md("beta", "Updated"))
+        self.assertTrue(self.loader.refresh())
+        self.assertIs(self.loader.catalog["alpha"], alpha)
+        self.assertEqual(self.loader.catalog["beta"].description, "Updated")
+        # The old catalog was swapped out, not edited in place.
+        self.assertEqual(old_catalog["beta"].description, "Second")
+
+    def test_added_and_removed_skills(self):
+        _write(self.root / "gamma" / "SKILL.md", _skill_md("gamma", "Third"))
+        shutil.rmtree(self.root / "alpha")
+        self.assertTrue(self.loader.refresh())
+        self.assertEqual(sorted(self.loader.catalog), ["beta", "gamma"])
+
+    def test_script_change_triggers_reparse(self):
+        beta = self.loader.catalog["beta"]
+        _write(self.root / "beta" / "scripts" / "run.py", "print(1)\n")
+        self.assertTrue(self.loader.refresh())
+        self.assertIsNot(self.loader.catalog["beta"], beta)
+        self.assertEqual(self.loader.catalog["beta"].scripts, ["run.py"])
+
+    def test_doc_and_reference_follow_file_changes(self):
+        self.assertEqual(self.loader.get_skill_doc("alpha"), "# Doc")
+        self.assertEqual(self.loader.get_skill_reference("beta", "references/notes.md"), "v1")
+        _write(self.root / "alpha" / "SKILL.md", _skill_md("alpha", "First", "# New doc"))
+        _write(self.root / "beta" / "references" / "notes.md", "v2")
+        # Served fresh even before the catalog is rescanned.
+        self.assertEqual(self.loader.get_skill_doc("alpha"), "# New doc")
+        self.assertEqual(self.loader.get_skill_reference("beta", "references/notes.md"), "v2")
+
+    def test_unchanged_reference_is_not_reread(self):
+        self.loader.get_skill_reference("beta", "references/notes.md")
+        with mock.patch.object(Path, "read_text", side_effect=AssertionError("re-read")):
+            self.assertEqual(self.loader.get_skill_reference("beta", "references/notes.md"), "v1")
+
+    def test_watcher_picks_up_changes(self):
+        with mock.patch.dict(os.environ, {"SKILL_WATCH_INTERVAL_SECONDS": "0.05"}):
+            self.assertTrue(self.loader.start_watching())
+        self.addCleanup(self.loader.stop_watching)
+        _write(self.root / "delta" / "SKILL.md", _skill_md("delta", "Fourth"))
+        deadline = time.monotonic() + 5
+        while "delta" not in self.loader.catalog and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertIn("delta", self.loader.catalog)
+
+    def test_watcher_disabled(self):
+        with mock.patch.dict(os.environ, {"SKILL_WATCH_INTERVAL_SECONDS": "0"}):
+            self.assertFalse(self.loader.start_watching())
+
+
+if __name__ == "__main__":
+    unittest.main()
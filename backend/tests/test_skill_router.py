@@ -0,0 +1,94 @@
+"""Unit tests for query-relevant skill selection."""
+
+from __future__ import annotations
+
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent import engine
+from agent.skill_loader import SkillCommand, SkillMeta
+from agent.skill_router import SkillIndex, get_skill_index, select_skills, tokenize, used_skills
+
+SKILLS = [
+    SkillMeta("browser-automation", "通过 Chrome 浏览器扩展操作网页，登录后台、填写表单。", Path("a"),
+              metadata={"tags": "['browser', 'chrome']"}),
+    SkillMeta("datetime-skill", "提供日期时间工具，获取当前时间和计算日期差。", Path("b"),
+              commands=[SkillCommand("now", Path("b/scripts/dt.py"))]),
+    SkillMeta("deep-research", "搜索网络并撰写带引用的研究报告。", Path("c"),
+              metadata={"tags": "['research', 'web-search']"}),
+    SkillMeta("pandas-analysis", "数据分析与可视化，使用 pandas 生成图表。", Path("d"),
+              metadata={"tags": "['python', 'pandas', 'visualization']"}),
+    SkillMeta("report-export", "生成 HTML 数据分析报告。", Path("e"),
+              metadata={"tags": "['report', 'html']"}),
+]
+
+
+class SkillRouterTests(unittest.TestCase):
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"SKILL_ROUTING_ENABLED": "true", "SKILL_ROUTING_TOP_K": "2"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_tokenize_mixed_text(self):
+        self.assertEqual(tokenize("用 Pandas 画图"), ["用", "pandas", "画图"])
+        self.assertEqual(tokenize("日期时间"), ["日期", "期时", "时间"])
+
+    def test_ranks_by_relevance(self):
+        index = SkillIndex(SKILLS)
+        self.assertEqual([s.name for s in index.top("用 chrome 浏览器登录后台", 2)][0], "browser-automation")
+        self.assertEqual([s.name for s in index.top("计算两个日期差", 1)], ["datetime-skill"])
+        self.assertEqual(index.top("xyz", 3), [])
+
+    def test_selection_keeps_used_skills_in_catalog_order(self):
+        selection = select_skills(SKILLS, "pandas 画图", used={"browser-automation"})
+        names = [s.name for s in selection.listed]
+        self.assertEqual(names[0], "browser-automation")
+        self.assertIn("pandas-analysis", names)
+        self.assertNotIn("browser-automation", [s.name for s in selection.omitted])
+        self.assertEqual(len(selection.listed) + len(selection.omitted), len(SKILLS))
+
+    def test_disabled_lists_everything(self):
+        with mock.patch.dict(os.environ, {"SKILL_ROUTING_ENABLED": "false"}):
+            selection = select_skills(SKILLS, "pandas")
+        self.assertEqual(selection.listed, SKILLS)
+        self.assertEqual(selection.omitted, [])
+
+    def test_used_skills_from_history(self):
+        history = [
+            {"role": "ai", "tool_calls": [{"name": "read_skill_doc", "args": {"skill_name": "deep-research"}}]},
+            {"role": "ai", "tool_calls": [{"name": "datetime_skill_now", "args": {}}]},
+            {"role": "ai", "tool_calls": [{"name": "python_executor", "args": {"code": "1"}}]},
+        ]
+        self.assertEqual(used_skills(history, SKILLS), {"deep-research", "datetime-skill"})
+
+    def test_index_is_reused_for_same_catalog(self):
+        self.assertIs(get_skill_index(SKILLS), get_skill_index(list(SKILLS)))
+
+    def test_prompt_lists_routed_skills_and_names_the_rest(self):
+        loader = mock.Mock(loaded_skills=SKILLS)
+        with mock.patch.object(engine, "get_skill_loader", return_value=loader):
+            routed = engine._build_system_prompt("chrome 浏览器登录", [])
+            full = engine._build_system_prompt()
+        self.assertIn('<skill name="browser-automation"', routed)
+        self.assertNotIn('<skill name="report-export"', routed)
+        self.assertIn("<other_skills>", routed)
+        self.assertIn("report-export", routed)
+        self.assertIn('<skill name="report-export"', full)
+        self.assertLess(len(routed), len(full))
+
+    def test_cache_control_keeps_the_full_catalog_in_the_stable_part(self):
+        loader = mock.Mock(loaded_skills=SKILLS)
+        with mock.patch.object(engine, "get_skill_loader", return_value=loader), \
+                mock.patch.dict(os.environ, {"PROMPT_CACHE_CONTROL": "true"}):
+            browser = engine._prompt_parts(engine._route_skills("chrome 浏览器登录", []))
+            report = engine._prompt_parts(engine._route_skills("导出 PDF 报告", []))
+        self.assertEqual(browser[0], report[0])
+        self.assertIn('<skill name="report-export"', browser[0])
+        self.assertIn("<relevant_skills>", browser[1])
+        self.assertIn("browser-automation", browser[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""Unit tests for skill script commands exposed as tools."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import textwrap
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from agent.skill_loader import SkillLoader, parse_script_commands
+from tools import python_worker_pool, skill_tools
+from tools.python_worker_pool import PythonWorkerPool
+
+SCRIPT = textwrap.dedent('''
+    import sys
+
+    def greet(name: str, times: int = 1, punctuation="!"):
+        """Greet someone."""
+        return " ".join([f"hello {name}{punctuation}"] * times)
+
+    def fail():
+        raise ValueError("nope")
+
+    def _helper():
+        pass
+
+    COMMANDS = {"greet": greet, "fail": fail, "builtin": len}
+
+    if __name__ == "__main__":
+        sys.exit(1)
+''')
+
+
+class SkillToolsTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        skill_dir = Path(self._tmp.name) / "demo-skill"
+        (skill_dir / "scripts").mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text("---\nname: demo-skill\ndescription: Demo\n---\n# Demo\n", encoding="utf-8")
+        self.script = skill_dir / "scripts" / "tools.py"
+        self.script.write_text(SCRIPT, encoding="utf-8")
+        env = mock.patch.dict(os.environ, {"SKILL_SCRIPT_TOOLS_ENABLED": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+        self.loader = SkillLoader(Path(self._tmp.name))
+        self.loader.discover()
+        pool = PythonWorkerPool(size=0)
+        for target, value in ((skill_tools, "get_skill_loader"), (skill_tools, "get_python_pool")):
+            patcher = mock.patch.object(target, value, return_value=self.loader if value == "get_skill_loader" else pool)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_parses_commands_without_importing(self):
+        commands = {c.name: c for c in parse_script_commands(self.script)}
+        self.assertEqual(set(commands), {"greet", "fail"})
+        params = {p.name: p for p in commands["greet"].params}
+        self.assertEqual(params["name"].annotation, "str")
+        self.assertTrue(params["name"].required)
+        self.assertEqual(params["times"].default, 1)
+        self.assertEqual(params["punctuation"].default, "!")
+        self.assertEqual(commands["greet"].doc, "Greet someone.")
+
+    def test_tools_have_schemas_and_run(self):
+        tools = {t.name: t for t in skill_tools.get_skill_script_tools()}
+        self.assertEqual(set(tools), {"demo_skill_greet", "demo_skill_fail"})
+        greet = tools["demo_skill_greet"]
+        self.assertEqual(greet.args["times"]["default"], 1)
+        self.assertIn("Greet someone.", greet.description)
+        self.assertEqual(greet.invoke({"name": "bob", "times": 2}), "hello bob! hello bob!")
+        self.assertEqual(greet.invoke({"name": "amy"}), "hello amy!")
+        failed = tools["demo_skill_fail"].invoke({})
+        self.assertTrue(failed.startswith("错误"))
+        self.assertIn("ValueError: nope", failed)
+
+    def test_disabled_by_default(self):
+        with mock.patch.dict(os.environ, {"SKILL_SCRIPT_TOOLS_ENABLED": "false"}):
+            self.assertEqual(skill_tools.get_skill_script_tools(), [])
+
+
+WARM_SCRIPT = textwrap.dedent('''
+    import os
+
+    with open(os.environ["DEMO_IMPORT_LOG"], "a") as f:
+        f.write("import\\n")
+
+    def version():
+        return "VERSION"
+
+    COMMANDS = {"version": version}
+''')
+
+
+class WarmSkillToolsTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        root = Path(self._tmp.name)
+        skill_dir = root / "skills" / "warm-skill"
+        (skill_dir / "scripts").mkdir(parents=True)
+        (skill_dir / "SKILL.md").write_text("---\nname: warm-skill\ndescription: Warm\n---\n", encoding="utf-8")
+        self.script = skill_dir / "scripts" / "tools.py"
+        self.script.write_text(WARM_SCRIPT.replace("VERSION", "v1"), encoding="utf-8")
+        self.import_log = root / "imports.log"
+        for patcher in (
+            mock.patch.dict(os.environ, {"SKILL_SCRIPT_TOOLS_ENABLED": "true", "DEMO_IMPORT_LOG": str(self.import_log)}),
+            mock.patch.object(python_worker_pool, "IMPORT_STATS_FILE", root / "worker_imports.json"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        loader = SkillLoader(root / "skills")
+        loader.discover()
+        self.pool = PythonWorkerPool(size=1, max_runs=50, preload=[])
+        self.addCleanup(self.pool.shutdown)
+        self.pool.warm()
+        for target, value in ((skill_tools, "get_skill_loader"), (skill_tools, "get_python_pool")):
+            patcher = mock.patch.object(target, value, return_value=loader if value == "get_skill_loader" else self.pool)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.tool = skill_tools.get_skill_script_tools()[0]
+
+    def _invoke(self) -> str:
+        deadline = time.monotonic() + 30
+        while self.pool.status()["idle"] < 1:
+            self.assertLess(time.monotonic(), deadline, "pool did not warm up")
+            time.sleep(0.05)
+        return self.tool.invoke({})
+
+    def _imports(self) -> int:
+        return len(self.import_log.read_text(encoding="utf-8").splitlines())
+
+    def test_imported_once_per_worker_and_again_after_edit(self):
+        self.assertEqual([self._invoke(), self._invoke()], ["v1", "v1"])
+        self.assertEqual(self._imports(), 1)
+
+        self.script.write_text(WARM_SCRIPT.replace("VERSION", "v2"), encoding="utf-8")
+        stat = self.script.stat()
+        os.utime(self.script, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self._invoke(), "v2")
+        self.assertEqual(self._imports(), 2)
+
+        scripts_dir = str(self.script.parent.resolve())
+        probe = f"import sys\nprint(sum(k.startswith('_myclaw_skill_') for k in sys.modules), {scripts_dir!r} in sys.path)"
+        self._invoke()
+        self.assertEqual(self.pool.run(probe, timeout=10).stdout, "1 False\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
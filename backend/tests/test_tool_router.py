@@ -0,0 +1,94 @@
+"""Unit tests for per-turn tool exposure."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.tools import StructuredTool
+
+from agent import engine
+from agent.metrics import metrics
+from agent.skill_loader import SkillMeta
+from agent.tool_router import resolve_tool_request, select_tools
+from tools import BASE_TOOLS, JOB_TOOLS
+from tools.request_tools import request_tools
+
+
+def _browser_tool(name: str) -> StructuredTool:
+    return StructuredTool.from_function(func=lambda: "ok", name=name, description=name, metadata={"tool_group": "browser"})
+
+
+TOOLS = BASE_TOOLS + JOB_TOOLS + [request_tools, _browser_tool("chrome_navigate")]
+
+
+class _RecordingLLM(GenericFakeChatModel):
+    model_name: str = "fake"
+    streaming: bool = False
+    bound: list = []
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound.append(sorted(t.name for t in tools))
+        return self
+
+
+class ToolRouterTests(unittest.TestCase):
+    def setUp(self):
+        env = mock.patch.dict(os.environ, {"TOOL_ROUTING_ENABLED": "true"})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def test_core_tools_only_for_plain_message(self):
+        selected = select_tools(TOOLS, "你好，介绍一下你自己", [])
+        self.assertIn("python_executor", selected)
+        self.assertIn("request_tools", selected)
+        self.assertNotIn("web_search", selected)
+        self.assertNotIn("job_start", selected)
+        self.assertNotIn("chrome_navigate", selected)
+
+    def test_intent_and_skills_pick_groups(self):
+        self.assertIn("web_search", select_tools(TOOLS, "搜索一下最新的新闻", []))
+        self.assertIn("chrome_navigate", select_tools(TOOLS, "打开浏览器登录后台", []))
+        skill = SkillMeta("browser-automation", "通过 Chrome 浏览器扩展操作网页", Path("x"))
+        self.assertIn("chrome_navigate", select_tools(TOOLS, "帮我看看", [skill]))
+
+    def test_disabled_exposes_everything(self):
+        with mock.patch.dict(os.environ, {"TOOL_ROUTING_ENABLED": "false"}):
+            self.assertIsNone(select_tools(TOOLS, "你好", []))
+
+    def test_resolve_tool_request(self):
+        names, unknown = resolve_tool_request("web, job_start，nope", TOOLS)
+        self.assertEqual(names, {"web_search", "web_fetch", "job_start"})
+        self.assertEqual(unknown, ["nope"])
+
+    def test_request_tools_exposes_tools_from_the_next_call(self):
+        llm = _RecordingLLM(messages=iter([
+            AIMessage(content="", tool_calls=[{"id": "c1", "name": "request_tools", "args": {"tools": "web"}}]),
+            AIMessage(content="好的"),
+        ]), bound=[])
+        history = [{"role": "ai", "content": "", "tool_calls": [{"id": "c0", "name": "job_status", "args": {}}]},
+                   {"role": "tool", "content": "无", "name": "job_status", "tool_call_id": "c0"}]
+
+        async def _on_event(event):
+            pass
+
+        with mock.patch.object(engine, "get_llm", return_value=llm), \
+                mock.patch.object(engine, "get_all_tools", return_value=TOOLS), \
+                mock.patch.object(engine, "TOKEN_DELAY", 0):
+            asyncio.run(engine.run_agent("你好", _on_event, history=history))
+
+        first, second = llm.bound
+        self.assertNotIn("web_search", first)
+        self.assertIn("job_status", first)  # used earlier in the session
+        self.assertIn("web_search", second)
+        self.assertIn("web_fetch", second)
+        self.assertTrue(any(k.startswith("tool_schema_tokens") for k in metrics.snapshot()["summaries"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
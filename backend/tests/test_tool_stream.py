@@ -0,0 +1,150 @@
+"""Unit tests for live tool output streaming and bounded output capture."""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+from agent.tool_stream import ToolOutputStream, bind_stream, reset_stream
+from tools.output_buffer import BoundedOutput, prune_spill_dir
+from tools import process_runner
+from tools.process_runner import run_process
+
+
+class BoundedOutputTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_small_output_is_kept_verbatim(self):
+        buf = BoundedOutput(100, spill_dir=self._tmp.name)
+        buf.write("hello\n")
+        buf.close()
+        self.assertEqual(buf.getvalue(), "hello\n")
+        self.assertIsNone(buf.spill_path)
+
+    def test_keeps_head_and_tail_and_spills_everything(self):
+        buf = BoundedOutput(20, spill_dir=self._tmp.name)
+        text = "".join(f"{i:04d}" for i in range(1000))
+        for i in range(0, len(text), 7):
+            buf.write(text[i:i + 7])
+        buf.close()
+        value = buf.getvalue()
+        self.assertTrue(value.startswith(text[:10]))
+        self.assertTrue(value.endswith(text[-10:]))
+        self.assertIn(f"中间 {len(text) - 20} 字符已省略", value)
+        self.assertEqual(buf.spill_path.read_text(encoding="utf-8"), text)
+
+    def test_decodes_split_utf8_and_crlf(self):
+        buf = BoundedOutput(100, spill_dir=self._tmp.name)
+        data = "数据\r\n".encode("utf-8")
+        buf.write_bytes(data[:2])
+        buf.write_bytes(data[2:])
+        buf.close()
+        self.assertEqual(buf.getvalue(), "数据\n")
+
+    def test_writes_after_close_are_dropped(self):
+        buf = BoundedOutput(10, spill_dir=self._tmp.name)
+        buf.write("0123456789abcdef")
+        buf.close()
+        value = buf.getvalue()
+        buf.write("late output")
+        buf.write_bytes(b"late bytes")
+        buf.close()
+        self.assertEqual(buf.getvalue(), value)
+        self.assertEqual(buf.spill_path.read_text(encoding="utf-8"), "0123456789abcdef")
+
+    def test_prunes_old_and_excess_spill_files(self):
+        spill_dir = Path(self._tmp.name)
+        now = time.time()
+        for i, age in enumerate((7200, 300, 200, 100)):
+            path = spill_dir / f"stdout_{i}.log"
+            path.write_text("x" * 1000)
+            os.utime(path, (now - age, now - age))
+        (spill_dir / "notes.txt").write_text("keep")
+        self.assertEqual(prune_spill_dir(spill_dir, max_age_seconds=3600, max_bytes=2000), 2)
+        self.assertEqual(sorted(p.name for p in spill_dir.iterdir()), ["notes.txt", "stdout_2.log", "stdout_3.log"])
+
+
+class RunProcessStreamingTests(unittest.TestCase):
+    def test_output_callback_sees_chunks_before_exit(self):
+        chunks = []
+        code = "import sys, time\nprint('first', flush=True)\ntime.sleep(0.3)\nprint('oops', file=sys.stderr)"
+        result = run_process([sys.executable, "-c", code], timeout=10, on_output=lambda s, t: chunks.append((s, t)))
+        self.assertEqual(result.stdout, "first\n")
+        self.assertEqual(result.stderr, "oops\n")
+        self.assertEqual("".join(t for s, t in chunks if s == "stdout"), "first\n")
+        self.assertEqual("".join(t for s, t in chunks if s == "stderr"), "oops\n")
+
+    def test_background_child_holding_the_pipe_does_not_change_the_result(self):
+        child = "import time; time.sleep(1); print('late', flush=True)"
+        code = f"import subprocess, sys\nsubprocess.Popen([sys.executable, '-c', {child!r}])\nprint('main', flush=True)"
+        with mock.patch.object(process_runner, "DRAIN_TIMEOUT", 0.3):
+            start = time.monotonic()
+            result = run_process([sys.executable, "-c", code], timeout=10)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(result.stdout, "main\n")
+
+
+@tool
+def _chatty(lines: int) -> str:
+    """Print some lines from a subprocess."""
+    code = f"for i in range({lines}): print('line', i, flush=True)"
+    return run_process([sys.executable, "-c", code], timeout=10).stdout
+
+
+class ToolOutputStreamTests(unittest.IsolatedAsyncioTestCase):
+    async def test_chunks_are_attributed_to_tool_call(self):
+        events = []
+
+        async def on_event(event):
+            events.append(event)
+
+        stream = ToolOutputStream(on_event, flush_interval=0.01)
+        graph = StateGraph(MessagesState)
+        graph.add_node("tools", ToolNode([_chatty]))
+        graph.add_edge(START, "tools")
+        graph.add_edge("tools", END)
+        app = graph.compile()
+
+        token = bind_stream(stream)
+        try:
+            call = {"id": "call_42", "name": "_chatty", "args": {"lines": 3}}
+            async for _ in app.astream({"messages": [AIMessage(content="", tool_calls=[call])]},
+                                       config={"callbacks": [stream.handler]}, stream_mode="updates"):
+                await stream.flush()
+        finally:
+            reset_stream(token)
+
+        chunks = [e["data"] for e in events if e["type"] == "tool_output_chunk"]
+        self.assertTrue(chunks)
+        self.assertEqual({c["tool_call_id"] for c in chunks}, {"call_42"})
+        self.assertEqual("".join(c["text"] for c in chunks), "line 0\nline 1\nline 2\n")
+
+    async def test_per_call_stream_budget(self):
+        events = []
+
+        async def on_event(event):
+            events.append(event)
+
+        stream = ToolOutputStream(on_event, max_chars_per_call=5)
+        stream.push("c1", "t", "stdout", "abc")
+        stream.push("c1", "t", "stdout", "defgh")
+        stream.push("c1", "t", "stdout", "ignored")
+        await stream.flush()
+        self.assertEqual(len(events), 1)
+        self.assertTrue(events[0]["data"]["text"].startswith("abcde\n[实时输出已超过 5 字符"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Unit tests for turn admission control and fair queuing."""
+
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from agent.turn_scheduler import TurnScheduler, _parse_weights
+
+
+class TurnSchedulerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_admits_immediately_under_cap(self):
+        scheduler = TurnScheduler(max_concurrent=2, max_per_user=1, weights={})
+        waited = await scheduler.acquire("alice")
+        self.assertEqual(waited, 0.0)
+        self.assertEqual(scheduler.running, 1)
+
+    async def test_per_user_cap_queues_and_notifies_position(self):
+        scheduler = TurnScheduler(max_concurrent=4, max_per_user=1, weights={})
+        await scheduler.acquire("alice")
+        positions = []
+
+        async def on_queued(position, initial):
+            positions.append((position, initial))
+
+        waiter = asyncio.create_task(scheduler.acquire("alice", on_queued))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.queue_depth, 1)
+
+        # Another user is not blocked by alice's cap.
+        await asyncio.wait_for(scheduler.acquire("bob"), timeout=1)
+        self.assertEqual(scheduler.running, 2)
+
+        scheduler.release("alice")
+        await waiter
+        self.assertEqual(positions[0], (1, True))
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    async def test_fair_queue_interleaves_users(self):
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=5, weights={})
+        await scheduler.acquire("holder")
+        order: list[str] = []
+
+        async def run(user):
+            await scheduler.acquire(user)
+            order.append(user)
+            scheduler.release(user)
+
+        tasks = [asyncio.create_task(run("alice")) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(run("bob")))
+        await asyncio.sleep(0)
+        scheduler.release("holder")
+        await asyncio.gather(*tasks)
+        # Bob's single turn is served before alice's burst is exhausted.
+        self.assertLess(order.index("bob"), 3)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=1, weights={})
+        await scheduler.acquire("alice")
+        waiter = asyncio.create_task(scheduler.acquire("bob"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    async def test_idle_users_are_forgotten(self):
+        scheduler = TurnScheduler(max_concurrent=1, max_per_user=1, weights={})
+        for i in range(100):
+            async with scheduler.admit(f"user{i}"):
+                pass
+        await scheduler.acquire("alice")
+        waiter = asyncio.create_task(scheduler.acquire("bob"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(scheduler.status()["tracked_users"], 1)
+        scheduler.release("alice")
+        self.assertEqual(scheduler.status()["tracked_users"], 0)
+
+    def test_parse_weights(self):
+        self.assertEqual(_parse_weights("alice=2, bob=0.5,bad"), {"alice": 2.0, "bob": 0.5})
+
+
+if __name__ == "__main__":
+    unittest.main()
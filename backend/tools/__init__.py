@@ -8,42 +8,58 @@ from tools.web_search import web_search
 from tools.python_executor import python_executor
 from tools.shell_executor import shell_executor
 from tools.read_skill_doc import read_skill_doc, read_skill_reference
+from tools.python_kernel import kernels_enabled, python_kernel, python_kernel_reset
+from tools.background_jobs import job_cancel, job_collect, job_start, job_status, jobs_enabled
+from tools.execution_lanes import with_lane
+from tools.skill_tools import get_skill_script_tools
+from tools.request_tools import request_tools
+from agent.tool_router import tool_routing_enabled
+from mcp_client.registry import get_mcp_registry
+from mcp_client.tool_catalog import ToolCatalog
 
 logger = logging.getLogger(__name__)
 
+# Each tool's async path runs in its execution lane (see tools.execution_lanes).
 BASE_TOOLS = [
-    read_file,
-    write_file,
-    web_fetch,
-    web_search,
-    python_executor,
-    shell_executor,
-    read_skill_doc,
-    read_skill_reference,
+    with_lane(t)
+    for t in (
+        read_file,
+        write_file,
+        web_fetch,
+        web_search,
+        python_executor,
+        shell_executor,
+        read_skill_doc,
+        read_skill_reference,
+    )
 ]
 
+KERNEL_TOOLS = [with_lane(python_kernel), with_lane(python_kernel_reset)]
+
+JOB_TOOLS = [with_lane(t) for t in (job_start, job_status, job_collect, job_cancel)]
+
 MCP_CHROME_LOAD_RETRIES = 3
 MCP_CHROME_LOAD_DELAY = 1.5
 
 
-def _load_mcp_chrome_tools() -> list:
-    """Load MCP Chrome tools if enabled and bridge is available. Retries on connection failure."""
-    from config.mcp_config import is_mcp_enabled
+def _fetch_mcp_chrome_tools() -> list:
+    """Load MCP Chrome tools from the bridge. Retries on connection failure (until
+    the circuit opens), then raises."""
+    from mcp_client import get_mcp_chrome_tools
+    from mcp_client.chrome_client import get_chrome_health
+    from mcp_client.health import OPEN
 
-    if not is_mcp_enabled("mcp-chrome"):
-        return []
+    breaker = get_chrome_health().breaker
     last_err = None
     for attempt in range(1, MCP_CHROME_LOAD_RETRIES + 1):
         try:
-            from mcp_client import get_mcp_chrome_tools
-
             tools = get_mcp_chrome_tools()
-            if tools:
-                logger.info("Loaded %d MCP Chrome tools", len(tools))
-                return tools
-            break
+            logger.info("Loaded %d MCP Chrome tools", len(tools))
+            return tools
         except Exception as e:
             last_err = e
+            if breaker.state == OPEN:
+                break
             if attempt < MCP_CHROME_LOAD_RETRIES:
                 logger.info(
                     "MCP Chrome tools load attempt %d/%d failed, retrying in %.1fs: %s",
@@ -53,61 +69,96 @@ def _load_mcp_chrome_tools() -> list:
                     e,
                 )
                 time.sleep(MCP_CHROME_LOAD_DELAY)
-            else:
-                logger.warning(
-                    "MCP Chrome tools not available after %d attempts (bridge may not be running): %s",
-                    MCP_CHROME_LOAD_RETRIES,
-                    last_err,
-                    exc_info=False,
-                )
-    return []
+    logger.warning("MCP Chrome tools not available (bridge may not be running): %s", last_err)
+    raise last_err
+
+
+# Discovery runs in the background; turns read the cached catalog.
+_mcp_chrome_catalog = ToolCatalog("mcp-chrome", _fetch_mcp_chrome_tools)
+
+
+def mcp_chrome_catalog() -> ToolCatalog:
+    return _mcp_chrome_catalog
+
+
+def start_mcp_chrome_monitor() -> bool:
+    """Start the bridge health prober; tools are re-listed as soon as it comes back."""
+    from config.mcp_config import is_mcp_enabled
+    from mcp_client.chrome_client import get_chrome_health
+
+    health = get_chrome_health()
+    health.subscribe(lambda reachable: reachable and _mcp_chrome_catalog.invalidate())
+    return health.start(enabled=lambda: is_mcp_enabled("mcp-chrome"))
+
+
+def _load_mcp_chrome_tools() -> list:
+    """Cached MCP Chrome tools if enabled; never waits for the bridge."""
+    from config.mcp_config import is_mcp_enabled
+
+    if not is_mcp_enabled("mcp-chrome"):
+        return []
+    return _mcp_chrome_catalog.get()
 
 
 def get_all_tools() -> list:
-    """Return all tools (base + MCP when enabled). Dynamic per call."""
-    return list(BASE_TOOLS) + _load_mcp_chrome_tools()
+    """Return all tools (base + skill commands + MCP when enabled). Dynamic per call."""
+    tools = list(BASE_TOOLS)
+    if kernels_enabled():
+        tools += KERNEL_TOOLS
+    if jobs_enabled():
+        tools += JOB_TOOLS
+    tools += get_skill_script_tools()
+    if tool_routing_enabled():
+        tools.append(request_tools)
+    return tools + _load_mcp_chrome_tools() + get_mcp_registry().tools()
 
 
 def get_mcp_chrome_init_status():
     """
-    Check MCP Chrome connection status for init job.
+    Check MCP Chrome connection status for init job (warms the tool catalog).
     Returns JobResult for display in Graph panel.
     """
     from agent.init_jobs import JobResult
 
     from config.mcp_config import is_mcp_enabled
+    from mcp_client.chrome_client import get_chrome_health
 
     if not is_mcp_enabled("mcp-chrome"):
         return JobResult("check_mcp_chrome", "success", "MCP Chrome disabled (not enabled)", 0.0)
 
-    last_err = None
-    for attempt in range(1, MCP_CHROME_LOAD_RETRIES + 1):
-        try:
-            from mcp_client import get_mcp_chrome_tools
-
-            tools = get_mcp_chrome_tools()
-            if tools:
-                names = [t.name for t in tools]
-                return JobResult(
-                    "check_mcp_chrome",
-                    "success",
-                    f"{len(tools)} tools: {', '.join(names[:5])}{'...' if len(names) > 5 else ''}",
-                    0.0,
-                )
-            break
-        except Exception as e:
-            last_err = e
-            if attempt < MCP_CHROME_LOAD_RETRIES:
-                time.sleep(MCP_CHROME_LOAD_DELAY)
-
-    err_msg = str(last_err) if last_err else "unknown"
+    # One ping decides; a down bridge is not retried here (the prober picks it up later).
+    health = get_chrome_health()
+    try:
+        if not health.check():
+            raise ConnectionError(health.status()["message"])
+        tools = _mcp_chrome_catalog.refresh()
+    except Exception as e:
+        return JobResult(
+            "check_mcp_chrome",
+            "warning",
+            f"Bridge not reachable (port 12306). {e} — 请先在 Chrome 扩展中点击 Connect",
+            0.0,
+        )
+    names = [t.name for t in tools]
     return JobResult(
         "check_mcp_chrome",
-        "warning",
-        f"Bridge not reachable (port 12306). {err_msg} — 请先在 Chrome 扩展中点击 Connect",
+        "success",
+        f"{len(tools)} tools: {', '.join(names[:5])}{'...' if len(names) > 5 else ''}",
         0.0,
     )
 
 
+def get_mcp_servers_init_status():
+    """Discover the tools of all enabled MCP servers concurrently (init job)."""
+    from agent.init_jobs import JobResult
+
+    summary = get_mcp_registry().discover()
+    if not summary:
+        return JobResult("discover_mcp_servers", "success", "No extra MCP servers enabled", 0.0)
+    ok = all(v.endswith(" tools") for v in summary.values())
+    detail = "; ".join(f"{k}: {v}" for k, v in summary.items())
+    return JobResult("discover_mcp_servers", "success" if ok else "warning", detail, 0.0)
+
+
 # For backward compatibility - used by routes; returns current snapshot
 BUILTIN_TOOLS = BASE_TOOLS
@@ -0,0 +1,61 @@
+"""Launcher that applies resource limits to a command and reports its usage. Run as a script.
+
+Usage: python -I -S _exec_launcher.py REPORT MEMORY_MB CPU_SECONDS CGROUP_DIR -- argv...
+
+- CGROUP_DIR (or "-"): cgroup v2 directory to join before starting the command.
+- MEMORY_MB > 0: RLIMIT_AS for the command (skipped when a cgroup is used).
+- CPU_SECONDS > 0: RLIMIT_CPU for the command.
+
+The command inherits stdin/stdout/stderr and the process group. After it
+exits, ``{"peak_rss_kb", "cpu_seconds"}`` is written to REPORT and the
+launcher exits with the command's status (re-raising its signal), so the
+parent sees the same returncode as without the launcher. Doing this in a
+fresh single-threaded process avoids ``preexec_fn`` in the threaded server.
+"""
+
+import json
+import os
+import resource
+import signal
+import sys
+
+
+def main() -> None:
+    report, memory_mb, cpu_seconds, cgroup = sys.argv[1:5]
+    argv = sys.argv[6:]
+    memory_mb, cpu_seconds = int(memory_mb), int(cpu_seconds)
+
+    if cgroup != "-":
+        with open(os.path.join(cgroup, "cgroup.procs"), "w") as f:
+            f.write(str(os.getpid()))
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            if memory_mb > 0 and cgroup == "-":
+                limit = memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            if cpu_seconds > 0:
+                # Soft limit sends SIGXCPU; the hard limit a little later guarantees termination.
+                resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 2))
+            os.execvp(argv[0], argv)
+        except BaseException as e:
+            os.write(2, f"launcher: {e}\n".encode())
+        os._exit(127)
+
+    _, status, usage = os.wait4(pid, 0)
+    try:
+        with open(report, "w") as f:
+            json.dump({"peak_rss_kb": usage.ru_maxrss, "cpu_seconds": usage.ru_utime + usage.ru_stime}, f)
+    except OSError:
+        pass
+    if os.WIFSIGNALED(status):
+        sig = os.WTERMSIG(status)
+        signal.signal(sig, signal.SIG_DFL)
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        os.kill(os.getpid(), sig)
+    os._exit(os.waitstatus_to_exitcode(status))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Warm worker process for python_executor's pool. Run as a script, not imported.
+
+Protocol (one JSON object per line):
+  worker -> parent: {"ready": true, "preloaded": [...]} once imports are done
+  parent -> worker: {"code": str, "stdout": path, "stderr": path, "persistent": bool,
+                     "limits": {"memory_mb": int, "cpu_seconds": int}}
+  worker -> parent: {"exit_code": int, "rss": int, "exceeded": "memory" | "cpu" | null,
+                     "usage": {"peak_rss_mb": float, "cpu_seconds": float}}
+
+Each snippet runs in a fresh ``__main__`` namespace (or, with ``persistent``,
+in one namespace kept for the life of the worker — the session kernel mode),
+with file descriptors 1 and 2 pointed at the given files so C-level output
+and child processes are captured just like ``python -c``. The protocol uses
+private duplicates of the original stdin/stdout.
+
+Pooled (non-persistent) workers are shared by every session, so process
+state a snippet may change is put back afterwards: ``os.environ``,
+``sys.path`` and ``sys.modules`` (modules imported from outside the
+installed library paths, or swapped in by hand, are dropped; installed
+packages and modules cached under ``CACHED_MODULE_PREFIX`` stay imported so
+the next snippet gets them warm). The protocol is
+spoken through encoder/decoder objects bound at startup, so a snippet that
+patches ``json`` cannot break it.
+
+Limits apply per snippet: RLIMIT_AS is lowered for the duration of the run
+and RLIMIT_CPU is set to the worker's CPU time so far plus the budget; the
+SIGXCPU this triggers interrupts the snippet instead of killing the worker.
+"""
+
+import builtins
+import json
+import os
+import signal
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class _CPUTimeExceeded(BaseException):
+    pass
+
+
+_limits_active = False
+
+
+def _on_sigxcpu(signum, frame):
+    if _limits_active:
+        raise _CPUTimeExceeded()
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def _reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return _rss_bytes()
+
+
+def _cpu_seconds() -> float:
+    if resource is None:
+        return 0.0
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def _apply_limits(limits: dict) -> list:
+    """Lower the soft limits for one run; returns what to restore afterwards."""
+    saved = []
+    if resource is None:
+        return saved
+    memory_mb = int(limits.get("memory_mb") or 0)
+    cpu_seconds = int(limits.get("cpu_seconds") or 0)
+    try:
+        if memory_mb > 0:
+            soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+            limit = memory_mb * 1024 * 1024
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+            saved.append((resource.RLIMIT_AS, soft, hard))
+        if cpu_seconds > 0:
+            soft, hard = resource.getrlimit(resource.RLIMIT_CPU)
+            own = resource.getrusage(resource.RUSAGE_SELF)
+            limit = int(own.ru_utime + own.ru_stime) + cpu_seconds
+            if hard != resource.RLIM_INFINITY:
+                limit = min(limit, hard)
+            resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+            saved.append((resource.RLIMIT_CPU, soft, hard))
+    except (ValueError, OSError):
+        pass
+    return saved
+
+
+def _restore_limits(saved: list) -> None:
+    for which, soft, hard in saved:
+        try:
+            resource.setrlimit(which, (soft, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def _exit_code(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)
+    return 1
+
+
+def _library_roots() -> tuple:
+    """Absolute install locations (stdlib, site-packages) on the startup sys.path."""
+    roots = {os.path.abspath(p) for p in (sys.prefix, sys.base_prefix, sys.exec_prefix)}
+    roots |= {os.path.abspath(p) for p in sys.path if p and os.path.isabs(p)}
+    return tuple(sorted(r.rstrip(os.sep) + os.sep for r in roots))
+
+
+def _snapshot_process_state() -> tuple:
+    return dict(os.environ), list(sys.path), dict(sys.modules)
+
+
+# sys.modules keys that pooled runs may cache on purpose (skill scripts, see tools.skill_tools).
+CACHED_MODULE_PREFIX = "_myclaw_skill_"
+
+
+def _restore_process_state(state: tuple, library_roots: tuple) -> None:
+    environ, path, modules = state
+    if dict(os.environ) != environ:
+        os.environ.clear()
+        os.environ.update(environ)
+    sys.path[:] = path
+    for name, module in list(sys.modules.items()):
+        if name in modules or name.startswith(CACHED_MODULE_PREFIX):
+            continue
+        origin = getattr(module, "__file__", None)
+        if not origin or not os.path.abspath(origin).startswith(library_roots):
+            del sys.modules[name]
+    for name, module in modules.items():
+        # Cached entries may be dropped on purpose (a newer version replaced them).
+        if sys.modules.get(name) is not module and not name.startswith(CACHED_MODULE_PREFIX):
+            sys.modules[name] = module
+
+
+def _fresh_namespace() -> dict:
+    return {"__name__": "__main__", "__builtins__": builtins}
+
+
+def _run(code: str, namespace: dict, stdout_path: str, stderr_path: str, devnull: int, limits: dict) -> tuple:
+    global _limits_active
+    out_fd = os.open(stdout_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    err_fd = os.open(stderr_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(out_fd, 1)
+    os.dup2(err_fd, 2)
+    sys.argv = ["-c"]
+    exit_code = 0
+    exceeded = None
+    try:
+        saved = _apply_limits(limits)
+        _limits_active = True
+        try:
+            exec(compile(code, "<string>", "exec"), namespace)
+        finally:
+            _limits_active = False
+            _restore_limits(saved)
+    except SystemExit as e:
+        exit_code = _exit_code(e)
+    except _CPUTimeExceeded:
+        print(f"CPU time limit exceeded ({limits.get('cpu_seconds')} s)", file=sys.stderr)
+        exit_code = 128 + signal.SIGXCPU
+        exceeded = "cpu"
+    except BaseException as e:
+        # Skip this frame so the traceback matches `python -c`.
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        exit_code = 1
+        if isinstance(e, MemoryError) and limits.get("memory_mb"):
+            exceeded = "memory"
+    finally:
+        sys.stdout = sys.__stdout__
+        sys.stderr = sys.__stderr__
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        os.close(out_fd)
+        os.close(err_fd)
+    if "matplotlib.pyplot" in sys.modules:
+        try:
+            sys.modules["matplotlib.pyplot"].close("all")
+        except Exception:
+            pass
+    return exit_code, exceeded
+
+
+def main() -> None:
+    # Bound before any snippet runs; snippets may patch the json module.
+    encode = json.JSONEncoder(ensure_ascii=True).encode
+    decode = json.JSONDecoder().decode
+    proto_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    proto_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    write, flush, readline = proto_out.write, proto_out.flush, proto_in.readline
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    # Match `python -c`: the current directory, not this file's directory, is on sys.path.
+    sys.path[0] = ""
+    if hasattr(signal, "SIGXCPU"):
+        signal.signal(signal.SIGXCPU, _on_sigxcpu)
+
+    preloaded = []
+    for name in decode(os.environ.get("MYCLAW_WORKER_PRELOAD", "[]")):
+        try:
+            __import__(name)
+            preloaded.append(name)
+        except Exception:
+            pass
+    write(encode({"ready": True, "preloaded": preloaded}) + "\n")
+    flush()
+
+    base_cwd = os.getcwd()
+    library_roots = _library_roots()
+    session_namespace = _fresh_namespace()
+    while line := readline():
+        request = decode(line)
+        persistent = bool(request.get("persistent"))
+        namespace = session_namespace if persistent else _fresh_namespace()
+        state = None if persistent else _snapshot_process_state()
+        peak_reset = _reset_peak_rss()
+        cpu_before = _cpu_seconds()
+        exit_code, exceeded = _run(
+            request["code"], namespace, request["stdout"], request["stderr"], devnull, request.get("limits") or {}
+        )
+        usage = {"cpu_seconds": round(_cpu_seconds() - cpu_before, 3)}
+        if peak_reset:
+            usage["peak_rss_mb"] = round(_peak_rss_bytes() / (1024 * 1024), 1)
+        if not persistent:
+            _restore_process_state(state, library_roots)
+            try:
+                os.chdir(base_cwd)
+            except OSError:
+                pass
+        reply = {"exit_code": exit_code, "rss": _rss_bytes(), "exceeded": exceeded, "usage": usage}
+        write(encode(reply) + "\n")
+        flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""Background jobs (opt-in, ``BACKGROUND_JOBS_ENABLED``).
+
+``python_executor``/``shell_executor`` hold the agent loop until they finish
+and fail after their timeout. A job runs the same kind of code in the
+background instead: ``job_start`` returns a job id at once, ``job_status``
+reports progress and the tail of the output, ``job_collect`` returns the
+final result and ``job_cancel`` kills the process tree.
+
+Jobs belong to the conversation, not the turn: they keep running across
+turns (and reconnects) and are not killed when a turn is cancelled. Start
+and completion are pushed to the session's websocket as ``job_update``
+events. Lines printed as ``PROGRESS: ...`` (or ``进度：...``) become the job's
+progress.
+
+Limits: ``JOB_TIMEOUT_SECONDS`` per job, ``JOB_MAX_RUNNING_PER_SESSION``
+concurrent jobs per conversation; finished jobs are forgotten after
+``JOB_RETENTION_SECONDS``. ``EXEC_MEMORY_LIMIT_MB`` applies, the per-call CPU
+limit does not (long work is the point).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable
+
+from langchain_core.tools import tool
+
+from agent.cancellation import CancelScope, bind_scope, reset_scope
+from agent.metrics import metrics
+from tools.process_runner import ProcessResult, run_process
+from tools.python_executor import _format_result as _format_python
+from tools.python_kernel import current_session_id
+from tools.resource_limits import ExecLimits
+from tools.shell_executor import _check_command, _get_venv_env
+from tools.shell_executor import _format_result as _format_shell
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("python", "shell")
+PARTIAL_CHARS = 4000
+_PROGRESS_RE = re.compile(r"^\s*(?:PROGRESS|进度)\s*[:：]\s*(.+?)\s*$", re.MULTILINE | re.IGNORECASE)
+
+# Called from job threads with a ``job_update`` event dict.
+JobListener = Callable[[dict], None]
+
+
+def jobs_enabled() -> bool:
+    return os.getenv("BACKGROUND_JOBS_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class Job:
+    id: str
+    session_id: str
+    kind: str
+    code: str
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    status: str = "running"  # running | succeeded | failed | timed_out | cancelled
+    progress: str | None = None
+    output_chars: int = 0
+    tail: str = ""
+    result: ProcessResult | None = None
+    error: str | None = None
+    collected: bool = False
+    scope: CancelScope | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return round((self.finished_at or time.time()) - self.started_at, 1)
+
+    def to_event(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "elapsed_seconds": self.elapsed_seconds,
+            "progress": self.progress,
+        }
+        if self.result is not None:
+            data["returncode"] = self.result.returncode
+        return {"type": "job_update", "data": data}
+
+
+class JobManager:
+    def __init__(
+        self,
+        timeout: float | None = None,
+        max_running_per_session: int | None = None,
+        retention_seconds: float | None = None,
+        max_chars: int | None = None,
+    ):
+        self.timeout = timeout or float(os.getenv("JOB_TIMEOUT_SECONDS", "3600"))
+        self.max_running = max_running_per_session or max(1, int(os.getenv("JOB_MAX_RUNNING_PER_SESSION", "3")))
+        self.retention_seconds = retention_seconds or float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+        self.max_chars = max_chars or int(os.getenv("PYTHON_EXECUTOR_MAX_CHARS", "50000"))
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+        self._listeners: dict[str, list[JobListener]] = {}
+
+    # --- event stream ---
+
+    def add_listener(self, session_id: str, listener: JobListener) -> None:
+        with self._lock:
+            self._listeners.setdefault(session_id, []).append(listener)
+
+    def remove_listener(self, session_id: str, listener: JobListener) -> None:
+        with self._lock:
+            listeners = self._listeners.get(session_id, [])
+            if listener in listeners:
+                listeners.remove(listener)
+            if not listeners:
+                self._listeners.pop(session_id, None)
+
+    def _notify(self, job: Job) -> None:
+        with self._lock:
+            listeners = list(self._listeners.get(job.session_id, []))
+            event = job.to_event()
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.debug("Job listener failed: %s", e)
+
+    # --- lifecycle ---
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    def start(self, session_id: str, kind: str, code: str) -> Job:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"kind 必须是 {' / '.join(JOB_KINDS)}")
+        self._prune()
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.session_id == session_id and j.status == "running")
+            if running >= self.max_running:
+                raise RuntimeError(f"当前会话已有 {running} 个后台任务在运行（上限 {self.max_running}），请等待或取消后再试")
+            job = Job(uuid.uuid4().hex[:8], session_id, kind, code, scope=CancelScope(session_id=session_id))
+            self._jobs[job.id] = job
+        metrics.inc("background_jobs_started_total", kind=kind)
+        self._notify(job)
+        threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True).start()
+        return job
+
+    def _on_output(self, job: Job, stream: str, text: str) -> None:
+        progress = _PROGRESS_RE.findall(text)
+        with self._lock:
+            job.output_chars += len(text)
+            job.tail = (job.tail + text)[-PARTIAL_CHARS:]
+            if progress:
+                job.progress = progress[-1]
+
+    def _run(self, job: Job) -> None:
+        # The job's own scope: cancelling a turn leaves it alone, job_cancel kills it.
+        token = bind_scope(job.scope)
+        limits = dataclasses.replace(ExecLimits.from_env(), cpu_seconds=0)
+        try:
+            if job.kind == "python":
+                args, shell, env = [sys.executable, "-c", job.code], False, {**os.environ, "PYTHONUNBUFFERED": "1"}
+            else:
+                args, shell, env = job.code, True, _get_venv_env()
+            result = run_process(
+                args, timeout=self.timeout, shell=shell, env=env, max_chars=self.max_chars,
+                on_output=lambda stream, text: self._on_output(job, stream, text), limits=limits,
+            )
+        except Exception as e:
+            logger.warning("Background job %s failed to run: %s", job.id, e)
+            result, job.error = None, str(e)
+        finally:
+            reset_scope(token)
+        with self._lock:
+            job.result = result
+            job.finished_at = time.time()
+            if result is None:
+                job.status = "failed"
+            elif result.timed_out:
+                job.status = "timed_out"
+            elif result.cancelled:
+                job.status = "cancelled"
+            else:
+                job.status = "succeeded" if result.returncode == 0 else "failed"
+        job.done.set()
+        metrics.inc("background_jobs_finished_total", status=job.status)
+        metrics.observe("background_job_seconds", job.elapsed_seconds, kind=job.kind)
+        self._notify(job)
+
+    def get(self, session_id: str, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id.strip())
+        return job if job is not None and job.session_id == session_id else None
+
+    def list(self, session_id: str) -> list[Job]:
+        self._prune()
+        with self._lock:
+            return sorted((j for j in self._jobs.values() if j.session_id == session_id), key=lambda j: j.started_at)
+
+    def cancel(self, session_id: str, job_id: str) -> bool:
+        job = self.get(session_id, job_id)
+        if job is None or job.status != "running":
+            return False
+        job.scope.cancel()
+        return True
+
+    def shutdown(self) -> None:
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j.status == "running"]
+        for job in jobs:
+            job.scope.cancel()
+
+    def status(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            "enabled": jobs_enabled(),
+            "running": sum(1 for j in jobs if j.status == "running"),
+            "finished": sum(1 for j in jobs if j.status != "running"),
+        }
+
+
+_manager: JobManager | None = None
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
+
+
+def _describe(job: Job) -> str:
+    line = f"任务 {job.id}（{job.kind}）：{job.status}，已运行 {job.elapsed_seconds} 秒，输出 {job.output_chars} 字符"
+    if job.progress:
+        line += f"，进度：{job.progress}"
+    return line
+
+
+@tool
+def job_start(kind: str, code: str) -> str:
+    """在后台启动一个长时间运行的任务并立即返回任务 ID，不阻塞对话。kind 为 "python"（code 是 Python 代码）或 "shell"（code 是 shell 命令）。适用于大量计算、大文件下载等超过普通执行超时的工作；启动后可继续做其他事，用 job_status 查看进度，用 job_collect 获取结果。代码中打印 "PROGRESS: 40%" 这样的行可汇报进度。"""
+    if kind == "shell" and (error := _check_command(code)):
+        return error
+    try:
+        job = get_job_manager().start(current_session_id(), kind, code)
+    except (ValueError, RuntimeError) as e:
+        return f"错误：{e}"
+    return f"后台任务已启动，任务 ID：{job.id}。可继续其他工作，稍后用 job_status / job_collect 查询"
+
+
+@tool
+def job_status(job_id: str = "") -> str:
+    """查看后台任务的状态、进度和最近的部分输出。不传 job_id 时列出当前会话的所有后台任务。"""
+    manager = get_job_manager()
+    session_id = current_session_id()
+    if not job_id.strip():
+        jobs = manager.list(session_id)
+        if not jobs:
+            return "当前会话没有后台任务"
+        return "\n".join(_describe(j) + ("" if j.collected or j.status == "running" else "（结果未取）") for j in jobs)
+    job = manager.get(session_id, job_id)
+    if job is None:
+        return f"错误：找不到后台任务 {job_id}"
+    output = _describe(job)
+    if job.tail:
+        output += f"\n\n最近输出：\n{job.tail}"
+    if job.status != "running":
+        output += "\n\n任务已结束，用 job_collect 获取完整结果"
+    return output
+
+
+def _format(job: Job) -> tuple[str, dict]:
+    format_result = _format_python if job.kind == "python" else _format_shell
+    content, artifact = format_result(job.result, int(get_job_manager().timeout), ExecLimits.from_env())
+    return f"任务 {job.id}（{job.kind}）：{job.status}，耗时 {job.elapsed_seconds} 秒\n{content}", artifact
+
+
+@tool(response_format="content_and_artifact")
+def job_collect(job_id: str, wait_seconds: int = 0) -> tuple[str, dict]:
+    """获取后台任务的最终结果（输出和退出码）。任务仍在运行时可设置 wait_seconds（最多 60 秒）等待其完成，否则返回当前进度。"""
+    job = get_job_manager().get(current_session_id(), job_id)
+    if job is None:
+        return f"错误：找不到后台任务 {job_id}", {}
+    if wait_seconds > 0:
+        job.done.wait(min(wait_seconds, 60))
+    if job.status == "running":
+        return f"{_describe(job)}\n任务仍在运行，请稍后再取结果", {}
+    job.collected = True
+    if job.result is None:
+        return f"错误：后台任务 {job.id} 启动失败 - {job.error}", {}
+    return _format(job)
+
+
+@tool
+def job_cancel(job_id: str) -> str:
+    """取消一个正在运行的后台任务，终止其所有进程。"""
+    if get_job_manager().cancel(current_session_id(), job_id):
+        return f"后台任务 {job_id} 已取消"
+    return f"错误：后台任务 {job_id} 不存在或已结束"
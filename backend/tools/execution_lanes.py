@@ -0,0 +1,146 @@
+"""Execution lanes: separate concurrency limits for fast and slow tools.
+
+LangChain runs sync tools on the event loop's default executor, so a few
+long subprocess runs from busy sessions could occupy every thread and delay
+unrelated fast tools like ``read_skill_doc``. Each lane has its own
+concurrency limit, its own thread pool for sync work, and queue metrics
+(``tool_lane_waiting``/``tool_lane_running`` gauges, ``tool_lane_wait_seconds``).
+
+- ``fast``: in-process tools (file and skill reads, kernel reset).
+- ``slow``: subprocess tools and blocking network I/O.
+
+``TOOL_FAST_LANE_CONCURRENCY`` / ``TOOL_SLOW_LANE_CONCURRENCY`` set the limits.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from agent.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Tools not listed here run in the fast lane.
+TOOL_LANES = {
+    "python_executor": "slow",
+    "shell_executor": "slow",
+    "python_kernel": "slow",
+    # Can wait up to a minute for a background job to finish.
+    "job_collect": "slow",
+    # In-process but can block on the network for tens of seconds.
+    "web_fetch": "slow",
+    "web_search": "slow",
+}
+
+
+class ExecutionLane:
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self._executor = ThreadPoolExecutor(self.max_concurrent, thread_name_prefix=f"lane-{name}")
+        self._lock = threading.Lock()
+        self._semaphores: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self.waiting = 0
+        self.running = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sem = self._semaphores.get(loop)
+            if sem is None:
+                # One per event loop (tests and uvicorn workers may run several).
+                self._semaphores = {l: s for l, s in self._semaphores.items() if not l.is_closed()}
+                sem = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+        return sem
+
+    def _publish(self) -> None:
+        metrics.set_gauge("tool_lane_waiting", self.waiting, lane=self.name)
+        metrics.set_gauge("tool_lane_running", self.running, lane=self.name)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one of the lane's concurrency slots."""
+        start = time.perf_counter()
+        self.waiting += 1
+        self._publish()
+        try:
+            await self._semaphore().acquire()
+        finally:
+            self.waiting -= 1
+        metrics.observe("tool_lane_wait_seconds", time.perf_counter() - start, lane=self.name)
+        metrics.inc("tool_lane_calls_total", lane=self.name)
+        self.running += 1
+        self._publish()
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._semaphore().release()
+            self._publish()
+
+    async def run_in_executor(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run blocking work on the lane's own threads (context variables preserved)."""
+        ctx = contextvars.copy_context()
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def run_sync(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        async with self.slot():
+            return await self.run_in_executor(func, *args, **kwargs)
+
+    def status(self) -> dict:
+        return {"max_concurrent": self.max_concurrent, "waiting": self.waiting, "running": self.running}
+
+
+_lanes: dict[str, ExecutionLane] = {}
+_lanes_lock = threading.Lock()
+
+
+def get_lane(name: str) -> ExecutionLane:
+    with _lanes_lock:
+        lane = _lanes.get(name)
+        if lane is None:
+            default = "16" if name == "fast" else "8"
+            limit = int(os.getenv(f"TOOL_{name.upper()}_LANE_CONCURRENCY", default))
+            lane = _lanes[name] = ExecutionLane(name, limit)
+        return lane
+
+
+def lanes_status() -> dict:
+    with _lanes_lock:
+        lanes = dict(_lanes)
+    return {name: lane.status() for name, lane in lanes.items()}
+
+
+def with_lane(tool: BaseTool, lane_name: str | None = None) -> BaseTool:
+    """Return a copy of ``tool`` whose async path runs inside its lane.
+
+    Tools with a native coroutine just wait for a slot; sync-only tools also
+    run on the lane's threads instead of the default executor.
+    """
+    if not isinstance(tool, StructuredTool):
+        return tool
+    lane = get_lane(lane_name or TOOL_LANES.get(tool.name, "fast"))
+    coroutine, func = tool.coroutine, tool.func
+
+    if coroutine is not None:
+        async def _laned(*args: Any, **kwargs: Any) -> Any:
+            async with lane.slot():
+                return await coroutine(*args, **kwargs)
+    elif func is not None:
+        async def _laned(*args: Any, **kwargs: Any) -> Any:
+            return await lane.run_sync(func, *args, **kwargs)
+    else:
+        return tool
+    return tool.model_copy(update={"coroutine": _laned})
@@ -0,0 +1,196 @@
+"""Bounded capture of subprocess output.
+
+``BoundedOutput`` keeps the first and last ``max_chars / 2`` characters of a
+stream in memory. Once output overflows, everything (head, middle, and tail
+on close) is written to a spill file under ``TOOL_OUTPUT_SPILL_DIR``, so a
+chatty process uses constant memory and the full log stays readable with
+``read_file``. Spill files are pruned when new ones are created: those older
+than ``TOOL_OUTPUT_SPILL_MAX_AGE_SECONDS`` go first, then the oldest until the
+directory fits in ``TOOL_OUTPUT_SPILL_MAX_MB``.
+
+A buffer is filled by a reader thread and read by the caller, so its state is
+guarded by a lock. After ``close`` further writes are dropped: a reader still
+blocked on a pipe held open by a background child cannot change (or write to
+the finished spill file of) a result that was already taken.
+"""
+
+from __future__ import annotations
+
+import codecs
+import io
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Callable, TextIO
+
+from agent.metrics import metrics
+
+DEFAULT_SPILL_DIR = Path(__file__).resolve().parent.parent / "output" / "tool_logs"
+# Pruning lists the directory, so do it at most this often per process.
+PRUNE_INTERVAL_SECONDS = 60.0
+
+_prune_lock = threading.Lock()
+_last_prune: dict[Path, float] = {}
+
+
+def prune_spill_dir(
+    directory: Path, max_age_seconds: float | None = None, max_bytes: int | None = None
+) -> int:
+    """Delete expired spill files, then the oldest ones beyond the size cap. Returns how many were removed."""
+    if max_age_seconds is None:
+        max_age_seconds = float(os.getenv("TOOL_OUTPUT_SPILL_MAX_AGE_SECONDS", "86400"))
+    if max_bytes is None:
+        max_bytes = int(float(os.getenv("TOOL_OUTPUT_SPILL_MAX_MB", "256")) * 1024 * 1024)
+    files = []
+    for path in directory.glob("*.log"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    now = time.time()
+    removed = 0
+    live = []
+    for mtime, size, path in files:
+        if now - mtime > max_age_seconds:
+            path.unlink(missing_ok=True)
+            removed += 1
+        else:
+            live.append((mtime, size, path))
+    total = sum(size for _, size, _ in live)
+    for mtime, size, path in sorted(live):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        metrics.inc("tool_output_spill_removed_total", removed)
+    return removed
+
+
+def _maybe_prune(directory: Path) -> None:
+    now = time.monotonic()
+    with _prune_lock:
+        if now - _last_prune.get(directory, float("-inf")) < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune[directory] = now
+    try:
+        prune_spill_dir(directory)
+    except OSError:
+        pass
+
+
+class BoundedOutput:
+    def __init__(
+        self,
+        max_chars: int,
+        label: str = "output",
+        spill_dir: Path | str | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ):
+        self.head_limit = max(0, max_chars // 2)
+        self.tail_limit = max(0, max_chars - self.head_limit)
+        self.label = label
+        self.spill_dir = Path(spill_dir or os.getenv("TOOL_OUTPUT_SPILL_DIR", "") or DEFAULT_SPILL_DIR)
+        self.on_text = on_text
+        self.total_chars = 0
+        self.spill_path: Path | None = None
+        self._head: list[str] = []
+        self._head_len = 0
+        self._tail: deque[str] = deque()
+        self._tail_len = 0
+        self._spill: TextIO | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+        # Same decoding as text-mode pipes: UTF-8 with replacement, universal newlines.
+        self._decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(errors="replace"), translate=True)
+
+    def write_bytes(self, data: bytes, final: bool = False) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            text = self._decoder.decode(data, final=final)
+            self._append(text)
+        self._notify(text)
+
+    def write(self, text: str) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._append(text)
+        self._notify(text)
+
+    def _notify(self, text: str) -> None:
+        if text and self.on_text is not None:
+            self.on_text(text)
+
+    def _append(self, text: str) -> None:
+        if not text:
+            return
+        self.total_chars += len(text)
+        if self._head_len < self.head_limit:
+            take = text[: self.head_limit - self._head_len]
+            self._head.append(take)
+            self._head_len += len(take)
+            text = text[len(take):]
+            if not text:
+                return
+        self._tail.append(text)
+        self._tail_len += len(text)
+        while self._tail_len > self.tail_limit:
+            overflow = self._tail_len - self.tail_limit
+            first = self._tail[0]
+            if len(first) <= overflow:
+                self._tail.popleft()
+                self._spill_text(first)
+                self._tail_len -= len(first)
+            else:
+                self._tail[0] = first[overflow:]
+                self._spill_text(first[:overflow])
+                self._tail_len -= overflow
+
+    def _spill_text(self, text: str) -> None:
+        if self._spill is None:
+            try:
+                self.spill_dir.mkdir(parents=True, exist_ok=True)
+                directory = self.spill_dir
+                _maybe_prune(directory)
+            except OSError:
+                directory = Path(tempfile.gettempdir())
+            self.spill_path = directory / f"{self.label}_{uuid.uuid4().hex[:12]}.log"
+            self._spill = open(self.spill_path, "w", encoding="utf-8")
+            self._spill.write("".join(self._head))
+        self._spill.write(text)
+
+    @property
+    def omitted_chars(self) -> int:
+        return self.total_chars - self._head_len - self._tail_len
+
+    def close(self) -> None:
+        """Flush the decoder and finish the spill file (it then holds the full output).
+        Idempotent; later writes are ignored."""
+        with self._lock:
+            if self._closed:
+                return
+            text = self._decoder.decode(b"", final=True)
+            self._append(text)
+            if self._spill is not None and not self._spill.closed:
+                self._spill.write("".join(self._tail))
+                self._spill.close()
+            self._closed = True
+        self._notify(text)
+
+    def getvalue(self) -> str:
+        with self._lock:
+            head = "".join(self._head)
+            tail = "".join(self._tail)
+            omitted = self.omitted_chars
+        if not omitted:
+            return head + tail
+        marker = f"\n\n... [中间 {omitted} 字符已省略，完整输出见 {self.spill_path}] ...\n\n"
+        return head + marker + tail
@@ -0,0 +1,201 @@
+"""Subprocess execution shared by python_executor and shell_executor.
+
+Each command runs in its own process group so a timeout or a user cancel can
+kill the whole tree (e.g. a shell pipeline or a Python script that spawned
+children), not just the direct child.
+
+stdout/stderr are read incrementally into ``BoundedOutput`` buffers (head and
+tail kept, middle spilled to a file) and, when the agent is streaming, sent
+to the client as they arrive.
+
+``run_process_async`` is the asyncio-subprocess variant used by the async
+tool implementations: waiting on the child does not hold a thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from typing import IO
+
+from agent.cancellation import current_scope, kill_process_group
+from agent.tool_stream import OutputCallback, current_output_callback
+from tools.output_buffer import BoundedOutput
+from tools.resource_limits import ExecLimits, plan_launch
+
+DEFAULT_MAX_CHARS = 50000
+READ_CHUNK = 65536
+# How long to keep draining pipes after the process exits (background children may hold them open).
+DRAIN_TIMEOUT = 5.0
+
+
+@dataclass
+class ProcessResult:
+    stdout: str = ""
+    stderr: str = ""
+    returncode: int | None = None
+    timed_out: bool = False
+    cancelled: bool = False
+    # peak_rss_mb / cpu_seconds / wall_seconds (see tools.resource_limits)
+    usage: dict = field(default_factory=dict)
+    limit_exceeded: str | None = None  # "memory" | "cpu"
+
+
+def _finish(out_buf: BoundedOutput, err_buf: BoundedOutput, returncode: int | None, plan, limits: ExecLimits | None,
+            timed_out: bool, cancelled: bool) -> ProcessResult:
+    usage, exceeded = plan.collect(returncode)
+    stderr = err_buf.getvalue()
+    if exceeded is None and limits is not None and limits.memory_mb and returncode and "MemoryError" in stderr[-2000:]:
+        exceeded = "memory"
+    return ProcessResult(out_buf.getvalue(), stderr, returncode, timed_out=timed_out, cancelled=cancelled,
+                         usage=usage, limit_exceeded=exceeded)
+
+
+def make_buffers(max_chars: int, on_output: OutputCallback | None) -> tuple[BoundedOutput, BoundedOutput]:
+    def _forward(stream: str):
+        return (lambda text: on_output(stream, text)) if on_output is not None else None
+
+    return (
+        BoundedOutput(max_chars, "stdout", on_text=_forward("stdout")),
+        BoundedOutput(max_chars, "stderr", on_text=_forward("stderr")),
+    )
+
+
+def _pump(pipe: IO[bytes], buffer: BoundedOutput) -> None:
+    try:
+        while True:
+            data = pipe.read1(READ_CHUNK) if hasattr(pipe, "read1") else pipe.read(READ_CHUNK)
+            if not data:
+                break
+            buffer.write_bytes(data)
+    except (OSError, ValueError):
+        pass
+    finally:
+        buffer.close()
+
+
+def run_process(
+    args: list[str] | str,
+    timeout: float,
+    shell: bool = False,
+    env: dict | None = None,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    on_output: OutputCallback | None = None,
+    limits: ExecLimits | None = None,
+) -> ProcessResult:
+    """Run a command to completion, killing its process group on timeout or cancel.
+
+    Each stream keeps at most ``max_chars`` characters in memory. ``on_output``
+    defaults to the live output callback of the tool running in this thread.
+    With ``limits``, the command runs under the resource-limit launcher and the
+    result carries its usage.
+    """
+    scope = current_scope()
+    if on_output is None:
+        on_output = current_output_callback()
+    out_buf, err_buf = make_buffers(max_chars, on_output)
+    plan = plan_launch(args, shell, limits)
+    proc = subprocess.Popen(
+        plan.argv,
+        shell=plan.shell,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env=env,
+        start_new_session=(os.name == "posix"),
+    )
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, out_buf), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, err_buf), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    if scope is not None:
+        scope.register_process(proc)
+    timed_out = False
+    try:
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_group(proc)
+            proc.wait()
+            timed_out = True
+        for reader in readers:
+            reader.join(DRAIN_TIMEOUT)
+        # A reader still blocked on a pipe inherited by a background child must
+        # not touch the buffers while the result is read: close them first.
+        out_buf.close()
+        err_buf.close()
+    finally:
+        if scope is not None:
+            scope.unregister_process(proc)
+    cancelled = not timed_out and scope is not None and scope.cancelled
+    return _finish(out_buf, err_buf, proc.returncode, plan, limits, timed_out, cancelled)
+
+
+async def _pump_async(stream: asyncio.StreamReader, buffer: BoundedOutput) -> None:
+    try:
+        while True:
+            data = await stream.read(READ_CHUNK)
+            if not data:
+                break
+            buffer.write_bytes(data)
+    finally:
+        buffer.close()
+
+
+async def run_process_async(
+    args: list[str] | str,
+    timeout: float,
+    shell: bool = False,
+    env: dict | None = None,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    on_output: OutputCallback | None = None,
+    limits: ExecLimits | None = None,
+) -> ProcessResult:
+    """Async ``run_process``. Task cancellation kills the process group too."""
+    scope = current_scope()
+    if on_output is None:
+        on_output = current_output_callback()
+    out_buf, err_buf = make_buffers(max_chars, on_output)
+    plan = plan_launch(args, shell, limits)
+    kwargs = dict(
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+        start_new_session=(os.name == "posix"),
+    )
+    if plan.shell:
+        proc = await asyncio.create_subprocess_shell(plan.argv, **kwargs)
+    else:
+        proc = await asyncio.create_subprocess_exec(*plan.argv, **kwargs)
+    readers = [
+        asyncio.create_task(_pump_async(proc.stdout, out_buf)),
+        asyncio.create_task(_pump_async(proc.stderr, err_buf)),
+    ]
+    if scope is not None:
+        scope.register_process(proc)
+    timed_out = False
+    try:
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            kill_process_group(proc)
+            await proc.wait()
+            timed_out = True
+        await asyncio.wait(readers, timeout=DRAIN_TIMEOUT)
+        out_buf.close()
+        err_buf.close()
+    except asyncio.CancelledError:
+        kill_process_group(proc)
+        raise
+    finally:
+        for reader in readers:
+            if not reader.done():
+                reader.cancel()
+        if scope is not None:
+            scope.unregister_process(proc)
+    cancelled = not timed_out and scope is not None and scope.cancelled
+    return _finish(out_buf, err_buf, proc.returncode, plan, limits, timed_out, cancelled)
@@ -1,33 +1,87 @@
 import os
-import subprocess
-import sys
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
+from tools.execution_lanes import get_lane
+from tools.process_runner import ProcessResult
+from tools.python_worker_pool import get_python_pool
+from tools.resource_limits import ExecLimits, limit_message
+from tools.result_cache import CachePlan, cache_enabled, get_result_cache
 
-@tool
-def python_executor(code: str) -> str:
-    """在子进程中执行 Python 代码片段并返回标准输出和标准错误。请将完整代码写在一次调用中，包含所有 print 语句来输出结果。不要分多次调用。"""
-    MAX_CHARS = int(os.getenv("PYTHON_EXECUTOR_MAX_CHARS", "50000"))
-    TIMEOUT = int(os.getenv("PYTHON_EXECUTOR_TIMEOUT", "180"))
+
+CACHE_HIT_NOTE = "[缓存结果：代码与引用的文件均未变化，未重新执行；如需强制重新执行请传 no_cache=true]"
+
+
+def _limits() -> tuple[int, int]:
+    return int(os.getenv("PYTHON_EXECUTOR_MAX_CHARS", "50000")), int(os.getenv("PYTHON_EXECUTOR_TIMEOUT", "180"))
+
+
+def _format_result(result: ProcessResult, timeout: int, limits: ExecLimits) -> tuple[str, dict]:
+    """Tool content plus the artifact carrying resource usage."""
+    artifact = {"usage": result.usage}
+    if result.timed_out:
+        return f"错误：代码执行超时（{timeout} 秒）", artifact
+    if result.cancelled:
+        return "错误：代码执行已被用户取消", artifact
+    output = ""
+    if message := limit_message(result.limit_exceeded, limits):
+        output += message + "\n"
+    if result.stdout:
+        output += result.stdout
+    if result.stderr:
+        output += ("\n" if output else "") + result.stderr
+    if not output:
+        output = "(无输出)"
+    return output, artifact
+
+
+def _cache_plan(code: str) -> CachePlan | None:
+    return get_result_cache().plan(code) if cache_enabled() else None
+
+
+def _cached(result: ProcessResult, timeout: int, limits: ExecLimits) -> tuple[str, dict]:
+    content, artifact = _format_result(result, timeout, limits)
+    artifact["cache"] = "hit"
+    return f"{CACHE_HIT_NOTE}\n{content}", artifact
+
+
+def _python_executor(code: str, no_cache: bool = False) -> tuple[str, dict]:
+    """在子进程中执行 Python 代码片段并返回标准输出和标准错误。请将完整代码写在一次调用中，包含所有 print 语句来输出结果。不要分多次调用。若结果来自缓存而你需要重新执行（例如数据在代码未引用的位置发生了变化），传 no_cache=true。"""
+    MAX_CHARS, TIMEOUT = _limits()
+    limits = ExecLimits.from_env()
+    try:
+        plan = _cache_plan(code)
+        # no_cache skips the lookup; the fresh result still replaces the entry.
+        if plan is not None and not no_cache and (hit := get_result_cache().lookup(plan)) is not None:
+            return _cached(hit, TIMEOUT, limits)
+        result = get_python_pool().run(code, timeout=TIMEOUT, max_chars=MAX_CHARS, limits=limits)
+        if plan is not None:
+            get_result_cache().store(plan, result)
+        return _format_result(result, TIMEOUT, limits)
+    except Exception as e:
+        return f"错误：代码执行失败 - {e}", {}
+
+
+async def _apython_executor(code: str, no_cache: bool = False) -> tuple[str, dict]:
+    MAX_CHARS, TIMEOUT = _limits()
+    limits = ExecLimits.from_env()
+    # Cache hashing and file I/O run on the slow lane's threads, not the default executor.
+    lane = get_lane("slow")
     try:
-        result = subprocess.run(
-            [sys.executable, "-c", code],
-            capture_output=True,
-            text=True,
-            timeout=TIMEOUT,
-        )
-        output = ""
-        if result.stdout:
-            output += result.stdout
-        if result.stderr:
-            output += ("\n" if output else "") + result.stderr
-        if not output:
-            output = "(无输出)"
-        if len(output) > MAX_CHARS:
-            output = output[:MAX_CHARS] + f"\n\n... [输出已截断，仅显示前 {MAX_CHARS} 字符]"
-        return output
-    except subprocess.TimeoutExpired:
-        return f"错误：代码执行超时（{TIMEOUT} 秒）"
+        plan = await lane.run_in_executor(_cache_plan, code)
+        if plan is not None and not no_cache and (hit := await lane.run_in_executor(get_result_cache().lookup, plan)) is not None:
+            return _cached(hit, TIMEOUT, limits)
+        result = await get_python_pool().run_async(code, timeout=TIMEOUT, max_chars=MAX_CHARS, limits=limits)
+        if plan is not None:
+            await lane.run_in_executor(get_result_cache().store, plan, result)
+        return _format_result(result, TIMEOUT, limits)
     except Exception as e:
-        return f"错误：代码执行失败 - {e}"
+        return f"错误：代码执行失败 - {e}", {}
+
+
+python_executor = StructuredTool.from_function(
+    func=_python_executor,
+    coroutine=_apython_executor,
+    name="python_executor",
+    response_format="content_and_artifact",
+)
@@ -0,0 +1,273 @@
+"""Stateful per-session Python kernels (opt-in, ``PYTHON_KERNEL_ENABLED``).
+
+``python_executor`` starts every call from an empty namespace, so follow-up
+questions re-read and re-parse the same files. A kernel is a long-lived
+worker process bound to one conversation whose globals persist across calls
+and turns, so DataFrames loaded once stay hot.
+
+Limits:
+- ``PYTHON_KERNEL_MEMORY_MB``: RSS is sampled while code runs; a kernel that
+  exceeds it is killed and its state discarded.
+- ``PYTHON_KERNEL_IDLE_SECONDS``: kernels unused for this long are reaped.
+- ``PYTHON_KERNEL_MAX_SESSIONS``: when exceeded, the least recently used
+  kernel is shut down to make room.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import dataclasses
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from langchain_core.tools import tool
+
+from agent.cancellation import current_scope
+from agent.metrics import metrics
+from tools.process_runner import DEFAULT_MAX_CHARS, ProcessResult
+from tools.python_worker_pool import _Worker, get_python_pool
+from tools.resource_limits import ExecLimits, limit_message
+
+logger = logging.getLogger(__name__)
+
+
+def kernels_enabled() -> bool:
+    return os.getenv("PYTHON_KERNEL_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _process_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class _KernelProcess(_Worker):
+    """Worker whose namespace persists; watches its own RSS while code runs."""
+
+    def __init__(self, preload: list[str], memory_limit_bytes: int):
+        super().__init__(preload)
+        self.memory_limit_bytes = memory_limit_bytes
+        self.memory_exceeded = False
+        self.last_used = time.monotonic()
+
+    def _limit_exceeded(self) -> bool:
+        if self.memory_limit_bytes and _process_rss(self.proc.pid) > self.memory_limit_bytes:
+            self.memory_exceeded = True
+        return self.memory_exceeded
+
+
+class KernelManager:
+    def __init__(
+        self,
+        memory_mb: float | None = None,
+        idle_seconds: float | None = None,
+        max_sessions: int | None = None,
+    ):
+        self.memory_limit_bytes = int((memory_mb or float(os.getenv("PYTHON_KERNEL_MEMORY_MB", "2048"))) * 1024 * 1024)
+        self.idle_seconds = idle_seconds or float(os.getenv("PYTHON_KERNEL_IDLE_SECONDS", "1800"))
+        self.max_sessions = max_sessions or max(1, int(os.getenv("PYTHON_KERNEL_MAX_SESSIONS", "8")))
+        self._lock = threading.Lock()
+        self._kernels: dict[str, _KernelProcess] = {}
+        # Calls within one session run one at a time. A lock lives while the
+        # session has a kernel or a call holds or waits for it.
+        self._session_locks: dict[str, threading.Lock] = {}
+        self._users: Counter[str] = Counter()
+        self._reaper: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def _session(self, session_id: str):
+        with self._lock:
+            self._users[session_id] += 1
+            lock = self._session_locks.setdefault(session_id, threading.Lock())
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._users[session_id] -= 1
+                if not self._users[session_id]:
+                    del self._users[session_id]
+                    if session_id not in self._kernels:
+                        self._session_locks.pop(session_id, None)
+
+    def _get_or_start(self, session_id: str) -> tuple[_KernelProcess, bool]:
+        with self._lock:
+            kernel = self._kernels.get(session_id)
+            if kernel is not None and kernel.alive:
+                return kernel, False
+            self._kernels.pop(session_id, None)
+            evict = []
+            while len(self._kernels) >= self.max_sessions:
+                lru = min(self._kernels, key=lambda sid: self._kernels[sid].last_used)
+                evict.append(self._kernels.pop(lru))
+                if lru not in self._users:
+                    self._session_locks.pop(lru, None)
+        for old in evict:
+            old.kill()
+            metrics.inc("python_kernel_reaped_total", reason="capacity")
+        kernel = _KernelProcess(get_python_pool().preload_modules(), self.memory_limit_bytes)
+        if not kernel.wait_ready():
+            kernel.kill()
+            raise RuntimeError("Python 内核启动失败")
+        with self._lock:
+            self._kernels[session_id] = kernel
+        metrics.inc("python_kernel_started_total")
+        self._ensure_reaper()
+        return kernel, True
+
+    def run(
+        self,
+        session_id: str,
+        code: str,
+        timeout: float,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        limits: ExecLimits | None = None,
+    ) -> tuple[ProcessResult, dict]:
+        """Run code in the session's kernel. Returns the result and kernel info
+        (``started``: a new kernel was created; ``memory_exceeded``: it was killed).
+
+        Only the CPU part of ``limits`` applies: kernel memory is governed by
+        ``PYTHON_KERNEL_MEMORY_MB`` across calls, not per snippet."""
+        if limits is not None:
+            limits = dataclasses.replace(limits, memory_mb=0)
+        with self._session(session_id):
+            kernel, started = self._get_or_start(session_id)
+            kernel.last_used = time.monotonic()
+            try:
+                result = kernel.run(code, timeout, persistent=True, max_chars=max_chars, limits=limits)
+            finally:
+                kernel.last_used = time.monotonic()
+            info = {"started": started, "memory_exceeded": kernel.memory_exceeded}
+            if not kernel.alive:
+                # Timeout, cancel, memory limit or crash: the namespace is gone.
+                self._discard(session_id, kernel)
+                if kernel.memory_exceeded:
+                    metrics.inc("python_kernel_reaped_total", reason="memory")
+            return result, info
+
+    def _discard(self, session_id: str, kernel: _KernelProcess) -> None:
+        with self._lock:
+            if self._kernels.get(session_id) is kernel:
+                del self._kernels[session_id]
+        kernel.kill()
+
+    def reset(self, session_id: str) -> bool:
+        """Shut down the session's kernel. Returns whether one was running.
+        Waits for a call already running in the session to finish."""
+        with self._session(session_id):
+            with self._lock:
+                kernel = self._kernels.pop(session_id, None)
+            if kernel is None:
+                return False
+            kernel.kill()
+        metrics.inc("python_kernel_reaped_total", reason="reset")
+        return True
+
+    def reap_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [
+                sid for sid, k in self._kernels.items()
+                if (k.last_used < cutoff or not k.alive) and sid not in self._users
+            ]
+            kernels = [self._kernels.pop(sid) for sid in idle]
+            for sid in idle:
+                self._session_locks.pop(sid, None)
+        for kernel in kernels:
+            kernel.kill()
+            metrics.inc("python_kernel_reaped_total", reason="idle")
+        return len(kernels)
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while not self._stop.wait(interval):
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.warning("Python kernel reaper failed: %s", e)
+
+    def _ensure_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="python-kernel-reaper", daemon=True)
+                self._reaper.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            kernels, self._kernels = list(self._kernels.values()), {}
+        for kernel in kernels:
+            kernel.kill()
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            sessions = {
+                sid: {"runs": k.runs, "rss": k.rss, "idle_seconds": round(now - k.last_used, 1)}
+                for sid, k in self._kernels.items()
+            }
+        return {"enabled": kernels_enabled(), "memory_limit_mb": self.memory_limit_bytes // (1024 * 1024), "kernels": sessions}
+
+
+_manager: KernelManager | None = None
+
+
+def get_kernel_manager() -> KernelManager:
+    global _manager
+    if _manager is None:
+        _manager = KernelManager()
+    return _manager
+
+
+def current_session_id() -> str:
+    scope = current_scope()
+    return (scope.session_id if scope is not None else None) or "default"
+
+
+@tool(response_format="content_and_artifact")
+def python_kernel(code: str) -> tuple[str, dict]:
+    """在当前会话的持久 Python 内核中执行代码。变量、导入和已加载的 DataFrame 会在多次调用和多轮对话间保留，后续提问可直接复用，无需重新读取文件。用 print 输出结果。"""
+    MAX_CHARS = int(os.getenv("PYTHON_EXECUTOR_MAX_CHARS", "50000"))
+    TIMEOUT = int(os.getenv("PYTHON_EXECUTOR_TIMEOUT", "180"))
+    limits = ExecLimits.from_env()
+    manager = get_kernel_manager()
+    try:
+        result, info = manager.run(current_session_id(), code, timeout=TIMEOUT, max_chars=MAX_CHARS, limits=limits)
+    except Exception as e:
+        return f"错误：代码执行失败 - {e}", {}
+    artifact = {"usage": result.usage}
+    if result.timed_out:
+        return f"错误：代码执行超时（{TIMEOUT} 秒），内核已重置，之前的变量已丢失", artifact
+    if result.cancelled:
+        return "错误：代码执行已被用户取消，内核已重置，之前的变量已丢失", artifact
+    if info["memory_exceeded"]:
+        limit_mb = manager.memory_limit_bytes // (1024 * 1024)
+        return f"错误：内核内存超过上限（{limit_mb} MB），已重置，之前的变量已丢失。请分块读取或只加载需要的列", artifact
+    output = ""
+    if info["started"]:
+        output += "[新内核已启动，之前的变量不存在]\n"
+    if message := limit_message(result.limit_exceeded, limits):
+        output += message + "\n"
+    if result.stdout:
+        output += result.stdout
+    if result.stderr:
+        output += ("\n" if output else "") + result.stderr
+    if result.returncode not in (0, None) and not output:
+        output = f"(内核已退出，退出码 {result.returncode}，之前的变量已丢失)"
+    if not output:
+        output = "(无输出)"
+    return output, artifact
+
+
+@tool
+def python_kernel_reset() -> str:
+    """重置当前会话的持久 Python 内核，清除所有变量并释放内存。"""
+    if get_kernel_manager().reset(current_session_id()):
+        return "内核已重置，所有变量已清除"
+    return "当前会话没有运行中的内核"
@@ -0,0 +1,427 @@
+"""Pool of warm Python worker processes for python_executor.
+
+Starting ``python -c`` and importing pandas/duckdb/matplotlib costs 1–3 s per
+call. The pool keeps ``PYTHON_WORKER_POOL_SIZE`` workers alive with the common
+analysis modules already imported; each snippet still runs in a fresh
+namespace with the same stdout/stderr/timeout contract as a cold subprocess.
+
+Preloaded modules are ``PYTHON_WORKER_PRELOAD`` plus the most frequently
+imported third-party modules seen in past snippets (persisted to
+``memory/python_worker_imports.json``, written at most once a minute and at
+shutdown). Workers are recycled after
+``PYTHON_WORKER_MAX_RUNS`` snippets or once RSS exceeds
+``PYTHON_WORKER_MAX_RSS_MB``; when every worker is busy, calls fall back to a
+cold subprocess instead of queueing.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from agent.cancellation import current_scope, kill_process_group
+from agent.metrics import metrics
+from agent.tool_stream import OutputCallback, current_output_callback
+from tools.execution_lanes import get_lane
+from tools.process_runner import DEFAULT_MAX_CHARS, ProcessResult, make_buffers, run_process, run_process_async
+from tools.resource_limits import SIGXCPU, ExecLimits
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / "_python_worker.py"
+IMPORT_STATS_FILE = Path(__file__).resolve().parent.parent / "memory" / "python_worker_imports.json"
+DEFAULT_PRELOAD = "pandas,numpy,matplotlib.pyplot,duckdb"
+READY_TIMEOUT = 60.0
+# How often output files are tailed (and limits checked) while a snippet runs.
+TICK_INTERVAL = 0.1
+
+# Learned import counts are written at most this often (and at shutdown).
+IMPORT_STATS_FLUSH_SECONDS = 60.0
+
+_IMPORT_RE = re.compile(r"^\s*(?:import|from)\s+([A-Za-z_][\w]*)", re.MULTILINE)
+
+
+class _ProtocolError(Exception):
+    """The worker sent something that is not a protocol message."""
+
+
+class _Worker:
+    def __init__(self, preload: list[str]):
+        env = os.environ.copy()
+        env["MYCLAW_WORKER_PRELOAD"] = json.dumps(preload)
+        # Unbuffered so prints reach the output files (and the client) as they happen.
+        env["PYTHONUNBUFFERED"] = "1"
+        self.proc = subprocess.Popen(
+            [sys.executable, str(WORKER_SCRIPT)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            env=env,
+            start_new_session=(os.name == "posix"),
+        )
+        self.runs = 0
+        self.rss = 0
+        self.preloaded: list[str] = []
+        self.broken = False
+        self._lines: queue.Queue[str | None] = queue.Queue()
+        threading.Thread(target=self._pump, name=f"py-worker-{self.proc.pid}", daemon=True).start()
+
+    def _pump(self) -> None:
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def _read_message(self, timeout: float) -> dict | None:
+        """Next protocol message, or None if the worker died. Raises queue.Empty on timeout."""
+        line = self._lines.get(timeout=timeout)
+        if line is None:
+            return None
+        try:
+            msg = json.loads(line)
+        except ValueError as e:
+            raise _ProtocolError(f"invalid worker message {line[:200]!r}") from e
+        if not isinstance(msg, dict):
+            raise _ProtocolError(f"invalid worker message {line[:200]!r}")
+        return msg
+
+    def wait_ready(self, timeout: float = READY_TIMEOUT) -> bool:
+        try:
+            msg = self._read_message(timeout)
+        except (queue.Empty, _ProtocolError):
+            return False
+        if not msg or not msg.get("ready"):
+            return False
+        self.preloaded = msg.get("preloaded", [])
+        return True
+
+    @property
+    def alive(self) -> bool:
+        return not self.broken and self.proc.poll() is None
+
+    def kill(self) -> None:
+        self.broken = True
+        kill_process_group(self.proc)
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+
+    def _limit_exceeded(self) -> bool:
+        """Checked while code runs; returning True kills the worker. Overridden by kernels."""
+        return False
+
+    def _wait_reply(self, timeout: float, on_tick) -> dict | None:
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise queue.Empty
+            try:
+                return self._read_message(min(TICK_INTERVAL, remaining))
+            except queue.Empty:
+                pass
+            on_tick()
+            if self._limit_exceeded():
+                self.kill()
+                return None
+
+    def run(
+        self,
+        code: str,
+        timeout: float,
+        persistent: bool = False,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        on_output: OutputCallback | None = None,
+        limits: ExecLimits | None = None,
+    ) -> ProcessResult:
+        if on_output is None:
+            on_output = current_output_callback()
+        out_buf, err_buf = make_buffers(max_chars, on_output)
+        fd_out, out_path = tempfile.mkstemp(prefix="myclaw_py_", suffix=".out")
+        fd_err, err_path = tempfile.mkstemp(prefix="myclaw_py_", suffix=".err")
+        os.close(fd_out)
+        os.close(fd_err)
+        # The worker writes to the files at fd level; tail them so output streams while code runs.
+        out_file = open(out_path, "rb")
+        err_file = open(err_path, "rb")
+
+        def _drain() -> None:
+            out_buf.write_bytes(out_file.read())
+            err_buf.write_bytes(err_file.read())
+
+        scope = current_scope()
+        if scope is not None:
+            scope.register_process(self.proc)
+        try:
+            request = {"code": code, "stdout": out_path, "stderr": err_path, "persistent": persistent}
+            if limits is not None:
+                request["limits"] = limits.to_request()
+            start = time.perf_counter()
+            self.proc.stdin.write(json.dumps(request) + "\n")
+            self.proc.stdin.flush()
+            self.runs += 1
+            timed_out = protocol_error = False
+            try:
+                reply = self._wait_reply(timeout, _drain)
+            except queue.Empty:
+                self.kill()
+                reply, timed_out = None, True
+            except _ProtocolError as e:
+                # Never reuse a worker whose protocol stream is corrupted.
+                logger.warning("Python worker %s protocol error, killing it: %s", self.proc.pid, e)
+                metrics.inc("python_worker_protocol_errors_total")
+                self.kill()
+                reply, protocol_error = None, True
+            _drain()
+            out_buf.close()
+            err_buf.close()
+            usage = {"wall_seconds": round(time.perf_counter() - start, 3)}
+            if timed_out:
+                return ProcessResult(out_buf.getvalue(), err_buf.getvalue(), None, timed_out=True, usage=usage)
+            if protocol_error:
+                stderr = err_buf.getvalue() + "\n错误：Python 工作进程通信异常，已重启该进程，请重试。"
+                return ProcessResult(out_buf.getvalue(), stderr, 1, usage=usage)
+            if reply is None:
+                # The snippet took the worker down (os._exit, crash) or it was killed on cancel.
+                self.broken = True
+                self.proc.wait(timeout=5)
+                cancelled = scope is not None and scope.cancelled
+                exceeded = "cpu" if self.proc.returncode == -SIGXCPU else None
+                return ProcessResult(out_buf.getvalue(), err_buf.getvalue(), self.proc.returncode, cancelled=cancelled,
+                                     usage=usage, limit_exceeded=exceeded)
+            self.rss = int(reply.get("rss", 0))
+            usage.update(reply.get("usage") or {})
+            return ProcessResult(out_buf.getvalue(), err_buf.getvalue(), int(reply.get("exit_code", 0)),
+                                 usage=usage, limit_exceeded=reply.get("exceeded"))
+        finally:
+            if scope is not None:
+                scope.unregister_process(self.proc)
+            out_file.close()
+            err_file.close()
+            for path in (out_path, err_path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+class PythonWorkerPool:
+    def __init__(
+        self,
+        size: int | None = None,
+        max_runs: int | None = None,
+        max_rss_mb: float | None = None,
+        preload: list[str] | None = None,
+        learned_top: int | None = None,
+    ):
+        self.size = size if size is not None else max(0, int(os.getenv("PYTHON_WORKER_POOL_SIZE", "2")))
+        self.max_runs = max_runs or max(1, int(os.getenv("PYTHON_WORKER_MAX_RUNS", "50")))
+        self.max_rss_bytes = int((max_rss_mb or float(os.getenv("PYTHON_WORKER_MAX_RSS_MB", "1024"))) * 1024 * 1024)
+        configured = preload if preload is not None else os.getenv("PYTHON_WORKER_PRELOAD", DEFAULT_PRELOAD).split(",")
+        self.configured_preload = [m.strip() for m in configured if m.strip()]
+        self.learned_top = learned_top if learned_top is not None else int(os.getenv("PYTHON_WORKER_LEARNED_TOP", "5"))
+        self._lock = threading.Lock()
+        self._idle: list[_Worker] = []
+        self._total = 0
+        self._import_counts: Counter[str] = Counter(self._load_import_stats())
+        self._imports_dirty = False
+        self._imports_flushed_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    # --- preload learning ---
+
+    @staticmethod
+    def _load_import_stats() -> dict[str, int]:
+        try:
+            return json.loads(IMPORT_STATS_FILE.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _record_imports(self, code: str) -> None:
+        stdlib = getattr(sys, "stdlib_module_names", frozenset())
+        names = {m for m in _IMPORT_RE.findall(code) if m not in stdlib and m != "__future__"}
+        if not names:
+            return
+        with self._lock:
+            self._import_counts.update(names)
+            self._imports_dirty = True
+            due = time.monotonic() - self._imports_flushed_at >= IMPORT_STATS_FLUSH_SECONDS
+        if due:
+            self.flush_import_stats()
+
+    def flush_import_stats(self) -> None:
+        """Persist learned import counts if they changed since the last write."""
+        with self._lock:
+            if not self._imports_dirty:
+                return
+            snapshot = dict(self._import_counts)
+            self._imports_dirty = False
+            self._imports_flushed_at = time.monotonic()
+        try:
+            IMPORT_STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            IMPORT_STATS_FILE.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+        except OSError as e:
+            logger.debug("Failed to persist worker import stats: %s", e)
+
+    def preload_modules(self) -> list[str]:
+        modules = list(self.configured_preload)
+        with self._lock:
+            learned = [m for m, _ in self._import_counts.most_common(self.learned_top)]
+        for name in learned:
+            if not any(m == name or m.startswith(name + ".") for m in modules):
+                modules.append(name)
+        return modules
+
+    # --- worker lifecycle ---
+
+    def _spawn(self) -> _Worker | None:
+        start = time.perf_counter()
+        worker = _Worker(self.preload_modules())
+        if not worker.wait_ready():
+            logger.warning("Python worker %s failed to start", worker.proc.pid)
+            worker.kill()
+            return None
+        metrics.observe("python_worker_spawn_seconds", time.perf_counter() - start)
+        logger.info("Python worker %s ready, preloaded %s", worker.proc.pid, worker.preloaded)
+        return worker
+
+    def _spawn_into_pool(self) -> None:
+        worker = self._spawn()
+        with self._lock:
+            if worker is None:
+                self._total -= 1
+            else:
+                self._idle.append(worker)
+
+    def warm(self) -> None:
+        """Fill the pool in background threads (module imports take seconds)."""
+        with self._lock:
+            missing = self.size - self._total
+            self._total += max(0, missing)
+        for _ in range(max(0, missing)):
+            threading.Thread(target=self._spawn_into_pool, name="py-worker-spawn", daemon=True).start()
+
+    def _checkout(self) -> _Worker | None:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    return worker
+                self._total -= 1
+        return None
+
+    def _checkin(self, worker: _Worker) -> None:
+        recycle = (
+            not worker.alive
+            or worker.runs >= self.max_runs
+            or (worker.rss and worker.rss > self.max_rss_bytes)
+        )
+        if not recycle:
+            with self._lock:
+                self._idle.append(worker)
+            return
+        worker.kill()
+        metrics.inc("python_worker_recycled_total")
+        with self._lock:
+            self._total -= 1
+        self.warm()
+
+    def run(
+        self, code: str, timeout: float, max_chars: int = DEFAULT_MAX_CHARS, limits: ExecLimits | None = None
+    ) -> ProcessResult:
+        start = time.perf_counter()
+        worker = self._checkout() if self.enabled else None
+        if worker is None:
+            # Pool disabled, still warming, or saturated: behave like before.
+            if self.enabled:
+                self.warm()
+            env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+            result = run_process(
+                [sys.executable, "-c", code], timeout=timeout, env=env, max_chars=max_chars, limits=limits
+            )
+            metrics.inc("python_executor_runs_total", mode="cold")
+        else:
+            result = self._run_warm(worker, code, timeout, max_chars, limits)
+            metrics.inc("python_executor_runs_total", mode="warm")
+        metrics.observe("python_executor_seconds", time.perf_counter() - start)
+        self._record_imports(code)
+        return result
+
+    def _run_warm(
+        self, worker: _Worker, code: str, timeout: float, max_chars: int, limits: ExecLimits | None = None
+    ) -> ProcessResult:
+        try:
+            return worker.run(code, timeout, max_chars=max_chars, limits=limits)
+        except BaseException:
+            # Unknown state (broken pipe, protocol error): never hand it to another session.
+            worker.kill()
+            raise
+        finally:
+            self._checkin(worker)
+
+    async def run_async(
+        self, code: str, timeout: float, max_chars: int = DEFAULT_MAX_CHARS, limits: ExecLimits | None = None
+    ) -> ProcessResult:
+        """Async ``run``: cold runs use an asyncio subprocess; warm workers speak a
+        blocking pipe protocol, so they are driven from the slow lane's threads."""
+        start = time.perf_counter()
+        worker = self._checkout() if self.enabled else None
+        if worker is None:
+            if self.enabled:
+                self.warm()
+            env = {**os.environ, "PYTHONUNBUFFERED": "1"}
+            result = await run_process_async(
+                [sys.executable, "-c", code], timeout=timeout, env=env, max_chars=max_chars, limits=limits
+            )
+            metrics.inc("python_executor_runs_total", mode="cold")
+        else:
+            try:
+                result = await get_lane("slow").run_in_executor(
+                    self._run_warm, worker, code, timeout, max_chars, limits
+                )
+            except asyncio.CancelledError:
+                # The thread finishes (and checks the worker in) once the worker is gone.
+                worker.kill()
+                raise
+            metrics.inc("python_executor_runs_total", mode="warm")
+        metrics.observe("python_executor_seconds", time.perf_counter() - start)
+        self._record_imports(code)
+        return result
+
+    def shutdown(self) -> None:
+        self.flush_import_stats()
+        with self._lock:
+            workers, self._idle = self._idle, []
+            self._total = 0
+        for worker in workers:
+            worker.kill()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "idle": len(self._idle), "total": self._total}
+
+
+_pool: PythonWorkerPool | None = None
+
+
+def get_python_pool() -> PythonWorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = PythonWorkerPool()
+    return _pool
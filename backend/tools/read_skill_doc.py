@@ -1,6 +1,7 @@
 from langchain_core.tools import tool
 
 from agent.skill_loader import get_skill_loader
+from tools.skill_tools import skill_tool_name
 
 
 @tool
@@ -14,7 +15,12 @@ def read_skill_doc(skill_name: str) -> str:
     if doc is None:
         available = [s.name for s in loader.loaded_skills]
         return f"错误：Skill '{skill_name}' 不存在。可用的 skills: {available}"
-    return f"=== Skill '{skill_name}' 文档 ===\n\n{doc}"
+    output = f"=== Skill '{skill_name}' 文档 ===\n\n{doc}"
+    skill = loader.catalog.get(skill_name)
+    if skill is not None and skill.commands:
+        names = ", ".join(f"`{skill_tool_name(skill.name, c.name)}`" for c in skill.commands)
+        output += f"\n\n注意：本 Skill 的脚本命令已注册为工具，请直接调用 {names}，无需通过 shell_executor 执行脚本。"
+    return output
 
 
 @tool
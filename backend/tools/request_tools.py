@@ -0,0 +1,22 @@
+from langchain_core.tools import tool
+
+from agent.tool_router import resolve_tool_request, tool_group
+
+
+@tool
+def request_tools(tools: str) -> str:
+    """当完成任务需要的工具不在当前可用工具列表中时，调用此工具申请开放更多工具，开放后从下一步起即可直接调用。
+    参数 tools 为逗号分隔的工具名或工具组名：web（网页搜索与抓取）、browser（浏览器操作）、kernel（有状态 Python 内核）、
+    jobs（后台任务）、skill（Skill 脚本命令）、已接入 MCP 服务的 id（其工具名形如 <id>__<工具名>），或 all（全部工具）。"""
+    from tools import get_all_tools
+
+    available = get_all_tools()
+    names, unknown = resolve_tool_request(tools, available)
+    if not names:
+        groups = sorted({g for t in available if (g := tool_group(t))})
+        return f"错误：未知的工具或工具组 {unknown}。可用工具组：{groups}；可用工具：{[t.name for t in available]}"
+    lines = ["已开放以下工具，下一步起可直接调用："]
+    lines += [f"- {t.name}：{t.description.strip().splitlines()[0]}" for t in available if t.name in names]
+    if unknown:
+        lines.append(f"（未识别：{', '.join(unknown)}）")
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+"""Per-run resource limits and usage accounting for code-executing tools.
+
+Limits (0 disables):
+- ``EXEC_MEMORY_LIMIT_MB``: address-space limit (RLIMIT_AS), or ``memory.max``
+  when a cgroup v2 root is available.
+- ``EXEC_CPU_LIMIT_SECONDS``: CPU time limit (RLIMIT_CPU).
+- ``EXEC_CGROUP_ROOT``: a delegated, writable cgroup v2 directory. Each run gets
+  a child cgroup, which also makes peak memory and CPU time include every
+  descendant process. Without it, rlimits and ``wait4`` rusage are used.
+
+Cold subprocesses and persistent shell sessions are started through
+``_exec_launcher.py`` (a session's commands inherit its shell's limits); warm
+Python workers apply the same limits per snippet themselves. Every run reports
+``{"peak_rss_mb", "cpu_seconds", "wall_seconds"}``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+LAUNCHER = Path(__file__).resolve().parent / "_exec_launcher.py"
+SIGXCPU = 24
+
+
+@dataclass(frozen=True)
+class ExecLimits:
+    memory_mb: int = 0
+    cpu_seconds: int = 0
+    cgroup_root: str = ""
+
+    @classmethod
+    def from_env(cls) -> "ExecLimits":
+        return cls(
+            memory_mb=int(os.getenv("EXEC_MEMORY_LIMIT_MB", "0")),
+            cpu_seconds=int(os.getenv("EXEC_CPU_LIMIT_SECONDS", "0")),
+            cgroup_root=os.getenv("EXEC_CGROUP_ROOT", ""),
+        )
+
+    def to_request(self) -> dict:
+        return {"memory_mb": self.memory_mb, "cpu_seconds": self.cpu_seconds}
+
+
+_cgroup_disabled = False
+
+
+def _create_cgroup(limits: ExecLimits) -> Path | None:
+    """Create a per-run cgroup under ``EXEC_CGROUP_ROOT``; None if unavailable."""
+    global _cgroup_disabled
+    if not limits.cgroup_root or _cgroup_disabled:
+        return None
+    root = Path(limits.cgroup_root)
+    path = root / f"run-{uuid.uuid4().hex[:12]}"
+    try:
+        if not (root / "cgroup.controllers").exists():
+            raise OSError(f"{root} is not a cgroup v2 directory")
+        path.mkdir()
+        if limits.memory_mb > 0:
+            (path / "memory.max").write_text(str(limits.memory_mb * 1024 * 1024))
+            try:
+                (path / "memory.swap.max").write_text("0")
+            except OSError:
+                pass
+        return path
+    except OSError as e:
+        logger.warning("cgroup v2 limits unavailable (%s); falling back to rlimits", e)
+        _cgroup_disabled = True
+        try:
+            path.rmdir()
+        except OSError:
+            pass
+        return None
+
+
+def _read_cgroup_int(path: Path, name: str, key: str | None = None) -> int | None:
+    try:
+        text = (path / name).read_text()
+    except OSError:
+        return None
+    if key is None:
+        return int(text.strip()) if text.strip().isdigit() else None
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == key:
+            return int(parts[1])
+    return None
+
+
+@dataclass
+class LaunchPlan:
+    """A command wrapped by the launcher, plus where to collect its usage."""
+
+    argv: list[str] | str
+    shell: bool
+    report_path: str | None = None
+    cgroup: Path | None = None
+    started: float = 0.0
+
+    def collect(self, returncode: int | None) -> tuple[dict, str | None]:
+        """Read usage after the command exited. Returns (usage, exceeded) where
+        exceeded is "memory", "cpu" or None."""
+        usage: dict = {"wall_seconds": round(time.perf_counter() - self.started, 3)}
+        exceeded = None
+        if self.report_path:
+            try:
+                with open(self.report_path, encoding="utf-8") as f:
+                    report = json.load(f)
+                usage["peak_rss_mb"] = round(report["peak_rss_kb"] / 1024, 1)
+                usage["cpu_seconds"] = round(report["cpu_seconds"], 3)
+            except (OSError, ValueError, KeyError):
+                pass
+            try:
+                os.unlink(self.report_path)
+            except OSError:
+                pass
+        if self.cgroup is not None:
+            peak = _read_cgroup_int(self.cgroup, "memory.peak")
+            if peak is not None:
+                usage["peak_rss_mb"] = round(peak / (1024 * 1024), 1)
+            cpu_usec = _read_cgroup_int(self.cgroup, "cpu.stat", "usage_usec")
+            if cpu_usec is not None:
+                usage["cpu_seconds"] = round(cpu_usec / 1e6, 3)
+            if (_read_cgroup_int(self.cgroup, "memory.events", "oom_kill") or 0) > 0:
+                exceeded = "memory"
+            try:
+                self.cgroup.rmdir()
+            except OSError:
+                pass
+        if returncode is not None and returncode in (-SIGXCPU, 128 + SIGXCPU):
+            exceeded = "cpu"
+        return usage, exceeded
+
+    def oom_kills(self) -> int:
+        """OOM kills so far in the run's cgroup (0 without one)."""
+        if self.cgroup is None:
+            return 0
+        return _read_cgroup_int(self.cgroup, "memory.events", "oom_kill") or 0
+
+
+def plan_launch(args: list[str] | str, shell: bool, limits: ExecLimits | None) -> LaunchPlan:
+    """Wrap ``args`` with the launcher when limits/accounting are supported (POSIX)."""
+    if limits is None or os.name != "posix":
+        return LaunchPlan(args, shell, started=time.perf_counter())
+    argv = ["/bin/sh", "-c", args] if shell else list(args)
+    fd, report_path = tempfile.mkstemp(prefix="myclaw_usage_", suffix=".json")
+    os.close(fd)
+    cgroup = _create_cgroup(limits)
+    wrapped = [
+        sys.executable, "-I", "-S", str(LAUNCHER),
+        report_path, str(limits.memory_mb), str(limits.cpu_seconds), str(cgroup or "-"),
+        "--", *argv,
+    ]
+    return LaunchPlan(wrapped, False, report_path, cgroup, time.perf_counter())
+
+
+def limit_message(exceeded: str | None, limits: ExecLimits | None) -> str | None:
+    if exceeded == "memory":
+        return f"错误：执行超出内存限制（{limits.memory_mb if limits else '?'} MB），进程已被终止"
+    if exceeded == "cpu":
+        return f"错误：执行超出 CPU 时间限制（{limits.cpu_seconds if limits else '?'} 秒），进程已被终止"
+    return None
@@ -0,0 +1,337 @@
+"""Opt-in result cache for python_executor (``PYTHON_CACHE_ENABLED``).
+
+The agent often re-runs an identical snippet: an overflow retry replays the
+whole turn, or the user asks to "regenerate the chart". A cached entry is
+keyed on the code hash and is valid while the files the code references are
+unchanged. References are the string literals in the code that name existing
+files or directories (glob patterns are expanded); their mtime and size are
+the fingerprint.
+
+Files that a run creates or modifies among those literals (charts, exported
+reports) are stored as artifacts and written back on a hit if they were
+deleted or changed since. Only clean runs are stored (exit code 0, no
+timeout, cancel or limit), and code that looks non-deterministic (random,
+current time, network) is never cached.
+
+Entries live under ``PYTHON_CACHE_DIR``, expire after
+``PYTHON_CACHE_MAX_AGE_SECONDS`` and are evicted least-recently-used once
+the cache exceeds ``PYTHON_CACHE_MAX_MB``.
+"""
+
+from __future__ import annotations
+
+import ast
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from agent.metrics import metrics
+from tools.process_runner import ProcessResult
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / "memory" / "python_cache"
+# Literals longer than this (or containing newlines) are data, not paths.
+MAX_PATH_LITERAL = 1024
+MAX_REFERENCES = 64
+# Entries are built in a temp dir and renamed into place; other processes may
+# be mid-build, so an unreadable directory is removed only once it is this old.
+STALE_ENTRY_SECONDS = 3600
+_BUILD_PREFIX = ".build-"
+_GLOB_CHARS = set("*?[")
+# Output that depends on more than the code and its input files.
+_VOLATILE_RE = re.compile(
+    r"\b(?:random|secrets|uuid|requests|httpx|urllib|socket|subprocess)\b|\binput\s*\("
+    r"|\b(?:datetime|date)\.(?:now|today|utcnow)\b|\btime\.(?:time|time_ns|localtime|ctime)\b"
+)
+
+
+def cache_enabled() -> bool:
+    return os.getenv("PYTHON_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+def _fingerprint(path: Path) -> list[int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    # Directory size is meaningless; its mtime changes when entries are added or removed.
+    return [st.st_mtime_ns, 0 if path.is_dir() else st.st_size]
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def referenced_paths(code: str) -> list[Path] | None:
+    """Path-like string literals in ``code`` (resolved against the cwd), or
+    None if the code does not parse."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    paths: dict[str, Path] = {}
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Constant) and isinstance(node.value, str)):
+            continue
+        text = node.value.strip()
+        if not text or len(text) > MAX_PATH_LITERAL or "\n" in text or "\x00" in text:
+            continue
+        candidates = [text]
+        if _GLOB_CHARS & set(text):
+            try:
+                candidates = glob.glob(text, recursive=True)[:MAX_REFERENCES]
+            except (OSError, ValueError):
+                continue
+        for candidate in candidates:
+            path = Path(candidate).expanduser()
+            key = os.path.abspath(path)
+            if key not in paths:
+                paths[key] = Path(key)
+        if len(paths) >= MAX_REFERENCES:
+            break
+    return list(paths.values())
+
+
+@dataclass
+class CachePlan:
+    """State captured before a run, needed to look up or store its result."""
+
+    code_hash: str
+    references: list[Path]
+    before: dict[str, list[int]] = field(default_factory=dict)
+
+    def snapshot(self) -> dict[str, list[int]]:
+        current = {}
+        for path in self.references:
+            fp = _fingerprint(path)
+            if fp is not None:
+                current[str(path)] = fp
+        return current
+
+
+class PythonResultCache:
+    def __init__(self, cache_dir: Path | str | None = None, max_mb: float | None = None, max_age_seconds: float | None = None):
+        self.cache_dir = Path(cache_dir or os.getenv("PYTHON_CACHE_DIR", "") or DEFAULT_CACHE_DIR)
+        self.max_bytes = int((max_mb or float(os.getenv("PYTHON_CACHE_MAX_MB", "256"))) * 1024 * 1024)
+        self.max_age_seconds = max_age_seconds or float(os.getenv("PYTHON_CACHE_MAX_AGE_SECONDS", "86400"))
+        self._lock = threading.Lock()
+
+    def plan(self, code: str) -> CachePlan | None:
+        """Fingerprint the code's inputs; None if the code is not cacheable."""
+        if _VOLATILE_RE.search(code):
+            metrics.inc("python_cache_total", result="skip")
+            return None
+        references = referenced_paths(code)
+        if references is None:
+            return None
+        plan = CachePlan(hashlib.sha256(code.encode("utf-8")).hexdigest(), references)
+        plan.before = plan.snapshot()
+        return plan
+
+    def _entry_dir(self, code_hash: str) -> Path:
+        return self.cache_dir / code_hash[:32]
+
+    def _load(self, code_hash: str) -> dict | None:
+        try:
+            entry = json.loads((self._entry_dir(code_hash) / "entry.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("code_hash") == code_hash else None
+
+    def _write_entry(self, entry_dir: Path, entry: dict) -> None:
+        fd, tmp = tempfile.mkstemp(dir=entry_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, entry_dir / "entry.json")
+
+    def lookup(self, plan: CachePlan) -> ProcessResult | None:
+        """Return the cached result if the inputs are unchanged, restoring its artifacts."""
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._load(plan.code_hash)
+            if entry is None:
+                metrics.inc("python_cache_total", result="miss")
+                return None
+            entry_dir = self._entry_dir(plan.code_hash)
+            if time.time() - entry["created"] > self.max_age_seconds:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                metrics.inc("python_cache_total", result="expired")
+                return None
+            artifacts = entry.get("artifacts", {})
+            written = set(entry.get("written", [])) | set(artifacts)
+            inputs = {p: fp for p, fp in plan.before.items() if p not in written}
+            if inputs != entry["inputs"]:
+                metrics.inc("python_cache_total", result="stale")
+                return None
+            try:
+                for path, meta in artifacts.items():
+                    target = Path(path)
+                    if target.is_file() and target.stat().st_size == meta["size"] and _file_sha256(target) == meta["sha256"]:
+                        continue
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(entry_dir / meta["blob"], target)
+            except OSError as e:
+                logger.warning("Failed to restore cached artifacts for %s: %s", plan.code_hash[:12], e)
+                metrics.inc("python_cache_total", result="miss")
+                return None
+            entry["last_used"] = time.time()
+            self._write_entry(entry_dir, entry)
+        metrics.inc("python_cache_total", result="hit")
+        usage = {"wall_seconds": round(time.perf_counter() - start, 3)}
+        return ProcessResult(entry["stdout"], entry["stderr"], entry["returncode"], usage=usage)
+
+    def store(self, plan: CachePlan, result: ProcessResult) -> bool:
+        """Cache a clean run; files among the references that it created or changed become artifacts."""
+        if result.timed_out or result.cancelled or result.limit_exceeded or result.returncode != 0:
+            return False
+        after = plan.snapshot()
+        # Written paths: created or modified by the run (e.g. a chart and the output/ directory holding it).
+        written = [p for p, fp in after.items() if plan.before.get(p) != fp]
+        changed = [p for p in written if Path(p).is_file()]
+        inputs = {p: fp for p, fp in plan.before.items() if p not in written}
+        # Inputs that another writer touched during the run can't be trusted.
+        if any(after.get(p) != fp for p, fp in inputs.items()):
+            return False
+        entry_dir = self._entry_dir(plan.code_hash)
+        with self._lock:
+            build_dir = None
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                build_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=_BUILD_PREFIX))
+                artifacts = {}
+                size = len(result.stdout.encode("utf-8")) + len(result.stderr.encode("utf-8"))
+                for i, path in enumerate(changed):
+                    blob = f"artifact-{i}"
+                    shutil.copyfile(path, build_dir / blob)
+                    blob_size = (build_dir / blob).stat().st_size
+                    artifacts[path] = {"blob": blob, "size": blob_size, "sha256": _file_sha256(build_dir / blob)}
+                    size += blob_size
+                if size > self.max_bytes:
+                    shutil.rmtree(build_dir, ignore_errors=True)
+                    return False
+                now = time.time()
+                self._write_entry(build_dir, {
+                    "code_hash": plan.code_hash,
+                    "inputs": inputs,
+                    "artifacts": artifacts,
+                    "written": written,
+                    "stdout": result.stdout,
+                    "stderr": result.stderr,
+                    "returncode": result.returncode,
+                    "size": size,
+                    "created": now,
+                    "last_used": now,
+                })
+                self._publish(build_dir, entry_dir)
+            except OSError as e:
+                logger.warning("Failed to store python_executor cache entry: %s", e)
+                if build_dir is not None:
+                    shutil.rmtree(build_dir, ignore_errors=True)
+                return False
+            self._evict()
+        metrics.inc("python_cache_total", result="store")
+        return True
+
+    def _publish(self, build_dir: Path, entry_dir: Path) -> None:
+        """Swap a complete entry into place; readers see the old entry or the new one."""
+        old = None
+        if entry_dir.exists():
+            old = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=_BUILD_PREFIX)) / "old"
+            try:
+                os.replace(entry_dir, old)
+            except FileNotFoundError:
+                pass
+        try:
+            os.replace(build_dir, entry_dir)
+        except OSError:
+            # Another process published the same code hash first; keep theirs.
+            shutil.rmtree(build_dir, ignore_errors=True)
+        finally:
+            if old is not None:
+                shutil.rmtree(old.parent, ignore_errors=True)
+
+    def _entries(self) -> list[tuple[Path, dict]]:
+        entries = []
+        if not self.cache_dir.is_dir():
+            return entries
+        cutoff = time.time() - STALE_ENTRY_SECONDS
+        for entry_dir in self.cache_dir.iterdir():
+            if entry_dir.name.startswith(_BUILD_PREFIX):
+                # Another writer's entry under construction, unless it was abandoned.
+                if self._mtime(entry_dir) < cutoff:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            try:
+                entries.append((entry_dir, json.loads((entry_dir / "entry.json").read_text(encoding="utf-8"))))
+            except (OSError, ValueError):
+                # Foreign or damaged directory; leave it alone while it may still be in use.
+                if self._mtime(entry_dir) < cutoff:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+        return entries
+
+    @staticmethod
+    def _mtime(path: Path) -> float:
+        try:
+            return path.stat().st_mtime
+        except OSError:
+            return time.time()
+
+    def _evict(self) -> int:
+        now = time.time()
+        removed = 0
+        live = []
+        for entry_dir, entry in self._entries():
+            if now - entry.get("created", 0) > self.max_age_seconds:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+            else:
+                live.append((entry_dir, entry))
+        total = sum(entry.get("size", 0) for _, entry in live)
+        for entry_dir, entry in sorted(live, key=lambda item: item[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= entry.get("size", 0)
+            removed += 1
+        if removed:
+            metrics.inc("python_cache_evicted_total", removed)
+        metrics.set_gauge("python_cache_bytes", total)
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def status(self) -> dict:
+        with self._lock:
+            entries = self._entries()
+        return {
+            "enabled": cache_enabled(),
+            "entries": len(entries),
+            "bytes": sum(entry.get("size", 0) for _, entry in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+
+_cache: PythonResultCache | None = None
+
+
+def get_result_cache() -> PythonResultCache:
+    global _cache
+    if _cache is None:
+        _cache = PythonResultCache()
+    return _cache
@@ -1,9 +1,14 @@
 import os
-import subprocess
 import sys
 from pathlib import Path
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
+
+from tools.execution_lanes import get_lane
+from tools.process_runner import ProcessResult, run_process, run_process_async
+from tools.python_kernel import current_session_id
+from tools.resource_limits import ExecLimits, limit_message
+from tools.shell_session import get_shell_session_manager, shell_sessions_enabled
 
 DANGEROUS_PATTERNS = [
     "rm -rf /",
@@ -27,36 +32,91 @@ def _get_venv_env() -> dict:
     return env
 
 
-@tool
-def shell_executor(command: str) -> str:
-    """执行一条 shell 命令并返回输出。禁止执行高危命令。"""
-    MAX_CHARS = int(os.getenv("SHELL_EXECUTOR_MAX_CHARS", "50000"))
-    TIMEOUT = int(os.getenv("SHELL_EXECUTOR_TIMEOUT", "60"))
+def _limits() -> tuple[int, int]:
+    return int(os.getenv("SHELL_EXECUTOR_MAX_CHARS", "50000")), int(os.getenv("SHELL_EXECUTOR_TIMEOUT", "60"))
+
 
+def _check_command(command: str) -> str | None:
     cmd_lower = command.lower().strip()
     for pattern in DANGEROUS_PATTERNS:
         if pattern in cmd_lower:
             return f"错误：禁止执行危险命令 - 包含 '{pattern}'"
+    return None
+
+
+def _format_result(result: ProcessResult, timeout: int, limits: ExecLimits) -> tuple[str, dict]:
+    """Tool content plus the artifact carrying resource usage."""
+    artifact = {"usage": result.usage}
+    if result.timed_out:
+        return f"错误：命令执行超时（{timeout} 秒）", artifact
+    if result.cancelled:
+        return "错误：命令执行已被用户取消", artifact
+    output = ""
+    if message := limit_message(result.limit_exceeded, limits):
+        output += message + "\n"
+    if result.stdout:
+        output += result.stdout
+    if result.stderr:
+        output += ("\n" if output else "") + result.stderr
+    output += f"\n\n[退出码: {result.returncode}]"
+    return output, artifact
+
+
+SESSION_RESTARTED_NOTE = "[新 shell 会话已启动，之前的工作目录和环境变量已重置]"
+
+
+def _run_in_session(command: str, max_chars: int, timeout: int, limits: ExecLimits) -> tuple[str, dict]:
+    """Run in the conversation's persistent shell (see tools.shell_session)."""
+    result, info = get_shell_session_manager().run(
+        current_session_id(), command, timeout=timeout, max_chars=max_chars, env=_get_venv_env(), limits=limits
+    )
+    if result.timed_out:
+        return f"错误：命令执行超时（{timeout} 秒），shell 会话已重置，工作目录和环境变量已恢复默认", {"usage": result.usage}
+    if result.cancelled:
+        return "错误：命令执行已被用户取消，shell 会话已重置，工作目录和环境变量已恢复默认", {"usage": result.usage}
+    content, artifact = _format_result(result, timeout, limits)
+    if info["restarted"]:
+        content = f"{SESSION_RESTARTED_NOTE}\n{content}"
+    return content, artifact
 
+
+def _shell_executor(command: str) -> tuple[str, dict]:
+    """执行一条 shell 命令并返回输出。禁止执行高危命令。若启用了持久 shell 会话，cd、export、source 等状态会在同一对话的多次调用间保留。"""
+    MAX_CHARS, TIMEOUT = _limits()
+    if error := _check_command(command):
+        return error, {}
+    limits = ExecLimits.from_env()
+    try:
+        if shell_sessions_enabled():
+            return _run_in_session(command, MAX_CHARS, TIMEOUT, limits)
+        result = run_process(
+            command, timeout=TIMEOUT, shell=True, env=_get_venv_env(), max_chars=MAX_CHARS, limits=limits
+        )
+        return _format_result(result, TIMEOUT, limits)
+    except Exception as e:
+        return f"错误：命令执行失败 - {e}", {}
+
+
+async def _ashell_executor(command: str) -> tuple[str, dict]:
+    MAX_CHARS, TIMEOUT = _limits()
+    if error := _check_command(command):
+        return error, {}
+    limits = ExecLimits.from_env()
     try:
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=TIMEOUT,
-            env=_get_venv_env(),
+        if shell_sessions_enabled():
+            # The pty protocol is blocking; drive it from the slow lane's threads.
+            return await get_lane("slow").run_in_executor(_run_in_session, command, MAX_CHARS, TIMEOUT, limits)
+        result = await run_process_async(
+            command, timeout=TIMEOUT, shell=True, env=_get_venv_env(), max_chars=MAX_CHARS, limits=limits
         )
-        output = ""
-        if result.stdout:
-            output += result.stdout
-        if result.stderr:
-            output += ("\n" if output else "") + result.stderr
-        output += f"\n\n[退出码: {result.returncode}]"
-        if len(output) > MAX_CHARS:
-            output = output[:MAX_CHARS] + f"\n\n... [输出已截断，仅显示前 {MAX_CHARS} 字符]"
-        return output
-    except subprocess.TimeoutExpired:
-        return f"错误：命令执行超时（{TIMEOUT} 秒）"
+        return _format_result(result, TIMEOUT, limits)
     except Exception as e:
-        return f"错误：命令执行失败 - {e}"
+        return f"错误：命令执行失败 - {e}", {}
+
+
+shell_executor = StructuredTool.from_function(
+    func=_shell_executor,
+    coroutine=_ashell_executor,
+    name="shell_executor",
+    response_format="content_and_artifact",
+)
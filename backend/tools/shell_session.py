@@ -0,0 +1,374 @@
+"""Persistent shell per conversation for shell_executor (opt-in, ``SHELL_SESSION_ENABLED``).
+
+Without it every ``shell_executor`` call is a fresh ``sh -c``: ``cd``,
+``export`` and ``source venv/bin/activate`` are lost between calls, so the
+model chains everything into one long command. With it, each conversation
+gets one bash process on a pty, reused across calls and turns.
+
+Each command is written to a temp file and sourced (stdin from /dev/null),
+followed by a ``printf`` of a per-call sentinel carrying ``$?``; output up
+to the sentinel is the command's output (stdout and stderr interleaved, as
+on a terminal). A command that times out or is cancelled kills the shell
+and its children; the next call starts a fresh one.
+
+The shell is started through the resource-limit launcher, so the
+``EXEC_*`` rlimits (per process) and cgroup (shared by the whole session)
+apply to every command it runs.
+
+``SHELL_SESSION_IDLE_SECONDS`` reaps idle shells, ``SHELL_SESSION_MAX_SESSIONS``
+caps how many run at once: the least recently used idle shell goes first,
+and a new conversation is refused while every shell is running a command.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from agent.cancellation import current_scope, kill_process_group
+from agent.metrics import metrics
+from agent.tool_stream import OutputCallback, current_output_callback
+from tools.process_runner import DEFAULT_MAX_CHARS, ProcessResult, make_buffers
+from tools.resource_limits import SIGXCPU, ExecLimits, plan_launch
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 65536
+TICK_INTERVAL = 0.1
+STARTUP_TIMEOUT = 10.0
+# How many "shell was lost" markers to remember per allowed session.
+LOST_MARKERS_PER_SESSION = 16
+
+
+def shell_sessions_enabled() -> bool:
+    return os.getenv("SHELL_SESSION_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+class _ShellSession:
+    def __init__(self, env: dict | None = None, cwd: str | None = None, limits: ExecLimits | None = None):
+        import pty
+        import termios
+
+        master, slave = pty.openpty()
+        # No echo of the lines we write and no \n -> \r\n translation of output.
+        attrs = termios.tcgetattr(slave)
+        attrs[1] &= ~termios.OPOST
+        attrs[3] &= ~(termios.ECHO | termios.ICANON)
+        termios.tcsetattr(slave, termios.TCSANOW, attrs)
+        env = dict(env if env is not None else os.environ)
+        env.update({"TERM": "dumb", "PS1": "", "PS2": "", "PAGER": "cat", "GIT_PAGER": "cat"})
+        bash = shutil.which("bash") or "/bin/sh"
+        # Non-interactive: no job control, so every child stays in the shell's process group.
+        self._memory_limited = bool(limits and limits.memory_mb)
+        self._plan = plan_launch([bash, "--noprofile", "--norc"] if bash.endswith("bash") else [bash], False, limits)
+        try:
+            self.proc = subprocess.Popen(
+                self._plan.argv,
+                stdin=slave,
+                stdout=slave,
+                stderr=slave,
+                env=env,
+                cwd=cwd,
+                start_new_session=True,
+            )
+        except BaseException:
+            self._plan.collect(None)
+            os.close(master)
+            raise
+        finally:
+            os.close(slave)
+        self._master = master
+        self._chunks: queue.Queue[bytes | None] = queue.Queue()
+        self.runs = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+        threading.Thread(target=self._pump, name=f"shell-session-{self.proc.pid}", daemon=True).start()
+
+    def _pump(self) -> None:
+        while True:
+            try:
+                data = os.read(self._master, READ_CHUNK)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            self._chunks.put(data)
+        self._chunks.put(None)
+
+    @property
+    def alive(self) -> bool:
+        return not self.broken and self.proc.poll() is None
+
+    def kill(self) -> None:
+        self.broken = True
+        kill_process_group(self.proc)
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            pass
+        try:
+            os.close(self._master)
+        except OSError:
+            pass
+        if self.proc.returncode is not None and self._plan is not None:
+            # Removes the launcher's usage report and the session's cgroup.
+            self._plan.collect(self.proc.returncode)
+            self._plan = None
+
+    def run(
+        self,
+        command: str,
+        timeout: float,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        on_output: OutputCallback | None = None,
+    ) -> ProcessResult:
+        if on_output is None:
+            on_output = current_output_callback()
+        out_buf, err_buf = make_buffers(max_chars, on_output)
+        token = uuid.uuid4().hex
+        sentinel = re.compile(rb"\n?__MYCLAW_DONE_" + token.encode() + rb"_(\d+)__\n")
+        fd, script = tempfile.mkstemp(prefix="myclaw_sh_", suffix=".sh")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(command + "\n")
+        scope = current_scope()
+        if scope is not None:
+            scope.register_process(self.proc)
+        start = time.perf_counter()
+        oom_before = self._plan.oom_kills() if self._plan is not None else 0
+        pending = b""
+        returncode = None
+        timed_out = False
+        try:
+            line = f". {_quote(script)} < /dev/null; printf '\\n__MYCLAW_DONE_{token}_%s__\\n' \"$?\"\n"
+            os.write(self._master, line.encode())
+            self.runs += 1
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    self.kill()
+                    break
+                try:
+                    data = self._chunks.get(timeout=min(TICK_INTERVAL, remaining))
+                except queue.Empty:
+                    continue
+                if data is None:
+                    # The command ran `exit`, crashed the shell, or it was killed on cancel.
+                    self.broken = True
+                    break
+                pending += data
+                match = sentinel.search(pending)
+                if match:
+                    out_buf.write_bytes(pending[:match.start()])
+                    returncode = int(match.group(1))
+                    pending = b""
+                    break
+                # Hold back a possible partial sentinel; forward the rest.
+                keep = len(token) + 40
+                if len(pending) > keep:
+                    out_buf.write_bytes(pending[:-keep])
+                    pending = pending[-keep:]
+            if pending:
+                out_buf.write_bytes(pending)
+        finally:
+            if scope is not None:
+                scope.unregister_process(self.proc)
+            try:
+                os.unlink(script)
+            except OSError:
+                pass
+            self.last_used = time.monotonic()
+        out_buf.close()
+        err_buf.close()
+        exceeded = None
+        if self._plan is not None and self._plan.oom_kills() > oom_before:
+            exceeded = "memory"
+        elif returncode in (128 + SIGXCPU, -SIGXCPU):
+            exceeded = "cpu"
+        elif self._memory_limited and returncode and "MemoryError" in out_buf.getvalue()[-2000:]:
+            exceeded = "memory"
+        if returncode is None and not timed_out:
+            self.kill()
+            returncode = self.proc.returncode
+        cancelled = not timed_out and scope is not None and scope.cancelled
+        usage = {"wall_seconds": round(time.perf_counter() - start, 3)}
+        return ProcessResult(
+            out_buf.getvalue(), "", returncode, timed_out=timed_out, cancelled=cancelled, usage=usage,
+            limit_exceeded=exceeded,
+        )
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "'\\''") + "'"
+
+
+class ShellSessionManager:
+    def __init__(self, idle_seconds: float | None = None, max_sessions: int | None = None):
+        self.idle_seconds = idle_seconds or float(os.getenv("SHELL_SESSION_IDLE_SECONDS", "1800"))
+        self.max_sessions = max_sessions or max(1, int(os.getenv("SHELL_SESSION_MAX_SESSIONS", "8")))
+        self._lock = threading.Lock()
+        self._shells: dict[str, _ShellSession] = {}
+        # Calls within one conversation run one at a time. A lock lives while
+        # the conversation has a shell or a call holds or waits for it.
+        self._session_locks: dict[str, threading.Lock] = {}
+        self._users: Counter[str] = Counter()
+        # Shells being spawned outside the lock still count against the cap.
+        self._starting: set[str] = set()
+        # Conversations whose shell died, so the next call can say state was lost.
+        self._lost: OrderedDict[str, None] = OrderedDict()
+        self._reaper: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @contextmanager
+    def _session(self, session_id: str):
+        with self._lock:
+            self._users[session_id] += 1
+            lock = self._session_locks.setdefault(session_id, threading.Lock())
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._users[session_id] -= 1
+                if not self._users[session_id]:
+                    del self._users[session_id]
+                    if session_id not in self._shells:
+                        self._session_locks.pop(session_id, None)
+
+    def _mark_lost(self, session_id: str) -> None:
+        """Caller holds ``self._lock``."""
+        self._lost[session_id] = None
+        self._lost.move_to_end(session_id)
+        while len(self._lost) > self.max_sessions * LOST_MARKERS_PER_SESSION:
+            self._lost.popitem(last=False)
+
+    def _drop(self, session_id: str) -> _ShellSession:
+        """Remove an idle conversation's shell and lock. Caller holds ``self._lock``."""
+        self._session_locks.pop(session_id, None)
+        return self._shells.pop(session_id)
+
+    def _get_or_start(
+        self, session_id: str, env: dict | None, limits: ExecLimits | None
+    ) -> tuple[_ShellSession, bool]:
+        with self._lock:
+            shell = self._shells.get(session_id)
+            if shell is not None and shell.alive:
+                return shell, False
+            self._shells.pop(session_id, None)
+            restarted = shell is not None or session_id in self._lost
+            # Never kill a shell in the middle of a command.
+            excess = len(self._shells) + len(self._starting) - self.max_sessions + 1
+            idle = sorted(
+                (sid for sid in self._shells if sid not in self._users), key=lambda sid: self._shells[sid].last_used
+            )
+            if excess > len(idle):
+                if restarted:
+                    self._mark_lost(session_id)
+                metrics.inc("shell_session_rejected_total")
+                raise RuntimeError(f"持久 shell 会话已达上限（{self.max_sessions}）且都在执行命令，请稍后重试")
+            evict = []
+            for sid in idle[:max(0, excess)]:
+                evict.append(self._drop(sid))
+                self._mark_lost(sid)
+            self._lost.pop(session_id, None)
+            self._starting.add(session_id)
+        try:
+            for old in evict:
+                old.kill()
+                metrics.inc("shell_session_reaped_total", reason="capacity")
+            shell = _ShellSession(env=env, limits=limits)
+            with self._lock:
+                self._shells[session_id] = shell
+        finally:
+            with self._lock:
+                self._starting.discard(session_id)
+        metrics.inc("shell_session_started_total")
+        self._ensure_reaper()
+        return shell, restarted
+
+    def run(
+        self,
+        session_id: str,
+        command: str,
+        timeout: float,
+        max_chars: int = DEFAULT_MAX_CHARS,
+        env: dict | None = None,
+        limits: ExecLimits | None = None,
+    ) -> tuple[ProcessResult, dict]:
+        """Run a command in the conversation's shell. Returns the result and
+        ``{"restarted": bool}`` (a previous shell's cwd/env were lost).
+        ``env`` and ``limits`` only apply when a new shell is started."""
+        with self._session(session_id):
+            shell, restarted = self._get_or_start(session_id, env, limits)
+            result = shell.run(command, timeout, max_chars=max_chars)
+            if not shell.alive:
+                with self._lock:
+                    if self._shells.get(session_id) is shell:
+                        del self._shells[session_id]
+                    self._mark_lost(session_id)
+                shell.kill()
+            return result, {"restarted": restarted}
+
+    def reap_idle(self) -> int:
+        cutoff = time.monotonic() - self.idle_seconds
+        with self._lock:
+            idle = [
+                sid for sid, s in self._shells.items()
+                if (s.last_used < cutoff or not s.alive) and sid not in self._users
+            ]
+            shells = [self._drop(sid) for sid in idle]
+        for shell in shells:
+            shell.kill()
+            metrics.inc("shell_session_reaped_total", reason="idle")
+        return len(shells)
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while not self._stop.wait(interval):
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.warning("Shell session reaper failed: %s", e)
+
+    def _ensure_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap_loop, name="shell-session-reaper", daemon=True)
+                self._reaper.start()
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        with self._lock:
+            shells, self._shells = list(self._shells.values()), {}
+        for shell in shells:
+            shell.kill()
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            sessions = {
+                sid: {"runs": s.runs, "idle_seconds": round(now - s.last_used, 1)}
+                for sid, s in self._shells.items()
+            }
+        return {"enabled": shell_sessions_enabled(), "sessions": sessions}
+
+
+_manager: ShellSessionManager | None = None
+
+
+def get_shell_session_manager() -> ShellSessionManager:
+    global _manager
+    if _manager is None:
+        _manager = ShellSessionManager()
+    return _manager
@@ -0,0 +1,157 @@
+"""Skill script commands as structured tools (opt-in, ``SKILL_SCRIPT_TOOLS_ENABLED``).
+
+Skills like ``datetime-skill`` export functions through a ``COMMANDS`` dict in
+``scripts/*.py``. Calling them through ``shell_executor`` costs a doc read, a
+shell and a Python start for a millisecond function. With this enabled each
+command becomes a tool named ``<skill>_<command>`` whose argument schema comes
+from the function signature (parsed by ``SkillLoader`` without importing the
+script into the server).
+
+Calls run in the python_executor worker pool: the script module is imported
+once per warm worker (re-imported when the file changes) under the same
+resource limits as python_executor, falling back to a cold process when the
+pool is busy.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import Any
+
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import create_model
+
+from agent.skill_loader import SkillCommand, SkillMeta, get_skill_loader, script_tools_enabled
+from tools.execution_lanes import with_lane
+from tools.process_runner import ProcessResult
+from tools.python_worker_pool import get_python_pool
+from tools.resource_limits import ExecLimits, limit_message
+
+_TYPES = {"str": str, "int": int, "float": float, "bool": bool}
+_NAME_RE = re.compile(r"[^A-Za-z0-9_]")
+
+# Runs inside a worker; the module is cached in sys.modules under a key that includes the
+# mtime (the worker keeps ``_myclaw_skill_*`` entries across pooled runs). Keys of older
+# versions of the script are dropped, and the scripts dir is on sys.path only while importing.
+_CALL_TEMPLATE = """\
+import importlib.util, json, os, sys
+_path = {path!r}
+_prefix = "_myclaw_skill_%x_" % (hash(_path) & 0xFFFFFFFF)
+_key = _prefix + str(os.stat(_path).st_mtime_ns)
+_module = sys.modules.get(_key)
+if _module is None:
+    for _stale in [k for k in sys.modules if k.startswith(_prefix)]:
+        del sys.modules[_stale]
+    _dir = os.path.dirname(_path)
+    sys.path.insert(0, _dir)
+    try:
+        _spec = importlib.util.spec_from_file_location(_key, _path)
+        _module = importlib.util.module_from_spec(_spec)
+        _spec.loader.exec_module(_module)
+    finally:
+        if _dir in sys.path:
+            sys.path.remove(_dir)
+    sys.modules[_key] = _module
+_result = _module.COMMANDS[{command!r}](**json.loads({kwargs!r}))
+if _result is not None:
+    print(_result if isinstance(_result, str) else json.dumps(_result, ensure_ascii=False, default=str))
+"""
+
+
+def skill_tool_name(skill_name: str, command: str) -> str:
+    return _NAME_RE.sub("_", f"{skill_name}_{command}")[:64]
+
+
+def _timeout() -> int:
+    return int(os.getenv("SKILL_SCRIPT_TIMEOUT", "30"))
+
+
+def _args_schema(tool_name: str, command: SkillCommand):
+    fields: dict[str, Any] = {}
+    for param in command.params:
+        if param.annotation in _TYPES:
+            annotation = _TYPES[param.annotation]
+        elif not param.required and type(param.default) in _TYPES.values():
+            annotation = type(param.default)
+        else:
+            annotation = str
+        if param.required:
+            fields[param.name] = (annotation, ...)
+        else:
+            # Non-literal defaults are left to the function: omitted arguments are not sent.
+            fields[param.name] = (annotation | None, param.default)
+    return create_model(tool_name, **fields)
+
+
+def _format(result: ProcessResult, timeout: int, limits: ExecLimits) -> tuple[str, dict]:
+    artifact = {"usage": result.usage}
+    if result.timed_out:
+        return f"错误：脚本命令执行超时（{timeout} 秒）", artifact
+    if result.cancelled:
+        return "错误：脚本命令已被用户取消", artifact
+    if message := limit_message(result.limit_exceeded, limits):
+        return f"{message}\n{result.stderr}", artifact
+    if result.returncode != 0:
+        return f"错误：脚本命令执行失败\n{result.stderr}", artifact
+    output = result.stdout.rstrip("\n")
+    if result.stderr:
+        output += ("\n" if output else "") + result.stderr
+    return output or "(无输出)", artifact
+
+
+def _make_tool(skill: SkillMeta, command: SkillCommand) -> BaseTool:
+    name = skill_tool_name(skill.name, command.name)
+    schema = _args_schema(name, command)
+    summary = command.doc.strip() or f"{command.name}（{skill.description.strip()}）"
+    description = f"[Skill {skill.name}] {summary}"
+
+    def _code(kwargs: dict) -> str:
+        # Omitted optional arguments fall back to the function's own defaults.
+        sent = {k: v for k, v in kwargs.items() if v is not None}
+        return _CALL_TEMPLATE.format(path=str(command.script.resolve()), command=command.name, kwargs=json.dumps(sent))
+
+    def _run(**kwargs: Any) -> tuple[str, dict]:
+        timeout, limits = _timeout(), ExecLimits.from_env()
+        try:
+            return _format(get_python_pool().run(_code(kwargs), timeout=timeout, limits=limits), timeout, limits)
+        except Exception as e:
+            return f"错误：脚本命令执行失败 - {e}", {}
+
+    async def _arun(**kwargs: Any) -> tuple[str, dict]:
+        timeout, limits = _timeout(), ExecLimits.from_env()
+        try:
+            result = await get_python_pool().run_async(_code(kwargs), timeout=timeout, limits=limits)
+            return _format(result, timeout, limits)
+        except Exception as e:
+            return f"错误：脚本命令执行失败 - {e}", {}
+
+    tool = StructuredTool.from_function(
+        func=_run,
+        coroutine=_arun,
+        name=name,
+        description=description,
+        args_schema=schema,
+        response_format="content_and_artifact",
+        metadata={"tool_group": "skill", "skill": skill.name},
+    )
+    return with_lane(tool, "slow")
+
+
+_cache_lock = threading.Lock()
+_cache: tuple[tuple, list[BaseTool]] = ((), [])
+
+
+def get_skill_script_tools() -> list[BaseTool]:
+    """Tools for every discovered skill command; rebuilt only when the catalog changes."""
+    global _cache
+    if not script_tools_enabled():
+        return []
+    pairs = [(skill, command) for skill in get_skill_loader().loaded_skills for command in skill.commands]
+    key = tuple(id(command) for _, command in pairs)
+    with _cache_lock:
+        if _cache[0] != key:
+            _cache = (key, [_make_tool(skill, command) for skill, command in pairs])
+        return list(_cache[1])
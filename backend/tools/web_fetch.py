@@ -4,13 +4,15 @@ import httpx
 from langchain_core.tools import tool
 from markdownify import markdownify
 
+from agent.cancellation import scoped_client
+
 
 @tool
 def web_fetch(url: str) -> str:
     """抓取指定 URL 的网页内容，将 HTML 转换为 Markdown 文本返回。"""
     MAX_CHARS = int(os.getenv("WEB_FETCH_MAX_CHARS", "60000"))
     try:
-        with httpx.Client(timeout=30, follow_redirects=True) as client:
+        with scoped_client(httpx.Client(timeout=30, follow_redirects=True)) as client:
             resp = client.get(url, headers={"User-Agent": "MyClaw/1.0"})
             resp.raise_for_status()
         md = markdownify(resp.text, strip=["img", "script", "style"])
@@ -2,6 +2,8 @@ import os
 import httpx
 from langchain_core.tools import tool
 
+from agent.cancellation import scoped_client
+
 TAVILY_URL = "https://api.tavily.com/search"
 
 
@@ -26,7 +28,7 @@ def web_search(query: str, max_results: int = 5) -> str:
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}",
         }
-        with httpx.Client(timeout=30) as client:
+        with scoped_client(httpx.Client(timeout=30)) as client:
             resp = client.post(TAVILY_URL, json=payload, headers=headers)
             resp.raise_for_status()
 
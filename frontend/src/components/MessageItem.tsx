@@ -6,6 +6,7 @@ import type {
   ToolCallData,
   ToolResultData,
   ErrorData,
+  JobUpdateData,
 } from "../types";
 import UserMessage from "./UserMessage";
 import AssistantMessage from "./AssistantMessage";
@@ -15,6 +16,14 @@ import ErrorMessage from "./ErrorMessage";
 
 const { Text } = Typography;
 
+const JOB_STATUS_LABELS: Record<JobUpdateData["status"], string> = {
+  running: "已启动",
+  succeeded: "已完成",
+  failed: "失败",
+  timed_out: "超时",
+  cancelled: "已取消",
+};
+
 interface Props {
   message: MessageItemType;
 }
@@ -49,6 +58,18 @@ export default function MessageItem({ message }: Props) {
     case "error":
       content = <ErrorMessage data={message.data as ErrorData} />;
       break;
+    case "job_update": {
+      const job = message.data as unknown as JobUpdateData;
+      content = (
+        <div style={{ textAlign: "center", padding: "2px 0" }}>
+          <Text type="secondary" style={{ fontSize: 12 }}>
+            后台任务 {job.job_id}（{job.kind}）{JOB_STATUS_LABELS[job.status]}
+            {job.status !== "running" && `，耗时 ${job.elapsed_seconds} 秒`}
+          </Text>
+        </div>
+      );
+      break;
+    }
     default:
       return null;
   }
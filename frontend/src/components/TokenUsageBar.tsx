@@ -13,7 +13,7 @@ function formatNum(n: number): string {
 }
 
 export default function TokenUsageBar({ tokenUsage, contextLimit, modelName }: Props) {
-  const { prompt_tokens, completion_tokens, total_tokens } = tokenUsage;
+  const { prompt_tokens, completion_tokens, total_tokens, cached_tokens } = tokenUsage;
   const pct = contextLimit > 0 ? Math.min((total_tokens / contextLimit) * 100, 100) : 0;
 
   const strokeColor =
@@ -25,6 +25,7 @@ export default function TokenUsageBar({ tokenUsage, contextLimit, modelName }: P
       <div><b>上下文窗口</b>: {formatNum(contextLimit)} tokens</div>
       <hr style={{ margin: "4px 0", border: "none", borderTop: "1px solid rgba(255,255,255,0.2)" }} />
       <div><b>Prompt tokens</b>: {formatNum(prompt_tokens)}</div>
+      {cached_tokens ? <div><b>缓存命中</b>: {formatNum(cached_tokens)}</div> : null}
       <div><b>Completion tokens</b>: {formatNum(completion_tokens)}</div>
       <div><b>当前合计</b>: {formatNum(total_tokens)} / {formatNum(contextLimit)}</div>
     </div>
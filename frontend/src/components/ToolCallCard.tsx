@@ -35,6 +35,23 @@ export default function ToolCallCard({ data }: Props) {
         >
           {JSON.stringify(data.arguments, null, 2)}
         </pre>
+        {data.live_output && (
+          <pre
+            style={{
+              margin: "8px 0 0",
+              padding: 8,
+              background: "#1f1f1f",
+              color: "#d9d9d9",
+              borderRadius: 4,
+              fontSize: 12,
+              overflow: "auto",
+              maxHeight: 200,
+              whiteSpace: "pre-wrap",
+            }}
+          >
+            {data.live_output}
+          </pre>
+        )}
       </Card>
     </div>
   );
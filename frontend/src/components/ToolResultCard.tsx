@@ -3,7 +3,7 @@ import { CheckCircleOutlined, CloseCircleOutlined, DownOutlined, RightOutlined }
 import { useState } from "react";
 import { Prism as SyntaxHighlighter } from "react-syntax-highlighter";
 import { oneLight } from "react-syntax-highlighter/dist/esm/styles/prism";
-import type { ToolResultData } from "../types";
+import type { ToolResultData, ToolUsage } from "../types";
 
 const { Text } = Typography;
 
@@ -25,6 +25,14 @@ function guessLanguage(name: string, content: string): string | null {
   return null;
 }
 
+function formatUsage(usage: ToolUsage): string {
+  const parts: string[] = [];
+  if (usage.wall_seconds !== undefined) parts.push(`${usage.wall_seconds.toFixed(2)}s`);
+  if (usage.cpu_seconds !== undefined) parts.push(`CPU ${usage.cpu_seconds.toFixed(2)}s`);
+  if (usage.peak_rss_mb !== undefined) parts.push(`内存峰值 ${usage.peak_rss_mb.toFixed(0)} MB`);
+  return parts.join(" · ");
+}
+
 export default function ToolResultCard({ data }: Props) {
   const isSuccess = data.status === "success";
   const lines = data.content.split("\n");
@@ -55,6 +63,9 @@ export default function ToolResultCard({ data }: Props) {
           <span style={{ fontWeight: 600, fontSize: 13 }}>执行结果</span>
           <Tag color={isSuccess ? "success" : "error"}>{data.name}</Tag>
           <Tag color={isSuccess ? "green" : "red"}>{isSuccess ? "成功" : "失败"}</Tag>
+          {data.usage && (
+            <Text type="secondary" style={{ fontSize: 12 }}>{formatUsage(data.usage)}</Text>
+          )}
           <span style={{ marginLeft: "auto", color: "#999", fontSize: 12 }}>
             {expanded ? <DownOutlined /> : <RightOutlined />}
             {isLong && <Text type="secondary" style={{ marginLeft: 4, fontSize: 12 }}>{lines.length} 行</Text>}
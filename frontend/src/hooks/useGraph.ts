@@ -163,6 +163,7 @@ export function useGraph() {
             prompt_tokens: tu.prompt_tokens || prev.prompt_tokens,
             completion_tokens: prev.completion_tokens + (tu.completion_tokens || 0),
             total_tokens: tu.total_tokens || prev.total_tokens,
+            cached_tokens: tu.cached_tokens ?? prev.cached_tokens,
           }));
         }
         setGraphNodes((prev) =>
@@ -1,5 +1,5 @@
 import { useCallback, useEffect, useRef, useState } from "react";
-import type { AgentEvent, MessageItem } from "../types";
+import type { AgentEvent, MessageItem, ToolOutputChunkData } from "../types";
 
 type Status = "connecting" | "connected" | "disconnected";
 
@@ -15,6 +15,7 @@ const GRAPH_EVENTS = new Set([
 ]);
 
 const CHAT_IGNORE = new Set([
+  "pong",
   "user_input",
   "init_status",
   "graph_reset",
@@ -31,6 +32,10 @@ function nextId() {
 }
 
 const STREAMING_ID = "__streaming__";
+const HEARTBEAT_INTERVAL_MS = 30000;
+const SESSION_TAKEN_OVER = 4000;
+// Live tool output shown in the chat is capped; the full result arrives with tool_result.
+const LIVE_OUTPUT_MAX_CHARS = 20000;
 
 export type GraphEventHandler = (event: AgentEvent) => void;
 
@@ -43,6 +48,8 @@ export function useWebSocket(
   const [messages, setMessages] = useState<MessageItem[]>([]);
   const [isAgentRunning, setIsAgentRunning] = useState(false);
   const streamingContentRef = useRef("");
+  const sessionIdRef = useRef<string | null>(null);
+  const resumeTokenRef = useRef<string | null>(null);
   const onGraphEventRef = useRef(onGraphEvent);
   onGraphEventRef.current = onGraphEvent;
 
@@ -50,16 +57,36 @@ export function useWebSocket(
     if (wsRef.current?.readyState === WebSocket.OPEN) return;
 
     setStatus("connecting");
-    const ws = new WebSocket(url);
+    // Reconnect into the same server-side session (any worker can resume it);
+    // the server only resumes it with the token it issued.
+    const sid = sessionIdRef.current;
+    const token = resumeTokenRef.current;
+    const ws = new WebSocket(
+      sid && token
+        ? `${url}?session_id=${encodeURIComponent(sid)}&resume_token=${encodeURIComponent(token)}`
+        : url,
+    );
 
+    let heartbeat: ReturnType<typeof setInterval> | undefined;
     ws.onopen = () => {
       setStatus("connected");
+      heartbeat = setInterval(() => {
+        if (ws.readyState === WebSocket.OPEN) {
+          ws.send(JSON.stringify({ type: "ping", data: {} }));
+        }
+      }, HEARTBEAT_INTERVAL_MS);
     };
 
     ws.onmessage = (e) => {
       try {
         const event: AgentEvent = JSON.parse(e.data);
 
+        if (event.type === "init_status" && typeof event.data.session_id === "string") {
+          sessionIdRef.current = event.data.session_id;
+          resumeTokenRef.current =
+            typeof event.data.resume_token === "string" ? event.data.resume_token : null;
+        }
+
         if (GRAPH_EVENTS.has(event.type)) {
           onGraphEventRef.current?.(event);
         }
@@ -114,6 +141,24 @@ export function useWebSocket(
           return;
         }
 
+        if (event.type === "tool_output_chunk") {
+          const chunk = event.data as unknown as ToolOutputChunkData;
+          setMessages((prev) => {
+            const idx = prev.findIndex(
+              (m) => m.type === "tool_call" && m.data.tool_call_id === chunk.tool_call_id,
+            );
+            if (idx < 0) return prev;
+            const next = [...prev];
+            const live = ((next[idx].data.live_output as string | undefined) ?? "") + chunk.text;
+            next[idx] = {
+              ...next[idx],
+              data: { ...next[idx].data, live_output: live.slice(-LIVE_OUTPUT_MAX_CHARS) },
+            };
+            return next;
+          });
+          return;
+        }
+
         if (event.type === "tool_call") {
           streamingContentRef.current = "";
           setMessages((prev) => {
@@ -141,7 +186,7 @@ export function useWebSocket(
         };
         setMessages((prev) => [...prev, item]);
 
-        if (event.type === "error") {
+        if (event.type === "error" || event.type === "turn_cancelled") {
           setIsAgentRunning(false);
         }
       } catch {
@@ -149,9 +194,12 @@ export function useWebSocket(
       }
     };
 
-    ws.onclose = () => {
+    ws.onclose = (e) => {
+      clearInterval(heartbeat);
       setStatus("disconnected");
       setIsAgentRunning(false);
+      // 4000: the session was resumed by another connection; don't take it back.
+      if (e.code === SESSION_TAKEN_OVER) return;
       setTimeout(() => connect(), 3000);
     };
 
@@ -181,9 +229,16 @@ export function useWebSocket(
     );
   }, []);
 
+  const cancelTurn = useCallback(() => {
+    if (!wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return;
+    wsRef.current.send(JSON.stringify({ type: "cancel", data: {} }));
+  }, []);
+
   const clearMessages = useCallback(() => {
     setMessages([]);
     streamingContentRef.current = "";
+    sessionIdRef.current = null;
+    resumeTokenRef.current = null;
     wsRef.current?.close();
     setTimeout(() => connect(), 200);
   }, [connect]);
@@ -195,5 +250,5 @@ export function useWebSocket(
     };
   }, [connect]);
 
-  return { status, messages, isAgentRunning, sendMessage, clearMessages };
+  return { status, messages, isAgentRunning, sendMessage, cancelTurn, clearMessages };
 }
@@ -3,6 +3,8 @@ export type EventType =
   | "llm_token"
   | "tool_call"
   | "tool_result"
+  | "tool_output_chunk"
+  | "job_update"
   | "final_answer"
   | "error"
   | "init_status"
@@ -11,7 +13,11 @@ export type EventType =
   | "node_exit"
   | "context_pruned"
   | "context_compacted"
-  | "overflow_recovered";
+  | "overflow_recovered"
+  | "turn_cancelled"
+  | "queued"
+  | "queue_position"
+  | "pong";
 
 export interface AgentEvent {
   type: EventType;
@@ -32,6 +38,14 @@ export interface ToolCallData {
   tool_call_id: string;
   name: string;
   arguments: Record<string, unknown>;
+  live_output?: string;
+}
+
+export interface ToolOutputChunkData {
+  tool_call_id: string;
+  name: string;
+  stream: "stdout" | "stderr";
+  text: string;
 }
 
 export interface ToolResultData {
@@ -39,6 +53,22 @@ export interface ToolResultData {
   name: string;
   status: "success" | "error";
   content: string;
+  usage?: ToolUsage;
+}
+
+export interface ToolUsage {
+  peak_rss_mb?: number;
+  cpu_seconds?: number;
+  wall_seconds?: number;
+}
+
+export interface JobUpdateData {
+  job_id: string;
+  kind: "python" | "shell";
+  status: "running" | "succeeded" | "failed" | "timed_out" | "cancelled";
+  elapsed_seconds: number;
+  progress?: string | null;
+  returncode?: number | null;
 }
 
 export interface FinalAnswerData {
@@ -84,6 +114,8 @@ export interface TokenUsage {
   prompt_tokens: number;
   completion_tokens: number;
   total_tokens: number;
+  /** Prompt tokens served from the provider's prefix cache (latest step). */
+  cached_tokens?: number;
 }
 
 export interface InitStatusData {